@@ -0,0 +1,59 @@
+"""Conversation message sequence counter
+
+Revision ID: 002_message_sequence
+Revises: 001_voice_intelligence
+Create Date: 2025-01-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002_message_sequence'
+down_revision = '001_voice_intelligence'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Counter row for atomic per-conversation sequence allocation
+    op.add_column(
+        'conversations',
+        sa.Column('last_message_sequence', sa.Integer, nullable=False, server_default='0')
+    )
+
+    # The old max()+1 allocation could race, so renumber each conversation
+    # densely before the unique index goes on
+    op.execute("""
+        UPDATE conversation_messages m
+        SET sequence_number = ordered.rn
+        FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY conversation_id
+                ORDER BY sequence_number, timestamp, id
+            ) AS rn
+            FROM conversation_messages
+        ) ordered
+        WHERE m.id = ordered.id AND m.sequence_number IS DISTINCT FROM ordered.rn
+    """)
+
+    # Backfill from the renumbered messages
+    op.execute("""
+        UPDATE conversations
+        SET last_message_sequence = COALESCE((
+            SELECT MAX(m.sequence_number)
+            FROM conversation_messages m
+            WHERE m.conversation_id = conversations.id
+        ), 0)
+    """)
+
+    # One sequence number per conversation
+    op.create_index(
+        'uq_conversation_messages_sequence',
+        'conversation_messages',
+        ['conversation_id', 'sequence_number'],
+        unique=True
+    )
+
+def downgrade():
+    op.drop_index('uq_conversation_messages_sequence', table_name='conversation_messages')
+    op.drop_column('conversations', 'last_message_sequence')
@@ -0,0 +1,33 @@
+"""Keyset pagination indexes
+
+Revision ID: 003_keyset_pagination
+Revises: 002_message_sequence
+Create Date: 2025-01-27 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003_keyset_pagination'
+down_revision = '002_message_sequence'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Match `ORDER BY created_at DESC, id DESC` within an organization, so a
+    # cursor page is a range scan regardless of depth
+    op.create_index(
+        'idx_leads_org_created_id',
+        'leads',
+        ['organization_id', sa.text('created_at DESC'), sa.text('id DESC')]
+    )
+    op.create_index(
+        'idx_conversations_org_created_id',
+        'conversations',
+        ['organization_id', sa.text('created_at DESC'), sa.text('id DESC')]
+    )
+
+def downgrade():
+    op.drop_index('idx_conversations_org_created_id', table_name='conversations')
+    op.drop_index('idx_leads_org_created_id', table_name='leads')
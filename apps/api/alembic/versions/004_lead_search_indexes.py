@@ -0,0 +1,52 @@
+"""Lead search columns and trigram indexes
+
+Revision ID: 004_lead_search
+Revises: 003_keyset_pagination
+Create Date: 2025-01-28 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_lead_search'
+down_revision = '003_keyset_pagination'
+branch_labels = None
+depends_on = None
+
+SEARCH_TEXT = (
+    "lower(coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(email, ''))"
+)
+PHONE_DIGITS = (
+    "replace(replace(replace(replace(replace(replace(coalesce(phone, ''), "
+    "' ', ''), '-', ''), '(', ''), ')', ''), '+', ''), '.', '')"
+)
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Stored generated columns; adding them rewrites the leads table once
+    op.add_column('leads', sa.Column('search_text', sa.Text, sa.Computed(SEARCH_TEXT, persisted=True)))
+    op.add_column('leads', sa.Column('phone_digits', sa.String(50), sa.Computed(PHONE_DIGITS, persisted=True)))
+
+    # Trigram GIN indexes serve LIKE '%q%' and the <% word-similarity operator
+    op.create_index(
+        'idx_leads_search_text_trgm',
+        'leads',
+        ['search_text'],
+        postgresql_using='gin',
+        postgresql_ops={'search_text': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'idx_leads_phone_digits_trgm',
+        'leads',
+        ['phone_digits'],
+        postgresql_using='gin',
+        postgresql_ops={'phone_digits': 'gin_trgm_ops'}
+    )
+
+def downgrade():
+    op.drop_index('idx_leads_phone_digits_trgm', table_name='leads')
+    op.drop_index('idx_leads_search_text_trgm', table_name='leads')
+    op.drop_column('leads', 'phone_digits')
+    op.drop_column('leads', 'search_text')
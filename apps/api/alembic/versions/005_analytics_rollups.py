@@ -0,0 +1,84 @@
+"""Analytics rollup tables
+
+Revision ID: 005_analytics_rollups
+Revises: 004_lead_search
+Create Date: 2025-01-29 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '005_analytics_rollups'
+down_revision = '004_lead_search'
+branch_labels = None
+depends_on = None
+
+def _base_columns():
+    return [
+        sa.Column('id', sa.String, primary_key=True),
+        sa.Column('created_at', sa.DateTime, nullable=False, server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime, nullable=False, server_default=sa.text('now()')),
+        sa.Column('is_active', sa.Boolean, nullable=False, server_default=sa.true()),
+    ]
+
+def upgrade():
+    op.create_table('conversation_rollups',
+        *_base_columns(),
+        sa.Column('organization_id', sa.String, sa.ForeignKey('organizations.id'), nullable=False),
+        sa.Column('voice_agent_id', sa.String, sa.ForeignKey('voice_agents.id'), nullable=False),
+        sa.Column('granularity', sa.String(10), nullable=False),
+        sa.Column('bucket_start', sa.DateTime, nullable=False),
+        sa.Column('conversations', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('active', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('completed', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('transferred', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('converted', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('duration_sum', sa.Float, nullable=False, server_default='0'),
+        sa.Column('duration_count', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('sentiment_sum', sa.Float, nullable=False, server_default='0'),
+        sa.Column('sentiment_count', sa.Integer, nullable=False, server_default='0'),
+        sa.UniqueConstraint(
+            'organization_id', 'voice_agent_id', 'granularity', 'bucket_start',
+            name='uq_conversation_rollup_bucket'
+        ),
+    )
+    op.create_index(
+        'idx_conversation_rollups_org_bucket',
+        'conversation_rollups',
+        ['organization_id', 'granularity', 'bucket_start']
+    )
+
+    op.create_table('lead_rollups',
+        *_base_columns(),
+        sa.Column('organization_id', sa.String, sa.ForeignKey('organizations.id'), nullable=False),
+        sa.Column('granularity', sa.String(10), nullable=False),
+        sa.Column('bucket_start', sa.DateTime, nullable=False),
+        sa.Column('leads', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('score_sum', sa.Float, nullable=False, server_default='0'),
+        sa.Column('score_count', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('high_quality', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('status_counts', postgresql.JSON, nullable=False, server_default='{}'),
+        sa.Column('source_counts', postgresql.JSON, nullable=False, server_default='{}'),
+        sa.UniqueConstraint('organization_id', 'granularity', 'bucket_start', name='uq_lead_rollup_bucket'),
+    )
+
+    op.create_table('rollup_watermarks',
+        *_base_columns(),
+        sa.Column('name', sa.String(100), nullable=False, unique=True),
+        sa.Column('rolled_up_to', sa.DateTime, nullable=False),
+        sa.Column('last_run_at', sa.DateTime, nullable=False),
+    )
+
+    # Let the refresh job find rows changed since its last run without a scan
+    op.create_index('idx_conversations_updated_at', 'conversations', ['updated_at'])
+    op.create_index('idx_leads_updated_at', 'leads', ['updated_at'])
+
+def downgrade():
+    op.drop_index('idx_leads_updated_at', table_name='leads')
+    op.drop_index('idx_conversations_updated_at', table_name='conversations')
+    op.drop_table('rollup_watermarks')
+    op.drop_table('lead_rollups')
+    op.drop_index('idx_conversation_rollups_org_bucket', table_name='conversation_rollups')
+    op.drop_table('conversation_rollups')
@@ -0,0 +1,90 @@
+"""Composite and partial indexes for hot queries
+
+Revision ID: 006_hot_query_indexes
+Revises: 005_analytics_rollups
+Create Date: 2025-01-30 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_hot_query_indexes'
+down_revision = '005_analytics_rollups'
+branch_labels = None
+depends_on = None
+
+# Enum columns store member names
+OPEN_LEAD_STATUSES = "status IN ('NEW', 'CONTACTED', 'QUALIFIED')"
+ACTIVE_CONVERSATION_STATUSES = "status IN ('INITIATED', 'IN_PROGRESS')"
+
+INDEXES = [
+    # Status-filtered lead listing in keyset order, and per-status counts
+    dict(
+        index_name='idx_leads_org_status_created_id',
+        table_name='leads',
+        columns=['organization_id', 'status', sa.text('created_at DESC'), sa.text('id DESC')]
+    ),
+    # Hot leads: open leads by score
+    dict(
+        index_name='idx_leads_open_org_score',
+        table_name='leads',
+        columns=['organization_id', sa.text('lead_score DESC'), sa.text('created_at DESC')],
+        postgresql_where=sa.text(OPEN_LEAD_STATUSES)
+    ),
+    # Follow-up queue: open leads by due date
+    dict(
+        index_name='idx_leads_open_org_follow_up',
+        table_name='leads',
+        columns=['organization_id', sa.text('next_follow_up_date ASC NULLS FIRST')],
+        postgresql_where=sa.text(OPEN_LEAD_STATUSES)
+    ),
+    # Analytics windows and exports filter conversations on started_at
+    dict(
+        index_name='idx_conversations_org_started',
+        table_name='conversations',
+        columns=['organization_id', 'started_at']
+    ),
+    dict(
+        index_name='idx_conversations_agent_started',
+        table_name='conversations',
+        columns=['voice_agent_id', 'started_at']
+    ),
+    # Live "active conversations" counters touch only in-flight calls
+    dict(
+        index_name='idx_conversations_active_org',
+        table_name='conversations',
+        columns=['organization_id'],
+        postgresql_where=sa.text(ACTIVE_CONVERSATION_STATUSES)
+    ),
+    # Security review of a client's alerts, newest first
+    dict(
+        index_name='idx_audit_client_alerts',
+        table_name='client_audit_logs',
+        columns=['client_id', sa.text('event_timestamp DESC')],
+        postgresql_where=sa.text('security_alert')
+    ),
+]
+
+def upgrade():
+    # Built concurrently so the hot tables stay writable during the migration
+    with op.get_context().autocommit_block():
+        for index in INDEXES:
+            op.create_index(
+                index['index_name'],
+                index['table_name'],
+                index['columns'],
+                postgresql_where=index.get('postgresql_where'),
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for index in reversed(INDEXES):
+            op.drop_index(
+                index['index_name'],
+                table_name=index['table_name'],
+                postgresql_concurrently=True,
+                if_exists=True
+            )
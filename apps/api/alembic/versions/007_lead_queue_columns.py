@@ -0,0 +1,73 @@
+"""Generated hot-lead and follow-up columns with partial indexes
+
+Revision ID: 007_lead_queue_columns
+Revises: 006_hot_query_indexes
+Create Date: 2025-01-31 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_lead_queue_columns'
+down_revision = '006_hot_query_indexes'
+branch_labels = None
+depends_on = None
+
+IS_HOT = (
+    "coalesce(lead_score, 0) >= 75 "
+    "OR coalesce(timeline, '') IN ('immediate', '1_month') "
+    "OR coalesce(pre_approved, false)"
+)
+FOLLOW_UP_DUE_AT = (
+    "coalesce(next_follow_up_date, "
+    "CASE WHEN last_contact_date IS NULL THEN created_at + interval '1 day' END)"
+)
+OPEN_LEAD_STATUSES = "status IN ('NEW', 'CONTACTED', 'QUALIFIED')"
+
+def upgrade():
+    # Stored generated columns; adding them rewrites the leads table once
+    op.add_column('leads', sa.Column('is_hot', sa.Boolean, sa.Computed(IS_HOT, persisted=True)))
+    op.add_column('leads', sa.Column('follow_up_due_at', sa.DateTime, sa.Computed(FOLLOW_UP_DUE_AT, persisted=True)))
+
+    with op.get_context().autocommit_block():
+        # Hot leads: the index holds only open hot leads, in result order
+        op.create_index(
+            'idx_leads_hot_org_score',
+            'leads',
+            ['organization_id', sa.text('lead_score DESC'), sa.text('created_at DESC')],
+            postgresql_where=sa.text(f"is_hot AND {OPEN_LEAD_STATUSES}"),
+            postgresql_concurrently=True
+        )
+        # Follow-up queue: open leads with a due date, most overdue first
+        op.create_index(
+            'idx_leads_follow_up_org_due',
+            'leads',
+            ['organization_id', 'follow_up_due_at'],
+            postgresql_where=sa.text(f"follow_up_due_at IS NOT NULL AND {OPEN_LEAD_STATUSES}"),
+            postgresql_concurrently=True
+        )
+        # Superseded by the two above
+        op.drop_index('idx_leads_open_org_score', table_name='leads', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('idx_leads_open_org_follow_up', table_name='leads', postgresql_concurrently=True, if_exists=True)
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_leads_open_org_score',
+            'leads',
+            ['organization_id', sa.text('lead_score DESC'), sa.text('created_at DESC')],
+            postgresql_where=sa.text(OPEN_LEAD_STATUSES),
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'idx_leads_open_org_follow_up',
+            'leads',
+            ['organization_id', sa.text('next_follow_up_date ASC NULLS FIRST')],
+            postgresql_where=sa.text(OPEN_LEAD_STATUSES),
+            postgresql_concurrently=True
+        )
+        op.drop_index('idx_leads_follow_up_org_due', table_name='leads', postgresql_concurrently=True)
+        op.drop_index('idx_leads_hot_org_score', table_name='leads', postgresql_concurrently=True)
+    op.drop_column('leads', 'follow_up_due_at')
+    op.drop_column('leads', 'is_hot')
@@ -0,0 +1,24 @@
+"""Flush id on real-time sessions for idempotent journal replay
+
+Revision ID: 008_session_flush_id
+Revises: 007_lead_queue_columns
+Create Date: 2025-02-03 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_session_flush_id'
+down_revision = '007_lead_queue_columns'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable without a default, so no table rewrite
+    op.add_column('realtime_conversation_sessions', sa.Column('last_flush_id', sa.String(100), nullable=True))
+
+
+def downgrade():
+    op.drop_column('realtime_conversation_sessions', 'last_flush_id')
@@ -8,11 +8,16 @@ from .context_manager import ConversationContextManager
 from .intent_recognition import IntentRecognizer
 from .function_calling import FunctionCallHandler
 from .flow_manager import ConversationFlowManager
+from .summarizer import ConversationSummarizer
+from .prompt_bundles import PromptBundleCache, invalidate_prompt_bundles
 
 __all__ = [
     "ConversationAI",
     "ConversationContextManager",
     "IntentRecognizer", 
     "FunctionCallHandler",
-    "ConversationFlowManager"
+    "ConversationFlowManager",
+    "ConversationSummarizer",
+    "PromptBundleCache",
+    "invalidate_prompt_bundles"
 ]
\ No newline at end of file
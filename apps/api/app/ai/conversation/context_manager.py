@@ -70,11 +70,15 @@ class ConversationContextManager:
         assistant_message: Any,
         user_id: str,
         tenant_id: Optional[str] = None
-    ):
-        """Add conversation turn to context"""
+    ) -> Dict[str, Any]:
+        """Add conversation turn to context and return the updated context"""
         try:
             context = await self.get_context(conversation_id, user_id, tenant_id)
             
+            # Total turns ever added; history below is trimmed
+            metadata = context.setdefault("metadata", {})
+            metadata["turn_count"] = metadata.get("turn_count", 0) + 1
+            
             # Add messages
             context["messages"].extend([
                 {
@@ -101,8 +105,11 @@ class ConversationContextManager:
                 json.dumps(context)
             )
             
+            return context
+            
         except Exception as e:
             logger.error(f"Context update failed: {e}")
+            return {"messages": [], "metadata": {}}
     
     async def health_check(self) -> Dict[str, Any]:
         """Health check"""
@@ -18,6 +18,8 @@ from .context_manager import ConversationContextManager
 from .intent_recognition import IntentRecognizer
 from .function_calling import FunctionCallHandler
 from .flow_manager import ConversationFlowManager
+from .summarizer import ConversationSummarizer
+from .prompt_bundles import PromptBundle, PromptBundleCache, build_system_prompt
 from ..config import ai_settings, MODEL_CONFIGS
 from ...core.cache import get_redis_client
 
@@ -82,6 +84,8 @@ class ConversationAI:
         self.intent_recognizer = IntentRecognizer()
         self.function_handler = FunctionCallHandler()
         self.flow_manager = ConversationFlowManager()
+        self.summarizer = ConversationSummarizer(self.client)
+        self.prompt_bundles = PromptBundleCache(self.function_handler.get_available_functions)
         
         # Configuration
         self.model_config = MODEL_CONFIGS["gpt-4-conversation"]
@@ -94,6 +98,9 @@ class ConversationAI:
         self._token_usage = []
         self._function_call_success_rate = 0.0
         
+        # Background rolling-summary updates (held to keep tasks alive)
+        self._summary_tasks: set = set()
+        
         logger.info("Conversation AI engine initialized")
     
     async def initialize(self):
@@ -102,6 +109,7 @@ class ConversationAI:
         await self.intent_recognizer.initialize()
         await self.function_handler.initialize()
         await self.flow_manager.initialize()
+        await self.summarizer.initialize()
         logger.info("Conversation AI components initialized")
     
     async def process_conversation_turn(
@@ -150,15 +158,16 @@ class ConversationAI:
             )
             
             # Build conversation messages
+            bundle = self.prompt_bundles.get_bundle(tenant_id, context)
             messages = await self._build_conversation_messages(
-                conversation_context, user_message, system_prompt, context
+                conversation_context, user_message, system_prompt, context, bundle
             )
             
             # Determine if function calling is needed
             functions = None
             if self.function_calling_enabled and intent_result.requires_function_call:
-                functions = await self.function_handler.get_available_functions(
-                    user_id, tenant_id, intent_result.intent
+                functions = await self.prompt_bundles.get_functions(
+                    bundle, user_id, tenant_id, intent_result.intent
                 )
             
             # Generate response
@@ -167,9 +176,10 @@ class ConversationAI:
             )
             
             # Update conversation context
-            await self.context_manager.add_turn(
+            updated_context = await self.context_manager.add_turn(
                 conversation_id, user_message, assistant_response, user_id, tenant_id
             )
+            self._schedule_summary_update(conversation_id, updated_context, tenant_id)
             
             # Update flow state
             await self.flow_manager.update_flow_state(
@@ -246,7 +256,8 @@ class ConversationAI:
             )
             
             messages = await self._build_conversation_messages(
-                conversation_context, user_message, None, context
+                conversation_context, user_message, None, context,
+                self.prompt_bundles.get_bundle(tenant_id, context)
             )
             
             # Stream response
@@ -263,9 +274,10 @@ class ConversationAI:
                 timestamp=time.time()
             )
             
-            await self.context_manager.add_turn(
+            updated_context = await self.context_manager.add_turn(
                 conversation_id, user_message, assistant_response, user_id, tenant_id
             )
+            self._schedule_summary_update(conversation_id, updated_context, tenant_id)
             
         except Exception as e:
             logger.error(f"Streaming conversation failed: {e}")
@@ -391,20 +403,19 @@ class ConversationAI:
         context: Dict[str, Any],
         user_message: ConversationMessage,
         system_prompt: Optional[str] = None,
-        additional_context: Optional[Dict[str, Any]] = None
+        additional_context: Optional[Dict[str, Any]] = None,
+        bundle: Optional[PromptBundle] = None
     ) -> List[Dict[str, Any]]:
         """Build message list for OpenAI API"""
         
         messages = []
         
-        # System message
+        # System message (the compiled bundle keeps the prefix stable across turns)
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
         else:
-            messages.append({
-                "role": "system", 
-                "content": self._get_default_system_prompt(additional_context)
-            })
+            bundle = bundle or self.prompt_bundles.get_bundle(None, additional_context)
+            messages.append(bundle.system_message)
         
         # Previous conversation history
         conversation_history = context.get("messages", [])
@@ -423,34 +434,8 @@ class ConversationAI:
     
     def _get_default_system_prompt(self, context: Optional[Dict[str, Any]] = None) -> str:
         """Get default system prompt for real estate assistant"""
-        base_prompt = """You are JARVIS, an advanced AI voice assistant for Seiketsu AI's real estate platform. You are professional, knowledgeable, and helpful.
-
-Your capabilities include:
-- Answering real estate questions
-- Helping with property searches
-- Scheduling appointments
-- Providing market insights
-- Lead qualification
-- CRM management
-
-Guidelines:
-- Be conversational and natural
-- Ask clarifying questions when needed
-- Use function calls for specific actions
-- Keep responses concise but informative
-- Maintain professional tone
-- Focus on providing value to real estate professionals
-
-Current conversation context: Real estate voice assistant interaction."""
-        
-        if context:
-            # Add context-specific information
-            if context.get("user_type") == "agent":
-                base_prompt += "\n\nUser is a real estate agent. Focus on agent-specific features and tools."
-            elif context.get("user_type") == "client":
-                base_prompt += "\n\nUser is a potential property buyer/seller. Focus on client-facing services."
-        
-        return base_prompt
+        context = context or {}
+        return build_system_prompt(context.get("user_type"), context.get("agent_system_prompt"))
     
     def _generate_message_id(self) -> str:
         """Generate unique message ID"""
@@ -493,53 +478,50 @@ Current conversation context: Real estate voice assistant interaction."""
             self._conversation_times = self._conversation_times[-100:]
             self._token_usage = self._token_usage[-100:]
     
+    def _schedule_summary_update(
+        self,
+        conversation_id: str,
+        context: Dict[str, Any],
+        tenant_id: Optional[str] = None
+    ):
+        """Fold the latest turn into the rolling summary off the response path"""
+        task = asyncio.create_task(self.summarizer.update(conversation_id, context, tenant_id))
+        self._summary_tasks.add(task)
+        task.add_done_callback(self._summary_tasks.discard)
+    
     async def get_conversation_summary(
         self,
         conversation_id: str,
         user_id: str,
         tenant_id: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Generate conversation summary and insights"""
+        """Get the rolling conversation summary and insights.
+        
+        Served from the stored summary when it is current; otherwise only
+        the turns since its last version are summarized.
+        """
         try:
+            summary = await self.summarizer.get_summary(conversation_id, tenant_id)
             context = await self.context_manager.get_context(
                 conversation_id, user_id, tenant_id
             )
             
-            messages = context.get("messages", [])
+            if context.get("metadata", {}).get("turn_count", 0) > summary["turn_count"]:
+                summary = await self.summarizer.update(conversation_id, context, tenant_id)
             
-            if not messages:
+            if not summary["turn_count"]:
                 return {"summary": "No conversation history", "insights": []}
             
-            # Generate summary using GPT
-            summary_prompt = f"""Summarize this conversation between a user and a real estate AI assistant. Focus on:
-1. Key topics discussed
-2. Actions taken or requested
-3. Important decisions or preferences
-4. Next steps or follow-ups needed
-
-Conversation:
-{json.dumps(messages[-20:], indent=2)}
-
-Provide a concise summary and actionable insights."""
-            
-            summary_response = await self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": summary_prompt}],
-                max_tokens=500,
-                temperature=0.3
-            )
-            
-            summary = summary_response.choices[0].message.content
-            
-            # Extract insights
-            insights = await self._extract_conversation_insights(messages)
+            first_timestamp = summary["first_timestamp"]
+            last_timestamp = summary["last_timestamp"]
             
             return {
-                "summary": summary,
-                "insights": insights,
-                "message_count": len(messages),
-                "duration_minutes": (messages[-1]["timestamp"] - messages[0]["timestamp"]) / 60 if messages else 0,
-                "generated_at": time.time()
+                "summary": summary["summary"],
+                "insights": self.summarizer.insights(summary),
+                "message_count": summary["turn_count"] * 2,
+                "summary_version": summary["turn_count"],
+                "duration_minutes": (last_timestamp - first_timestamp) / 60 if first_timestamp and last_timestamp else 0,
+                "generated_at": summary["updated_at"]
             }
             
         except Exception as e:
@@ -547,30 +529,11 @@ Provide a concise summary and actionable insights."""
             return {"error": str(e)}
     
     async def _extract_conversation_insights(self, messages: List[Dict[str, Any]]) -> List[str]:
-        """Extract actionable insights from conversation"""
-        insights = []
-        
+        """Extract actionable insights from a batch of messages"""
         try:
-            # Analyze conversation patterns
-            user_messages = [msg for msg in messages if msg["role"] == "user"]
-            
-            if len(user_messages) > 5:
-                insights.append("Extended conversation - high engagement")
-            
-            # Look for specific keywords/patterns
-            all_content = " ".join([msg["content"] for msg in user_messages]).lower()
-            
-            if "price" in all_content or "budget" in all_content:
-                insights.append("Price/budget discussion - potential qualified lead")
-            
-            if "schedule" in all_content or "appointment" in all_content:
-                insights.append("Scheduling request - follow up needed")
-            
-            if "property" in all_content or "house" in all_content:
-                insights.append("Property-specific interest - provide property details")
-            
-            return insights
-            
+            summary = ConversationSummarizer.empty_summary()
+            ConversationSummarizer.update_insights(summary, messages)
+            return ConversationSummarizer.insights(summary)
         except Exception as e:
             logger.error(f"Insight extraction failed: {e}")
             return []
@@ -588,6 +551,7 @@ Provide a concise summary and actionable insights."""
             "total_conversations": len(self._conversation_times),
             "function_call_success_rate": self._function_call_success_rate,
             "model_config": self.model_config.__dict__,
+            "prompt_bundles": self.prompt_bundles.get_stats(),
             "target_response_time_ms": 500
         }
     
@@ -608,7 +572,9 @@ Provide a concise summary and actionable insights."""
             ("context_manager", self.context_manager),
             ("intent_recognizer", self.intent_recognizer),
             ("function_handler", self.function_handler),
-            ("flow_manager", self.flow_manager)
+            ("flow_manager", self.flow_manager),
+            ("summarizer", self.summarizer),
+            ("prompt_bundles", self.prompt_bundles)
         ]
         
         for name, component in components:
@@ -11,6 +11,90 @@ from typing import Dict, Any, Optional, List
 logger = logging.getLogger(__name__)
 
 
+# Function schemas advertised to the model, in a fixed order
+FUNCTION_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "search_properties": {
+        "name": "search_properties",
+        "description": "Search for properties based on criteria",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "location": {"type": "string", "description": "Property location"},
+                "property_type": {"type": "string", "description": "Type of property"},
+                "price_range": {"type": "object", "properties": {
+                    "min": {"type": "number"}, "max": {"type": "number"}
+                }}
+            },
+            "required": ["location"]
+        }
+    },
+    "get_property_details": {
+        "name": "get_property_details",
+        "description": "Get details for a specific property",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "property_id": {"type": "string", "description": "Property identifier"}
+            },
+            "required": ["property_id"]
+        }
+    },
+    "schedule_appointment": {
+        "name": "schedule_appointment",
+        "description": "Schedule an appointment with a real estate agent",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "date": {"type": "string", "description": "Preferred date"},
+                "time": {"type": "string", "description": "Preferred time"},
+                "type": {"type": "string", "description": "Appointment type"}
+            },
+            "required": ["date", "time", "type"]
+        }
+    },
+    "check_availability": {
+        "name": "check_availability",
+        "description": "Check available appointment slots",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "date": {"type": "string", "description": "Date to check"}
+            }
+        }
+    },
+    "get_market_data": {
+        "name": "get_market_data",
+        "description": "Get current market data for a location",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "location": {"type": "string", "description": "Market location"}
+            },
+            "required": ["location"]
+        }
+    },
+    "analyze_trends": {
+        "name": "analyze_trends",
+        "description": "Analyze price trends for a location",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "location": {"type": "string", "description": "Market location"},
+                "period_months": {"type": "integer", "description": "Analysis period in months"}
+            },
+            "required": ["location"]
+        }
+    }
+}
+
+# Functions offered per recognized intent
+INTENT_FUNCTIONS: Dict[str, List[str]] = {
+    "property_search": ["search_properties", "get_property_details"],
+    "schedule_appointment": ["schedule_appointment", "check_availability"],
+    "market_analysis": ["get_market_data", "analyze_trends"]
+}
+
+
 class FunctionCallHandler:
     """Handles function calling for real estate operations"""
     
@@ -34,39 +118,16 @@ class FunctionCallHandler:
         tenant_id: Optional[str] = None,
         intent: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """Get available functions for OpenAI function calling"""
-        functions = [
-            {
-                "name": "search_properties",
-                "description": "Search for properties based on criteria",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "location": {"type": "string", "description": "Property location"},
-                        "property_type": {"type": "string", "description": "Type of property"},
-                        "price_range": {"type": "object", "properties": {
-                            "min": {"type": "number"}, "max": {"type": "number"}
-                        }}
-                    },
-                    "required": ["location"]
-                }
-            },
-            {
-                "name": "schedule_appointment",
-                "description": "Schedule an appointment with a real estate agent",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "date": {"type": "string", "description": "Preferred date"},
-                        "time": {"type": "string", "description": "Preferred time"},
-                        "type": {"type": "string", "description": "Appointment type"}
-                    },
-                    "required": ["date", "time", "type"]
-                }
-            }
-        ]
-        
-        return functions
+        """Get available functions for OpenAI function calling.
+
+        Returns the schemas relevant to the intent (all schemas for unknown
+        or missing intents) in declaration order, so the serialized list is
+        identical from turn to turn.
+        """
+        names = INTENT_FUNCTIONS.get(intent)
+        if names is None:
+            return list(FUNCTION_SCHEMAS.values())
+        return [FUNCTION_SCHEMAS[name] for name in names]
         
     async def execute_function(
         self,
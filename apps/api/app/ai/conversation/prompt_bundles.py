@@ -0,0 +1,183 @@
+"""
+Prompt Bundles
+Pre-rendered per-tenant, per-agent system prompts and function schemas
+"""
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, List, Tuple, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_SYSTEM_PROMPT = """You are JARVIS, an advanced AI voice assistant for Seiketsu AI's real estate platform. You are professional, knowledgeable, and helpful.
+
+Your capabilities include:
+- Answering real estate questions
+- Helping with property searches
+- Scheduling appointments
+- Providing market insights
+- Lead qualification
+- CRM management
+
+Guidelines:
+- Be conversational and natural
+- Ask clarifying questions when needed
+- Use function calls for specific actions
+- Keep responses concise but informative
+- Maintain professional tone
+- Focus on providing value to real estate professionals
+
+Current conversation context: Real estate voice assistant interaction."""
+
+USER_TYPE_PROMPTS = {
+    "agent": "User is a real estate agent. Focus on agent-specific features and tools.",
+    "client": "User is a potential property buyer/seller. Focus on client-facing services."
+}
+
+# Bumped by invalidate_prompt_bundles(); checked by every cache on lookup
+_config_generations: Dict[Tuple[Optional[str], Optional[str]], int] = {}
+_global_generation = 0
+
+
+def build_system_prompt(user_type: Optional[str] = None, agent_prompt: Optional[str] = None) -> str:
+    """Render the system prompt for an agent and user type"""
+    prompt = agent_prompt or DEFAULT_SYSTEM_PROMPT
+    if user_type in USER_TYPE_PROMPTS:
+        prompt += "\n\n" + USER_TYPE_PROMPTS[user_type]
+    return prompt
+
+
+def invalidate_prompt_bundles(tenant_id: Optional[str] = None, agent_id: Optional[str] = None):
+    """Invalidate compiled bundles after an agent configuration change.
+
+    With neither argument every bundle is rebuilt on next use; with only
+    agent_id the agent's bundles are dropped for all tenants.
+    """
+    global _global_generation
+    if tenant_id is None and agent_id is None:
+        _global_generation += 1
+        return
+    key = (tenant_id, agent_id)
+    _config_generations[key] = _config_generations.get(key, 0) + 1
+
+
+def _generation(tenant_id: Optional[str], agent_id: Optional[str]) -> Tuple[int, int, int]:
+    return (
+        _global_generation,
+        _config_generations.get((None, agent_id), 0),
+        _config_generations.get((tenant_id, agent_id), 0)
+    )
+
+
+@dataclass
+class PromptBundle:
+    """Compiled request prefix for one tenant, agent and user type"""
+    system_prompt: str
+    system_message: Dict[str, str]
+    version: Tuple[Any, ...]
+    fingerprint: str
+    built_at: float
+    functions: Dict[Optional[str], Optional[List[Dict[str, Any]]]] = field(default_factory=dict)
+
+
+class PromptBundleCache:
+    """Caches compiled prompt bundles so turns reuse one stable request prefix.
+
+    The system message and per-intent function lists are built once per
+    bundle version and handed to the client as the same objects every turn,
+    so the prefix of each request is byte-identical and eligible for
+    provider-side prompt caching. The least recently used bundles are
+    dropped beyond max_bundles.
+    """
+
+    def __init__(
+        self,
+        functions_loader: Callable[[str, Optional[str], Optional[str]], Awaitable[List[Dict[str, Any]]]],
+        max_bundles: int = 1000
+    ):
+        self.functions_loader = functions_loader
+        self.max_bundles = max_bundles
+        self._bundles: "OrderedDict[Tuple[Optional[str], Optional[str], Optional[str]], PromptBundle]" = OrderedDict()
+        self.stats = {
+            "builds": 0,
+            "hits": 0,
+            "function_builds": 0,
+            "function_hits": 0
+        }
+
+    def get_bundle(
+        self,
+        tenant_id: Optional[str] = None,
+        context: Optional[Dict[str, Any]] = None
+    ) -> PromptBundle:
+        """Get the compiled bundle for the agent described by the context"""
+        context = context or {}
+        agent_id = context.get("agent_id")
+        user_type = context.get("user_type")
+        agent_prompt = context.get("agent_system_prompt")
+        # The prompt itself is part of the version, so an edited prompt is
+        # picked up even when the config version and generation are unchanged
+        prompt_hash = hashlib.sha256(agent_prompt.encode()).hexdigest()[:16] if agent_prompt else None
+        version = _generation(tenant_id, agent_id) + (context.get("agent_config_version"), prompt_hash)
+
+        key = (tenant_id, agent_id, user_type)
+        bundle = self._bundles.get(key)
+        if bundle is not None and bundle.version == version:
+            self._bundles.move_to_end(key)
+            self.stats["hits"] += 1
+            return bundle
+
+        system_prompt = build_system_prompt(user_type, agent_prompt)
+        bundle = PromptBundle(
+            system_prompt=system_prompt,
+            system_message={"role": "system", "content": system_prompt},
+            version=version,
+            fingerprint=hashlib.sha256(system_prompt.encode()).hexdigest()[:16],
+            built_at=time.time()
+        )
+        self._bundles[key] = bundle
+        self._bundles.move_to_end(key)
+        while len(self._bundles) > self.max_bundles:
+            self._bundles.popitem(last=False)
+        self.stats["builds"] += 1
+        logger.debug(f"Built prompt bundle {bundle.fingerprint} for tenant={tenant_id} agent={agent_id}")
+        return bundle
+
+    async def get_functions(
+        self,
+        bundle: PromptBundle,
+        user_id: str,
+        tenant_id: Optional[str] = None,
+        intent: Optional[str] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Get the bundle's function schemas for an intent, loading them once"""
+        if intent in bundle.functions:
+            self.stats["function_hits"] += 1
+            return bundle.functions[intent]
+
+        functions = await self.functions_loader(user_id, tenant_id, intent)
+        bundle.functions[intent] = functions or None
+        self.stats["function_builds"] += 1
+        return bundle.functions[intent]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Bundle build and hit counters"""
+        lookups = self.stats["builds"] + self.stats["hits"]
+        return {
+            **self.stats,
+            "cached_bundles": len(self._bundles),
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0
+        }
+
+    async def health_check(self) -> Dict[str, Any]:
+        """Health check"""
+        return {
+            "status": "healthy",
+            "service": "prompt_bundle_cache",
+            **self.get_stats(),
+            "timestamp": time.time()
+        }
@@ -0,0 +1,197 @@
+"""
+Conversation Summarizer
+Maintains a rolling conversation summary updated incrementally per turn
+"""
+
+import asyncio
+import logging
+import time
+import json
+import weakref
+from typing import Dict, Any, Optional, List
+
+from ...core.cache import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+# Keyword-driven insights, evaluated only over new user messages
+INSIGHT_RULES = [
+    ("price_discussion", ("price", "budget"), "Price/budget discussion - potential qualified lead"),
+    ("scheduling_request", ("schedule", "appointment"), "Scheduling request - follow up needed"),
+    ("property_interest", ("property", "house"), "Property-specific interest - provide property details"),
+]
+EXTENDED_CONVERSATION_USER_MESSAGES = 5
+
+
+class ConversationSummarizer:
+    """Keeps a versioned rolling summary next to the conversation context.
+
+    After each turn only the messages added since the last summarized turn
+    are sent to the model together with the previous summary, so summary
+    reads are a cache lookup and no call ever covers the full transcript.
+    """
+
+    def __init__(self, client: Any, model: str = "gpt-3.5-turbo"):
+        self.client = client
+        self.model = model
+        self.redis_client = None
+        self.summary_ttl = 1800  # Matches the conversation context TTL
+        # Per-conversation locks, released once no update holds them
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    async def initialize(self):
+        """Initialize Redis connection"""
+        self.redis_client = await get_redis_client()
+
+    def _summary_key(self, conversation_id: str, tenant_id: Optional[str]) -> str:
+        return f"conversation:{tenant_id or 'default'}:{conversation_id}:summary"
+
+    def _lock_for(self, conversation_id: str) -> asyncio.Lock:
+        lock = self._locks.get(conversation_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[conversation_id] = lock
+        return lock
+
+    @staticmethod
+    def empty_summary() -> Dict[str, Any]:
+        return {
+            "summary": "",
+            "turn_count": 0,
+            "user_message_count": 0,
+            "insight_flags": [],
+            "first_timestamp": None,
+            "last_timestamp": None,
+            "updated_at": None
+        }
+
+    async def get_summary(
+        self,
+        conversation_id: str,
+        tenant_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Get the stored rolling summary"""
+        try:
+            if not self.redis_client:
+                return self.empty_summary()
+
+            data = await self.redis_client.get(self._summary_key(conversation_id, tenant_id))
+            return json.loads(data) if data else self.empty_summary()
+
+        except Exception as e:
+            logger.error(f"Summary retrieval failed: {e}")
+            return self.empty_summary()
+
+    async def update(
+        self,
+        conversation_id: str,
+        context: Dict[str, Any],
+        tenant_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Fold turns added since the last update into the summary"""
+        async with self._lock_for(conversation_id):
+            summary = await self.get_summary(conversation_id, tenant_id)
+
+            total_turns = context.get("metadata", {}).get("turn_count", 0)
+            pending_turns = total_turns - summary["turn_count"]
+            if pending_turns <= 0:
+                return summary
+
+            messages = context.get("messages", [])
+            new_messages = messages[-pending_turns * 2:]
+            if pending_turns * 2 > len(messages):
+                logger.warning(
+                    f"Summary for {conversation_id} lagged past retained history; "
+                    f"{pending_turns * 2 - len(messages)} messages skipped"
+                )
+
+            if new_messages:
+                summary["summary"] = await self._summarize_delta(summary["summary"], new_messages)
+                self.update_insights(summary, new_messages)
+                if summary["first_timestamp"] is None:
+                    summary["first_timestamp"] = new_messages[0].get("timestamp")
+                summary["last_timestamp"] = new_messages[-1].get("timestamp")
+
+            summary["turn_count"] = total_turns
+            summary["updated_at"] = time.time()
+
+            await self._store(conversation_id, tenant_id, summary)
+            return summary
+
+    async def _summarize_delta(self, previous_summary: str, new_messages: List[Dict[str, Any]]) -> str:
+        """Merge new messages into the previous summary with one small call"""
+        delta = "\n".join(f"{msg['role']}: {msg['content']}" for msg in new_messages)
+
+        prompt = f"""You maintain a running summary of a conversation between a user and a real estate AI assistant. Focus on:
+1. Key topics discussed
+2. Actions taken or requested
+3. Important decisions or preferences
+4. Next steps or follow-ups needed
+
+Current summary:
+{previous_summary or "(none yet)"}
+
+New messages:
+{delta}
+
+Return the updated concise summary."""
+
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=500,
+                temperature=0.3
+            )
+            return response.choices[0].message.content
+
+        except Exception as e:
+            logger.error(f"Delta summarization failed: {e}")
+            return previous_summary
+
+    @staticmethod
+    def update_insights(summary: Dict[str, Any], new_messages: List[Dict[str, Any]]):
+        """Update insight flags from new user messages only"""
+        flags = set(summary["insight_flags"])
+        user_messages = [msg for msg in new_messages if msg["role"] == "user"]
+        summary["user_message_count"] += len(user_messages)
+
+        content = " ".join(msg["content"] for msg in user_messages).lower()
+        for flag, keywords, _ in INSIGHT_RULES:
+            if any(keyword in content for keyword in keywords):
+                flags.add(flag)
+
+        summary["insight_flags"] = sorted(flags)
+
+    @staticmethod
+    def insights(summary: Dict[str, Any]) -> List[str]:
+        """Render insight flags as human-readable insights"""
+        insights = []
+        if summary["user_message_count"] > EXTENDED_CONVERSATION_USER_MESSAGES:
+            insights.append("Extended conversation - high engagement")
+
+        flags = set(summary["insight_flags"])
+        insights.extend(text for flag, _, text in INSIGHT_RULES if flag in flags)
+        return insights
+
+    async def _store(self, conversation_id: str, tenant_id: Optional[str], summary: Dict[str, Any]):
+        if not self.redis_client:
+            return
+        try:
+            await self.redis_client.setex(
+                self._summary_key(conversation_id, tenant_id),
+                self.summary_ttl,
+                json.dumps(summary)
+            )
+        except Exception as e:
+            logger.error(f"Summary store failed: {e}")
+
+    async def health_check(self) -> Dict[str, Any]:
+        """Health check"""
+        return {
+            "status": "healthy",
+            "service": "conversation_summarizer",
+            "redis_connected": self.redis_client is not None,
+            "timestamp": time.time()
+        }
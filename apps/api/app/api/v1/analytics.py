@@ -9,7 +9,7 @@ from pydantic import BaseModel, Field
 from datetime import datetime, timedelta
 import logging
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.core.auth import get_current_user, get_current_organization
 from app.models.user import User
 from app.models.organization import Organization
@@ -64,7 +64,7 @@ async def get_dashboard_metrics(
     include_ml: bool = Query(False),
     current_user: User = Depends(get_current_user),
     current_org: Organization = Depends(get_current_organization),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> DashboardResponse:
     """Get comprehensive dashboard metrics with optional ML insights"""
     try:
@@ -117,7 +117,7 @@ async def get_performance_metrics(
     include_benchmarks: bool = Query(False),
     current_user: User = Depends(get_current_user),
     current_org: Organization = Depends(get_current_organization),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> PerformanceMetricsResponse:
     """Get detailed performance metrics with industry benchmarks"""
     try:
@@ -173,7 +173,7 @@ async def get_conversation_analysis(
     days: int = Query(30, ge=7, le=90),
     current_user: User = Depends(get_current_user),
     current_org: Organization = Depends(get_current_organization),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> ConversationAnalysisResponse:
     """Get advanced conversation pattern analysis"""
     try:
@@ -217,7 +217,7 @@ async def get_conversation_analysis(
 async def get_lead_scoring_insights(
     current_user: User = Depends(get_current_user),
     current_org: Organization = Depends(get_current_organization),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> Dict[str, Any]:
     """Get lead scoring model insights and recommendations"""
     try:
@@ -247,7 +247,7 @@ async def get_agent_optimization(
     days: int = Query(30, ge=7, le=90),
     current_user: User = Depends(get_current_user),
     current_org: Organization = Depends(get_current_organization),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> Dict[str, Any]:
     """Get AI-powered optimization suggestions for a specific voice agent"""
     try:
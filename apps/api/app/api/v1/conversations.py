@@ -1,13 +1,24 @@
 """
 Conversations API endpoints
 """
-from fastapi import APIRouter
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any, Optional, AsyncIterator
+from datetime import datetime
 import logging
 
+from app.core.database import get_read_db, ReadSessionLocal
+from app.core.auth import get_current_organization
+from app.models.organization import Organization
+from app.services.conversation_service import ConversationService
+from app.utils.streaming import encode_stream, gzip_stream
+
 logger = logging.getLogger("seiketsu.conversations")
 router = APIRouter()
 
+conversation_service = ConversationService()
+
 @router.get("")
 async def list_conversations() -> Dict[str, Any]:
     return {"conversations": [], "total": 0}
@@ -16,6 +27,55 @@ async def list_conversations() -> Dict[str, Any]:
 async def create_conversation() -> Dict[str, Any]:
     return {"id": "conv_123", "created_at": "2024-01-01T00:00:00Z"}
 
+@router.get("/export")
+async def export_conversations(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    compress: bool = Query(True, description="Download the NDJSON stream as a .gz file"),
+    current_org: Organization = Depends(get_current_organization)
+) -> StreamingResponse:
+    """Stream all of the organization's conversations as (gzipped) NDJSON"""
+    organization_id = current_org.id
+    
+    async def generate() -> AsyncIterator[str]:
+        # The stream outlives the request-scoped session, so it owns its own
+        async with ReadSessionLocal() as stream_db:
+            async for line in conversation_service.stream_organization_export(
+                organization_id, stream_db, start_date=start_date, end_date=end_date
+            ):
+                yield line
+    
+    filename = f"conversations_{organization_id}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.ndjson"
+    
+    if compress:
+        # A .gz file download, not a transfer encoding: clients keep the
+        # bytes as-is instead of transparently decompressing them
+        headers = {"Content-Disposition": f'attachment; filename="{filename}.gz"'}
+        return StreamingResponse(gzip_stream(generate()), media_type="application/gzip", headers=headers)
+    
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    return StreamingResponse(encode_stream(generate()), media_type="application/x-ndjson", headers=headers)
+
+@router.get("/{conversation_id}/transcript")
+async def stream_conversation_transcript(
+    conversation_id: str,
+    current_org: Organization = Depends(get_current_organization),
+    db: AsyncSession = Depends(get_read_db)
+) -> StreamingResponse:
+    """Stream a conversation transcript line by line"""
+    conversation = await conversation_service.get_conversation(conversation_id, db)
+    if not conversation or conversation.organization_id != current_org.id:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    async def generate() -> AsyncIterator[str]:
+        async with ReadSessionLocal() as stream_db:
+            async for line in conversation_service.stream_conversation_transcript(
+                conversation_id, stream_db
+            ):
+                yield line
+    
+    return StreamingResponse(encode_stream(generate()), media_type="text/plain; charset=utf-8")
+
 @router.get("/{conversation_id}")
 async def get_conversation(conversation_id: str) -> Dict[str, Any]:
     return {"id": conversation_id, "transcript": "Mock transcript"}
@@ -2,21 +2,26 @@
 Enterprise Lead Management API Endpoints
 Comprehensive CRUD operations with lead qualification scoring
 """
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, UploadFile, File
+from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field, validator
 from datetime import datetime, timedelta
 import logging
+import os
 from enum import Enum
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, get_read_db, AsyncSessionLocal
 from app.core.auth import get_current_user, get_current_organization
 from app.models.user import User
 from app.models.organization import Organization
 from app.models.lead import Lead, LeadStatus, LeadSource
 from app.services.lead_service import LeadService
+from app.services.lead_import_service import lead_import_service, ImportCheckpoint, IMPORT_FORMATS
 from app.services.analytics_service import AnalyticsService
+from app.utils.pagination import encode_cursor
 from app.tasks.lead_tasks import schedule_follow_up_reminder
 
 logger = logging.getLogger("seiketsu.leads")
@@ -30,9 +35,9 @@ analytics_service = AnalyticsService()
 class LeadCreateRequest(BaseModel):
     first_name: str = Field(..., min_length=1, max_length=100)
     last_name: str = Field(..., min_length=1, max_length=100)
-    email: Optional[str] = Field(None, regex=r'^[\w\.-]+@[\w\.-]+\.\w+$')
+    email: Optional[str] = Field(None, pattern=r'^[\w\.-]+@[\w\.-]+\.\w+$')
     phone: str = Field(..., min_length=10, max_length=20)
-    source: LeadSource = LeadSource.MANUAL
+    source: LeadSource = LeadSource.OTHER
     property_type: Optional[str] = None
     budget_min: Optional[int] = Field(None, ge=0)
     budget_max: Optional[int] = Field(None, ge=0)
@@ -53,7 +58,7 @@ class LeadCreateRequest(BaseModel):
 class LeadUpdateRequest(BaseModel):
     first_name: Optional[str] = Field(None, min_length=1, max_length=100)
     last_name: Optional[str] = Field(None, min_length=1, max_length=100)
-    email: Optional[str] = Field(None, regex=r'^[\w\.-]+@[\w\.-]+\.\w+$')
+    email: Optional[str] = Field(None, pattern=r'^[\w\.-]+@[\w\.-]+\.\w+$')
     phone: Optional[str] = Field(None, min_length=10, max_length=20)
     property_type: Optional[str] = None
     budget_min: Optional[int] = Field(None, ge=0)
@@ -80,7 +85,7 @@ class LeadNoteRequest(BaseModel):
 
 class BulkLeadUpdateRequest(BaseModel):
     lead_ids: List[str] = Field(..., min_items=1)
-    action: str = Field(..., regex='^(update_status|assign_agent|add_tags|remove_tags)$')
+    action: str = Field(..., pattern='^(update_status|assign_agent|add_tags|remove_tags)$')
     data: Dict[str, Any]
 
 class LeadQualificationRequest(BaseModel):
@@ -88,6 +93,17 @@ class LeadQualificationRequest(BaseModel):
     qualification_data: Dict[str, Any]
     qualified_by_user_id: str
 
+class LeadImportResponse(BaseModel):
+    job_id: str
+    status: str
+    rows_read: int
+    imported: int
+    duplicates: int
+    invalid: int
+    error: Optional[str] = None
+    created_at: str
+    updated_at: Optional[str] = None
+
 class LeadResponse(BaseModel):
     id: str
     first_name: str
@@ -123,11 +139,20 @@ class LeadListResponse(BaseModel):
     page: int
     limit: int
     has_next: bool
+    next_cursor: Optional[str] = None
+
+def _page_of(leads: List[Lead], limit: int):
+    """Trim a limit + 1 fetch to one page and build the next-page cursor"""
+    if len(leads) <= limit:
+        return leads, False, None
+    leads = leads[:limit]
+    return leads, True, encode_cursor(leads[-1].created_at, leads[-1].id)
 
 @router.get("", response_model=LeadListResponse)
 async def list_leads(
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; overrides page"),
     status: Optional[LeadStatus] = None,
     source: Optional[LeadSource] = None,
     search: Optional[str] = None,
@@ -135,11 +160,12 @@ async def list_leads(
     hot_leads_only: bool = False,
     current_user: User = Depends(get_current_user),
     current_org: Organization = Depends(get_current_organization),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> LeadListResponse:
     """List leads with filtering and pagination"""
     try:
         offset = (page - 1) * limit
+        next_cursor = None
         
         # Get hot leads if requested
         if hot_leads_only:
@@ -147,6 +173,7 @@ async def list_leads(
                 current_org.id, db, limit=limit
             )
             total = len(leads)
+            has_next = False
         else:
             # Apply filtering based on user role
             if assigned_only and not current_user.is_admin:
@@ -155,27 +182,29 @@ async def list_leads(
             else:
                 status_filter = status
             
-            leads = await lead_service.get_leads_for_organization(
-                organization_id=current_org.id,
-                db=db,
-                status_filter=status_filter,
-                source_filter=source,
-                limit=limit,
-                offset=offset,
-                search_query=search
-            )
+            try:
+                leads = await lead_service.get_leads_for_organization(
+                    organization_id=current_org.id,
+                    db=db,
+                    status_filter=status_filter,
+                    source_filter=source,
+                    limit=limit + 1,
+                    offset=offset,
+                    search_query=search,
+                    cursor=cursor
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            leads, has_next, next_cursor = _page_of(leads, limit)
             
             # Get total count for pagination
-            total_leads = await lead_service.get_leads_for_organization(
+            total = await lead_service.count_leads_for_organization(
                 organization_id=current_org.id,
                 db=db,
                 status_filter=status_filter,
                 source_filter=source,
-                limit=1000,  # High limit to get total count
-                offset=0,
                 search_query=search
             )
-            total = len(total_leads)
         
         # Convert to response models
         lead_responses = [LeadResponse.from_orm(lead) for lead in leads]
@@ -192,9 +221,12 @@ async def list_leads(
             total=total,
             page=page,
             limit=limit,
-            has_next=offset + limit < total
+            has_next=has_next,
+            next_cursor=next_cursor
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to list leads: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve leads")
@@ -475,29 +507,25 @@ async def search_leads(
     limit: int = Query(20, ge=1, le=50),
     current_user: User = Depends(get_current_user),
     current_org: Organization = Depends(get_current_organization),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> LeadListResponse:
     """Search leads by name, email, phone, or notes"""
     try:
         offset = (page - 1) * limit
         
-        leads = await lead_service.get_leads_for_organization(
-            organization_id=current_org.id,
-            db=db,
-            limit=limit,
-            offset=offset,
-            search_query=q
+        # Ranked by relevance, so results page by offset
+        leads = await lead_service.search_leads(
+            current_org.id, q, db, limit=limit + 1, offset=offset
         )
+        has_next = len(leads) > limit
+        leads = leads[:limit]
         
         # Get total count for searched results
-        all_results = await lead_service.get_leads_for_organization(
+        total = await lead_service.count_leads_for_organization(
             organization_id=current_org.id,
             db=db,
-            limit=1000,
-            offset=0,
             search_query=q
         )
-        total = len(all_results)
         
         lead_responses = [LeadResponse.from_orm(lead) for lead in leads]
         
@@ -513,9 +541,11 @@ async def search_leads(
             total=total,
             page=page,
             limit=limit,
-            has_next=offset + limit < total
+            has_next=has_next
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to search leads: {e}")
         raise HTTPException(status_code=500, detail="Search failed")
@@ -525,7 +555,7 @@ async def get_hot_leads(
     limit: int = Query(20, ge=1, le=50),
     current_user: User = Depends(get_current_user),
     current_org: Organization = Depends(get_current_organization),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> List[LeadResponse]:
     """Get hot leads that need immediate attention"""
     try:
@@ -551,7 +581,7 @@ async def get_leads_needing_follow_up(
     limit: int = Query(50, ge=1, le=100),
     current_user: User = Depends(get_current_user),
     current_org: Organization = Depends(get_current_organization),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> List[LeadResponse]:
     """Get leads that need follow-up contact"""
     try:
@@ -577,18 +607,13 @@ async def bulk_update_leads(
         if not current_user.is_admin:
             raise HTTPException(status_code=403, detail="Admin access required")
         
-        updated_count = 0
-        
-        if request.action == "add_tags":
-            tags_to_add = request.data.get("tags", [])
-            updated_count = await lead_service.bulk_update_lead_tags(
-                request.lead_ids, tags_to_add, [], db, current_user.id
-            )
-        elif request.action == "remove_tags":
-            tags_to_remove = request.data.get("tags", [])
-            updated_count = await lead_service.bulk_update_lead_tags(
-                request.lead_ids, [], tags_to_remove, db, current_user.id
+        try:
+            updated_ids = await lead_service.bulk_update_leads(
+                current_org.id, request.lead_ids, request.action, request.data, db, current_user.id
             )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        updated_count = len(updated_ids)
         
         # Track analytics
         await analytics_service.track_event(
@@ -606,6 +631,7 @@ async def bulk_update_leads(
         return {
             "success": True,
             "updated_count": updated_count,
+            "updated_ids": updated_ids,
             "total_requested": len(request.lead_ids)
         }
         
@@ -615,6 +641,103 @@ async def bulk_update_leads(
         logger.error(f"Failed to bulk update leads: {e}")
         raise HTTPException(status_code=500, detail="Bulk update failed")
 
+async def run_lead_import(job_id: str):
+    """Run an import job in its own session, outside the request"""
+    async with AsyncSessionLocal() as db:
+        try:
+            await lead_import_service.run(job_id, db, LeadCreateRequest)
+        except Exception as e:
+            logger.error(f"Lead import {job_id} failed: {e}")
+
+def _import_job_for(job_id: str, current_org: Organization) -> ImportCheckpoint:
+    try:
+        checkpoint = lead_import_service.load_checkpoint(job_id)
+    except ValueError:
+        checkpoint = None
+    if not checkpoint or checkpoint.organization_id != current_org.id:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return checkpoint
+
+@router.post("/import", status_code=202, response_model=LeadImportResponse)
+async def import_leads(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(..., description="CSV with a header row, or NDJSON with one lead per line"),
+    current_user: User = Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization)
+) -> LeadImportResponse:
+    """Bulk import leads from a CSV or NDJSON file.
+
+    The file is stored and processed in the background; poll the job for
+    progress and download rejected rows from its errors file.
+    """
+    file_format = (file.filename or "").rsplit(".", 1)[-1].lower()
+    if file_format == "jsonl":
+        file_format = "ndjson"
+    if file_format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Import file must be .csv or .ndjson")
+
+    async def chunks():
+        while chunk := await file.read(1024 * 1024):
+            yield chunk
+
+    try:
+        checkpoint = await lead_import_service.create_job(
+            current_org.id, current_user.id, file_format, chunks(),
+            max_bytes=settings.LEAD_IMPORT_MAX_UPLOAD_SIZE
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    # Owned from the start, so a resume can't race the first run
+    lead_import_service.claim(checkpoint.job_id)
+    background_tasks.add_task(run_lead_import, checkpoint.job_id)
+    logger.info(f"Queued lead import {checkpoint.job_id} by user {current_user.id}")
+
+    return LeadImportResponse(**checkpoint.to_dict())
+
+@router.get("/import/{job_id}", response_model=LeadImportResponse)
+async def get_lead_import(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization)
+) -> LeadImportResponse:
+    """Progress and counts for a lead import job"""
+    return LeadImportResponse(**_import_job_for(job_id, current_org).to_dict())
+
+@router.get("/import/{job_id}/errors")
+async def get_lead_import_errors(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization)
+) -> FileResponse:
+    """Rejected rows of a lead import job as NDJSON"""
+    _import_job_for(job_id, current_org)
+    path = lead_import_service.errors_path(job_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="No import errors recorded")
+    return FileResponse(path, media_type="application/x-ndjson", filename=f"lead-import-{job_id}-errors.ndjson")
+
+@router.post("/import/{job_id}/resume", status_code=202, response_model=LeadImportResponse)
+async def resume_lead_import(
+    job_id: str,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization)
+) -> LeadImportResponse:
+    """Resume a failed or abandoned import after its last committed batch.
+
+    A job still marked running counts as abandoned once it has made no
+    progress for LEAD_IMPORT_STALE_SECONDS, e.g. after an API restart.
+    """
+    checkpoint = _import_job_for(job_id, current_org)
+    if not lead_import_service.is_resumable(checkpoint):
+        raise HTTPException(status_code=409, detail=f"Import job is {checkpoint.status}")
+    if not lead_import_service.claim(job_id):
+        raise HTTPException(status_code=409, detail="Import job is already running")
+
+    background_tasks.add_task(run_lead_import, job_id)
+    return LeadImportResponse(**checkpoint.to_dict())
+
 @router.delete("/{lead_id}")
 async def delete_lead(
     lead_id: str,
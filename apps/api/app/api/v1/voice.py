@@ -22,6 +22,7 @@ from app.models.conversation import Conversation, ConversationStatus
 from app.services.voice_service import VoiceService
 from app.services.conversation_service import ConversationService
 from app.services.elevenlabs_service import elevenlabs_service, Language, AudioFormat
+from app.services.session_state_buffer import session_state_buffer
 from app.api.v1.voice_streaming import router as streaming_router
 
 logger = logging.getLogger("seiketsu.voice")
@@ -96,6 +97,9 @@ async def voice_stream_websocket(
     db: AsyncSession = Depends(get_db)
 ):
     """WebSocket endpoint for real-time voice streaming with sub-2s response time"""
+    # The session is keyed by the conversation it streams
+    conversation_id = session_id
+    end_status = "ended"
     await manager.connect(websocket, session_id)
     
     try:
@@ -154,12 +158,16 @@ async def voice_stream_websocket(
         logger.info(f"WebSocket disconnected for conversation {conversation_id}")
     except Exception as e:
         logger.error(f"WebSocket error for conversation {conversation_id}: {e}")
+        end_status = "error"
         await websocket.send_text(json.dumps({
             "error": str(e),
             "type": "error"
         }))
     finally:
         manager.disconnect(conversation_id)
+        # Flush final status and ended_at if the buffer tracks this session
+        if session_state_buffer.get_state(conversation_id) is not None:
+            await session_state_buffer.end_session(conversation_id, end_status)
 
 @router.post("/process", response_model=VoiceProcessingResponse)
 async def process_voice_input(
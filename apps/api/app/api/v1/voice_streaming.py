@@ -21,6 +21,7 @@ from app.models.organization import Organization
 from app.models.voice_agent import VoiceAgent
 from app.services.elevenlabs_service import elevenlabs_service, Language, AudioFormat
 from app.services.voice_service import VoiceService
+from app.services.session_state_buffer import session_state_buffer
 from app.tasks.voice_generation_tasks import pregenerate_agent_voices, voice_quality_analysis
 from app.services.twentyonedev_service import analytics_service
 
@@ -112,6 +113,7 @@ async def voice_streaming_websocket(
     Supports bidirectional audio streaming and real-time synthesis
     """
     voice_agent = None
+    end_status = "ended"
     
     try:
         # Get and validate voice agent
@@ -177,8 +179,12 @@ async def voice_streaming_websocket(
         logger.info(f"WebSocket disconnected for session {session_id}")
     except Exception as e:
         logger.error(f"WebSocket error for session {session_id}: {e}")
+        end_status = "error"
     finally:
         streaming_manager.disconnect(session_id)
+        # Flush final status and ended_at if the buffer tracks this session
+        if session_state_buffer.get_state(session_id) is not None:
+            await session_state_buffer.end_session(session_id, end_status)
 
 async def handle_synthesis_message(session_id: str, message: Dict[str, Any], voice_agent: VoiceAgent, language: str):
     """Handle voice synthesis message via WebSocket"""
@@ -13,7 +13,7 @@ from sqlalchemy.orm import selectinload
 
 from app.models.user import User
 from app.models.client import Client
-from app.core.cache import get_redis_client
+from app.core.cache import near_cache
 
 
 logger = logging.getLogger(__name__)
@@ -735,17 +735,10 @@ class RBACService:
         return [user.role]
     
     async def _get_cached_permissions(self, cache_key: str) -> Optional[List[str]]:
-        """Get permissions from cache"""
-        
-        redis_client = await get_redis_client()
-        if not redis_client:
-            return None
+        """Get permissions from cache (in-process L1, then Redis)"""
         
         try:
-            cached_data = await redis_client.get(cache_key)
-            if cached_data:
-                import json
-                return json.loads(cached_data)
+            return await near_cache.get("permissions", cache_key)
         except Exception as e:
             logger.error(f"Error getting cached permissions: {e}")
         
@@ -754,30 +747,17 @@ class RBACService:
     async def _cache_permissions(self, cache_key: str, permissions: List[str]):
         """Cache permissions"""
         
-        redis_client = await get_redis_client()
-        if not redis_client:
-            return
-        
         try:
-            import json
-            await redis_client.setex(
-                cache_key, 
-                self._permission_cache_ttl, 
-                json.dumps(permissions)
-            )
+            await near_cache.set("permissions", cache_key, permissions, self._permission_cache_ttl)
         except Exception as e:
             logger.error(f"Error caching permissions: {e}")
     
     async def _invalidate_permissions_cache(self, user_id: str, client_id: str):
-        """Invalidate cached permissions for user"""
-        
-        redis_client = await get_redis_client()
-        if not redis_client:
-            return
+        """Invalidate cached permissions for user in Redis and every worker"""
         
         try:
             cache_key = f"user_permissions:{user_id}:{client_id}"
-            await redis_client.delete(cache_key)
+            await near_cache.delete("permissions", cache_key)
         except Exception as e:
             logger.error(f"Error invalidating permissions cache: {e}")
 
@@ -0,0 +1,135 @@
+"""
+Pure ASGI middleware primitives
+Base class, per-request state and the ordered middleware pipeline
+"""
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Sequence, Tuple, Type, Union
+
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+MiddlewareSpec = Union[Type, Tuple[Type, Dict[str, Any]]]
+
+
+def request_state(scope: Scope) -> Dict[str, Any]:
+    """Per-request state shared by every middleware and the endpoint.
+
+    This is the dict behind Starlette's `request.state`, so values set here
+    are visible as attributes to route handlers and dependencies.
+    """
+    return scope.setdefault("state", {})
+
+
+def get_header(scope: Scope, name: bytes) -> str:
+    """First value of a lower-cased header name, or an empty string"""
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+def client_ip(scope: Scope) -> str:
+    """Client address behind proxies, resolved once per request"""
+    state = request_state(scope)
+    ip = state.get("client_ip")
+    if ip is None:
+        forwarded_for = get_header(scope, b"x-forwarded-for")
+        real_ip = get_header(scope, b"x-real-ip")
+        if forwarded_for:
+            ip = forwarded_for.split(",")[0].strip()
+        elif real_ip:
+            ip = real_ip.strip()
+        else:
+            client = scope.get("client")
+            ip = client[0] if client else "unknown"
+        state["client_ip"] = ip
+    return ip
+
+
+def send_with_headers(send: Send, headers: Mapping[str, str]) -> Send:
+    """Wrap `send` to set headers on the response start message"""
+    async def wrapped(message: Message):
+        if message["type"] == "http.response.start":
+            response_headers = MutableHeaders(scope=message)
+            for name, value in headers.items():
+                response_headers[name] = value
+        await send(message)
+    return wrapped
+
+
+async def send_json(
+    scope: Scope,
+    receive: Receive,
+    send: Send,
+    status_code: int,
+    content: Any,
+    headers: Optional[Mapping[str, str]] = None
+):
+    """Short-circuit a request with a JSON response"""
+    await JSONResponse(status_code=status_code, content=content, headers=headers)(scope, receive, send)
+
+
+class ASGIMiddleware:
+    """Base for pure ASGI middlewares.
+
+    HTTP requests go to `handle`; websocket and lifespan scopes pass straight
+    through. Unlike BaseHTTPMiddleware, nothing is buffered and no extra task
+    is spawned, so streaming responses reach the client chunk by chunk.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        await self.handle(scope, receive, send)
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send):
+        await self.app(scope, receive, send)
+
+
+def replay_body(body: bytes, receive: Receive) -> Callable[[], Awaitable[Message]]:
+    """A receive callable that yields an already-read body, then defers to `receive`"""
+    pending = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def replay() -> Message:
+        if pending:
+            return pending.pop()
+        return await receive()
+    return replay
+
+
+async def read_body(receive: Receive) -> bytes:
+    """Read the full request body from `receive`"""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+class MiddlewarePipeline:
+    """Ordered middleware stack registered as a single layer.
+
+    `middlewares` lists classes (or `(class, kwargs)` pairs), outermost
+    first, so the pipeline reads in the order a request flows through it.
+    Any ASGI middleware can take part, including Starlette's own.
+    """
+
+    def __init__(self, app: ASGIApp, middlewares: Sequence[MiddlewareSpec]):
+        self.layers = []
+        for spec in reversed(middlewares):
+            cls, kwargs = spec if isinstance(spec, tuple) else (spec, {})
+            app = cls(app, **kwargs)
+            self.layers.append(app)
+        self.layers.reverse()
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await self.app(scope, receive, send)
@@ -2,19 +2,54 @@
 Cache configuration for Seiketsu AI API
 """
 import redis.asyncio as redis
+import asyncio
+import functools
+import hashlib
+import inspect
 import json
-import pickle
-from typing import Any, Optional, Union
+import math
+import random
+import time
+import os
+import uuid
+import weakref
+from collections import OrderedDict, defaultdict
+from decimal import Decimal
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Union
+from uuid import UUID
 import logging
-from datetime import timedelta
+from datetime import date, datetime, timedelta
 
 from app.core.config import settings
+from app.core.cache_codec import CacheCodec, CodecError, default_codec
 
 logger = logging.getLogger("seiketsu.cache")
 
 # Redis client instance
 redis_client: Optional[redis.Redis] = None
 
+# Invalidation bookkeeping: generation counters and per-tag key sets
+GENERATION_KEY_PREFIX = "cache:gen"
+TAG_KEY_PREFIX = "cache:tag"
+SCAN_BATCH_SIZE = 500
+
+# Adds a key to a tag set and keeps the set alive at least as long as its
+# longest-lived member; members written without TTL make the set persistent
+TAG_INDEX_SCRIPT = """
+redis.call('SADD', KEYS[1], ARGV[1])
+local ttl = tonumber(ARGV[2])
+local current = redis.call('TTL', KEYS[1])
+if ttl <= 0 then
+    redis.call('PERSIST', KEYS[1])
+elseif current >= 0 then
+    if current < ttl then redis.call('EXPIRE', KEYS[1], ttl) end
+elseif redis.call('SCARD', KEYS[1]) == 1 then
+    redis.call('EXPIRE', KEYS[1], ttl)
+end
+return 1
+"""
+
 
 async def init_cache():
     """Initialize Redis cache connection"""
@@ -49,11 +84,120 @@ async def close_cache():
         logger.info("Redis cache connection closed")
 
 
+class _LoopBatch:
+    """Pending GETs and flush handle for one event loop"""
+    
+    __slots__ = ("pending", "flush_handle", "tasks")
+    
+    def __init__(self):
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.flush_handle: Optional[asyncio.Handle] = None
+        self.tasks: set = set()
+
+
+class GetBatcher:
+    """Coalesces GETs issued in the same event-loop tick into one MGET.
+    
+    Each load() registers the key and returns a future; the pending batch is
+    flushed on the next loop iteration (or after `window` seconds, or as soon
+    as `max_batch_size` distinct keys are queued) and every future resolves
+    from the single reply. Duplicate keys in a batch share one slot.
+    
+    Futures are bound to their loop, so each running loop (e.g. a Celery
+    worker thread next to the API loop) batches independently.
+    """
+    
+    def __init__(self, service: "CacheService", max_batch_size: int = 200, window: float = 0.0):
+        self.service = service
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self._batches: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopBatch]" = weakref.WeakKeyDictionary()
+        self.stats = {"batches": 0, "keys": 0, "requests": 0}
+    
+    async def load(self, key: str) -> Optional[bytes]:
+        """Queue a GET for key and wait for its batch"""
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(loop)
+        if batch is None:
+            batch = self._batches.setdefault(loop, _LoopBatch())
+        
+        self.stats["requests"] += 1
+        future = batch.pending.get(key)
+        if future is None:
+            future = loop.create_future()
+            batch.pending[key] = future
+            if len(batch.pending) >= self.max_batch_size:
+                self._dispatch(batch)
+            elif batch.flush_handle is None:
+                if self.window > 0:
+                    batch.flush_handle = loop.call_later(self.window, self._dispatch, batch)
+                else:
+                    batch.flush_handle = loop.call_soon(self._dispatch, batch)
+        
+        # Shielded so one cancelled caller doesn't cancel the shared result
+        return await asyncio.shield(future)
+    
+    def _dispatch(self, batch: _LoopBatch):
+        if batch.flush_handle is not None:
+            batch.flush_handle.cancel()
+            batch.flush_handle = None
+        pending, batch.pending = batch.pending, {}
+        if pending:
+            task = asyncio.get_running_loop().create_task(self._execute(pending))
+            batch.tasks.add(task)
+            task.add_done_callback(batch.tasks.discard)
+    
+    async def _execute(self, batch: Dict[str, asyncio.Future]):
+        keys = list(batch)
+        self.stats["batches"] += 1
+        self.stats["keys"] += len(keys)
+        try:
+            if len(keys) == 1:
+                values = [await self.service.client.get(keys[0])]
+            else:
+                values = await self.service.client.mget(keys)
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for key, value in zip(keys, values):
+            future = batch[key]
+            if not future.done():
+                future.set_result(value)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Batch counters and average batch size"""
+        return {
+            **self.stats,
+            "avg_batch_size": self.stats["keys"] / self.stats["batches"] if self.stats["batches"] else 0.0
+        }
+
+
 class CacheService:
     """Service for caching operations"""
     
-    def __init__(self):
-        self.client = redis_client
+    def __init__(
+        self,
+        client: Optional[redis.Redis] = None,
+        codec: Optional[CacheCodec] = None,
+        batch_window: float = 0.0
+    ):
+        self._client = client
+        self.codec = codec or default_codec
+        self.batcher = GetBatcher(self, window=batch_window)
+    
+    @property
+    def client(self) -> Optional[redis.Redis]:
+        """Explicit client, or the module connection once init_cache() ran"""
+        return self._client if self._client is not None else redis_client
+    
+    async def get_raw(self, key: str) -> Optional[bytes]:
+        """Get the encoded value, batched with other GETs in the same tick"""
+        if not self.client:
+            return None
+        return await self.batcher.load(key)
     
     async def get(self, key: str, default: Any = None) -> Any:
         """Get value from cache"""
@@ -61,16 +205,15 @@ class CacheService:
             return default
         
         try:
-            value = await self.client.get(key)
+            value = await self.get_raw(key)
             if value is None:
                 return default
             
-            # Try to deserialize as JSON first, then pickle
-            try:
-                return json.loads(value.decode('utf-8'))
-            except (json.JSONDecodeError, UnicodeDecodeError):
-                return pickle.loads(value)
+            return self.codec.decode(value)
                 
+        except CodecError as e:
+            logger.warning(f"Cache value for key {key} could not be decoded: {e}")
+            return default
         except Exception as e:
             logger.error(f"Cache get error for key {key}: {e}")
             return default
@@ -79,23 +222,30 @@ class CacheService:
         self, 
         key: str, 
         value: Any, 
-        ttl: Optional[Union[int, timedelta]] = None
+        ttl: Optional[Union[int, timedelta]] = None,
+        tags: Optional[Iterable[str]] = None
     ) -> bool:
-        """Set value in cache"""
+        """Set value in cache, optionally indexing the key under tags"""
         if not self.client:
             return False
         
         try:
-            # Serialize value
-            try:
-                serialized_value = json.dumps(value)
-            except (TypeError, ValueError):
-                serialized_value = pickle.dumps(value)
+            serialized_value = self.codec.encode(value)
             
-            # Set with TTL
-            if ttl:
-                if isinstance(ttl, timedelta):
-                    ttl = int(ttl.total_seconds())
+            if isinstance(ttl, timedelta):
+                ttl = int(ttl.total_seconds())
+            
+            if tags:
+                # Value and tag index are written in one round trip
+                async with self.client.pipeline(transaction=False) as pipe:
+                    if ttl:
+                        pipe.setex(key, ttl, serialized_value)
+                    else:
+                        pipe.set(key, serialized_value)
+                    for tag in tags:
+                        self._index_tag(pipe, tag, key, ttl)
+                    await pipe.execute()
+            elif ttl:
                 await self.client.setex(key, ttl, serialized_value)
             else:
                 await self.client.set(key, serialized_value)
@@ -168,9 +318,9 @@ class CacheService:
             for key, value in zip(keys, values):
                 if value is not None:
                     try:
-                        result[key] = json.loads(value.decode('utf-8'))
-                    except (json.JSONDecodeError, UnicodeDecodeError):
-                        result[key] = pickle.loads(value)
+                        result[key] = self.codec.decode(value)
+                    except CodecError as e:
+                        logger.warning(f"Cache value for key {key} could not be decoded: {e}")
             
             return result
             
@@ -188,27 +338,14 @@ class CacheService:
             return False
         
         try:
-            # Serialize all values
-            serialized_mapping = {}
-            for key, value in mapping.items():
-                try:
-                    serialized_mapping[key] = json.dumps(value)
-                except (TypeError, ValueError):
-                    serialized_mapping[key] = pickle.dumps(value)
+            if isinstance(ttl, timedelta):
+                ttl = int(ttl.total_seconds())
             
-            # Set all values
-            await self.client.mset(serialized_mapping)
-            
-            # Set TTL if specified
-            if ttl:
-                if isinstance(ttl, timedelta):
-                    ttl = int(ttl.total_seconds())
-                
-                # Use pipeline for efficiency
-                async with self.client.pipeline() as pipe:
-                    for key in mapping.keys():
-                        pipe.expire(key, ttl)
-                    await pipe.execute()
+            # One round trip; each SET carries its own expiry
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key, value in mapping.items():
+                    pipe.set(key, self.codec.encode(value), ex=ttl or None)
+                await pipe.execute()
             
             return True
             
@@ -216,43 +353,535 @@ class CacheService:
             logger.error(f"Cache set_many error: {e}")
             return False
     
-    async def clear_pattern(self, pattern: str) -> int:
-        """Clear all keys matching pattern"""
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"{TAG_KEY_PREFIX}:{tag}"
+    
+    def _index_tag(self, pipe, tag: str, key: str, ttl: Optional[int]):
+        """Queue the commands adding key to a tag's key set"""
+        pipe.eval(TAG_INDEX_SCRIPT, 1, self._tag_key(tag), key, ttl or 0)
+    
+    async def tag(self, key: str, *tags: str, ttl: Optional[Union[int, timedelta]] = None) -> bool:
+        """Index an existing key under tags"""
+        if not self.client or not tags:
+            return False
+        
+        try:
+            if isinstance(ttl, timedelta):
+                ttl = int(ttl.total_seconds())
+            async with self.client.pipeline(transaction=False) as pipe:
+                for tag in tags:
+                    self._index_tag(pipe, tag, key, ttl)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Cache tag error for key {key}: {e}")
+            return False
+    
+    async def invalidate_tags(self, *tags: str) -> int:
+        """Delete every key written under any of the tags"""
+        if not self.client or not tags:
+            return 0
+        
+        removed = 0
+        try:
+            for tag in tags:
+                tag_key = self._tag_key(tag)
+                batch: List[bytes] = []
+                async for member in self.client.sscan_iter(tag_key, count=SCAN_BATCH_SIZE):
+                    batch.append(member)
+                    if len(batch) >= SCAN_BATCH_SIZE:
+                        removed += await self.client.unlink(*batch)
+                        batch = []
+                if batch:
+                    removed += await self.client.unlink(*batch)
+                await self.client.unlink(tag_key)
+            return removed
+        except Exception as e:
+            logger.error(f"Cache invalidate_tags error for tags {tags}: {e}")
+            return removed
+    
+    async def get_generation(self, scope: str) -> int:
+        """Current generation of an invalidation scope"""
         if not self.client:
             return 0
         
         try:
-            keys = await self.client.keys(pattern)
-            if keys:
-                return await self.client.delete(*keys)
+            value = await self.get_raw(f"{GENERATION_KEY_PREFIX}:{scope}")
+            return int(value) if value else 0
+        except Exception as e:
+            logger.error(f"Cache generation read error for scope {scope}: {e}")
             return 0
+    
+    async def bump_generation(self, scope: str) -> Optional[int]:
+        """Invalidate every key versioned under a scope in O(1).
+        
+        Keys built from the previous generation are no longer addressed and
+        age out through their TTL.
+        """
+        if not self.client:
+            return None
+        
+        try:
+            return await self.client.incr(f"{GENERATION_KEY_PREFIX}:{scope}")
         except Exception as e:
-            logger.error(f"Cache clear_pattern error for pattern {pattern}: {e}")
+            logger.error(f"Cache generation bump error for scope {scope}: {e}")
+            return None
+    
+    async def scan_keys(self, pattern: str) -> AsyncIterator[bytes]:
+        """Iterate keys matching pattern with SCAN, never KEYS"""
+        if not self.client:
+            return
+        
+        async for key in self.client.scan_iter(match=pattern, count=SCAN_BATCH_SIZE):
+            yield key
+    
+    async def clear_pattern(self, pattern: str) -> int:
+        """Clear all keys matching pattern.
+        
+        Fallback for ad-hoc patterns: walks the keyspace with SCAN and
+        removes keys with batched UNLINK so Redis is never blocked. Prefer
+        tags or generations for routine invalidation.
+        """
+        if not self.client:
             return 0
+        
+        removed = 0
+        try:
+            batch: List[bytes] = []
+            async for key in self.scan_keys(pattern):
+                batch.append(key)
+                if len(batch) >= SCAN_BATCH_SIZE:
+                    removed += await self.client.unlink(*batch)
+                    batch = []
+            if batch:
+                removed += await self.client.unlink(*batch)
+            return removed
+        except Exception as e:
+            logger.error(f"Cache clear_pattern error for pattern {pattern}: {e}")
+            return removed
 
 
 # Global cache service instance
 cache_service = CacheService()
 
 
+class NearCache:
+    """In-process L1 cache in front of Redis for small, hot, rarely-changing keys.
+    
+    Each namespace has its own size and TTL limits. Entries are kept as the
+    encoded bytes read from Redis, so every hit decodes a private copy.
+    Writes and deletes made through the near-cache publish the key on a
+    Redis channel, and every worker drops it from its L1. If the subscription
+    drops, the L1 is cleared, because invalidations may have been missed.
+    """
+    
+    def __init__(
+        self,
+        service: CacheService = cache_service,
+        channel: str = "cache:near:invalidate",
+        default_max_entries: int = 1000,
+        default_ttl: float = 30.0
+    ):
+        self.service = service
+        self.channel = channel
+        self.default_max_entries = default_max_entries
+        self.default_ttl = default_ttl
+        self.instance_id = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._limits: Dict[str, tuple] = {}
+        self._entries: Dict[str, "OrderedDict[str, tuple]"] = defaultdict(OrderedDict)
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {
+            "l1_hits": 0,
+            "l2_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidations": 0
+        })
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribed = False
+        # Bumped on every invalidation so a read that raced one is not cached
+        self._invalidation_seq = 0
+    
+    def configure(self, namespace: str, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        """Set the L1 size and TTL limits for a namespace"""
+        self._limits[namespace] = (
+            max_entries or self.default_max_entries,
+            ttl if ttl is not None else self.default_ttl
+        )
+    
+    def _limits_for(self, namespace: str) -> tuple:
+        return self._limits.get(namespace, (self.default_max_entries, self.default_ttl))
+    
+    def _store_local(self, namespace: str, key: str, raw: bytes, seq: Optional[int] = None):
+        max_entries, ttl = self._limits_for(namespace)
+        if seq is not None and seq != self._invalidation_seq:
+            return
+        if ttl <= 0 or not self._subscribed:
+            # Without invalidations an L1 entry could serve stale data
+            return
+        entries = self._entries[namespace]
+        entries[key] = (time.monotonic() + ttl, raw)
+        entries.move_to_end(key)
+        while len(entries) > max_entries:
+            entries.popitem(last=False)
+            self._stats[namespace]["evictions"] += 1
+    
+    def invalidate_local(self, namespace: str, key: Optional[str] = None):
+        """Drop a key, or a whole namespace, from this process's L1"""
+        if key is None:
+            self._entries.pop(namespace, None)
+        else:
+            self._entries[namespace].pop(key, None)
+        self._invalidation_seq += 1
+        self._stats[namespace]["invalidations"] += 1
+    
+    async def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        """Read through L1, then Redis"""
+        stats = self._stats[namespace]
+        entry = self._entries[namespace].get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                stats["l1_hits"] += 1
+                return self.service.codec.decode(entry[1])
+            self._entries[namespace].pop(key, None)
+        
+        client = self.service.client
+        if not client:
+            stats["misses"] += 1
+            return default
+        
+        seq = self._invalidation_seq
+        try:
+            raw = await self.service.get_raw(key)
+            if raw is None:
+                stats["misses"] += 1
+                return default
+            value = self.service.codec.decode(raw)
+        except Exception as e:
+            logger.error(f"Near-cache get error for key {key}: {e}")
+            stats["misses"] += 1
+            return default
+        
+        stats["l2_hits"] += 1
+        self._store_local(namespace, key, raw, seq)
+        return value
+    
+    async def set(self, namespace: str, key: str, value: Any, ttl: Optional[Union[int, timedelta]] = None) -> bool:
+        """Write to Redis and L1, then invalidate the key in other workers"""
+        client = self.service.client
+        if not client:
+            return False
+        
+        try:
+            raw = self.service.codec.encode(value)
+            if isinstance(ttl, timedelta):
+                ttl = int(ttl.total_seconds())
+            if ttl:
+                await client.setex(key, ttl, raw)
+            else:
+                await client.set(key, raw)
+        except Exception as e:
+            logger.error(f"Near-cache set error for key {key}: {e}")
+            return False
+        
+        self._store_local(namespace, key, raw)
+        await self._publish(namespace, key)
+        return True
+    
+    async def delete(self, namespace: str, key: str) -> bool:
+        """Delete from Redis and every worker's L1"""
+        self.invalidate_local(namespace, key)
+        deleted = await self.service.delete(key)
+        await self._publish(namespace, key)
+        return deleted
+    
+    async def _publish(self, namespace: str, key: str):
+        client = self.service.client
+        if not client:
+            return
+        try:
+            message = json.dumps({"o": self.instance_id, "n": namespace, "k": key})
+            await client.publish(self.channel, message)
+        except Exception as e:
+            logger.error(f"Near-cache invalidation publish failed for key {key}: {e}")
+    
+    def _handle_message(self, data: bytes):
+        message = json.loads(data)
+        if message.get("o") == self.instance_id:
+            return
+        self.invalidate_local(message["n"], message.get("k"))
+    
+    async def start(self):
+        """Start the invalidation listener"""
+        if self._listener is None and self.service.client:
+            self._listener = asyncio.create_task(self._listen())
+    
+    async def stop(self):
+        """Stop the invalidation listener and clear L1"""
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self._subscribed = False
+        self._entries.clear()
+    
+    async def _listen(self):
+        backoff = 1.0
+        while True:
+            pubsub = None
+            try:
+                pubsub = self.service.client.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self.channel)
+                self._subscribed = True
+                backoff = 1.0
+                logger.info("Near-cache invalidation listener subscribed")
+                
+                async for message in pubsub.listen():
+                    if message and message.get("type") == "message":
+                        try:
+                            self._handle_message(message["data"])
+                        except Exception as e:
+                            logger.error(f"Bad near-cache invalidation message: {e}")
+            
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Near-cache invalidation listener error: {e}")
+            finally:
+                # Anything cached while disconnected may have missed invalidations
+                self._subscribed = False
+                self._entries.clear()
+                self._invalidation_seq += 1
+                if pubsub is not None:
+                    try:
+                        await pubsub.reset()
+                    except Exception:
+                        pass
+            
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+    
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-namespace L1/L2 hit ratios"""
+        stats = {}
+        for namespace, counters in self._stats.items():
+            lookups = counters["l1_hits"] + counters["l2_hits"] + counters["misses"]
+            stats[namespace] = {
+                **counters,
+                "l1_entries": len(self._entries.get(namespace, ())),
+                "l1_hit_ratio": counters["l1_hits"] / lookups if lookups else 0.0,
+                "l2_hit_ratio": counters["l2_hits"] / lookups if lookups else 0.0
+            }
+        return stats
+
+
+# Global near-cache instance
+near_cache = NearCache()
+near_cache.configure("permissions", max_entries=5000, ttl=60)
+near_cache.configure("voice_agent_status", max_entries=1000, ttl=5)
+near_cache.configure("conversation_state", max_entries=2000, ttl=10)
+
+
 # Decorator functions for caching
-def cache_result(ttl: Union[int, timedelta] = 300, key_prefix: str = ""):
-    """Decorator to cache function results"""
+
+# Per-function counters for cache_result, keyed by module-qualified name
+cache_metrics: Dict[str, Dict[str, int]] = defaultdict(lambda: {
+    "hits": 0,
+    "negative_hits": 0,
+    "stale_hits": 0,
+    "misses": 0,
+    "early_refreshes": 0,
+    "uncacheable": 0,
+    "errors": 0
+})
+
+# Background refreshes (held to keep the tasks alive)
+_refresh_tasks: set = set()
+
+
+def _canonical_default(value: Any) -> Any:
+    """JSON fallback producing stable representations for common argument types"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    raise TypeError(f"Unsupported cache key argument type: {type(value).__name__}")
+
+
+def make_cache_key(
+    func,
+    args: tuple,
+    kwargs: dict,
+    key_prefix: str = "",
+    ignore: Iterable[str] = ()
+) -> str:
+    """Deterministic cache key for a call.
+    
+    Arguments are bound to parameter names (so positional and keyword calls
+    agree), serialized canonically and hashed, giving the same key in every
+    process. Raises TypeError for arguments without a stable representation.
+    """
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = {name: value for name, value in bound.arguments.items() if name not in ignore}
+    canonical = json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=_canonical_default)
+    digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+    name = f"{func.__module__}.{func.__qualname__}"
+    return ":".join(part for part in (key_prefix, name, digest) if part)
+
+
+def get_cache_metrics() -> Dict[str, Dict[str, Any]]:
+    """Per-function cache_result counters with hit rates"""
+    metrics = {}
+    for name, counters in cache_metrics.items():
+        served = counters["hits"] + counters["negative_hits"] + counters["stale_hits"]
+        lookups = served + counters["misses"]
+        metrics[name] = {**counters, "hit_rate": served / lookups if lookups else 0.0}
+    return metrics
+
+
+def cache_result(
+    ttl: Union[int, timedelta] = 300,
+    key_prefix: str = "",
+    stale_ttl: Union[int, timedelta] = 0,
+    negative_ttl: Optional[Union[int, timedelta]] = None,
+    early_refresh_beta: float = 1.0,
+    ignore: Iterable[str] = ("self", "cls", "db")
+):
+    """Decorator to cache function results.
+    
+    Args:
+        ttl: Freshness lifetime of a cached result
+        key_prefix: Prefix for generated keys
+        stale_ttl: How long an expired result may still be served while a
+            single background refresh recomputes it
+        negative_ttl: Lifetime of cached None results (defaults to the
+            smaller of ttl and 60 seconds; 0 disables negative caching)
+        early_refresh_beta: Probabilistic early refresh factor; entries are
+            refreshed ahead of expiry with a probability that grows with how
+            expensive they were to compute (0 disables)
+        ignore: Parameter names left out of the key (instances, sessions)
+    
+    Concurrent misses for the same key within a process share one call.
+    """
+    def _seconds(value: Union[int, timedelta]) -> int:
+        return int(value.total_seconds()) if isinstance(value, timedelta) else int(value)
+    
+    fresh_ttl = _seconds(ttl)
+    stale_seconds = _seconds(stale_ttl)
+    none_ttl = min(fresh_ttl, 60) if negative_ttl is None else _seconds(negative_ttl)
+    ignored = frozenset(ignore)
+    
     def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+        counters = cache_metrics[name]
+        inflight: Dict[str, asyncio.Future] = {}
+        
+        async def load(key: str, args: tuple, kwargs: dict) -> Any:
+            """Compute and store a result, sharing in-flight calls per key"""
+            if key in inflight:
+                return await asyncio.shield(inflight[key])
+            
+            future = asyncio.get_running_loop().create_future()
+            inflight[key] = future
+            try:
+                started = time.monotonic()
+                result = await func(*args, **kwargs)
+                await store(key, result, time.monotonic() - started)
+                future.set_result(result)
+                return result
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                # Mark retrieved so a failure nobody else awaited is not logged
+                future.exception()
+                raise
+            finally:
+                inflight.pop(key, None)
+        
+        async def store(key: str, result: Any, compute_seconds: float):
+            lifetime = fresh_ttl if result is not None else none_ttl
+            if lifetime <= 0:
+                return
+            envelope = {
+                "v": result,
+                "n": result is None,
+                "e": time.time() + lifetime,
+                "d": compute_seconds
+            }
+            await cache_service.set(key, envelope, lifetime + stale_seconds)
+        
+        async def refresh(key: str, args: tuple, kwargs: dict):
+            """Background recompute, claimed by one process via a short lock"""
+            client = cache_service.client
+            lock_key = f"{key}:refresh"
+            try:
+                if client and not await client.set(lock_key, b"1", nx=True, ex=max(fresh_ttl, 1)):
+                    return
+            except Exception as e:
+                logger.warning(f"Refresh lock unavailable for {name}: {e}")
+                client = None
+            
+            try:
+                await load(key, args, kwargs)
+            except Exception as e:
+                counters["errors"] += 1
+                logger.error(f"Background refresh failed for {name}: {e}")
+            finally:
+                if client:
+                    try:
+                        await client.delete(lock_key)
+                    except Exception as e:
+                        logger.warning(f"Refresh lock release failed for {name}: {e}")
+        
+        def schedule_refresh(key: str, args: tuple, kwargs: dict):
+            if key in inflight:
+                return
+            task = asyncio.create_task(refresh(key, args, kwargs))
+            _refresh_tasks.add(task)
+            task.add_done_callback(_refresh_tasks.discard)
+        
+        @functools.wraps(func)
         async def wrapper(*args, **kwargs):
-            # Generate cache key
-            cache_key = f"{key_prefix}:{func.__name__}:{hash(str(args) + str(sorted(kwargs.items())))}"
+            try:
+                cache_key = make_cache_key(func, args, kwargs, key_prefix, ignored)
+            except TypeError as e:
+                counters["uncacheable"] += 1
+                logger.debug(f"Not caching {name}: {e}")
+                return await func(*args, **kwargs)
             
-            # Try to get from cache
-            cached_result = await cache_service.get(cache_key)
-            if cached_result is not None:
-                return cached_result
+            envelope = await cache_service.get(cache_key)
+            if isinstance(envelope, dict) and "e" in envelope:
+                now = time.time()
+                value = None if envelope.get("n") else envelope.get("v")
+                
+                # XFetch: refresh early with probability rising near expiry
+                jitter = envelope.get("d", 0) * early_refresh_beta * -math.log(1.0 - random.random())
+                if now + jitter < envelope["e"]:
+                    counters["negative_hits" if envelope.get("n") else "hits"] += 1
+                    return value
+                
+                if now < envelope["e"]:
+                    counters["early_refreshes"] += 1
+                    counters["negative_hits" if envelope.get("n") else "hits"] += 1
+                else:
+                    counters["stale_hits"] += 1
+                schedule_refresh(cache_key, args, kwargs)
+                return value
             
-            # Execute function and cache result
-            result = await func(*args, **kwargs)
-            await cache_service.set(cache_key, result, ttl)
-            return result
+            counters["misses"] += 1
+            return await load(cache_key, args, kwargs)
         
+        wrapper.cache_key = lambda *args, **kwargs: make_cache_key(func, args, kwargs, key_prefix, ignored)
         return wrapper
     return decorator
 
@@ -262,28 +891,34 @@ async def get_cached_result(key: str, default: Any = None) -> Any:
     return await cache_service.get(key, default)
 
 
+async def organization_cache_key(organization_id: str, *parts: str) -> str:
+    """Build an organization-scoped key versioned by the organization generation"""
+    generation = await cache_service.get_generation(f"org:{organization_id}")
+    return ":".join([parts[0], organization_id, f"v{generation}", *parts[1:]])
+
+
 async def cache_analytics_data(organization_id: str, data_type: str, data: Any, ttl: int = 300) -> bool:
     """Cache analytics data with organization-specific key"""
-    key = f"analytics:{organization_id}:{data_type}"
+    key = await organization_cache_key(organization_id, "analytics", data_type)
     return await cache_service.set(key, data, ttl)
 
 
 async def get_cached_analytics_data(organization_id: str, data_type: str) -> Any:
     """Get cached analytics data"""
-    key = f"analytics:{organization_id}:{data_type}"
+    key = await organization_cache_key(organization_id, "analytics", data_type)
     return await cache_service.get(key)
 
 
 async def cache_conversation_state(conversation_id: str, state: Dict[str, Any], ttl: int = 3600) -> bool:
     """Cache conversation state for real-time updates"""
     key = f"conversation:{conversation_id}:state"
-    return await cache_service.set(key, state, ttl)
+    return await near_cache.set("conversation_state", key, state, ttl)
 
 
 async def get_conversation_state(conversation_id: str) -> Optional[Dict[str, Any]]:
     """Get cached conversation state"""
     key = f"conversation:{conversation_id}:state"
-    return await cache_service.get(key)
+    return await near_cache.get("conversation_state", key)
 
 
 async def cache_lead_score(lead_id: str, score: float, ttl: int = 1800) -> bool:
@@ -301,13 +936,13 @@ async def get_cached_lead_score(lead_id: str) -> Optional[float]:
 async def cache_voice_agent_status(agent_id: str, status: Dict[str, Any], ttl: int = 60) -> bool:
     """Cache voice agent status for real-time monitoring"""
     key = f"voice_agent:{agent_id}:status"
-    return await cache_service.set(key, status, ttl)
+    return await near_cache.set("voice_agent_status", key, status, ttl)
 
 
 async def get_voice_agent_status(agent_id: str) -> Optional[Dict[str, Any]]:
     """Get cached voice agent status"""
     key = f"voice_agent:{agent_id}:status"
-    return await cache_service.get(key)
+    return await near_cache.get("voice_agent_status", key)
 
 
 async def cache_ml_prediction(model_type: str, input_hash: str, prediction: Any, ttl: int = 7200) -> bool:
@@ -323,9 +958,14 @@ async def get_cached_ml_prediction(model_type: str, input_hash: str) -> Any:
 
 
 async def invalidate_organization_cache(organization_id: str) -> int:
-    """Invalidate all cache entries for an organization"""
-    pattern = f"*:{organization_id}:*"
-    return await cache_service.clear_pattern(pattern)
+    """Invalidate all cache entries for an organization.
+    
+    Bumps the organization generation (O(1)) so every key built with
+    organization_cache_key() is orphaned, and drops keys tagged with the
+    organization. Returns the number of tagged keys removed.
+    """
+    await cache_service.bump_generation(f"org:{organization_id}")
+    return await cache_service.invalidate_tags(f"org:{organization_id}")
 
 
 async def get_redis_client() -> Optional[redis.Redis]:
@@ -334,43 +974,49 @@ async def get_redis_client() -> Optional[redis.Redis]:
 
 
 class CacheManager:
-    """Advanced cache management with namespace isolation"""
+    """Advanced cache management with namespace isolation.
+    
+    Keys are versioned by a namespace generation, so clearing a namespace is
+    a single INCR; entries from earlier generations expire via their TTL.
+    """
     
-    def __init__(self, namespace: str):
+    def __init__(self, namespace: str, default_ttl: Union[int, timedelta] = 86400):
         self.namespace = namespace
+        self.default_ttl = default_ttl
         self.service = cache_service
     
-    def _make_key(self, key: str) -> str:
+    async def _prefix(self) -> str:
+        generation = await self.service.get_generation(f"ns:{self.namespace}")
+        return f"{self.namespace}:v{generation}"
+    
+    async def _make_key(self, key: str) -> str:
         """Create namespaced key"""
-        return f"{self.namespace}:{key}"
+        return f"{await self._prefix()}:{key}"
     
     async def get(self, key: str, default: Any = None) -> Any:
         """Get value with namespace"""
-        return await self.service.get(self._make_key(key), default)
+        return await self.service.get(await self._make_key(key), default)
     
     async def set(self, key: str, value: Any, ttl: Optional[Union[int, timedelta]] = None) -> bool:
         """Set value with namespace"""
-        return await self.service.set(self._make_key(key), value, ttl)
+        return await self.service.set(await self._make_key(key), value, ttl or self.default_ttl)
     
     async def delete(self, key: str) -> bool:
         """Delete value with namespace"""
-        return await self.service.delete(self._make_key(key))
+        return await self.service.delete(await self._make_key(key))
     
     async def clear_namespace(self) -> int:
-        """Clear all keys in this namespace"""
-        pattern = f"{self.namespace}:*"
-        return await self.service.clear_pattern(pattern)
+        """Clear all keys in this namespace, returning the new generation"""
+        return await self.service.bump_generation(f"ns:{self.namespace}") or 0
     
     async def get_keys(self, pattern: str = "*") -> list[str]:
         """Get all keys in namespace matching pattern"""
-        if not redis_client:
-            return []
-        
         try:
-            full_pattern = f"{self.namespace}:{pattern}"
-            keys = await redis_client.keys(full_pattern)
-            # Remove namespace prefix from keys
-            return [key.decode('utf-8').replace(f"{self.namespace}:", "") for key in keys]
+            prefix = f"{await self._prefix()}:"
+            return [
+                key.decode('utf-8')[len(prefix):]
+                async for key in self.service.scan_keys(f"{prefix}{pattern}")
+            ]
         except Exception as e:
             logger.error(f"Error getting keys for pattern {pattern}: {e}")
-            return []
\ No newline at end of file
+            return []
@@ -0,0 +1,191 @@
+"""
+Binary codec for cached values
+One-byte frame tag, JSON payload and optional compression
+"""
+import base64
+import json
+import zlib
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Callable, Dict
+from uuid import UUID
+
+try:
+    import orjson
+except ImportError:  # Falls back to the stdlib encoder
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # Falls back to zlib
+    zstandard = None
+
+# Frame tag: low two bits are the payload format, the next two the
+# compression. Tags stay below 0x20, so they never collide with the first
+# byte of a legacy JSON document or a pickle (0x80).
+FORMAT_JSON = 0x01
+FORMAT_TAGGED_JSON = 0x02
+FORMAT_MASK = 0x03
+COMPRESSION_NONE = 0x00
+COMPRESSION_ZLIB = 0x04
+COMPRESSION_ZSTD = 0x08
+COMPRESSION_MASK = 0x0C
+LEGACY_PICKLE_TAG = 0x80
+
+# Allow-listed rich types are written as single-key objects, {"~dt": "..."}
+TYPE_MARKER_PREFIX = "~"
+
+
+class CodecError(ValueError):
+    """Raised when a value cannot be encoded or a frame cannot be decoded"""
+
+
+def _encode_rich(value: Any) -> Any:
+    """Encode an allow-listed rich type as a typed marker object"""
+    if isinstance(value, datetime):
+        return {"~dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"~d": value.isoformat()}
+    if isinstance(value, time):
+        return {"~t": value.isoformat()}
+    if isinstance(value, timedelta):
+        return {"~td": value.total_seconds()}
+    if isinstance(value, Decimal):
+        return {"~dec": str(value)}
+    if isinstance(value, (set, frozenset)):
+        return {"~set": list(value)}
+    if isinstance(value, bytes):
+        return {"~b": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, UUID):
+        # Stored as plain strings, matching orjson's native UUID handling
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    raise TypeError(f"Type {type(value).__name__} is not allowed in cache values")
+
+
+_RICH_DECODERS: Dict[str, Callable[[Any], Any]] = {
+    "~dt": datetime.fromisoformat,
+    "~d": date.fromisoformat,
+    "~t": time.fromisoformat,
+    "~td": lambda v: timedelta(seconds=v),
+    "~dec": Decimal,
+    "~set": set,
+    "~b": base64.b64decode,
+}
+
+
+def _revive(obj: Dict[str, Any]) -> Any:
+    """json object_hook rebuilding rich types from typed marker objects"""
+    if len(obj) != 1:
+        return obj
+    (key, value), = obj.items()
+    if not key.startswith(TYPE_MARKER_PREFIX):
+        return obj
+    decoder = _RICH_DECODERS.get(key)
+    if decoder is None:
+        raise CodecError(f"Unknown cached type: {key}")
+    return decoder(value)
+
+
+class CacheCodec:
+    """Encodes cache values as `tag byte + JSON payload`.
+
+    Plain JSON values take the fast path with no post-processing on read.
+    Values containing allow-listed rich types (datetime, date, Decimal,
+    sets, bytes) are written as tagged JSON and revived on read; anything
+    else is rejected rather than pickled. UUIDs and enums are stored as
+    their string value. Payloads above `compression_threshold` bytes are
+    compressed with zstd when available, zlib otherwise.
+    """
+
+    def __init__(self, compression_threshold: int = 1024, compression_level: int = 3):
+        self.compression_threshold = compression_threshold
+        self.compression_level = compression_level
+        if zstandard is not None:
+            self._zstd_compressor = zstandard.ZstdCompressor(level=compression_level)
+            self._zstd_decompressor = zstandard.ZstdDecompressor()
+
+    def _dumps_plain(self, value: Any) -> bytes:
+        if orjson is not None:
+            # Passthrough makes datetimes fail here and take the tagged path
+            return orjson.dumps(value, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    def _dumps_tagged(self, value: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(
+                value,
+                default=_encode_rich,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+            )
+        return json.dumps(value, default=_encode_rich, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def _loads(payload: bytes) -> Any:
+        return orjson.loads(payload) if orjson is not None else json.loads(payload)
+
+    def encode(self, value: Any) -> bytes:
+        """Encode a value into a tagged frame"""
+        try:
+            payload = self._dumps_plain(value)
+            tag = FORMAT_JSON
+        except (TypeError, ValueError):
+            try:
+                payload = self._dumps_tagged(value)
+            except (TypeError, ValueError) as e:
+                raise CodecError(str(e)) from e
+            tag = FORMAT_TAGGED_JSON
+
+        if len(payload) >= self.compression_threshold:
+            if zstandard is not None:
+                payload = self._zstd_compressor.compress(payload)
+                tag |= COMPRESSION_ZSTD
+            else:
+                payload = zlib.compress(payload, self.compression_level)
+                tag |= COMPRESSION_ZLIB
+
+        return bytes((tag,)) + payload
+
+    def decode(self, data: bytes) -> Any:
+        """Decode a tagged frame, or a legacy untagged JSON value"""
+        if not data:
+            raise CodecError("Empty cache value")
+
+        tag = data[0]
+        if tag == LEGACY_PICKLE_TAG:
+            # Pickled values from the previous serializer are never loaded
+            raise CodecError("Refusing to unpickle legacy cache value")
+        if tag >= 0x20:
+            # Untagged JSON written before the codec was introduced
+            try:
+                return json.loads(data)
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                raise CodecError("Undecodable legacy cache value") from e
+
+        payload = data[1:]
+        compression = tag & COMPRESSION_MASK
+        if compression == COMPRESSION_ZSTD:
+            if zstandard is None:
+                raise CodecError("zstd-compressed value but zstandard is not installed")
+            payload = self._zstd_decompressor.decompress(payload)
+        elif compression == COMPRESSION_ZLIB:
+            payload = zlib.decompress(payload)
+        elif compression != COMPRESSION_NONE:
+            raise CodecError(f"Unknown compression in tag {tag:#04x}")
+
+        value_format = tag & FORMAT_MASK
+        if value_format == FORMAT_JSON:
+            return self._loads(payload)
+        if value_format == FORMAT_TAGGED_JSON:
+            # The stdlib hook runs per object inside the C decoder, which beats
+            # walking an orjson result in Python
+            return json.loads(payload, object_hook=_revive)
+        raise CodecError(f"Unknown format in tag {tag:#04x}")
+
+
+# Default codec shared by cache services
+default_codec = CacheCodec()
@@ -31,6 +31,11 @@ class Settings(BaseSettings):
     DATABASE_POOL_SIZE: int = 10
     DATABASE_MAX_OVERFLOW: int = 20
     DATABASE_POOL_TIMEOUT: int = 30
+    DATABASE_REPLICA_URL: Optional[str] = os.getenv("DATABASE_REPLICA_URL")
+    DATABASE_REPLICA_POOL_SIZE: int = 10
+    DATABASE_REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("DATABASE_REPLICA_MAX_LAG_SECONDS", "5.0"))
+    DATABASE_REPLICA_CHECK_INTERVAL: float = 5.0
+    DATABASE_SLOW_QUERY_MS: float = float(os.getenv("DATABASE_SLOW_QUERY_MS", "500"))
     
     # Supabase settings
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
@@ -99,6 +104,8 @@ class Settings(BaseSettings):
     # Lead scoring settings
     LEAD_SCORING_MODEL_PATH: str = os.getenv("LEAD_SCORING_MODEL_PATH", "models/lead_scoring.pkl")
     LEAD_QUALIFICATION_THRESHOLD: float = float(os.getenv("LEAD_QUALIFICATION_THRESHOLD", "0.7"))
+    LEAD_SCORING_BACKEND: str = os.getenv("LEAD_SCORING_BACKEND", "local")  # local or remote (21dev.ai)
+    LEAD_SCORING_BATCH_SIZE: int = int(os.getenv("LEAD_SCORING_BATCH_SIZE", "1000"))
     
     # CORS settings
     CORS_ORIGINS: List[str] = [
@@ -136,6 +143,10 @@ class Settings(BaseSettings):
     # File upload settings
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_AUDIO_FORMATS: List[str] = ["mp3", "wav", "m4a", "ogg"]
+    LEAD_IMPORT_DIR: str = os.getenv("LEAD_IMPORT_DIR", "/tmp/seiketsu/lead_imports")
+    LEAD_IMPORT_MAX_UPLOAD_SIZE: int = int(os.getenv("LEAD_IMPORT_MAX_UPLOAD_SIZE", str(200 * 1024 * 1024)))
+    # A running import with no progress for this long is assumed dead and may be resumed
+    LEAD_IMPORT_STALE_SECONDS: int = int(os.getenv("LEAD_IMPORT_STALE_SECONDS", "600"))
     
     # Webhook settings
     WEBHOOK_TIMEOUT: int = 30
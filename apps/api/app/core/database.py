@@ -1,32 +1,63 @@
 """
 Database configuration and connection for Seiketsu AI API
 """
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import event
 from sqlalchemy.pool import NullPool
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 import logging
 
 from app.core.config import settings
+from app.core.db_routing import ReplicaRouter, READ_ONLY_KEY
+from app.core.db_telemetry import InstrumentedQueuePool, db_telemetry
 
 logger = logging.getLogger("seiketsu.database")
 
-# Create async engine
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=False,  # Set to True for SQL debugging
-    pool_size=settings.DATABASE_POOL_SIZE,
-    max_overflow=settings.DATABASE_MAX_OVERFLOW,
-    pool_timeout=settings.DATABASE_POOL_TIMEOUT,
-    pool_pre_ping=True,
-    pool_recycle=3600,  # Recycle connections after 1 hour
-    poolclass=NullPool if settings.ENVIRONMENT == "test" else None
+
+def _create_engine(url: str, pool_size: int, name: str):
+    if settings.ENVIRONMENT == "test":
+        pool_options = {"poolclass": NullPool}
+    else:
+        pool_options = {
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": pool_size,
+            "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+            "pool_timeout": settings.DATABASE_POOL_TIMEOUT,
+        }
+    
+    new_engine = create_async_engine(
+        url,
+        echo=False,  # Set to True for SQL debugging
+        pool_pre_ping=True,  # Liveness check on checkout; no other ping is needed
+        pool_recycle=3600,  # Recycle connections after 1 hour
+        pool_logging_name=name,  # Labels the pool's telemetry
+        **pool_options
+    )
+    db_telemetry.instrument(new_engine, name)
+    return new_engine
+
+
+db_telemetry.slow_query_ms = settings.DATABASE_SLOW_QUERY_MS
+
+# Create async engines; the primary takes all writes
+engine = _create_engine(settings.DATABASE_URL, settings.DATABASE_POOL_SIZE, "primary")
+replica_engine = (
+    _create_engine(settings.DATABASE_REPLICA_URL, settings.DATABASE_REPLICA_POOL_SIZE, "replica")
+    if settings.DATABASE_REPLICA_URL else None
 )
 
-# Create async session factory
-AsyncSessionLocal = async_sessionmaker(
+replica_router = ReplicaRouter(
     engine,
+    replica_engine,
+    max_lag_seconds=settings.DATABASE_REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.DATABASE_REPLICA_CHECK_INTERVAL
+)
+
+# Create async session factory
+AsyncSessionLocal = replica_router.sessionmaker(
     class_=AsyncSession,
     expire_on_commit=False,
     autoflush=True,
@@ -70,9 +101,39 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+async def get_read_db() -> AsyncSession:
+    """Get read-only database session dependency.
+    
+    SELECTs go to the read replica while its lag is within bounds; after
+    the session writes, it reads from the primary for the rest of the request.
+    """
+    await replica_router.check_replica()
+    async with AsyncSessionLocal(info={READ_ONLY_KEY: True}) as session:
+        try:
+            yield session
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Database session error: {e}")
+            raise
+        finally:
+            await session.close()
+
+
+@asynccontextmanager
+async def ReadSessionLocal() -> AsyncIterator[AsyncSession]:
+    """Read-only session for work outside a request, such as streamed exports.
+    
+    Refreshes replica health first, like get_read_db, so long-running
+    streams don't route to a replica whose lag was never measured.
+    """
+    await replica_router.check_replica()
+    async with AsyncSessionLocal(info={READ_ONLY_KEY: True}) as session:
+        yield session
+
+
 async def close_db():
-    """Close database engine"""
-    await engine.dispose()
+    """Close database engines"""
+    await replica_router.dispose()
     logger.info("Database engine disposed")
 
 
@@ -86,16 +147,6 @@ def set_sqlite_pragma(dbapi_connection, connection_record):
         cursor.close()
 
 
-@event.listens_for(engine.sync_engine, "checkout")
-def ping_connection(dbapi_connection, connection_record, connection_proxy):
-    """Ping connection on checkout to ensure it's alive"""
-    try:
-        dbapi_connection.ping(reconnect=True)
-    except Exception:
-        # Connection is invalid, will be recreated
-        raise
-
-
 # Transaction management utilities
 class DatabaseTransaction:
     """Context manager for database transactions"""
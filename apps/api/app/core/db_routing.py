@@ -0,0 +1,144 @@
+"""
+Read-replica routing for async SQLAlchemy sessions
+Sends read-only sessions' SELECTs to a replica, everything else to the primary
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("seiketsu.database")
+
+# Session.info keys
+ROUTER_KEY = "replica_router"
+READ_ONLY_KEY = "read_only"
+WROTE_KEY = "wrote"
+
+# Seconds since the last replayed transaction; 0 when not a standby
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_is_in_recovery() "
+    "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "ELSE 0 END"
+)
+
+
+def is_plain_read(clause: Any) -> bool:
+    """Whether a statement is a SELECT that is safe to run on a replica"""
+    return bool(getattr(clause, "is_select", False)) and getattr(clause, "_for_update_arg", None) is None
+
+
+class ReplicaMonitor:
+    """Tracks replica lag and reachability.
+
+    Lag is measured at most every `check_interval` seconds; the replica is
+    used only while the last measurement succeeded and was within
+    `max_lag_seconds`.
+    """
+
+    def __init__(self, engine: AsyncEngine, max_lag_seconds: float = 5.0, check_interval: float = 5.0):
+        self.engine = engine
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self.lag: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._checked_at: Optional[float] = None
+
+    @property
+    def healthy(self) -> bool:
+        return self.lag is not None and self.lag <= self.max_lag_seconds
+
+    async def measure_lag(self) -> float:
+        if self.engine.dialect.name != "postgresql":
+            # Stand-ins without replication (SQLite in tests) only need to be reachable
+            async with self.engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+            return 0.0
+        async with self.engine.connect() as conn:
+            return float(await conn.scalar(POSTGRES_LAG_QUERY))
+
+    async def check(self, force: bool = False):
+        """Refresh the lag measurement if it is older than check_interval"""
+        now = asyncio.get_running_loop().time()
+        if not force and self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        # Claimed before awaiting so concurrent requests don't all probe
+        self._checked_at = now
+        was_healthy = self.healthy
+        try:
+            self.lag = await self.measure_lag()
+            self.last_error = None
+        except Exception as e:
+            self.lag = None
+            self.last_error = str(e)
+
+        if was_healthy and not self.healthy:
+            logger.warning(
+                f"Read replica unavailable (lag={self.lag}, error={self.last_error}), reading from primary"
+            )
+        elif not was_healthy and self.healthy:
+            logger.info(f"Read replica available (lag={self.lag:.2f}s)")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "max_lag_seconds": self.max_lag_seconds,
+            "last_error": self.last_error
+        }
+
+
+class RoutingSession(Session):
+    """Session choosing the primary or the replica per statement.
+
+    Only sessions opened read-only consult the replica, and only for plain
+    SELECTs while the replica is healthy. Once a read-only session flushes
+    or executes a write it sticks to the primary, so it reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        router = self.info.get(ROUTER_KEY)
+        if router is not None and self.info.get(READ_ONLY_KEY):
+            if self._flushing or not is_plain_read(clause):
+                self.info[WROTE_KEY] = True
+            elif not self.info.get(WROTE_KEY) and router.replica_available:
+                return router.reader.sync_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+class ReplicaRouter:
+    """Writer and optional reader engine behind one session factory"""
+
+    def __init__(
+        self,
+        writer: AsyncEngine,
+        reader: Optional[AsyncEngine] = None,
+        max_lag_seconds: float = 5.0,
+        check_interval: float = 5.0
+    ):
+        self.writer = writer
+        self.reader = reader
+        self.monitor = ReplicaMonitor(reader, max_lag_seconds, check_interval) if reader is not None else None
+
+    @property
+    def replica_available(self) -> bool:
+        return self.monitor is not None and self.monitor.healthy
+
+    def sessionmaker(self, **kw) -> async_sessionmaker:
+        kw.setdefault("class_", AsyncSession)
+        kw["info"] = {**kw.get("info", {}), ROUTER_KEY: self}
+        return async_sessionmaker(self.writer, sync_session_class=RoutingSession, **kw)
+
+    async def check_replica(self, force: bool = False):
+        if self.monitor is not None:
+            await self.monitor.check(force=force)
+
+    async def dispose(self):
+        await self.writer.dispose()
+        if self.reader is not None:
+            await self.reader.dispose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"replica_configured": self.reader is not None, **(self.monitor.get_stats() if self.monitor else {})}
@@ -0,0 +1,251 @@
+"""
+Database telemetry
+Pool checkout waits and gauges, per-source statement latency and a slow-query log
+"""
+import bisect
+import logging
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+logger = logging.getLogger("seiketsu.database")
+
+# Histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Slow query fingerprints kept; the least expensive is evicted beyond this
+MAX_SLOW_FINGERPRINTS = 200
+
+# What is issuing queries in this context: an ASGI scope for requests,
+# resolved lazily to the matched route, or a plain label such as a task name
+_query_source: ContextVar[Any] = ContextVar("query_source", default=None)
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRINGS = re.compile(r"'(?:''|[^'])*'")
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+|\?")
+_NUMBERS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", re.IGNORECASE)
+_IN_LISTS = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUE_ROWS = re.compile(r"(\(\?(?:\s*,\s*\?)*\))(?:\s*,\s*\(\?(?:\s*,\s*\?)*\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Normalize SQL so statements differing only in literals group together"""
+    sql = _COMMENTS.sub(" ", statement)
+    sql = _STRINGS.sub("?", sql)
+    sql = _PLACEHOLDERS.sub("?", sql)
+    sql = _NUMBERS.sub("?", sql)
+    sql = _IN_LISTS.sub("IN (...)", sql)
+    sql = _VALUE_ROWS.sub(r"\1, ...", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def set_query_source(source: Any):
+    """Tag queries issued from the current context; returns a reset token"""
+    return _query_source.set(source)
+
+
+def reset_query_source(token):
+    _query_source.reset(token)
+
+
+def current_query_source() -> str:
+    source = _query_source.get()
+    if source is None:
+        return "unattributed"
+    if isinstance(source, dict):
+        # Routing fills in scope["route"] after middleware has bound the scope
+        route = source.get("route")
+        path = getattr(route, "path", None) or "unmatched"
+        return f"{source.get('method', 'WS')} {path}"
+    return str(source)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self, buckets_ms: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.buckets_ms, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets_ms, self.counts):
+            seen += count
+            if seen >= rank:
+                return float(bound)
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets_ms + (float("inf"),), self.counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 3),
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "buckets": buckets
+        }
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool recording how long each checkout waits for a connection.
+
+    The wait includes opening a new connection when the pool is below
+    capacity. Timings go to `db_telemetry` under the pool's logging name,
+    which survives pool recreation on dispose.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_telemetry.observe_checkout_wait(self._orig_logging_name or "default", time.perf_counter() - start)
+
+
+class DatabaseTelemetry:
+    """Collects pool and statement metrics through SQLAlchemy events"""
+
+    def __init__(self, slow_query_ms: float = 500.0):
+        self.slow_query_ms = slow_query_ms
+        self.engines: Dict[str, Engine] = {}
+        self.checkout_wait: Dict[str, LatencyHistogram] = {}
+        self.connections_opened: Dict[str, int] = {}
+        self.statements: Dict[str, LatencyHistogram] = {}
+        self.slow_queries: Dict[str, Dict[str, Any]] = {}
+
+    def instrument(self, engine: Any, name: str):
+        """Attach statement timing listeners to an engine (sync or async)"""
+        sync_engine = getattr(engine, "sync_engine", engine)
+        self.engines[name] = sync_engine
+        self.connections_opened.setdefault(name, 0)
+        event.listen(sync_engine, "connect", lambda dbapi_connection, record: self._connection_opened(name))
+        event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(sync_engine, "handle_error", self._handle_error)
+
+    def observe_checkout_wait(self, pool_name: str, seconds: float):
+        histogram = self.checkout_wait.get(pool_name)
+        if histogram is None:
+            histogram = self.checkout_wait[pool_name] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    def _connection_opened(self, name: str):
+        # Connection churn: a healthy pool opens few connections over its life
+        self.connections_opened[name] = self.connections_opened.get(name, 0) + 1
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        self.record_statement(current_query_source(), statement, elapsed)
+
+    def _handle_error(self, exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start_time"):
+            conn.info["query_start_time"].pop()
+
+    def record_statement(self, source: str, statement: str, seconds: float):
+        histogram = self.statements.get(source)
+        if histogram is None:
+            histogram = self.statements[source] = LatencyHistogram()
+        histogram.observe(seconds)
+
+        elapsed_ms = seconds * 1000
+        if elapsed_ms < self.slow_query_ms:
+            return
+
+        sql = fingerprint(statement)
+        entry = self.slow_queries.get(sql)
+        if entry is None:
+            if len(self.slow_queries) >= MAX_SLOW_FINGERPRINTS:
+                cheapest = min(self.slow_queries, key=lambda key: self.slow_queries[key]["total_ms"])
+                del self.slow_queries[cheapest]
+            entry = self.slow_queries[sql] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "sources": {}}
+        entry["count"] += 1
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+        entry["sources"][source] = entry["sources"].get(source, 0) + 1
+
+        # Parameters are never logged; they can hold personal data
+        logger.warning(
+            f"Slow query ({elapsed_ms:.1f}ms) from {source}: {sql}",
+            extra={"source": source, "duration_ms": round(elapsed_ms, 3), "fingerprint": sql}
+        )
+
+    def pool_gauges(self) -> Dict[str, Dict[str, Any]]:
+        gauges = {}
+        for name, engine in self.engines.items():
+            pool = engine.pool
+            stats: Dict[str, Any] = {
+                "pool_class": type(pool).__name__,
+                "connections_opened": self.connections_opened.get(name, 0)
+            }
+            if hasattr(pool, "checkedout"):
+                stats.update({
+                    "size": pool.size(),
+                    "in_use": pool.checkedout(),
+                    "idle": pool.checkedin(),
+                    "overflow": max(pool.overflow(), 0)
+                })
+            if name in self.checkout_wait:
+                stats["checkout_wait"] = self.checkout_wait[name].snapshot()
+            gauges[name] = stats
+        return gauges
+
+    def top_slow_queries(self, limit: int = 20) -> List[Dict[str, Any]]:
+        ranked = sorted(self.slow_queries.items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        return [
+            {
+                "fingerprint": sql,
+                "count": entry["count"],
+                "total_ms": round(entry["total_ms"], 3),
+                "avg_ms": round(entry["total_ms"] / entry["count"], 3),
+                "max_ms": round(entry["max_ms"], 3),
+                "sources": dict(entry["sources"])
+            }
+            for sql, entry in ranked[:limit]
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pools": self.pool_gauges(),
+            "statements": {source: histogram.snapshot() for source, histogram in self.statements.items()},
+            "slow_queries": self.top_slow_queries()
+        }
+
+    def reset(self):
+        self.checkout_wait.clear()
+        self.connections_opened = dict.fromkeys(self.connections_opened, 0)
+        self.statements.clear()
+        self.slow_queries.clear()
+
+
+# Global telemetry instance
+db_telemetry = DatabaseTelemetry()
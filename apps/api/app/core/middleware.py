@@ -1,78 +1,97 @@
 """
 Middleware for Seiketsu AI API
 """
-from fastapi import Request, Response
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from fastapi import Request
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import time
 import uuid
 import logging
 from datetime import datetime
-from typing import Callable
-import asyncio
-import json
+from typing import Optional
+import math
 
+from app.core.asgi import ASGIMiddleware, get_header, request_state, send_json, send_with_headers
 from app.core.config import settings
+from app.core.cache import get_redis_client
+from app.core.db_telemetry import set_query_source, reset_query_source
+from app.utils.rate_limiter import GCRARateLimiter, RedisGCRAStore
 
 logger = logging.getLogger("seiketsu.middleware")
 
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
+class RequestLoggingMiddleware(ASGIMiddleware):
     """Middleware for logging requests and responses"""
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def handle(self, scope: Scope, receive: Receive, send: Send):
         # Generate unique request ID
         request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
+        request_state(scope)["request_id"] = request_id
+        
+        # Database statements are attributed to the route matched below
+        token = set_query_source(scope)
         
         # Start timing
         start_time = time.time()
         
         # Log incoming request
-        logger.info(
-            f"Incoming request: {request.method} {request.url.path}",
-            extra={
-                "request_id": request_id,
-                "method": request.method,
-                "url": str(request.url),
-                "headers": dict(request.headers),
-                "user_agent": request.headers.get("user-agent")
-            }
-        )
-        
-        # Process request
-        response = await call_next(request)
-        
-        # Calculate response time
-        process_time = time.time() - start_time
-        
-        # Add response headers
-        response.headers["X-Request-ID"] = request_id
-        response.headers["X-Response-Time"] = f"{process_time:.4f}s"
+        if logger.isEnabledFor(logging.INFO):
+            request = Request(scope)
+            logger.info(
+                f"Incoming request: {request.method} {request.url.path}",
+                extra={
+                    "request_id": request_id,
+                    "method": request.method,
+                    "url": str(request.url),
+                    "headers": dict(request.headers),
+                    "user_agent": request.headers.get("user-agent")
+                }
+            )
         
-        # Log response
-        logger.info(
-            f"Response: {response.status_code} - {process_time:.4f}s",
-            extra={
-                "request_id": request_id,
-                "status_code": response.status_code,
-                "response_time": process_time
-            }
-        )
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                # Calculate response time
+                process_time = time.time() - start_time
+                
+                # Add response headers
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = request_id
+                headers["X-Response-Time"] = f"{process_time:.4f}s"
+                
+                # Log response
+                logger.info(
+                    f"Response: {message['status']} - {process_time:.4f}s",
+                    extra={
+                        "request_id": request_id,
+                        "status_code": message["status"],
+                        "response_time": process_time
+                    }
+                )
+            await send(message)
         
-        return response
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            reset_query_source(token)
 
 
-class ErrorHandlingMiddleware(BaseHTTPMiddleware):
+class ErrorHandlingMiddleware(ASGIMiddleware):
     """Middleware for handling errors and exceptions"""
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def handle(self, scope: Scope, receive: Receive, send: Send):
+        response_started = False
+        
+        async def send_tracking_start(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+        
         try:
-            response = await call_next(request)
-            return response
+            await self.app(scope, receive, send_tracking_start)
         except Exception as exc:
-            request_id = getattr(request.state, 'request_id', str(uuid.uuid4()))
+            request_id = request_state(scope).get("request_id") or str(uuid.uuid4())
+            request = Request(scope)
             
             logger.error(
                 f"Request failed with exception: {exc}",
@@ -85,7 +104,12 @@ class ErrorHandlingMiddleware(BaseHTTPMiddleware):
                 }
             )
             
-            return JSONResponse(
+            # Too late for an error response once the body is streaming
+            if response_started:
+                raise
+            
+            await send_json(
+                scope, receive, send,
                 status_code=500,
                 content={
                     "detail": "Internal server error",
@@ -95,113 +119,89 @@ class ErrorHandlingMiddleware(BaseHTTPMiddleware):
             )
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Simple rate limiting middleware"""
+class RateLimitMiddleware(ASGIMiddleware):
+    """Simple per-IP rate limiting middleware.
     
-    def __init__(self, app: ASGIApp):
+    A GCRA limiter keeps one timestamp per client: in Redis once it is
+    connected, otherwise in a bounded in-process LRU.
+    """
+    
+    def __init__(self, app: ASGIApp, calls_per_minute: Optional[int] = None):
         super().__init__(app)
-        self.requests = {}  # In production, use Redis
-        self.cleanup_interval = 60  # seconds
-        self.last_cleanup = time.time()
+        self.calls_per_minute = calls_per_minute or settings.RATE_LIMIT_PER_MINUTE
+        self.limiter = GCRARateLimiter(
+            requests_per_second=self.calls_per_minute / 60,
+            burst_size=self.calls_per_minute
+        )
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def handle(self, scope: Scope, receive: Receive, send: Send):
+        path = scope["path"]
+        
         # Skip rate limiting for health checks
-        if request.url.path.startswith("/api/health"):
-            return await call_next(request)
+        if path.startswith("/api/health"):
+            await self.app(scope, receive, send)
+            return
         
         # Get client IP
-        client_ip = request.client.host if request.client else "unknown"
-        
-        # Cleanup old entries periodically
-        current_time = time.time()
-        if current_time - self.last_cleanup > self.cleanup_interval:
-            await self._cleanup_old_requests(current_time)
-            self.last_cleanup = current_time
-        
-        # Check rate limit
-        if self._is_rate_limited(client_ip, current_time):
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        
+        # Share limits across processes once Redis is up
+        if self.limiter.store is self.limiter.memory:
+            redis_client = await get_redis_client()
+            if redis_client:
+                self.limiter.store = RedisGCRAStore(redis_client, prefix="rate_limit:gcra:")
+        
+        # Check and record the request
+        result = await self.limiter.check(client_ip)
+        if not result.allowed:
             logger.warning(
                 f"Rate limit exceeded for IP: {client_ip}",
                 extra={
                     "client_ip": client_ip,
-                    "path": request.url.path
+                    "path": path
                 }
             )
-            return JSONResponse(
+            retry_after = max(1, math.ceil(result.retry_after))
+            await send_json(
+                scope, receive, send,
                 status_code=429,
                 content={
                     "detail": "Rate limit exceeded",
-                    "retry_after": 60
-                }
+                    "retry_after": retry_after
+                },
+                headers={"Retry-After": str(retry_after)}
             )
+            return
         
-        # Record request
-        self._record_request(client_ip, current_time)
-        
-        return await call_next(request)
-    
-    def _is_rate_limited(self, client_ip: str, current_time: float) -> bool:
-        """Check if client is rate limited"""
-        if client_ip not in self.requests:
-            return False
-        
-        # Count requests in the last minute
-        recent_requests = [
-            req_time for req_time in self.requests[client_ip]
-            if current_time - req_time < 60
-        ]
-        
-        return len(recent_requests) >= settings.RATE_LIMIT_PER_MINUTE
-    
-    def _record_request(self, client_ip: str, current_time: float):
-        """Record a request for rate limiting"""
-        if client_ip not in self.requests:
-            self.requests[client_ip] = []
-        
-        self.requests[client_ip].append(current_time)
-        
-        # Keep only recent requests
-        self.requests[client_ip] = [
-            req_time for req_time in self.requests[client_ip]
-            if current_time - req_time < 60
-        ]
-    
-    async def _cleanup_old_requests(self, current_time: float):
-        """Clean up old request records"""
-        for client_ip in list(self.requests.keys()):
-            self.requests[client_ip] = [
-                req_time for req_time in self.requests[client_ip]
-                if current_time - req_time < 60
-            ]
-            if not self.requests[client_ip]:
-                del self.requests[client_ip]
+        await self.app(scope, receive, send)
 
 
-class TenantContextMiddleware(BaseHTTPMiddleware):
+class TenantContextMiddleware(ASGIMiddleware):
     """Middleware for handling multi-tenant context"""
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def handle(self, scope: Scope, receive: Receive, send: Send):
         # Extract tenant information from request
-        tenant_id = self._extract_tenant_id(request)
+        tenant_id = self._extract_tenant_id(scope)
         
         if tenant_id:
-            request.state.tenant_id = tenant_id
+            request_state(scope)["tenant_id"] = tenant_id
             logger.debug(
                 f"Request tenant context: {tenant_id}",
                 extra={"tenant_id": tenant_id}
             )
         
-        return await call_next(request)
+        await self.app(scope, receive, send)
     
-    def _extract_tenant_id(self, request: Request) -> str:
+    def _extract_tenant_id(self, scope: Scope) -> Optional[str]:
         """Extract tenant ID from request"""
         # Try to get from header
-        tenant_id = request.headers.get("X-Tenant-ID")
+        tenant_id = get_header(scope, b"x-tenant-id")
         if tenant_id:
             return tenant_id
         
         # Try to get from subdomain
-        host = request.headers.get("host", "")
+        host = get_header(scope, b"host")
         if "." in host:
             subdomain = host.split(".")[0]
             if subdomain not in ["api", "www", "app"]:
@@ -213,20 +213,21 @@ class TenantContextMiddleware(BaseHTTPMiddleware):
         return None
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+class SecurityHeadersMiddleware(ASGIMiddleware):
     """Middleware for adding security headers"""
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        response = await call_next(request)
-        
-        # Add security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Permissions-Policy"] = "camera=(), microphone=(), geolocation=()"
+    def __init__(self, app: ASGIApp):
+        super().__init__(app)
+        self.headers = {
+            "X-Content-Type-Options": "nosniff",
+            "X-Frame-Options": "DENY",
+            "X-XSS-Protection": "1; mode=block",
+            "Referrer-Policy": "strict-origin-when-cross-origin",
+            "Permissions-Policy": "camera=(), microphone=(), geolocation=()"
+        }
         
         if settings.ENVIRONMENT == "production":
-            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        
-        return response
\ No newline at end of file
+            self.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+    
+    async def handle(self, scope: Scope, receive: Receive, send: Send):
+        await self.app(scope, receive, send_with_headers(send, self.headers))
@@ -3,31 +3,101 @@ Advanced Security Middleware
 Multi-tenant isolation, rate limiting, and threat protection
 """
 import logging
-from fastapi import Request, Response, HTTPException
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.types import ASGIApp, Receive, Scope, Send
 import time
 import uuid
-import hashlib
-import json
-from datetime import datetime, timedelta
-from typing import Dict, Set, Optional, Callable
-import asyncio
+from typing import Dict, Set, Optional, Tuple
+from collections import OrderedDict, deque
+import math
 import re
 
+from app.core.asgi import (
+    ASGIMiddleware,
+    client_ip,
+    get_header,
+    read_body,
+    replay_body,
+    request_state,
+    send_json,
+    send_with_headers
+)
 from app.core.config import settings
 from app.core.cache import get_redis_client
 
 logger = logging.getLogger("seiketsu.security_middleware")
 
 
-class AdvancedRateLimitMiddleware(BaseHTTPMiddleware):
+# Sliding-window log in one round trip: trims requests older than the window,
+# admits this one if the window has room, and reports the remaining quota and
+# milliseconds until the oldest request leaves the window. Running as a script
+# makes count-then-add atomic, so concurrent requests cannot overshoot.
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+local allowed = 0
+if count < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[4])
+    count = count + 1
+    allowed = 1
+end
+local reset = window
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+if oldest[2] then
+    reset = tonumber(oldest[2]) + window - now
+end
+if count > 0 then
+    redis.call('PEXPIRE', KEYS[1], window)
+end
+return {allowed, limit - count, reset}
+"""
+
+# Keys tracked by the in-memory fallback; least recently used are evicted
+MEMORY_RATE_LIMIT_MAX_KEYS = 10000
+
+
+class MemorySlidingWindow:
+    """Bounded in-process sliding-window log, used while Redis is unavailable.
+
+    Each key keeps at most `limit` timestamps, and only the most recently
+    used keys are kept. Checks never await, so they are atomic within the
+    event loop.
+    """
+    
+    def __init__(self, max_keys: int = MEMORY_RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self.windows: "OrderedDict[str, deque]" = OrderedDict()
+    
+    def hit(self, key: str, now_ms: int, window_ms: int, limit: int) -> Tuple[bool, int, int]:
+        """Admit a request if there is room; returns (allowed, remaining, reset_ms)"""
+        window = self.windows.get(key)
+        if window is None:
+            window = self.windows[key] = deque(maxlen=limit)
+            if len(self.windows) > self.max_keys:
+                self.windows.popitem(last=False)
+        else:
+            self.windows.move_to_end(key)
+        
+        while window and window[0] <= now_ms - window_ms:
+            window.popleft()
+        
+        allowed = len(window) < limit
+        if allowed:
+            window.append(now_ms)
+        reset_ms = window[0] + window_ms - now_ms if window else window_ms
+        return allowed, limit - len(window), reset_ms
+
+
+class AdvancedRateLimitMiddleware(ASGIMiddleware):
     """Advanced rate limiting with Redis backend and different limits per endpoint"""
     
     def __init__(self, app: ASGIApp):
         super().__init__(app)
         self.redis_client = None
+        self.sliding_window = None
+        self.memory_windows = MemorySlidingWindow()
         self.rate_limits = {
             "/api/v1/voice/process": {"requests": 10, "window": 60},  # Voice processing
             "/api/v1/voice/initiate": {"requests": 20, "window": 60},  # Voice initiation
@@ -36,64 +106,65 @@ class AdvancedRateLimitMiddleware(BaseHTTPMiddleware):
             "default": {"requests": settings.RATE_LIMIT_PER_MINUTE, "window": 60}
         }
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def handle(self, scope: Scope, receive: Receive, send: Send):
+        path = scope["path"]
+        
         # Skip rate limiting for health checks and static files
-        if (request.url.path.startswith("/api/health") or 
-            request.url.path.startswith("/static") or
-            request.method == "OPTIONS"):
-            return await call_next(request)
+        if (path.startswith("/api/health") or 
+            path.startswith("/static") or
+            scope["method"] == "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
         
         # Get client identifier
-        client_id = self._get_client_identifier(request)
+        client_id = self._get_client_identifier(scope)
         
         # Get rate limit for this endpoint
-        rate_limit = self._get_rate_limit_for_path(request.url.path)
+        rate_limit = self._get_rate_limit_for_path(path)
         
-        # Check rate limit
-        is_limited, retry_after = await self._check_rate_limit(
-            client_id, request.url.path, rate_limit
+        # Check and record in one step
+        allowed, remaining, reset_seconds = await self._check_rate_limit(
+            client_id, path, rate_limit
         )
+        headers = {
+            "X-RateLimit-Limit": str(rate_limit["requests"]),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(reset_seconds)
+        }
         
-        if is_limited:
+        if not allowed:
             logger.warning(
-                f"Rate limit exceeded for {client_id} on {request.url.path}",
+                f"Rate limit exceeded for {client_id} on {path}",
                 extra={
                     "client_id": client_id,
-                    "path": request.url.path,
+                    "path": path,
                     "rate_limit": rate_limit
                 }
             )
-            return JSONResponse(
+            await send_json(
+                scope, receive, send,
                 status_code=429,
                 content={
                     "detail": "Rate limit exceeded",
-                    "retry_after": retry_after,
+                    "retry_after": reset_seconds,
                     "limit": rate_limit["requests"],
                     "window": rate_limit["window"]
                 },
-                headers={"Retry-After": str(retry_after)}
+                headers={**headers, "Retry-After": str(reset_seconds)}
             )
+            return
         
-        # Record successful request
-        await self._record_request(client_id, request.url.path, rate_limit)
-        
-        return await call_next(request)
+        await self.app(scope, receive, send_with_headers(send, headers))
     
-    def _get_client_identifier(self, request: Request) -> str:
+    def _get_client_identifier(self, scope: Scope) -> str:
         """Get unique client identifier for rate limiting"""
         # Try to get authenticated user ID first
-        if hasattr(request.state, 'user_id') and request.state.user_id:
-            return f"user:{request.state.user_id}"
+        user_id = request_state(scope).get("user_id")
+        if user_id:
+            return f"user:{user_id}"
         
-        # Fall back to IP address
-        client_ip = request.client.host if request.client else "unknown"
-        
-        # Consider X-Forwarded-For header for load balancers
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            client_ip = forwarded_for.split(",")[0].strip()
-        
-        return f"ip:{client_ip}"
+        # Fall back to IP address, honouring load balancer headers
+        return f"ip:{client_ip(scope)}"
     
     def _get_rate_limit_for_path(self, path: str) -> Dict[str, int]:
         """Get rate limit configuration for specific path"""
@@ -109,116 +180,75 @@ class AdvancedRateLimitMiddleware(BaseHTTPMiddleware):
         client_id: str, 
         path: str, 
         rate_limit: Dict[str, int]
-    ) -> tuple[bool, int]:
-        """Check if client has exceeded rate limit"""
+    ) -> Tuple[bool, int, int]:
+        """Admit or reject a request; returns (allowed, remaining, reset_seconds)"""
+        key = f"rate_limit:{client_id}:{path}"
+        now_ms = int(time.time() * 1000)
+        window_ms = rate_limit["window"] * 1000
+        
         try:
             if not self.redis_client:
                 self.redis_client = await get_redis_client()
             
-            if not self.redis_client:
-                # Fallback to in-memory rate limiting
-                return await self._check_rate_limit_memory(client_id, path, rate_limit)
-            
-            key = f"rate_limit:{client_id}:{path}"
-            current_time = int(time.time())
-            window_start = current_time - rate_limit["window"]
-            
-            # Remove old entries
-            await self.redis_client.zremrangebyscore(key, 0, window_start)
-            
-            # Count current requests in window
-            current_requests = await self.redis_client.zcard(key)
-            
-            if current_requests >= rate_limit["requests"]:
-                # Get time of earliest request in current window
-                earliest = await self.redis_client.zrange(key, 0, 0, withscores=True)
-                if earliest:
-                    retry_after = int(earliest[0][1]) + rate_limit["window"] - current_time
-                    return True, max(retry_after, 1)
-                return True, rate_limit["window"]
-            
-            return False, 0
-            
-        except Exception as e:
-            logger.error(f"Rate limit check failed: {e}")
-            # Allow request on error to avoid blocking legitimate traffic
-            return False, 0
-    
-    async def _record_request(
-        self, 
-        client_id: str, 
-        path: str, 
-        rate_limit: Dict[str, int]
-    ):
-        """Record successful request"""
-        try:
-            if not self.redis_client:
-                return
-            
-            key = f"rate_limit:{client_id}:{path}"
-            current_time = time.time()
-            
-            # Add current request
-            await self.redis_client.zadd(key, {str(uuid.uuid4()): current_time})
-            
-            # Set expiration on key
-            await self.redis_client.expire(key, rate_limit["window"] + 60)
+            if self.redis_client:
+                if self.sliding_window is None:
+                    # Runs via EVALSHA, loading the script on first use
+                    self.sliding_window = self.redis_client.register_script(SLIDING_WINDOW_SCRIPT)
+                allowed, remaining, reset_ms = await self.sliding_window(
+                    keys=[key],
+                    args=[now_ms, window_ms, rate_limit["requests"], uuid.uuid4().hex]
+                )
+                return bool(allowed), int(remaining), max(math.ceil(int(reset_ms) / 1000), 1)
             
         except Exception as e:
-            logger.error(f"Failed to record request: {e}")
-    
-    async def _check_rate_limit_memory(
-        self, 
-        client_id: str, 
-        path: str, 
-        rate_limit: Dict[str, int]
-    ) -> tuple[bool, int]:
-        """Fallback in-memory rate limiting"""
-        # This is a simplified version - in production you'd want a more sophisticated implementation
-        return False, 0
+            logger.error(f"Rate limit check failed, using in-memory limits: {e}")
+        
+        allowed, remaining, reset_ms = self.memory_windows.hit(key, now_ms, window_ms, rate_limit["requests"])
+        return allowed, remaining, max(math.ceil(reset_ms / 1000), 1)
 
 
-class TenantIsolationMiddleware(BaseHTTPMiddleware):
+class TenantIsolationMiddleware(ASGIMiddleware):
     """Multi-tenant data isolation middleware"""
     
     def __init__(self, app: ASGIApp):
         super().__init__(app)
-        self.bypass_paths = {"/api/health", "/docs", "/redoc", "/openapi.json"}
+        self.bypass_paths = ("/api/health", "/docs", "/redoc", "/openapi.json")
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def handle(self, scope: Scope, receive: Receive, send: Send):
+        path = scope["path"]
+        
         # Skip tenant isolation for bypass paths
-        if any(request.url.path.startswith(path) for path in self.bypass_paths):
-            return await call_next(request)
+        if path.startswith(self.bypass_paths):
+            await self.app(scope, receive, send)
+            return
         
         # Extract and validate tenant context
-        tenant_context = await self._extract_tenant_context(request)
+        tenant_context = self._extract_tenant_context(scope)
         
         if tenant_context:
             # Set tenant context in request state
-            request.state.tenant_id = tenant_context["tenant_id"]
-            request.state.organization_id = tenant_context["organization_id"]
+            state = request_state(scope)
+            state["tenant_id"] = tenant_context["tenant_id"]
+            state["organization_id"] = tenant_context["organization_id"]
             
             # Add tenant headers to response
-            response = await call_next(request)
-            response.headers["X-Tenant-ID"] = tenant_context["tenant_id"]
-            
-            return response
+            await self.app(scope, receive, send_with_headers(send, {"X-Tenant-ID": tenant_context["tenant_id"]}))
+        elif path.startswith("/api/v1/auth"):
+            # Allow auth endpoints without tenant context
+            await self.app(scope, receive, send)
         else:
             # No valid tenant context found
-            if request.url.path.startswith("/api/v1/auth"):
-                # Allow auth endpoints without tenant context
-                return await call_next(request)
-            else:
-                return JSONResponse(
-                    status_code=403,
-                    content={"detail": "Invalid or missing tenant context"}
-                )
+            await send_json(
+                scope, receive, send,
+                status_code=403,
+                content={"detail": "Invalid or missing tenant context"}
+            )
     
-    async def _extract_tenant_context(self, request: Request) -> Optional[Dict[str, str]]:
+    def _extract_tenant_context(self, scope: Scope) -> Optional[Dict[str, str]]:
         """Extract tenant context from request"""
         try:
             # Method 1: From custom header
-            tenant_id = request.headers.get("X-Tenant-ID")
+            tenant_id = get_header(scope, b"x-tenant-id")
             if tenant_id:
                 return {
                     "tenant_id": tenant_id,
@@ -226,7 +256,7 @@ class TenantIsolationMiddleware(BaseHTTPMiddleware):
                 }
             
             # Method 2: From subdomain
-            host = request.headers.get("host", "")
+            host = get_header(scope, b"host")
             if "." in host:
                 subdomain = host.split(".")[0]
                 if subdomain not in ["api", "www", "app", "admin"]:
@@ -236,10 +266,11 @@ class TenantIsolationMiddleware(BaseHTTPMiddleware):
                     }
             
             # Method 3: From JWT token (if already authenticated)
-            if hasattr(request.state, 'organization_id') and request.state.organization_id:
+            organization_id = request_state(scope).get("organization_id")
+            if organization_id:
                 return {
-                    "tenant_id": request.state.organization_id,
-                    "organization_id": request.state.organization_id
+                    "tenant_id": organization_id,
+                    "organization_id": organization_id
                 }
             
             return None
@@ -249,20 +280,22 @@ class TenantIsolationMiddleware(BaseHTTPMiddleware):
             return None
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+class SecurityHeadersMiddleware(ASGIMiddleware):
     """Enhanced security headers middleware"""
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        response = await call_next(request)
+    def __init__(self, app: ASGIApp):
+        super().__init__(app)
         
         # Basic security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+        self.headers = {
+            "X-Content-Type-Options": "nosniff",
+            "X-Frame-Options": "DENY",
+            "X-XSS-Protection": "1; mode=block",
+            "Referrer-Policy": "strict-origin-when-cross-origin"
+        }
         
         # Content Security Policy
-        csp = (
+        self.headers["Content-Security-Policy"] = (
             "default-src 'self'; "
             "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
             "style-src 'self' 'unsafe-inline'; "
@@ -273,31 +306,34 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
             "object-src 'none'; "
             "base-uri 'self'"
         )
-        response.headers["Content-Security-Policy"] = csp
         
         # Additional security headers
-        response.headers["Permissions-Policy"] = (
+        self.headers["Permissions-Policy"] = (
             "camera=(), microphone=(), geolocation=(), "
             "payment=(), usb=(), magnetometer=(), gyroscope=()"
         )
         
         # HSTS for production
         if settings.ENVIRONMENT == "production":
-            response.headers["Strict-Transport-Security"] = (
+            self.headers["Strict-Transport-Security"] = (
                 "max-age=31536000; includeSubDomains; preload"
             )
         
         # API-specific headers
-        if request.url.path.startswith("/api"):
-            response.headers["X-Robots-Tag"] = "noindex, nofollow"
-            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-            response.headers["Pragma"] = "no-cache"
-            response.headers["Expires"] = "0"
-        
-        return response
+        self.api_headers = {
+            **self.headers,
+            "X-Robots-Tag": "noindex, nofollow",
+            "Cache-Control": "no-cache, no-store, must-revalidate",
+            "Pragma": "no-cache",
+            "Expires": "0"
+        }
+    
+    async def handle(self, scope: Scope, receive: Receive, send: Send):
+        headers = self.api_headers if scope["path"].startswith("/api") else self.headers
+        await self.app(scope, receive, send_with_headers(send, headers))
 
 
-class ThreatDetectionMiddleware(BaseHTTPMiddleware):
+class ThreatDetectionMiddleware(ASGIMiddleware):
     """Advanced threat detection and prevention"""
     
     def __init__(self, app: ASGIApp):
@@ -313,78 +349,67 @@ class ThreatDetectionMiddleware(BaseHTTPMiddleware):
         self.blocked_ips: Set[str] = set()
         self.suspicious_requests: Dict[str, int] = {}
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        client_ip = self._get_client_ip(request)
+    async def handle(self, scope: Scope, receive: Receive, send: Send):
+        ip = client_ip(scope)
         
         # Check if IP is blocked
-        if client_ip in self.blocked_ips:
-            logger.warning(f"Blocked request from {client_ip}")
-            return JSONResponse(
+        if ip in self.blocked_ips:
+            logger.warning(f"Blocked request from {ip}")
+            await send_json(
+                scope, receive, send,
                 status_code=403,
                 content={"detail": "Access denied"}
             )
+            return
         
-        # Analyze request for threats
-        threat_level = await self._analyze_request(request)
+        # Analyze request for threats; a JSON body read here is replayed downstream
+        threat_level, receive = await self._analyze_request(scope, receive)
         
         if threat_level >= 0.8:  # High threat
             logger.warning(
-                f"High threat request blocked from {client_ip}",
+                f"High threat request blocked from {ip}",
                 extra={
                     "threat_level": threat_level,
-                    "path": request.url.path,
-                    "method": request.method
+                    "path": scope["path"],
+                    "method": scope["method"]
                 }
             )
-            self._record_suspicious_activity(client_ip)
-            return JSONResponse(
+            self._record_suspicious_activity(ip)
+            await send_json(
+                scope, receive, send,
                 status_code=403,
                 content={"detail": "Request blocked by security policy"}
             )
+            return
         elif threat_level >= 0.5:  # Medium threat
-            logger.info(f"Suspicious request from {client_ip} (threat level: {threat_level})")
-            self._record_suspicious_activity(client_ip)
+            logger.info(f"Suspicious request from {ip} (threat level: {threat_level})")
+            self._record_suspicious_activity(ip)
         
         # Add security context to request
-        request.state.threat_level = threat_level
-        request.state.client_ip = client_ip
+        request_state(scope)["threat_level"] = threat_level
         
-        return await call_next(request)
+        await self.app(scope, receive, send)
     
-    def _get_client_ip(self, request: Request) -> str:
-        """Get client IP address"""
-        # Check X-Forwarded-For header first
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            return forwarded_for.split(",")[0].strip()
-        
-        # Check X-Real-IP header
-        real_ip = request.headers.get("X-Real-IP")
-        if real_ip:
-            return real_ip.strip()
-        
-        # Fall back to client IP
-        return request.client.host if request.client else "unknown"
-    
-    async def _analyze_request(self, request: Request) -> float:
+    async def _analyze_request(self, scope: Scope, receive: Receive) -> Tuple[float, Receive]:
         """Analyze request for potential threats"""
         threat_score = 0.0
         
         try:
             # Analyze URL parameters
-            query_params = str(request.url.query)
+            query_params = scope.get("query_string", b"").decode("latin-1")
             threat_score += self._scan_for_patterns(query_params) * 0.3
             
             # Analyze headers
-            user_agent = request.headers.get("User-Agent", "")
+            user_agent = get_header(scope, b"user-agent")
             if self._is_suspicious_user_agent(user_agent):
                 threat_score += 0.2
             
             # Analyze request body for POST/PUT requests
-            if request.method in ["POST", "PUT", "PATCH"]:
+            if scope["method"] in ["POST", "PUT", "PATCH"]:
                 try:
-                    if request.headers.get("content-type", "").startswith("application/json"):
-                        body = await request.body()
+                    if get_header(scope, b"content-type").startswith("application/json"):
+                        body = await read_body(receive)
+                        receive = replay_body(body, receive)
                         if body:
                             body_str = body.decode("utf-8", errors="ignore")
                             threat_score += self._scan_for_patterns(body_str) * 0.4
@@ -393,14 +418,13 @@ class ThreatDetectionMiddleware(BaseHTTPMiddleware):
                     pass
             
             # Check for rapid successive requests (potential DoS)
-            client_ip = self._get_client_ip(request)
-            if self._is_rapid_requests(client_ip):
+            if self._is_rapid_requests(client_ip(scope)):
                 threat_score += 0.3
             
         except Exception as e:
             logger.error(f"Error analyzing request: {e}")
         
-        return min(threat_score, 1.0)  # Cap at 1.0
+        return min(threat_score, 1.0), receive  # Cap at 1.0
     
     def _scan_for_patterns(self, text: str) -> float:
         """Scan text for suspicious patterns"""
@@ -455,47 +479,53 @@ class ThreatDetectionMiddleware(BaseHTTPMiddleware):
             logger.warning(f"Blocked IP {client_ip} due to repeated suspicious activity")
 
 
-class DataValidationMiddleware(BaseHTTPMiddleware):
+class DataValidationMiddleware(ASGIMiddleware):
     """Input validation and sanitization middleware"""
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    allowed_types = (
+        "application/json",
+        "multipart/form-data",
+        "application/x-www-form-urlencoded",
+        "audio/mpeg",
+        "audio/wav",
+        "audio/mp3"
+    )
+    
+    async def handle(self, scope: Scope, receive: Receive, send: Send):
         # Validate request size
-        content_length = request.headers.get("content-length")
+        content_length = get_header(scope, b"content-length")
         if content_length:
             try:
                 size = int(content_length)
                 if size > 50 * 1024 * 1024:  # 50MB limit
-                    return JSONResponse(
+                    await send_json(
+                        scope, receive, send,
                         status_code=413,
                         content={"detail": "Request too large"}
                     )
+                    return
             except ValueError:
                 pass
         
         # Validate content type for API endpoints
-        if (request.url.path.startswith("/api") and 
-            request.method in ["POST", "PUT", "PATCH"]):
-            content_type = request.headers.get("content-type", "")
+        if (scope["path"].startswith("/api") and 
+            scope["method"] in ["POST", "PUT", "PATCH"]):
+            content_type = get_header(scope, b"content-type")
             
             if not content_type:
-                return JSONResponse(
+                await send_json(
+                    scope, receive, send,
                     status_code=400,
                     content={"detail": "Content-Type header required"}
                 )
+                return
             
-            allowed_types = [
-                "application/json",
-                "multipart/form-data",
-                "application/x-www-form-urlencoded",
-                "audio/mpeg",
-                "audio/wav",
-                "audio/mp3"
-            ]
-            
-            if not any(content_type.startswith(allowed) for allowed in allowed_types):
-                return JSONResponse(
+            if not content_type.startswith(self.allowed_types):
+                await send_json(
+                    scope, receive, send,
                     status_code=415,
                     content={"detail": "Unsupported media type"}
                 )
+                return
         
-        return await call_next(request)
\ No newline at end of file
+        await self.app(scope, receive, send)
@@ -10,6 +10,7 @@ from .property import Property
 from .webhook import Webhook
 from .integration import Integration
 from .analytics import AnalyticsEvent
+from .analytics_rollup import ConversationRollup, LeadRollup, RollupWatermark
 from .subscription import Subscription
 
 __all__ = [
@@ -23,5 +24,8 @@ __all__ = [
     "Webhook",
     "Integration",
     "AnalyticsEvent",
+    "ConversationRollup",
+    "LeadRollup",
+    "RollupWatermark",
     "Subscription"
 ]
\ No newline at end of file
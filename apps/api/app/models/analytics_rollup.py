@@ -0,0 +1,79 @@
+"""
+Analytics rollup models
+Hourly and daily pre-aggregated conversation and lead metrics for dashboards
+"""
+from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSON
+
+from .base import BaseModel
+
+
+class RollupGranularity:
+    HOUR = "hour"
+    DAY = "day"
+
+
+class ConversationRollup(BaseModel):
+    """Conversation aggregates per organization, voice agent and time bucket.
+
+    Stores sums and counts rather than averages so buckets can be added
+    together and combined with live aggregates.
+    """
+    __tablename__ = "conversation_rollups"
+
+    organization_id = Column(String, ForeignKey("organizations.id"), nullable=False)
+    voice_agent_id = Column(String, ForeignKey("voice_agents.id"), nullable=False)
+    granularity = Column(String(10), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+
+    conversations = Column(Integer, nullable=False, default=0)
+    active = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    transferred = Column(Integer, nullable=False, default=0)
+    converted = Column(Integer, nullable=False, default=0)  # Conversations that produced a lead
+    duration_sum = Column(Float, nullable=False, default=0)
+    duration_count = Column(Integer, nullable=False, default=0)
+    sentiment_sum = Column(Float, nullable=False, default=0)
+    sentiment_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint(
+            'organization_id', 'voice_agent_id', 'granularity', 'bucket_start',
+            name='uq_conversation_rollup_bucket'
+        ),
+        Index('idx_conversation_rollups_org_bucket', 'organization_id', 'granularity', 'bucket_start'),
+    )
+
+
+class LeadRollup(BaseModel):
+    """Lead aggregates per organization and time bucket of creation"""
+    __tablename__ = "lead_rollups"
+
+    organization_id = Column(String, ForeignKey("organizations.id"), nullable=False)
+    granularity = Column(String(10), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+
+    leads = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0)
+    score_count = Column(Integer, nullable=False, default=0)
+    high_quality = Column(Integer, nullable=False, default=0)
+    status_counts = Column(JSON, nullable=False, default=dict)  # Current status of the bucket's leads
+    source_counts = Column(JSON, nullable=False, default=dict)
+
+    __table_args__ = (
+        UniqueConstraint('organization_id', 'granularity', 'bucket_start', name='uq_lead_rollup_bucket'),
+    )
+
+
+class RollupWatermark(BaseModel):
+    """Progress of an incremental rollup job.
+
+    `rolled_up_to` is the end of the last complete hour aggregated;
+    `last_run_at` is when that run read the source tables, and rows updated
+    after it are re-aggregated on the next run.
+    """
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String(100), nullable=False, unique=True)
+    rolled_up_to = Column(DateTime, nullable=False)
+    last_run_at = Column(DateTime, nullable=False)
@@ -116,6 +116,9 @@ class Conversation(BaseModel, TenantMixin, AuditMixin):
     organization_id = Column(String, ForeignKey("organizations.id"), nullable=False, index=True)
     organization = relationship("Organization", back_populates="conversations")
     
+    # Per-conversation message sequence counter (allocated atomically)
+    last_message_sequence = Column(Integer, default=0, nullable=False)
+    
     # Messages relationship
     messages = relationship(
         "ConversationMessage", 
@@ -1,8 +1,11 @@
 """
 Lead model for real estate prospects
 """
-from sqlalchemy import Column, String, Boolean, Integer, Float, Text, ForeignKey, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, String, Boolean, Integer, Float, Text, ForeignKey, DateTime, Computed, Enum as SQLEnum
+from sqlalchemy import case, column, func
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql.functions import FunctionElement
 from sqlalchemy.dialects.postgresql import JSON
 from enum import Enum
 from datetime import datetime
@@ -41,6 +44,39 @@ class PropertyType(str, Enum):
     OTHER = "other"
 
 
+class day_after(FunctionElement):
+    """A timestamp plus one day, in the dialect's own date arithmetic"""
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(day_after)
+def _day_after(element, compiler, **kw):
+    return f"{compiler.process(element.clauses, **kw)} + interval '1 day'"
+
+
+@compiles(day_after, "sqlite")
+def _day_after_sqlite(element, compiler, **kw):
+    return f"datetime({compiler.process(element.clauses, **kw)}, '+1 day')"
+
+
+# Hot lead rule, shared by Lead.is_hot_lead and the generated is_hot column
+HOT_LEAD_SCORE = 75
+HOT_LEAD_TIMELINES = ("immediate", "1_month")
+
+# Points awarded by the rule-based lead score for each buying timeline
+LEAD_TIMELINE_SCORES = {
+    "immediate": 30,
+    "1_month": 25,
+    "3_months": 15,
+    "6_months": 10,
+    "1_year": 5
+}
+
+# Statuses still worked by agents; hot and follow-up queues only list these
+OPEN_LEAD_STATUSES = (LeadStatus.NEW, LeadStatus.CONTACTED, LeadStatus.QUALIFIED)
+
+
 class Lead(BaseModel, TenantMixin, AuditMixin):
     """Real estate lead and prospect information"""
     __tablename__ = "leads"
@@ -133,6 +169,34 @@ class Lead(BaseModel, TenantMixin, AuditMixin):
     tags = Column(JSON, default=list)
     custom_fields = Column(JSON, default=dict)
     
+    # Generated search columns, trigram-indexed on PostgreSQL (see LeadSearch)
+    search_text = Column(Text, Computed(
+        "lower(coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(email, ''))",
+        persisted=True
+    ))
+    phone_digits = Column(String(50), Computed(
+        "replace(replace(replace(replace(replace(replace(coalesce(phone, ''), "
+        "' ', ''), '-', ''), '(', ''), ')', ''), '+', ''), '.', '')",
+        persisted=True
+    ))
+    
+    # Generated queue columns, partially indexed on open leads; PostgreSQL
+    # recomputes them on every write to the columns they derive from
+    is_hot = Column(Boolean, Computed(
+        f"coalesce(lead_score, 0) >= {HOT_LEAD_SCORE} "
+        f"OR coalesce(timeline, '') IN ({', '.join(repr(t) for t in HOT_LEAD_TIMELINES)}) "
+        "OR coalesce(pre_approved, false)",
+        persisted=True
+    ))
+    # Scheduled follow-up, else a day after creation for never-contacted leads
+    follow_up_due_at = Column(DateTime, Computed(
+        func.coalesce(
+            column("next_follow_up_date"),
+            case((column("last_contact_date").is_(None), day_after(column("created_at"))))
+        ),
+        persisted=True
+    ))
+    
     # Organization relationship
     organization_id = Column(String, ForeignKey("organizations.id"), nullable=False, index=True)
     organization = relationship("Organization", back_populates="leads")
@@ -157,9 +221,9 @@ class Lead(BaseModel, TenantMixin, AuditMixin):
     @property
     def is_hot_lead(self) -> bool:
         """Determine if this is a hot lead based on score and timeline"""
-        return (
-            self.lead_score >= 75 or
-            self.timeline in ["immediate", "1_month"] or
+        return bool(
+            (self.lead_score or 0) >= HOT_LEAD_SCORE or
+            self.timeline in HOT_LEAD_TIMELINES or
             self.pre_approved
         )
     
@@ -190,14 +254,7 @@ class Lead(BaseModel, TenantMixin, AuditMixin):
             score += 20
         
         # Timeline urgency
-        timeline_scores = {
-            "immediate": 30,
-            "1_month": 25,
-            "3_months": 15,
-            "6_months": 10,
-            "1_year": 5
-        }
-        score += timeline_scores.get(self.timeline, 0)
+        score += LEAD_TIMELINE_SCORES.get(self.timeline, 0)
         
         # Pre-approval status
         if self.pre_approved:
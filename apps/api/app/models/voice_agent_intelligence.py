@@ -279,6 +279,9 @@ class RealTimeConversationSession(Base):
     last_activity = Column(DateTime, default=datetime.utcnow)
     ended_at = Column(DateTime)
     
+    # Last write-behind flush applied; lets journal replay skip committed batches
+    last_flush_id = Column(String(100))
+    
     # Relationships
     agent = relationship("VoiceAgent")
     conversation = relationship("Conversation")
@@ -0,0 +1,393 @@
+"""
+Analytics rollup service
+Incrementally maintained hourly and daily aggregates behind the dashboards
+"""
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import select, delete, insert, and_, or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement
+
+from app.models.analytics_rollup import ConversationRollup, LeadRollup, RollupWatermark, RollupGranularity
+from app.models.conversation import Conversation, ConversationStatus
+from app.models.lead import Lead
+
+logger = logging.getLogger("seiketsu.analytics_rollup")
+
+ROLLUP_NAME = "analytics"
+# Hours before the previous high-water mark that every run re-aggregates,
+# so rows written late for recent buckets are picked up
+LATE_DATA_GRACE = timedelta(hours=2)
+
+ACTIVE_CONVERSATION_STATUSES = [ConversationStatus.INITIATED, ConversationStatus.IN_PROGRESS]
+HIGH_QUALITY_LEAD_SCORE = 75
+
+CONVERSATION_SUM_FIELDS = (
+    "conversations", "active", "completed", "transferred", "converted",
+    "duration_sum", "duration_count", "sentiment_sum", "sentiment_count"
+)
+LEAD_SUM_FIELDS = ("leads", "score_sum", "score_count", "high_quality")
+
+# A pair of (first full day, first day not yet rolled up); daily rollups
+# answer that range and everything else is aggregated live
+RollupRange = Tuple[datetime, datetime]
+
+
+def floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def ceil_day(value: datetime) -> datetime:
+    day = floor_day(value)
+    return day if day == value else day + timedelta(days=1)
+
+
+def conversation_sum_columns() -> List[ColumnElement]:
+    """Additive conversation aggregates, shared by rollups and live queries.
+
+    Counts use Conversation.id so they also work across an outer join.
+    """
+    duration_recorded = Conversation.duration_seconds > 0
+    return [
+        func.count(Conversation.id).label("conversations"),
+        func.count(Conversation.id).filter(Conversation.status.in_(ACTIVE_CONVERSATION_STATUSES)).label("active"),
+        func.count(Conversation.id).filter(Conversation.status == ConversationStatus.COMPLETED).label("completed"),
+        func.count(Conversation.id).filter(Conversation.transferred_to_human.is_(True)).label("transferred"),
+        func.count(Conversation.lead_id).label("converted"),
+        func.coalesce(func.sum(Conversation.duration_seconds).filter(duration_recorded), 0).label("duration_sum"),
+        func.count(Conversation.id).filter(duration_recorded).label("duration_count"),
+        func.coalesce(func.sum(Conversation.sentiment_score), 0).label("sentiment_sum"),
+        func.count(Conversation.sentiment_score).label("sentiment_count")
+    ]
+
+
+def lead_sum_columns() -> List[ColumnElement]:
+    """Additive lead aggregates, shared by rollups and live queries"""
+    return [
+        func.count(Lead.id).label("leads"),
+        func.coalesce(func.sum(Lead.lead_score), 0).label("score_sum"),
+        func.count(Lead.lead_score).label("score_count"),
+        func.count(Lead.id).filter(Lead.lead_score >= HIGH_QUALITY_LEAD_SCORE).label("high_quality")
+    ]
+
+
+def sums_from_row(row: Any, fields: Tuple[str, ...]) -> Dict[str, float]:
+    return {field: getattr(row, field) or 0 for field in fields}
+
+
+def add_sums(total: Dict[str, float], other: Dict[str, float]) -> Dict[str, float]:
+    for field, value in other.items():
+        total[field] = total.get(field, 0) + (value or 0)
+    return total
+
+
+def live_condition(column: Any, start: datetime, rollup_range: Optional[RollupRange]) -> ColumnElement:
+    """Rows of [start, now) that the daily rollups in rollup_range don't cover"""
+    if rollup_range is None:
+        return column >= start
+    first_day, boundary = rollup_range
+    return or_(and_(column >= start, column < first_day), column >= boundary)
+
+
+class AnalyticsRollupService:
+    """Maintains hourly and daily rollups and plans reads against them.
+
+    refresh() re-aggregates every hour from a little before the previous
+    high-water mark, plus any older hour holding a row updated since the
+    last run, then rebuilds the affected days from the hourly rows. Readers
+    take whole days before the high-water mark from the daily rollups and
+    aggregate only the partial first day and the not yet rolled up tail
+    live, so dashboard cost doesn't grow with the length of the range.
+    """
+
+    async def get_watermark(self, db: AsyncSession) -> Optional[RollupWatermark]:
+        result = await db.execute(select(RollupWatermark).where(RollupWatermark.name == ROLLUP_NAME))
+        return result.scalar_one_or_none()
+
+    async def plan(self, db: AsyncSession, start: datetime) -> Optional[RollupRange]:
+        """Range of whole days from start that daily rollups can answer"""
+        try:
+            # A savepoint keeps a failed lookup from aborting the caller's transaction
+            async with db.begin_nested():
+                watermark = await self.get_watermark(db)
+        except Exception as e:
+            logger.warning(f"Rollup watermark unavailable, aggregating live: {e}")
+            return None
+        if watermark is None:
+            return None
+
+        first_day = ceil_day(start)
+        boundary = floor_day(watermark.rolled_up_to)
+        if boundary <= first_day:
+            return None
+        return first_day, boundary
+
+    async def refresh(self, db: AsyncSession, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Bring the rollups up to the last complete hour"""
+        now = now or datetime.utcnow()
+        end = floor_hour(now)
+        watermark = await self.get_watermark(db)
+
+        if watermark is None:
+            # First run backfills the full history
+            start = await self._earliest_source_time(db) or end
+        else:
+            start = min(watermark.rolled_up_to, end) - LATE_DATA_GRACE
+            changed = await self._earliest_changed_time(db, watermark.last_run_at, start)
+            if changed is not None:
+                start = changed
+        start = floor_hour(start)
+
+        if start < end:
+            await self._rebuild_hourly(db, start, end)
+            await self._rebuild_daily(db, floor_day(start), end)
+
+        if watermark is None:
+            db.add(RollupWatermark(name=ROLLUP_NAME, rolled_up_to=end, last_run_at=now))
+        else:
+            watermark.rolled_up_to = end
+            # Rows updated after this run started reading are caught next time
+            watermark.last_run_at = now
+
+        await db.commit()
+
+        logger.info(f"Analytics rollups rebuilt from {start.isoformat()} to {end.isoformat()}")
+
+        return {"rebuilt_from": start.isoformat(), "rolled_up_to": end.isoformat()}
+
+    async def _earliest_source_time(self, db: AsyncSession) -> Optional[datetime]:
+        conversations = (await db.execute(select(func.min(Conversation.started_at)))).scalar()
+        leads = (await db.execute(select(func.min(Lead.created_at)))).scalar()
+        times = [value for value in (conversations, leads) if value is not None]
+        return min(times) if times else None
+
+    async def _earliest_changed_time(
+        self,
+        db: AsyncSession,
+        since: datetime,
+        before: datetime
+    ) -> Optional[datetime]:
+        """Oldest bucket time of rows updated since the last run, before `before`"""
+        conversations = (await db.execute(
+            select(func.min(Conversation.started_at)).where(
+                Conversation.updated_at >= since,
+                Conversation.started_at < before
+            )
+        )).scalar()
+        leads = (await db.execute(
+            select(func.min(Lead.created_at)).where(
+                Lead.updated_at >= since,
+                Lead.created_at < before
+            )
+        )).scalar()
+        times = [value for value in (conversations, leads) if value is not None]
+        return min(times) if times else None
+
+    async def _rebuild_hourly(self, db: AsyncSession, start: datetime, end: datetime):
+        """Replace hourly rollups in [start, end) with fresh aggregates"""
+        await db.execute(delete(ConversationRollup).where(
+            ConversationRollup.granularity == RollupGranularity.HOUR,
+            ConversationRollup.bucket_start >= start,
+            ConversationRollup.bucket_start < end
+        ))
+        await db.execute(delete(LeadRollup).where(
+            LeadRollup.granularity == RollupGranularity.HOUR,
+            LeadRollup.bucket_start >= start,
+            LeadRollup.bucket_start < end
+        ))
+
+        bucket = func.date_trunc("hour", Conversation.started_at).label("bucket")
+        stmt = (
+            select(Conversation.organization_id, Conversation.voice_agent_id, bucket, *conversation_sum_columns())
+            .where(Conversation.started_at >= start, Conversation.started_at < end)
+            .group_by(Conversation.organization_id, Conversation.voice_agent_id, bucket)
+        )
+        conversation_rows = [
+            {
+                "organization_id": row.organization_id,
+                "voice_agent_id": row.voice_agent_id,
+                "granularity": RollupGranularity.HOUR,
+                "bucket_start": row.bucket,
+                **sums_from_row(row, CONVERSATION_SUM_FIELDS)
+            }
+            for row in (await db.execute(stmt)).all()
+        ]
+        if conversation_rows:
+            await db.execute(insert(ConversationRollup), conversation_rows)
+
+        lead_rows = await self._hourly_lead_rows(db, start, end)
+        if lead_rows:
+            await db.execute(insert(LeadRollup), lead_rows)
+
+    async def _hourly_lead_rows(self, db: AsyncSession, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        bucket = func.date_trunc("hour", Lead.created_at).label("bucket")
+        in_range = and_(Lead.created_at >= start, Lead.created_at < end)
+
+        rows: Dict[Tuple[str, datetime], Dict[str, Any]] = {}
+        totals = await db.execute(
+            select(Lead.organization_id, bucket, *lead_sum_columns())
+            .where(in_range)
+            .group_by(Lead.organization_id, bucket)
+        )
+        for row in totals.all():
+            rows[(row.organization_id, row.bucket)] = {
+                "organization_id": row.organization_id,
+                "granularity": RollupGranularity.HOUR,
+                "bucket_start": row.bucket,
+                **sums_from_row(row, LEAD_SUM_FIELDS),
+                "status_counts": {},
+                "source_counts": {}
+            }
+
+        for column, field in ((Lead.status, "status_counts"), (Lead.source, "source_counts")):
+            breakdown = await db.execute(
+                select(Lead.organization_id, bucket, column, func.count(Lead.id))
+                .where(in_range)
+                .group_by(Lead.organization_id, bucket, column)
+            )
+            for organization_id, row_bucket, value, count in breakdown.all():
+                key = value.value if value else "unknown"
+                rows[(organization_id, row_bucket)][field][key] = count
+
+        return list(rows.values())
+
+    async def _rebuild_daily(self, db: AsyncSession, start: datetime, end: datetime):
+        """Replace daily rollups from `start` with sums of the hourly rows"""
+        await db.execute(delete(ConversationRollup).where(
+            ConversationRollup.granularity == RollupGranularity.DAY,
+            ConversationRollup.bucket_start >= start,
+            ConversationRollup.bucket_start < end
+        ))
+        await db.execute(delete(LeadRollup).where(
+            LeadRollup.granularity == RollupGranularity.DAY,
+            LeadRollup.bucket_start >= start,
+            LeadRollup.bucket_start < end
+        ))
+
+        day = func.date_trunc("day", ConversationRollup.bucket_start).label("day")
+        stmt = (
+            select(
+                ConversationRollup.organization_id,
+                ConversationRollup.voice_agent_id,
+                day,
+                *[func.sum(getattr(ConversationRollup, field)).label(field) for field in CONVERSATION_SUM_FIELDS]
+            )
+            .where(
+                ConversationRollup.granularity == RollupGranularity.HOUR,
+                ConversationRollup.bucket_start >= start,
+                ConversationRollup.bucket_start < end
+            )
+            .group_by(ConversationRollup.organization_id, ConversationRollup.voice_agent_id, day)
+        )
+        conversation_rows = [
+            {
+                "organization_id": row.organization_id,
+                "voice_agent_id": row.voice_agent_id,
+                "granularity": RollupGranularity.DAY,
+                "bucket_start": row.day,
+                **sums_from_row(row, CONVERSATION_SUM_FIELDS)
+            }
+            for row in (await db.execute(stmt)).all()
+        ]
+        if conversation_rows:
+            await db.execute(insert(ConversationRollup), conversation_rows)
+
+        # Status and source counts are JSON, so days are summed here
+        hourly = await db.execute(
+            select(LeadRollup).where(
+                LeadRollup.granularity == RollupGranularity.HOUR,
+                LeadRollup.bucket_start >= start,
+                LeadRollup.bucket_start < end
+            )
+        )
+        days: Dict[Tuple[str, datetime], Dict[str, Any]] = {}
+        for rollup in hourly.scalars().all():
+            key = (rollup.organization_id, floor_day(rollup.bucket_start))
+            if key not in days:
+                days[key] = {
+                    "organization_id": key[0],
+                    "granularity": RollupGranularity.DAY,
+                    "bucket_start": key[1],
+                    "status_counts": Counter(),
+                    "source_counts": Counter()
+                }
+            add_sums(days[key], sums_from_row(rollup, LEAD_SUM_FIELDS))
+            days[key]["status_counts"].update(rollup.status_counts or {})
+            days[key]["source_counts"].update(rollup.source_counts or {})
+
+        lead_rows = [
+            {**row, "status_counts": dict(row["status_counts"]), "source_counts": dict(row["source_counts"])}
+            for row in days.values()
+        ]
+        if lead_rows:
+            await db.execute(insert(LeadRollup), lead_rows)
+
+    async def conversation_sums(
+        self,
+        db: AsyncSession,
+        organization_id: str,
+        rollup_range: RollupRange
+    ) -> Dict[str, Dict[str, float]]:
+        """Daily conversation rollup sums in the range, per voice agent"""
+        first_day, boundary = rollup_range
+        stmt = (
+            select(
+                ConversationRollup.voice_agent_id,
+                *[func.sum(getattr(ConversationRollup, field)).label(field) for field in CONVERSATION_SUM_FIELDS]
+            )
+            .where(
+                ConversationRollup.organization_id == organization_id,
+                ConversationRollup.granularity == RollupGranularity.DAY,
+                ConversationRollup.bucket_start >= first_day,
+                ConversationRollup.bucket_start < boundary
+            )
+            .group_by(ConversationRollup.voice_agent_id)
+        )
+        result = await db.execute(stmt)
+        return {row.voice_agent_id: sums_from_row(row, CONVERSATION_SUM_FIELDS) for row in result.all()}
+
+    async def conversation_daily_counts(
+        self,
+        db: AsyncSession,
+        organization_id: str,
+        rollup_range: RollupRange
+    ) -> Dict[str, int]:
+        """Conversations per day in the range from daily rollups"""
+        first_day, boundary = rollup_range
+        stmt = (
+            select(ConversationRollup.bucket_start, func.sum(ConversationRollup.conversations))
+            .where(
+                ConversationRollup.organization_id == organization_id,
+                ConversationRollup.granularity == RollupGranularity.DAY,
+                ConversationRollup.bucket_start >= first_day,
+                ConversationRollup.bucket_start < boundary
+            )
+            .group_by(ConversationRollup.bucket_start)
+        )
+        result = await db.execute(stmt)
+        return {day.date().isoformat(): int(count) for day, count in result.all() if count}
+
+    async def lead_days(
+        self,
+        db: AsyncSession,
+        organization_id: str,
+        rollup_range: RollupRange
+    ) -> List[LeadRollup]:
+        """Daily lead rollups in the range"""
+        first_day, boundary = rollup_range
+        result = await db.execute(
+            select(LeadRollup).where(
+                LeadRollup.organization_id == organization_id,
+                LeadRollup.granularity == RollupGranularity.DAY,
+                LeadRollup.bucket_start >= first_day,
+                LeadRollup.bucket_start < boundary
+            )
+        )
+        return result.scalars().all()
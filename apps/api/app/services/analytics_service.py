@@ -12,19 +12,48 @@ import asyncio
 import json
 
 from app.models.analytics import AnalyticsEvent
-from app.models.conversation import Conversation, ConversationStatus
+from app.models.conversation import Conversation
 from app.models.lead import Lead, LeadStatus
 from app.models.voice_agent import VoiceAgent
+from app.services.analytics_rollup_service import (
+    AnalyticsRollupService,
+    CONVERSATION_SUM_FIELDS,
+    LEAD_SUM_FIELDS,
+    RollupRange,
+    add_sums,
+    conversation_sum_columns,
+    lead_sum_columns,
+    live_condition,
+    sums_from_row
+)
 from app.core.config import settings
 from app.core.cache import cache_result, get_cached_result
 
 logger = logging.getLogger("seiketsu.analytics_service")
 
 
+def conversation_aggregates(sums: Dict[str, float]) -> Dict[str, Any]:
+    """Turn additive conversation sums into counts and averages"""
+    return {
+        "total": int(sums.get("conversations", 0)),
+        "active": int(sums.get("active", 0)),
+        "completed": int(sums.get("completed", 0)),
+        "transferred": int(sums.get("transferred", 0)),
+        "leads_generated": int(sums.get("converted", 0)),
+        "avg_duration": float(sums["duration_sum"] / sums["duration_count"]) if sums.get("duration_count") else 0.0,
+        "avg_sentiment": float(sums["sentiment_sum"] / sums["sentiment_count"]) if sums.get("sentiment_count") else 0.0
+    }
+
+
+def _percent(part: int, total: int) -> float:
+    return round((part / total * 100), 2) if total > 0 else 0
+
+
 class AnalyticsService:
     """Advanced analytics service with 21dev.ai integration for ML insights"""
     
     def __init__(self):
+        self.rollups = AnalyticsRollupService()
         self.twentyonedev_client = None
         if settings.TWENTYONEDEV_API_KEY:
             self.twentyonedev_client = httpx.AsyncClient(
@@ -84,52 +113,42 @@ class AnalyticsService:
         try:
             start_date = datetime.utcnow() - timedelta(days=days)
             
-            # Get conversations in date range
-            stmt = select(Conversation).where(
-                and_(
+            rollup_range = await self.rollups.plan(db, start_date)
+            aggregates = await self.aggregate_conversations(
+                organization_id, db, start_date, rollup_range=rollup_range
+            )
+            daily_counts = await self.daily_counts(
+                Conversation.started_at,
+                [
                     Conversation.organization_id == organization_id,
-                    Conversation.started_at >= start_date
-                )
+                    live_condition(Conversation.started_at, start_date, rollup_range)
+                ],
+                db
             )
+            if rollup_range:
+                daily_counts.update(
+                    await self.rollups.conversation_daily_counts(db, organization_id, rollup_range)
+                )
+                daily_counts = dict(sorted(daily_counts.items()))
             
-            result = await db.execute(stmt)
-            conversations = result.scalars().all()
-            
-            # Calculate metrics
-            total_conversations = len(conversations)
-            active_conversations = len([c for c in conversations if c.is_active])
-            completed_conversations = len([c for c in conversations if c.status == ConversationStatus.COMPLETED])
-            transferred_conversations = len([c for c in conversations if c.transferred_to_human])
-            
-            # Duration metrics
-            durations = [c.duration_seconds for c in conversations if c.duration_seconds and c.duration_seconds > 0]
-            avg_duration = sum(durations) / len(durations) if durations else 0
-            
-            # Lead generation
-            leads_generated = len([c for c in conversations if c.lead_id])
-            
-            # Sentiment analysis
-            sentiment_scores = [c.sentiment_score for c in conversations if c.sentiment_score is not None]
-            avg_sentiment = sum(sentiment_scores) / len(sentiment_scores) if sentiment_scores else 0
-            
-            # Daily breakdown
-            daily_counts = {}
-            for conversation in conversations:
-                date_key = conversation.started_at.date().isoformat()
-                daily_counts[date_key] = daily_counts.get(date_key, 0) + 1
+            total_conversations = aggregates["total"]
+            completed_conversations = aggregates["completed"]
+            transferred_conversations = aggregates["transferred"]
+            leads_generated = aggregates["leads_generated"]
+            avg_duration = aggregates["avg_duration"]
             
             return {
                 "total_conversations": total_conversations,
-                "active_conversations": active_conversations,
+                "active_conversations": aggregates["active"],
                 "completed_conversations": completed_conversations,
                 "transferred_conversations": transferred_conversations,
                 "leads_generated": leads_generated,
                 "average_duration_seconds": round(avg_duration, 2),
                 "average_duration_minutes": round(avg_duration / 60, 2),
-                "average_sentiment_score": round(avg_sentiment, 3),
-                "completion_rate": round((completed_conversations / total_conversations * 100), 2) if total_conversations > 0 else 0,
-                "lead_conversion_rate": round((leads_generated / total_conversations * 100), 2) if total_conversations > 0 else 0,
-                "transfer_rate": round((transferred_conversations / total_conversations * 100), 2) if total_conversations > 0 else 0,
+                "average_sentiment_score": round(aggregates["avg_sentiment"], 3),
+                "completion_rate": _percent(completed_conversations, total_conversations),
+                "lead_conversion_rate": _percent(leads_generated, total_conversations),
+                "transfer_rate": _percent(transferred_conversations, total_conversations),
                 "daily_conversation_counts": daily_counts,
                 "date_range_days": days
             }
@@ -148,48 +167,61 @@ class AnalyticsService:
         try:
             start_date = datetime.utcnow() - timedelta(days=days)
             
-            # Get leads in date range
-            stmt = select(Lead).where(
-                and_(
-                    Lead.organization_id == organization_id,
-                    Lead.created_at >= start_date
-                )
-            )
-            
-            result = await db.execute(stmt)
-            leads = result.scalars().all()
-            
-            total_leads = len(leads)
-            
-            # Status breakdown
-            status_counts = {}
-            for status in LeadStatus:
-                status_counts[status.value] = len([l for l in leads if l.status == status])
+            rollup_range = await self.rollups.plan(db, start_date)
+            conditions = [
+                Lead.organization_id == organization_id,
+                live_condition(Lead.created_at, start_date, rollup_range)
+            ]
+            
+            # Live totals and per-status counts in one pass
+            totals_stmt = select(
+                *lead_sum_columns(),
+                *[
+                    func.count(Lead.id).filter(Lead.status == status).label(status.value)
+                    for status in LeadStatus
+                ]
+            ).where(and_(*conditions))
+            totals = (await db.execute(totals_stmt)).one()
+            
+            sums = sums_from_row(totals, LEAD_SUM_FIELDS)
+            status_counts = {status.value: getattr(totals, status.value) or 0 for status in LeadStatus}
             
-            # Lead scores
-            lead_scores = [l.lead_score for l in leads if l.lead_score is not None]
-            avg_lead_score = sum(lead_scores) / len(lead_scores) if lead_scores else 0
+            # Source breakdown
+            source_stmt = (
+                select(Lead.source, func.count(Lead.id))
+                .where(and_(*conditions))
+                .group_by(Lead.source)
+            )
+            source_counts = {
+                source.value if source else "unknown": count
+                for source, count in (await db.execute(source_stmt)).all()
+            }
             
-            # High-quality leads (score >= 75)
-            high_quality_leads = len([l for l in leads if l.lead_score and l.lead_score >= 75])
+            daily_counts = await self.daily_counts(Lead.created_at, conditions, db)
             
-            # Source breakdown
-            from collections import Counter
-            source_counts = Counter([l.source.value if l.source else 'unknown' for l in leads])
+            # Whole days already rolled up
+            if rollup_range:
+                for rollup in await self.rollups.lead_days(db, organization_id, rollup_range):
+                    add_sums(sums, sums_from_row(rollup, LEAD_SUM_FIELDS))
+                    for status, count in (rollup.status_counts or {}).items():
+                        status_counts[status] = status_counts.get(status, 0) + count
+                    for source, count in (rollup.source_counts or {}).items():
+                        source_counts[source] = source_counts.get(source, 0) + count
+                    if rollup.leads:
+                        daily_counts[rollup.bucket_start.date().isoformat()] = rollup.leads
+                daily_counts = dict(sorted(daily_counts.items()))
             
-            # Daily breakdown
-            daily_counts = {}
-            for lead in leads:
-                date_key = lead.created_at.date().isoformat()
-                daily_counts[date_key] = daily_counts.get(date_key, 0) + 1
+            total_leads = int(sums["leads"])
+            avg_lead_score = sums["score_sum"] / sums["score_count"] if sums["score_count"] else 0
+            high_quality_leads = int(sums["high_quality"])
             
             return {
                 "total_leads": total_leads,
                 "status_breakdown": status_counts,
                 "average_lead_score": round(avg_lead_score, 2),
                 "high_quality_leads": high_quality_leads,
-                "high_quality_rate": round((high_quality_leads / total_leads * 100), 2) if total_leads > 0 else 0,
-                "source_breakdown": dict(source_counts),
+                "high_quality_rate": _percent(high_quality_leads, total_leads),
+                "source_breakdown": source_counts,
                 "daily_lead_counts": daily_counts,
                 "date_range_days": days
             }
@@ -208,48 +240,43 @@ class AnalyticsService:
         try:
             start_date = datetime.utcnow() - timedelta(days=days)
             
-            # Get voice agents for organization
+            rollup_range = await self.rollups.plan(db, start_date)
+            
             agents_stmt = select(VoiceAgent).where(VoiceAgent.organization_id == organization_id)
-            agents_result = await db.execute(agents_stmt)
-            agents = agents_result.scalars().all()
+            agents = (await db.execute(agents_stmt)).scalars().all()
             
-            agent_metrics = []
+            # Per-agent sums: rolled up days plus one grouped live query
+            agent_sums: Dict[str, Dict[str, float]] = {}
+            if rollup_range:
+                agent_sums = await self.rollups.conversation_sums(db, organization_id, rollup_range)
             
-            for agent in agents:
-                # Get conversations for this agent in date range
-                conv_stmt = select(Conversation).where(
-                    and_(
-                        Conversation.voice_agent_id == agent.id,
-                        Conversation.started_at >= start_date
-                    )
+            live_stmt = (
+                select(Conversation.voice_agent_id, *conversation_sum_columns())
+                .where(
+                    Conversation.organization_id == organization_id,
+                    live_condition(Conversation.started_at, start_date, rollup_range)
                 )
-                
-                conv_result = await db.execute(conv_stmt)
-                conversations = conv_result.scalars().all()
-                
-                total_conversations = len(conversations)
-                completed_conversations = len([c for c in conversations if c.status == ConversationStatus.COMPLETED])
-                leads_generated = len([c for c in conversations if c.lead_id])
-                
-                # Duration metrics
-                durations = [c.duration_seconds for c in conversations if c.duration_seconds]
-                avg_duration = sum(durations) / len(durations) if durations else 0
-                
-                # Sentiment metrics
-                sentiments = [c.sentiment_score for c in conversations if c.sentiment_score is not None]
-                avg_sentiment = sum(sentiments) / len(sentiments) if sentiments else 0
+                .group_by(Conversation.voice_agent_id)
+            )
+            for row in (await db.execute(live_stmt)).all():
+                add_sums(agent_sums.setdefault(row.voice_agent_id, {}), sums_from_row(row, CONVERSATION_SUM_FIELDS))
+            
+            agent_metrics = []
+            for agent in agents:
+                aggregates = conversation_aggregates(agent_sums.get(agent.id, {}))
+                total_conversations = aggregates["total"]
                 
                 agent_metrics.append({
                     "agent_id": agent.id,
                     "agent_name": agent.name,
                     "agent_type": agent.type.value,
                     "total_conversations": total_conversations,
-                    "completed_conversations": completed_conversations,
-                    "leads_generated": leads_generated,
-                    "average_duration_seconds": round(avg_duration, 2),
-                    "average_sentiment_score": round(avg_sentiment, 3),
-                    "completion_rate": round((completed_conversations / total_conversations * 100), 2) if total_conversations > 0 else 0,
-                    "lead_conversion_rate": round((leads_generated / total_conversations * 100), 2) if total_conversations > 0 else 0,
+                    "completed_conversations": aggregates["completed"],
+                    "leads_generated": aggregates["leads_generated"],
+                    "average_duration_seconds": round(aggregates["avg_duration"], 2),
+                    "average_sentiment_score": round(aggregates["avg_sentiment"], 3),
+                    "completion_rate": _percent(aggregates["completed"], total_conversations),
+                    "lead_conversion_rate": _percent(aggregates["leads_generated"], total_conversations),
                     "phone_number": agent.phone_number,
                     "status": agent.status.value
                 })
@@ -273,30 +300,16 @@ class AnalyticsService:
             now = datetime.utcnow()
             today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
             
-            # Today's conversations
-            today_conversations_stmt = select(Conversation).where(
-                and_(
-                    Conversation.organization_id == organization_id,
-                    Conversation.started_at >= today_start
-                )
-            )
-            
-            today_result = await db.execute(today_conversations_stmt)
-            today_conversations = today_result.scalars().all()
-            
-            # Active conversations
-            active_conversations = len([c for c in today_conversations if c.is_active])
+            today = await self.aggregate_conversations(organization_id, db, today_start)
             
             # Today's leads
-            today_leads_stmt = select(Lead).where(
+            today_leads_stmt = select(func.count(Lead.id)).where(
                 and_(
                     Lead.organization_id == organization_id,
                     Lead.created_at >= today_start
                 )
             )
-            
-            today_leads_result = await db.execute(today_leads_stmt)
-            today_leads = today_leads_result.scalars().all()
+            today_leads = (await db.execute(today_leads_stmt)).scalar_one()
             
             # Recent activity (last 24 hours)
             last_24h = now - timedelta(hours=24)
@@ -317,10 +330,10 @@ class AnalyticsService:
             recent_events = recent_events_result.scalars().all()
             
             return {
-                "active_conversations": active_conversations,
-                "today_total_conversations": len(today_conversations),
-                "today_completed_conversations": len([c for c in today_conversations if c.status == ConversationStatus.COMPLETED]),
-                "today_leads_generated": len(today_leads),
+                "active_conversations": today["active"],
+                "today_total_conversations": today["total"],
+                "today_completed_conversations": today["completed"],
+                "today_leads_generated": today_leads,
                 "recent_activity": [
                     {
                         "event_type": event.event_type,
@@ -344,6 +357,56 @@ class AnalyticsService:
                 "timestamp": datetime.utcnow().isoformat()
             }
     
+    async def aggregate_conversations(
+        self,
+        organization_id: str,
+        db: AsyncSession,
+        start_date: datetime,
+        end_date: Optional[datetime] = None,
+        rollup_range: Optional[RollupRange] = None
+    ) -> Dict[str, Any]:
+        """Conversation counts and averages for a period.
+        
+        Open-ended periods read whole rolled-up days from the daily rollups
+        and aggregate only the remainder live; bounded periods are
+        aggregated live. Pass rollup_range to reuse an existing plan.
+        """
+        if end_date is None and rollup_range is None:
+            rollup_range = await self.rollups.plan(db, start_date)
+        
+        conditions = [Conversation.organization_id == organization_id]
+        if end_date:
+            rollup_range = None
+            conditions.extend([Conversation.started_at >= start_date, Conversation.started_at < end_date])
+        else:
+            conditions.append(live_condition(Conversation.started_at, start_date, rollup_range))
+        
+        stmt = select(*conversation_sum_columns()).where(and_(*conditions))
+        sums = sums_from_row((await db.execute(stmt)).one(), CONVERSATION_SUM_FIELDS)
+        
+        if rollup_range:
+            for agent_sums in (await self.rollups.conversation_sums(db, organization_id, rollup_range)).values():
+                add_sums(sums, agent_sums)
+        
+        return conversation_aggregates(sums)
+    
+    async def daily_counts(
+        self,
+        timestamp_column: Any,
+        conditions: List[Any],
+        db: AsyncSession
+    ) -> Dict[str, int]:
+        """Row counts per day of timestamp_column, grouped in SQL"""
+        day = func.date_trunc("day", timestamp_column).label("day")
+        stmt = (
+            select(day, func.count())
+            .where(and_(*conditions))
+            .group_by(day)
+            .order_by(day)
+        )
+        result = await db.execute(stmt)
+        return {row_day.date().isoformat(): count for row_day, count in result.all()}
+    
     def _empty_conversation_metrics(self, days: int) -> Dict[str, Any]:
         """Return empty conversation metrics structure"""
         return {
@@ -1,18 +1,40 @@
 """
 Conversation management service
 """
+import json
 import logging
-from typing import Optional, Dict, Any, List
+import uuid
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, AsyncIterator
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, desc
+from sqlalchemy import select, and_, desc, update, insert
 
 from app.models.conversation import Conversation, ConversationMessage, ConversationStatus, ConversationOutcome, MessageType, MessageDirection
 from app.models.voice_agent import VoiceAgent
 from app.services.analytics_service import AnalyticsService
+from app.utils.pagination import keyset_after
 
 logger = logging.getLogger("seiketsu.conversation_service")
 
+TRANSCRIPT_MESSAGE_TYPES = [MessageType.USER_SPEECH, MessageType.AGENT_SPEECH]
+
+# Rows fetched per round trip from server-side cursors
+STREAM_BATCH_SIZE = 500
+
+
+@dataclass
+class PendingMessage:
+    """Message buffered for a batched insert"""
+    message_type: MessageType
+    direction: MessageDirection
+    content: str
+    speaker_name: Optional[str] = None
+    speaker_type: Optional[str] = None
+    audio_url: Optional[str] = None
+    processing_time_ms: Optional[float] = None
+    timestamp: Optional[datetime] = None
+
 
 class ConversationService:
     """Service for managing voice conversations"""
@@ -66,22 +88,32 @@ class ConversationService:
         db: AsyncSession,
         limit: int = 50,
         offset: int = 0,
-        status_filter: Optional[ConversationStatus] = None
+        status_filter: Optional[ConversationStatus] = None,
+        cursor: Optional[str] = None
     ) -> List[Conversation]:
-        """Get conversations for organization"""
+        """Get conversations for organization, newest first by (created_at, id).
+        
+        A cursor from the previous page's last conversation pages by keyset
+        and takes precedence over offset. Raises ValueError for a malformed
+        cursor.
+        """
+        after = keyset_after(Conversation.created_at, Conversation.id, cursor)
         try:
             conditions = [Conversation.organization_id == organization_id]
             
             if status_filter:
                 conditions.append(Conversation.status == status_filter)
+            if after is not None:
+                conditions.append(after)
             
             stmt = (
                 select(Conversation)
                 .where(and_(*conditions))
-                .order_by(desc(Conversation.started_at))
+                .order_by(desc(Conversation.created_at), desc(Conversation.id))
                 .limit(limit)
-                .offset(offset)
             )
+            if after is None and offset:
+                stmt = stmt.offset(offset)
             
             result = await db.execute(stmt)
             return result.scalars().all()
@@ -143,6 +175,74 @@ class ConversationService:
         
         return conversation
     
+    async def allocate_sequence_numbers(
+        self,
+        conversation_id: str,
+        count: int,
+        db: AsyncSession
+    ) -> int:
+        """Atomically reserve `count` sequence numbers, returning the first.
+        
+        Uses the conversation row as a counter, so concurrent writers are
+        serialized by the row lock and numbers never collide.
+        """
+        stmt = (
+            update(Conversation)
+            .where(Conversation.id == conversation_id)
+            .values(last_message_sequence=Conversation.last_message_sequence + count)
+            .returning(Conversation.last_message_sequence)
+            .execution_options(synchronize_session=False)
+        )
+        result = await db.execute(stmt)
+        last_sequence = result.scalar_one_or_none()
+        
+        if last_sequence is None:
+            raise ValueError(f"Conversation {conversation_id} not found")
+        
+        return last_sequence - count + 1
+    
+    async def add_messages(
+        self,
+        conversation_id: str,
+        messages: List[PendingMessage],
+        db: AsyncSession
+    ) -> List[str]:
+        """Insert several messages with one sequence allocation and one INSERT"""
+        if not messages:
+            return []
+        
+        try:
+            first_sequence = await self.allocate_sequence_numbers(
+                conversation_id, len(messages), db
+            )
+            
+            now = datetime.utcnow()
+            rows = []
+            for offset, pending in enumerate(messages):
+                rows.append({
+                    "id": str(uuid.uuid4()),
+                    "conversation_id": conversation_id,
+                    "message_type": pending.message_type,
+                    "direction": pending.direction,
+                    "content": pending.content,
+                    "speaker_name": pending.speaker_name,
+                    "speaker_type": pending.speaker_type,
+                    "audio_url": pending.audio_url,
+                    "processing_time_ms": pending.processing_time_ms,
+                    "timestamp": pending.timestamp or now,
+                    "sequence_number": first_sequence + offset
+                })
+            
+            await db.execute(insert(ConversationMessage).values(rows))
+            await db.commit()
+            
+            return [row["id"] for row in rows]
+            
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Failed to add {len(messages)} messages to conversation {conversation_id}: {e}")
+            raise
+    
     async def add_message(
         self,
         conversation_id: str,
@@ -156,14 +256,7 @@ class ConversationService:
     ) -> ConversationMessage:
         """Add message to conversation"""
         try:
-            # Get message sequence number
-            stmt = select(ConversationMessage).where(
-                ConversationMessage.conversation_id == conversation_id
-            ).order_by(desc(ConversationMessage.sequence_number))
-            
-            result = await db.execute(stmt)
-            last_message = result.scalar_one_or_none()
-            sequence_number = (last_message.sequence_number + 1) if last_message else 1
+            sequence_number = await self.allocate_sequence_numbers(conversation_id, 1, db)
             
             message = ConversationMessage(
                 conversation_id=conversation_id,
@@ -183,9 +276,14 @@ class ConversationService:
             return message
             
         except Exception as e:
+            await db.rollback()
             logger.error(f"Failed to add message to conversation {conversation_id}: {e}")
             raise
     
+    def message_writer(self, conversation_id: str) -> "ConversationMessageWriter":
+        """Create a buffered writer for one conversation turn"""
+        return ConversationMessageWriter(self, conversation_id)
+    
     async def get_conversation_messages(
         self,
         conversation_id: str,
@@ -208,20 +306,100 @@ class ConversationService:
             logger.error(f"Failed to get messages for conversation {conversation_id}: {e}")
             return []
     
+    async def stream_conversation_transcript(
+        self,
+        conversation_id: str,
+        db: AsyncSession
+    ) -> AsyncIterator[str]:
+        """Stream transcript lines using a server-side cursor"""
+        stmt = (
+            select(ConversationMessage)
+            .where(
+                and_(
+                    ConversationMessage.conversation_id == conversation_id,
+                    ConversationMessage.message_type.in_(TRANSCRIPT_MESSAGE_TYPES)
+                )
+            )
+            .order_by(ConversationMessage.sequence_number)
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        
+        messages = await db.stream_scalars(stmt)
+        async for message in messages:
+            yield message.to_transcript_format() + "\n"
+    
     async def get_conversation_transcript(
         self,
         conversation_id: str,
         db: AsyncSession
     ) -> str:
         """Get formatted transcript for conversation"""
-        messages = await self.get_conversation_messages(conversation_id, db)
+        transcript_lines = [
+            line async for line in self.stream_conversation_transcript(conversation_id, db)
+        ]
+        return "".join(transcript_lines).rstrip("\n")
+    
+    async def stream_organization_export(
+        self,
+        organization_id: str,
+        db: AsyncSession,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> AsyncIterator[str]:
+        """Stream an organization's conversations as NDJSON.
+        
+        Emits a "conversation" record followed by one "message" record per
+        message, so memory use does not depend on call length or export size.
+        """
+        conditions = [Conversation.organization_id == organization_id]
+        if start_date:
+            conditions.append(Conversation.started_at >= start_date)
+        if end_date:
+            conditions.append(Conversation.started_at < end_date)
         
-        transcript_lines = []
-        for message in messages:
-            if message.message_type in [MessageType.USER_SPEECH, MessageType.AGENT_SPEECH]:
-                transcript_lines.append(message.to_transcript_format())
+        stmt = (
+            select(Conversation, ConversationMessage)
+            .outerjoin(
+                ConversationMessage,
+                and_(
+                    ConversationMessage.conversation_id == Conversation.id,
+                    ConversationMessage.message_type.in_(TRANSCRIPT_MESSAGE_TYPES)
+                )
+            )
+            .where(and_(*conditions))
+            .order_by(Conversation.started_at, Conversation.id, ConversationMessage.sequence_number)
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
         
-        return "\n".join(transcript_lines)
+        current_conversation_id = None
+        rows = await db.stream(stmt)
+        async for conversation, message in rows:
+            if conversation.id != current_conversation_id:
+                current_conversation_id = conversation.id
+                yield json.dumps({
+                    "type": "conversation",
+                    "id": conversation.id,
+                    "call_id": conversation.call_id,
+                    "voice_agent_id": conversation.voice_agent_id,
+                    "caller_phone": conversation.caller_phone,
+                    "status": conversation.status.value if conversation.status else None,
+                    "outcome": conversation.outcome.value if conversation.outcome else None,
+                    "started_at": conversation.started_at.isoformat() if conversation.started_at else None,
+                    "ended_at": conversation.ended_at.isoformat() if conversation.ended_at else None,
+                    "duration_seconds": conversation.duration_seconds,
+                    "lead_id": conversation.lead_id
+                }) + "\n"
+            
+            if message is not None:
+                yield json.dumps({
+                    "type": "message",
+                    "conversation_id": conversation.id,
+                    "sequence_number": message.sequence_number,
+                    "speaker": message.speaker_name or message.speaker_type,
+                    "message_type": message.message_type.value,
+                    "timestamp": message.timestamp.isoformat(),
+                    "content": message.content
+                }) + "\n"
     
     async def update_conversation_sentiment(
         self,
@@ -254,28 +432,16 @@ class ConversationService:
             
             start_date = datetime.utcnow() - timedelta(days=days)
             
-            # Get conversations in date range
-            stmt = select(Conversation).where(
-                and_(
-                    Conversation.organization_id == organization_id,
-                    Conversation.started_at >= start_date
-                )
+            # Same aggregate query as the analytics dashboards
+            aggregates = await self.analytics_service.aggregate_conversations(
+                organization_id, db, start_date
             )
             
-            result = await db.execute(stmt)
-            conversations = result.scalars().all()
-            
-            # Calculate metrics
-            total_conversations = len(conversations)
-            completed_conversations = len([c for c in conversations if c.status == ConversationStatus.COMPLETED])
-            leads_generated = len([c for c in conversations if c.lead_id])
-            transferred_conversations = len([c for c in conversations if c.transferred_to_human])
-            
-            avg_duration = 0
-            if conversations:
-                durations = [c.duration_seconds for c in conversations if c.duration_seconds]
-                if durations:
-                    avg_duration = sum(durations) / len(durations)
+            total_conversations = aggregates["total"]
+            completed_conversations = aggregates["completed"]
+            leads_generated = aggregates["leads_generated"]
+            transferred_conversations = aggregates["transferred"]
+            avg_duration = aggregates["avg_duration"]
             
             # Conversion rates
             completion_rate = (completed_conversations / total_conversations * 100) if total_conversations > 0 else 0
@@ -306,4 +472,40 @@ class ConversationService:
                 "lead_conversion_rate_percent": 0,
                 "transfer_rate_percent": 0,
                 "date_range_days": days
-            }
\ No newline at end of file
+            }
+
+
+class ConversationMessageWriter:
+    """Buffers a turn's messages and writes them in a single batch"""
+    
+    def __init__(self, conversation_service: ConversationService, conversation_id: str):
+        self.conversation_service = conversation_service
+        self.conversation_id = conversation_id
+        self.pending: List[PendingMessage] = []
+    
+    def add(
+        self,
+        message_type: MessageType,
+        direction: MessageDirection,
+        content: str,
+        **kwargs
+    ) -> "ConversationMessageWriter":
+        """Buffer a message; nothing is written until flush()"""
+        self.pending.append(PendingMessage(
+            message_type=message_type,
+            direction=direction,
+            content=content,
+            **kwargs
+        ))
+        return self
+    
+    async def flush(self, db: AsyncSession) -> List[str]:
+        """Write all buffered messages and clear the buffer"""
+        if not self.pending:
+            return []
+        
+        message_ids = await self.conversation_service.add_messages(
+            self.conversation_id, self.pending, db
+        )
+        self.pending = []
+        return message_ids
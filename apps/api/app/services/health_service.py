@@ -9,8 +9,9 @@ from typing import Dict, Any
 import logging
 
 from app.core.config import settings
-from app.core.database import engine
-from app.core.cache import redis_client
+from app.core.database import engine, replica_router
+from app.core.db_telemetry import db_telemetry
+from app.core import cache
 
 logger = logging.getLogger("seiketsu.health")
 
@@ -120,9 +121,13 @@ class HealthService:
                 result = await conn.execute("SELECT 1")
                 await result.fetchone()
             
+            await replica_router.check_replica(force=True)
+            
             return {
                 "status": "healthy",
-                "message": "Database connection successful"
+                "message": "Database connection successful",
+                "replica": replica_router.get_stats(),
+                "telemetry": db_telemetry.get_stats()
             }
             
         except Exception as e:
@@ -136,17 +141,20 @@ class HealthService:
     async def _check_cache(self) -> Dict[str, Any]:
         """Check Redis cache connectivity"""
         try:
-            if not redis_client:
+            if not cache.redis_client:
                 return {
                     "status": "warning",
                     "message": "Cache not configured"
                 }
             
-            await redis_client.ping()
+            await cache.redis_client.ping()
             
             return {
                 "status": "healthy",
-                "message": "Cache connection successful"
+                "message": "Cache connection successful",
+                "decorators": cache.get_cache_metrics(),
+                "near_cache": cache.near_cache.get_stats(),
+                "read_batching": cache.cache_service.batcher.get_stats()
             }
             
         except Exception as e:
@@ -0,0 +1,539 @@
+"""
+Bulk lead import service
+Streaming CSV/NDJSON import with batched validation, deduplication and bulk loading
+"""
+import asyncio
+import csv
+import itertools
+import json
+import logging
+import os
+import shutil
+import socket
+import time
+import uuid
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from enum import Enum
+from typing import Optional, Dict, Any, List, Iterator, Tuple, Type, Callable, AsyncIterator
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select, delete, func, text, table, column, union
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.lead import Lead, LeadStatus, PropertyType
+from app.services.lead_search import dialect_of, phone_digits
+
+logger = logging.getLogger("seiketsu.lead_import_service")
+
+IMPORT_BATCH_SIZE = 1000
+IMPORT_FORMATS = ("csv", "ndjson")
+
+# CSV cells holding lists, e.g. "tags" = "investor;cash buyer"
+CSV_LIST_FIELDS = ("preferred_locations", "tags")
+CSV_LIST_SEPARATOR = ";"
+
+# Same qualification threshold as leads created from conversations
+QUALIFIED_SCORE = 60
+
+# Per-connection scratch table holding a batch's dedupe keys
+import_keys = table("lead_import_keys", column("row_number"), column("email"), column("phone"))
+
+CREATE_IMPORT_KEYS = text(
+    "CREATE TEMPORARY TABLE IF NOT EXISTS lead_import_keys "
+    "(row_number INTEGER NOT NULL, email VARCHAR(255), phone VARCHAR(50))"
+)
+
+# Columns written for each imported lead, in COPY order
+LEAD_IMPORT_COLUMNS = (
+    "id", "organization_id", "created_by_user_id", "first_name", "last_name", "email", "phone",
+    "status", "source", "lead_score", "qualification_notes", "budget_min", "budget_max", "timeline",
+    "preferred_property_type", "preferred_bedrooms", "preferred_bathrooms", "preferred_locations",
+    "tags", "custom_fields", "created_at", "updated_at", "is_active"
+)
+
+ProgressCallback = Callable[["ImportCheckpoint"], None]
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    """Dedupe key for an email address"""
+    email = (email or "").strip().lower()
+    return email or None
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Dedupe key for a phone number, comparable with Lead.phone_digits"""
+    return phone_digits(phone or "") or None
+
+
+def _csv_record(row: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    """Drop blank cells and split list cells"""
+    record: Dict[str, Any] = {}
+    for key, value in row.items():
+        if key is None or value is None or not value.strip():
+            continue
+        key = key.strip()
+        if key in CSV_LIST_FIELDS:
+            record[key] = [item.strip() for item in value.split(CSV_LIST_SEPARATOR) if item.strip()]
+        else:
+            record[key] = value.strip()
+    return record
+
+
+def read_rows(path: str, file_format: str, skip: int = 0) -> Iterator[Tuple[int, Any, Optional[str]]]:
+    """Yield (row_number, record, parse_error) from a CSV or NDJSON file.
+
+    Reads one row at a time, so memory does not depend on file size. Row
+    numbers count data rows from 1; the first `skip` rows are passed over,
+    which is how an interrupted import resumes.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as source:
+        if file_format == "csv":
+            rows = ((number, _csv_record(row), None) for number, row in enumerate(csv.DictReader(source), 1))
+        elif file_format == "ndjson":
+            rows = _ndjson_rows(source)
+        else:
+            raise ValueError(f"Unsupported import format: {file_format}")
+        yield from itertools.islice(rows, skip, None)
+
+
+def _ndjson_rows(source) -> Iterator[Tuple[int, Any, Optional[str]]]:
+    number = 0
+    for line in source:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, line.rstrip("\n"), f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield number, record, "Row must be a JSON object"
+            continue
+        yield number, record, None
+
+
+@dataclass
+class ImportCheckpoint:
+    """Persisted progress of an import job; rows_read rows are committed"""
+    job_id: str
+    organization_id: str
+    user_id: str
+    file_format: str
+    status: str = "pending"  # pending, running, completed, failed
+    rows_read: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    errors_bytes: int = 0
+    error: Optional[str] = None
+    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    updated_at: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ImportJobBusy(RuntimeError):
+    """Another runner holds the import job's lock"""
+
+
+@dataclass
+class BatchResult:
+    imported: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class LeadImportService:
+    """Imports leads from CSV or NDJSON files in committed batches.
+
+    Each batch is validated against a request schema, deduplicated on
+    normalized email and phone (within the file and against the
+    organization's existing leads, via a temporary key table), then loaded
+    with COPY on PostgreSQL or executemany elsewhere and committed. After
+    every batch the job's checkpoint and per-row error file are updated, so
+    a failed job resumes after its last committed batch.
+
+    A runner owns a job through an exclusively created lock file, touched
+    after every batch. A job whose runner died (its checkpoint still says
+    running) becomes resumable, and its lock breakable, once neither has
+    been updated for stale_after seconds.
+    """
+
+    def __init__(
+        self,
+        base_dir: Optional[str] = None,
+        batch_size: int = IMPORT_BATCH_SIZE,
+        stale_after: Optional[float] = None
+    ):
+        self.base_dir = base_dir or settings.LEAD_IMPORT_DIR
+        self.batch_size = batch_size
+        self.stale_after = settings.LEAD_IMPORT_STALE_SECONDS if stale_after is None else stale_after
+        self._claimed: set = set()
+
+    def _job_path(self, job_id: str, name: str) -> str:
+        if not job_id or os.path.basename(job_id) != job_id:
+            raise ValueError("Invalid import job id")
+        return os.path.join(self.base_dir, job_id, name)
+
+    def source_path(self, job_id: str) -> str:
+        return self._job_path(job_id, "source")
+
+    def errors_path(self, job_id: str) -> str:
+        return self._job_path(job_id, "errors.ndjson")
+
+    def lock_path(self, job_id: str) -> str:
+        return self._job_path(job_id, "lock")
+
+    def is_resumable(self, checkpoint: ImportCheckpoint) -> bool:
+        """Failed jobs, and running jobs whose runner stopped making progress"""
+        if checkpoint.status == "failed":
+            return True
+        if checkpoint.status != "running" or not checkpoint.updated_at:
+            return False
+        idle = datetime.utcnow() - datetime.fromisoformat(checkpoint.updated_at)
+        return idle.total_seconds() > self.stale_after
+
+    def claim(self, job_id: str) -> bool:
+        """Take the job's runner lock; False if another runner holds it"""
+        path = self.lock_path(job_id)
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if not self._break_stale_lock(path):
+                    return False
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(f"{socket.gethostname()}:{os.getpid()}")
+            self._claimed.add(job_id)
+            return True
+        return False
+
+    def release(self, job_id: str):
+        """Drop the job's runner lock if this service holds it"""
+        if job_id in self._claimed:
+            self._claimed.discard(job_id)
+            try:
+                os.remove(self.lock_path(job_id))
+            except FileNotFoundError:
+                pass
+
+    def _break_stale_lock(self, path: str) -> bool:
+        """Remove a lock left by a dead runner; True if the lock is gone"""
+        try:
+            if time.time() - os.stat(path).st_mtime <= self.stale_after:
+                return False
+            # Renaming is atomic, so only one caller takes a given lock file
+            stale = f"{path}.{uuid.uuid4().hex}"
+            os.rename(path, stale)
+        except FileNotFoundError:
+            return True
+        if time.time() - os.stat(stale).st_mtime <= self.stale_after:
+            # A new runner locked the job in between; hand its lock back
+            try:
+                os.link(stale, path)
+            except FileExistsError:
+                pass
+            os.remove(stale)
+            return False
+        os.remove(stale)
+        return True
+
+    async def create_job(
+        self,
+        organization_id: str,
+        user_id: str,
+        file_format: str,
+        chunks: AsyncIterator[bytes],
+        max_bytes: Optional[int] = None
+    ) -> ImportCheckpoint:
+        """Spool an uploaded file to the job directory and record the job"""
+        if file_format not in IMPORT_FORMATS:
+            raise ValueError(f"Unsupported import format: {file_format}")
+
+        checkpoint = ImportCheckpoint(
+            job_id=uuid.uuid4().hex,
+            organization_id=organization_id,
+            user_id=user_id,
+            file_format=file_format
+        )
+        os.makedirs(os.path.dirname(self.source_path(checkpoint.job_id)))
+
+        size = 0
+        try:
+            with open(self.source_path(checkpoint.job_id), "wb") as source:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise ValueError(f"Import file exceeds {max_bytes} bytes")
+                    await asyncio.to_thread(source.write, chunk)
+        except Exception:
+            shutil.rmtree(os.path.dirname(self.source_path(checkpoint.job_id)), ignore_errors=True)
+            raise
+
+        self.save_checkpoint(checkpoint)
+        logger.info(f"Created lead import {checkpoint.job_id} ({size} bytes) for org {organization_id}")
+        return checkpoint
+
+    def load_checkpoint(self, job_id: str) -> Optional[ImportCheckpoint]:
+        try:
+            with open(self._job_path(job_id, "checkpoint.json")) as f:
+                return ImportCheckpoint(**json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def save_checkpoint(self, checkpoint: ImportCheckpoint):
+        """Write the checkpoint atomically"""
+        checkpoint.updated_at = datetime.utcnow().isoformat()
+        path = self._job_path(checkpoint.job_id, "checkpoint.json")
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(checkpoint.to_dict(), f)
+        os.replace(f"{path}.tmp", path)
+        if checkpoint.job_id in self._claimed:
+            # Keeps the runner's lock from looking stale
+            os.utime(self.lock_path(checkpoint.job_id))
+
+    async def run(
+        self,
+        job_id: str,
+        db: AsyncSession,
+        row_model: Type[BaseModel],
+        progress: Optional[ProgressCallback] = None
+    ) -> ImportCheckpoint:
+        """Run or resume an import job to completion.
+
+        Takes the job's lock unless the caller already claimed it, and
+        raises ImportJobBusy if another runner holds it.
+        """
+        checkpoint = self.load_checkpoint(job_id)
+        if checkpoint is None:
+            raise ValueError(f"Unknown import job: {job_id}")
+        if job_id not in self._claimed and not self.claim(job_id):
+            raise ImportJobBusy(f"Import job {job_id} is already running")
+        try:
+            # Reloaded under the lock, in case a previous runner moved it on
+            return await self._run(self.load_checkpoint(job_id), db, row_model, progress)
+        finally:
+            self.release(job_id)
+
+    async def _run(
+        self,
+        checkpoint: ImportCheckpoint,
+        db: AsyncSession,
+        row_model: Type[BaseModel],
+        progress: Optional[ProgressCallback]
+    ) -> ImportCheckpoint:
+        job_id = checkpoint.job_id
+        if checkpoint.status == "completed":
+            return checkpoint
+
+        checkpoint.status = "running"
+        checkpoint.error = None
+        self.save_checkpoint(checkpoint)
+
+        # Errors written by a batch that never committed are discarded
+        with open(self.errors_path(job_id), "ab") as errors_file:
+            errors_file.truncate(checkpoint.errors_bytes)
+
+        rows = read_rows(self.source_path(job_id), checkpoint.file_format, skip=checkpoint.rows_read)
+        try:
+            while True:
+                batch = await asyncio.to_thread(list, itertools.islice(rows, self.batch_size))
+                if not batch:
+                    break
+
+                result = await self.import_batch(
+                    batch, checkpoint.organization_id, checkpoint.user_id, row_model, db
+                )
+
+                if result.errors:
+                    with open(self.errors_path(job_id), "a", encoding="utf-8") as errors_file:
+                        for error in result.errors:
+                            errors_file.write(json.dumps(error, default=str) + "\n")
+                checkpoint.errors_bytes = os.path.getsize(self.errors_path(job_id))
+                checkpoint.rows_read += len(batch)
+                checkpoint.imported += result.imported
+                checkpoint.duplicates += result.duplicates
+                checkpoint.invalid += result.invalid
+                self.save_checkpoint(checkpoint)
+
+                if progress:
+                    progress(checkpoint)
+
+            checkpoint.status = "completed"
+            self.save_checkpoint(checkpoint)
+            logger.info(
+                f"Lead import {job_id} completed: {checkpoint.imported} imported, "
+                f"{checkpoint.duplicates} duplicates, {checkpoint.invalid} invalid"
+            )
+            return checkpoint
+
+        except Exception as e:
+            await db.rollback()
+            checkpoint.status = "failed"
+            checkpoint.error = str(e)
+            self.save_checkpoint(checkpoint)
+            logger.error(f"Lead import {job_id} failed after {checkpoint.rows_read} rows: {e}")
+            raise
+
+        finally:
+            rows.close()
+
+    async def import_batch(
+        self,
+        batch: List[Tuple[int, Any, Optional[str]]],
+        organization_id: str,
+        user_id: str,
+        row_model: Type[BaseModel],
+        db: AsyncSession
+    ) -> BatchResult:
+        """Validate, dedupe, load and commit one batch of parsed rows"""
+        result = BatchResult()
+        candidates: List[Tuple[int, Dict[str, Any], Dict[str, Any]]] = []
+
+        for row_number, record, parse_error in batch:
+            if parse_error is None:
+                try:
+                    values = self.lead_values(row_model(**record), organization_id, user_id)
+                    candidates.append((row_number, record, values))
+                    continue
+                except ValidationError as e:
+                    parse_error = "; ".join(
+                        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+                    )
+                except ValueError as e:
+                    parse_error = str(e)
+            result.invalid += 1
+            result.errors.append({"row": row_number, "error": parse_error, "data": record})
+
+        # First occurrence of an email or phone within the batch wins
+        unique = []
+        seen_emails, seen_phones = set(), set()
+        for row_number, record, values in candidates:
+            email, phone = normalize_email(values["email"]), normalize_phone(values["phone"])
+            if (email and email in seen_emails) or (phone and phone in seen_phones):
+                result.duplicates += 1
+                result.errors.append({"row": row_number, "error": "Duplicate of an earlier row", "data": record})
+                continue
+            seen_emails.add(email)
+            seen_phones.add(phone)
+            unique.append((row_number, record, values, email, phone))
+
+        existing = await self._existing_rows(
+            db, organization_id, [(row_number, email, phone) for row_number, _, _, email, phone in unique]
+        )
+
+        rows = []
+        for row_number, record, values, _, _ in unique:
+            if row_number in existing:
+                result.duplicates += 1
+                result.errors.append({"row": row_number, "error": "Duplicate of an existing lead", "data": record})
+            else:
+                rows.append(values)
+
+        if rows:
+            await self._bulk_insert(db, rows)
+        await db.commit()
+
+        result.imported = len(rows)
+        return result
+
+    @staticmethod
+    def lead_values(lead_request: BaseModel, organization_id: str, user_id: str) -> Dict[str, Any]:
+        """Column values for a validated lead request, scored like a new lead"""
+        data = lead_request.model_dump()
+        now = datetime.utcnow()
+
+        property_type = data.get("property_type")
+        values = {
+            "id": str(uuid.uuid4()),
+            "organization_id": organization_id,
+            "created_by_user_id": user_id,
+            "first_name": data["first_name"],
+            "last_name": data["last_name"],
+            "email": data.get("email"),
+            "phone": data.get("phone"),
+            "status": LeadStatus.NEW,
+            "source": data.get("source"),
+            "lead_score": 0,
+            "qualification_notes": data.get("notes"),
+            "budget_min": data.get("budget_min"),
+            "budget_max": data.get("budget_max"),
+            "timeline": data.get("timeline"),
+            "preferred_property_type": PropertyType(property_type) if property_type else None,
+            "preferred_bedrooms": data.get("bedrooms"),
+            "preferred_bathrooms": data.get("bathrooms"),
+            "preferred_locations": data.get("preferred_locations") or [],
+            "tags": data.get("tags") or [],
+            "custom_fields": {},
+            "created_at": now,
+            "updated_at": now,
+            "is_active": True
+        }
+
+        score = Lead(**{key: values[key] for key in ("email", "phone", "budget_min", "budget_max", "timeline")})
+        values["lead_score"] = score.update_lead_score()
+        if values["lead_score"] >= QUALIFIED_SCORE:
+            values["status"] = LeadStatus.QUALIFIED
+        return values
+
+    async def _existing_rows(
+        self,
+        db: AsyncSession,
+        organization_id: str,
+        keys: List[Tuple[int, Optional[str], Optional[str]]]
+    ) -> set:
+        """Row numbers whose email or phone matches an existing lead"""
+        keys = [(row_number, email, phone) for row_number, email, phone in keys if email or phone]
+        if not keys:
+            return set()
+
+        await db.execute(CREATE_IMPORT_KEYS)
+        await db.execute(delete(import_keys))
+        await db.execute(
+            insert(import_keys),
+            [{"row_number": row_number, "email": email, "phone": phone} for row_number, email, phone in keys]
+        )
+
+        # Two equi-joins rather than one OR, so each side can use its index
+        by_email = (
+            select(import_keys.c.row_number)
+            .join(Lead, func.lower(Lead.email) == import_keys.c.email)
+            .where(Lead.organization_id == organization_id)
+        )
+        by_phone = (
+            select(import_keys.c.row_number)
+            .join(Lead, Lead.phone_digits == import_keys.c.phone)
+            .where(Lead.organization_id == organization_id)
+        )
+        result = await db.execute(union(by_email, by_phone))
+        return set(result.scalars().all())
+
+    async def _bulk_insert(self, db: AsyncSession, rows: List[Dict[str, Any]]):
+        if dialect_of(db) == "postgresql":
+            connection = await db.connection()
+            raw = await connection.get_raw_connection()
+            records = [tuple(self._copy_value(row[name]) for name in LEAD_IMPORT_COLUMNS) for row in rows]
+            await raw.driver_connection.copy_records_to_table(
+                Lead.__tablename__, records=records, columns=LEAD_IMPORT_COLUMNS
+            )
+        else:
+            await db.execute(insert(Lead.__table__), rows)
+
+    @staticmethod
+    def _copy_value(value: Any) -> Any:
+        # Enum columns store member names; JSON columns take encoded text
+        if isinstance(value, Enum):
+            return value.name
+        if isinstance(value, (list, dict)):
+            return json.dumps(value)
+        return value
+
+
+# Global service instance
+lead_import_service = LeadImportService()
@@ -0,0 +1,228 @@
+"""
+Batch lead scoring service
+Scores an organization's open leads in chunks from a numpy feature matrix
+"""
+import logging
+import os
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Sequence
+
+import numpy as np
+from sqlalchemy import select, and_, case, literal, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.conversation import Conversation
+from app.models.lead import Lead, LeadStatus, LEAD_TIMELINE_SCORES, OPEN_LEAD_STATUSES
+
+logger = logging.getLogger("seiketsu.lead_scoring_service")
+
+# Feature matrix columns, in order; a trained model must use the same layout
+LEAD_FEATURES = (
+    "has_email",
+    "has_phone",
+    "has_budget",
+    "budget_min",
+    "budget_max",
+    "timeline_points",
+    "pre_approved",
+    "sentiment",
+    "bedrooms",
+    "bathrooms",
+    "days_since_creation"
+)
+
+# Weights reproducing Lead.update_lead_score; sentiment is banded separately
+RULE_WEIGHTS = np.array([10, 10, 20, 0, 0, 1, 25, 0, 0, 0, 0], dtype=np.float64)
+
+_SENTIMENT = LEAD_FEATURES.index("sentiment")
+
+# Columns loaded per lead; nothing else is read for scoring
+LEAD_SCORING_COLUMNS = (
+    Lead.id,
+    Lead.lead_score,
+    Lead.email,
+    Lead.phone,
+    Lead.budget_min,
+    Lead.budget_max,
+    Lead.timeline,
+    Lead.pre_approved,
+    Lead.preferred_bedrooms,
+    Lead.preferred_bathrooms,
+    Lead.created_at,
+    Conversation.sentiment_score
+)
+
+
+def feature_matrix(rows: Sequence[Any], now: Optional[datetime] = None) -> np.ndarray:
+    """Build the (leads x LEAD_FEATURES) matrix from rows of LEAD_SCORING_COLUMNS.
+
+    Missing numbers are NaN; a missing sentiment means no conversation.
+    """
+    now = now or datetime.utcnow()
+    matrix = np.empty((len(rows), len(LEAD_FEATURES)), dtype=np.float64)
+    for i, row in enumerate(rows):
+        matrix[i] = (
+            bool(row.email),
+            bool(row.phone),
+            bool(row.budget_min or row.budget_max),
+            np.nan if row.budget_min is None else row.budget_min,
+            np.nan if row.budget_max is None else row.budget_max,
+            LEAD_TIMELINE_SCORES.get(row.timeline, 0),
+            bool(row.pre_approved),
+            np.nan if row.sentiment_score is None else row.sentiment_score,
+            np.nan if row.preferred_bedrooms is None else row.preferred_bedrooms,
+            np.nan if row.preferred_bathrooms is None else row.preferred_bathrooms,
+            (now - row.created_at).days if row.created_at else np.nan
+        )
+    return matrix
+
+
+def rule_scores(matrix: np.ndarray) -> np.ndarray:
+    """Vectorized Lead.update_lead_score over a feature matrix"""
+    matrix = np.nan_to_num(matrix, nan=0.0)
+    scores = matrix @ RULE_WEIGHTS
+    sentiment = matrix[:, _SENTIMENT]
+    scores += np.where(sentiment > 0.5, 15, np.where(sentiment > 0, 5, 0))
+    return np.minimum(scores, 100).astype(np.int64)
+
+
+class LeadScoringService:
+    """Rescores every open lead of an organization in chunks.
+
+    Each chunk is loaded as plain columns, turned into one feature matrix and
+    scored in a single call: a trained model at LEAD_SCORING_MODEL_PATH if
+    present, 21dev.ai's batch endpoint when the backend is "remote", and the
+    rule-based score otherwise. Changed scores are written back with one
+    executemany UPDATE per chunk.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[str] = None,
+        model_path: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        remote: Any = None
+    ):
+        self.backend = backend or settings.LEAD_SCORING_BACKEND
+        self.model_path = model_path or settings.LEAD_SCORING_MODEL_PATH
+        self.batch_size = batch_size or settings.LEAD_SCORING_BATCH_SIZE
+        self.qualification_score = int(settings.LEAD_QUALIFICATION_THRESHOLD * 100)
+        self._remote = remote
+        self._model = None
+        self._model_loaded = False
+
+    @property
+    def model(self):
+        """Trained classifier with predict_proba, loaded once if the file exists"""
+        if not self._model_loaded:
+            self._model_loaded = True
+            if os.path.exists(self.model_path):
+                try:
+                    import joblib
+                    self._model = joblib.load(self.model_path)
+                    logger.info(f"Loaded lead scoring model from {self.model_path}")
+                except Exception as e:
+                    logger.error(f"Failed to load lead scoring model {self.model_path}: {e}")
+        return self._model
+
+    @property
+    def remote(self):
+        if self._remote is None:
+            from app.services.twentyonedev_service import TwentyOneDevService
+            self._remote = TwentyOneDevService()
+        return self._remote
+
+    async def score_matrix(self, lead_ids: List[str], matrix: np.ndarray, organization_id: str) -> np.ndarray:
+        """Scores (0-100) for one chunk of leads"""
+        if self.backend == "remote":
+            scores = rule_scores(matrix)
+            leads = [
+                {"lead_id": lead_id, **{
+                    name: (None if np.isnan(value) else float(value)) for name, value in zip(LEAD_FEATURES, features)
+                }}
+                for lead_id, features in zip(lead_ids, matrix)
+            ]
+            predictions = await self.remote.predict_lead_conversion_batch(leads, organization_id)
+            if predictions is None:
+                logger.warning(f"Remote lead scoring unavailable for org {organization_id}, using rule scores")
+                return scores
+            positions = {lead_id: i for i, lead_id in enumerate(lead_ids)}
+            for prediction in predictions:
+                i = positions.get(prediction.get("lead_id"))
+                if i is not None:
+                    scores[i] = int(prediction.get("score", 0) * 100)
+            return scores
+
+        if self.model is not None:
+            probabilities = self.model.predict_proba(np.nan_to_num(matrix, nan=0.0))[:, 1]
+            return np.rint(probabilities * 100).astype(np.int64)
+
+        return rule_scores(matrix)
+
+    async def score_organization(self, organization_id: str, db: AsyncSession) -> Dict[str, int]:
+        """Rescore all open leads of an organization; returns scored and changed counts"""
+        scored = changed = 0
+        after_id = None
+
+        while True:
+            stmt = (
+                select(*LEAD_SCORING_COLUMNS)
+                .outerjoin(Conversation, Conversation.id == Lead.conversation_id)
+                .where(
+                    Lead.organization_id == organization_id,
+                    Lead.status.in_(OPEN_LEAD_STATUSES)
+                )
+                .order_by(Lead.id)
+                .limit(self.batch_size)
+            )
+            if after_id is not None:
+                stmt = stmt.where(Lead.id > after_id)
+
+            rows = (await db.execute(stmt)).all()
+            if not rows:
+                break
+            after_id = rows[-1].id
+
+            lead_ids = [row.id for row in rows]
+            scores = await self.score_matrix(lead_ids, feature_matrix(rows), organization_id)
+            current = np.array([-1 if row.lead_score is None else row.lead_score for row in rows])
+            updates = [
+                {"b_id": lead_ids[i], "b_score": int(scores[i])}
+                for i in np.flatnonzero(scores != current)
+            ]
+
+            if updates:
+                await db.execute(self._update_statement(), updates)
+                await db.commit()
+
+            scored += len(rows)
+            changed += len(updates)
+            if len(rows) < self.batch_size:
+                break
+
+        logger.info(f"Rescored {scored} leads for org {organization_id} ({changed} changed)")
+        return {"scored": scored, "changed": changed}
+
+    def _update_statement(self):
+        table = Lead.__table__
+        score = bindparam("b_score")
+        return (
+            table.update()
+            .where(table.c.id == bindparam("b_id"))
+            .values(
+                lead_score=score,
+                status=case(
+                    (
+                        and_(score >= self.qualification_score, table.c.status == LeadStatus.NEW),
+                        literal(LeadStatus.QUALIFIED, table.c.status.type)
+                    ),
+                    else_=table.c.status
+                ),
+                updated_at=datetime.utcnow()
+            )
+        )
+
+
+# Global service instance
+lead_scoring_service = LeadScoringService()
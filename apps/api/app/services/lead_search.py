@@ -0,0 +1,67 @@
+"""
+Lead search
+Index-backed matching and relevance ranking over the generated search columns
+"""
+import re
+from typing import Optional
+
+from sqlalchemy import or_, case, func, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement
+
+from app.models.lead import Lead
+
+# Shorter digit runs match too many phone numbers to be useful
+MIN_PHONE_DIGITS = 3
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace to match Lead.search_text"""
+    return " ".join(query.lower().split())
+
+
+def phone_digits(query: str) -> str:
+    """Digits of the query, matched against Lead.phone_digits"""
+    return re.sub(r"\D", "", query)
+
+
+def dialect_of(db: AsyncSession) -> Optional[str]:
+    """Name of the session's database dialect, if it is bound to an engine"""
+    dialect = getattr(db.bind, "dialect", None)
+    return getattr(dialect, "name", None)
+
+
+class LeadSearch:
+    """Builds the WHERE clause and rank for a lead search query.
+
+    On PostgreSQL, substring matches on `search_text` and `phone_digits` and
+    fuzzy `<%` word-similarity matches are all served by the pg_trgm GIN
+    indexes, and results are ranked by word similarity. Other dialects
+    (SQLite in tests) fall back to plain substring matching on the same
+    generated columns with a prefix-first rank.
+    """
+
+    def __init__(self, query: str, dialect_name: Optional[str] = None):
+        self.text = normalize_query(query)
+        digits = phone_digits(query)
+        self.digits = digits if len(digits) >= MIN_PHONE_DIGITS else ""
+        self.fuzzy = dialect_name == "postgresql"
+
+    def condition(self) -> ColumnElement:
+        """Predicate matching leads for the query"""
+        terms = [Lead.search_text.contains(self.text, autoescape=True)]
+        if self.fuzzy:
+            terms.append(literal(self.text).op("<%")(Lead.search_text))
+        if self.digits:
+            terms.append(Lead.phone_digits.contains(self.digits, autoescape=True))
+        return or_(*terms)
+
+    def rank(self) -> ColumnElement:
+        """Relevance score, higher is better"""
+        if self.fuzzy:
+            score = func.word_similarity(self.text, Lead.search_text)
+        else:
+            score = case((Lead.search_text.startswith(self.text, autoescape=True), 1.0), else_=0.5)
+        if self.digits:
+            score = case((Lead.phone_digits.contains(self.digits, autoescape=True), 1.0), else_=score)
+        return score
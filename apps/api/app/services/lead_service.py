@@ -5,15 +5,39 @@ import logging
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, desc
+from sqlalchemy import select, update, and_, desc, func, cast, literal, bindparam, distinct, any_
+from sqlalchemy.dialects.postgresql import ARRAY, JSON, JSONB
 
-from app.models.lead import Lead, LeadStatus, LeadSource
+from app.models.lead import Lead, LeadStatus, LeadSource, OPEN_LEAD_STATUSES
 from app.models.conversation import Conversation
 from app.services.webhook_service import WebhookService
 from app.services.analytics_service import AnalyticsService
+from app.services.lead_search import LeadSearch, dialect_of
+from app.utils.pagination import keyset_after
 
 logger = logging.getLogger("seiketsu.lead_service")
 
+# Ids per bulk UPDATE; bounds row locks and statement time per round trip
+BULK_UPDATE_CHUNK_SIZE = 5000
+
+
+def _tags_expression(tags_to_add: List[str], tags_to_remove: List[str]):
+    """SQL expression for the lead's tags with additions and removals applied.
+    
+    Runs in the database as a correlated subquery over the row's own tags,
+    so a bulk tag change never loads leads into Python. The result is the
+    deduplicated, sorted tag list.
+    """
+    empty = cast(literal("[]"), JSONB)
+    merged = func.coalesce(cast(Lead.tags, JSONB), empty).op("||")(
+        bindparam("tags_to_add", list(tags_to_add), type_=JSONB)
+    )
+    tag = func.jsonb_array_elements_text(merged).table_valued("value").render_derived()
+    new_tags = select(func.coalesce(func.jsonb_agg(distinct(tag.c.value)), empty))
+    if tags_to_remove:
+        new_tags = new_tags.where(tag.c.value.not_in(list(tags_to_remove)))
+    return cast(new_tags.scalar_subquery(), JSON)
+
 
 class LeadService:
     """Service for managing real estate leads"""
@@ -105,31 +129,71 @@ class LeadService:
         source_filter: Optional[LeadSource] = None,
         limit: int = 50,
         offset: int = 0,
-        search_query: Optional[str] = None
+        search_query: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> List[Lead]:
-        """Get leads for organization with filtering"""
+        """Get leads for organization with filtering.
+        
+        Leads are ordered newest first by (created_at, id). Pass the cursor
+        of the previous page's last lead to page by keyset; offset is kept
+        for backwards compatibility and ignored when a cursor is given.
+        Raises ValueError for a malformed cursor.
+        """
+        after = keyset_after(Lead.created_at, Lead.id, cursor)
         try:
-            conditions = [Lead.organization_id == organization_id]
+            conditions = self._lead_filters(db, organization_id, status_filter, source_filter, search_query)
+            if after is not None:
+                conditions.append(after)
             
-            if status_filter:
-                conditions.append(Lead.status == status_filter)
+            stmt = (
+                select(Lead)
+                .where(and_(*conditions))
+                .order_by(desc(Lead.created_at), desc(Lead.id))
+                .limit(limit)
+            )
+            if after is None and offset:
+                stmt = stmt.offset(offset)
             
-            if source_filter:
-                conditions.append(Lead.source == source_filter)
+            result = await db.execute(stmt)
+            return result.scalars().all()
             
-            if search_query:
-                search_conditions = [
-                    Lead.first_name.ilike(f"%{search_query}%"),
-                    Lead.last_name.ilike(f"%{search_query}%"),
-                    Lead.email.ilike(f"%{search_query}%"),
-                    Lead.phone.ilike(f"%{search_query}%")
-                ]
-                conditions.append(or_(*search_conditions))
+        except Exception as e:
+            logger.error(f"Failed to get leads for organization {organization_id}: {e}")
+            return []
+    
+    async def count_leads_for_organization(
+        self,
+        organization_id: str,
+        db: AsyncSession,
+        status_filter: Optional[LeadStatus] = None,
+        source_filter: Optional[LeadSource] = None,
+        search_query: Optional[str] = None
+    ) -> int:
+        """Count leads matching the same filters as get_leads_for_organization"""
+        try:
+            conditions = self._lead_filters(db, organization_id, status_filter, source_filter, search_query)
+            result = await db.execute(select(func.count(Lead.id)).where(and_(*conditions)))
+            return result.scalar_one()
             
+        except Exception as e:
+            logger.error(f"Failed to count leads for organization {organization_id}: {e}")
+            return 0
+    
+    async def search_leads(
+        self,
+        organization_id: str,
+        query: str,
+        db: AsyncSession,
+        limit: int = 20,
+        offset: int = 0
+    ) -> List[Lead]:
+        """Search leads by name, email or phone digits, best matches first"""
+        try:
+            search = LeadSearch(query, dialect_of(db))
             stmt = (
                 select(Lead)
-                .where(and_(*conditions))
-                .order_by(desc(Lead.created_at))
+                .where(Lead.organization_id == organization_id, search.condition())
+                .order_by(desc(search.rank()), desc(Lead.created_at), desc(Lead.id))
                 .limit(limit)
                 .offset(offset)
             )
@@ -138,9 +202,30 @@ class LeadService:
             return result.scalars().all()
             
         except Exception as e:
-            logger.error(f"Failed to get leads for organization {organization_id}: {e}")
+            logger.error(f"Failed to search leads for organization {organization_id}: {e}")
             return []
     
+    @staticmethod
+    def _lead_filters(
+        db: AsyncSession,
+        organization_id: str,
+        status_filter: Optional[LeadStatus] = None,
+        source_filter: Optional[LeadSource] = None,
+        search_query: Optional[str] = None
+    ) -> List[Any]:
+        conditions = [Lead.organization_id == organization_id]
+        
+        if status_filter:
+            conditions.append(Lead.status == status_filter)
+        
+        if source_filter:
+            conditions.append(Lead.source == source_filter)
+        
+        if search_query:
+            conditions.append(LeadSearch(search_query, dialect_of(db)).condition())
+        
+        return conditions
+    
     async def update_lead_status(
         self,
         lead_id: str,
@@ -341,14 +426,19 @@ class LeadService:
         db: AsyncSession,
         limit: int = 20
     ) -> List[Lead]:
-        """Get hot leads for organization (high score, urgent timeline, etc.)"""
+        """Get open hot leads for organization, highest score first.
+        
+        Filters on the generated is_hot column, so the partial hot-lead
+        index returns exactly `limit` rows.
+        """
         try:
             stmt = (
                 select(Lead)
                 .where(
                     and_(
                         Lead.organization_id == organization_id,
-                        Lead.status.in_([LeadStatus.NEW, LeadStatus.QUALIFIED, LeadStatus.CONTACTED])
+                        Lead.is_hot.is_(True),
+                        Lead.status.in_(OPEN_LEAD_STATUSES)
                     )
                 )
                 .order_by(desc(Lead.lead_score), desc(Lead.created_at))
@@ -356,12 +446,7 @@ class LeadService:
             )
             
             result = await db.execute(stmt)
-            all_leads = result.scalars().all()
-            
-            # Filter for hot leads
-            hot_leads = [lead for lead in all_leads if lead.is_hot_lead]
-            
-            return hot_leads
+            return result.scalars().all()
             
         except Exception as e:
             logger.error(f"Failed to get hot leads for organization {organization_id}: {e}")
@@ -373,26 +458,23 @@ class LeadService:
         db: AsyncSession,
         limit: int = 50
     ) -> List[Lead]:
-        """Get leads that need follow-up"""
+        """Get open leads due for follow-up, most overdue first.
+        
+        A lead is due at its scheduled follow-up date or, if it has never
+        been contacted and has none, a day after creation (the generated
+        follow_up_due_at column).
+        """
         try:
-            now = datetime.utcnow()
-            
             stmt = (
                 select(Lead)
                 .where(
                     and_(
                         Lead.organization_id == organization_id,
-                        Lead.status.in_([LeadStatus.NEW, LeadStatus.CONTACTED, LeadStatus.QUALIFIED]),
-                        or_(
-                            Lead.next_follow_up_date <= now,
-                            and_(
-                                Lead.last_contact_date.is_(None),
-                                Lead.created_at <= now - timedelta(days=1)
-                            )
-                        )
+                        Lead.status.in_(OPEN_LEAD_STATUSES),
+                        Lead.follow_up_due_at <= datetime.utcnow()
                     )
                 )
-                .order_by(Lead.next_follow_up_date.asc().nullsfirst(), desc(Lead.lead_score))
+                .order_by(Lead.follow_up_due_at)
                 .limit(limit)
             )
             
@@ -403,46 +485,110 @@ class LeadService:
             logger.error(f"Failed to get leads needing follow-up: {e}")
             return []
     
+    @staticmethod
+    def _bulk_values(action: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Column values for a bulk action; raises ValueError on bad input"""
+        if action == "update_status":
+            return {"status": LeadStatus(data.get("status"))}
+        if action == "assign_agent":
+            agent_id = data.get("agent_id")
+            if not agent_id:
+                raise ValueError("agent_id is required")
+            return {"assigned_agent_id": agent_id}
+        if action in ("add_tags", "remove_tags"):
+            tags = data.get("tags") or []
+            if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+                raise ValueError("tags must be a list of strings")
+            if action == "add_tags":
+                return {"tags": _tags_expression(tags, [])}
+            return {"tags": _tags_expression([], tags)}
+        raise ValueError(f"Unknown bulk action: {action}")
+    
+    async def _apply_bulk_update(
+        self,
+        lead_ids: List[str],
+        values: Dict[str, Any],
+        db: AsyncSession,
+        organization_id: Optional[str] = None,
+        updated_by_user_id: Optional[str] = None
+    ) -> List[str]:
+        """Run chunked `UPDATE ... WHERE id = ANY(:ids) RETURNING id` and commit"""
+        values = {**values, "updated_at": func.now()}
+        if updated_by_user_id:
+            values["updated_by"] = updated_by_user_id
+        
+        unique_ids = list(dict.fromkeys(lead_ids))
+        updated_ids: List[str] = []
+        
+        for start in range(0, len(unique_ids), BULK_UPDATE_CHUNK_SIZE):
+            chunk = unique_ids[start:start + BULK_UPDATE_CHUNK_SIZE]
+            conditions = [Lead.id == any_(bindparam("lead_ids", chunk, type_=ARRAY(Lead.id.type)))]
+            if organization_id:
+                conditions.append(Lead.organization_id == organization_id)
+            
+            stmt = (
+                update(Lead)
+                .where(*conditions)
+                .values(**values)
+                .returning(Lead.id)
+                .execution_options(synchronize_session=False)
+            )
+            result = await db.execute(stmt)
+            updated_ids.extend(result.scalars().all())
+        
+        await db.commit()
+        return updated_ids
+    
+    async def bulk_update_leads(
+        self,
+        organization_id: str,
+        lead_ids: List[str],
+        action: str,
+        data: Dict[str, Any],
+        db: AsyncSession,
+        updated_by_user_id: Optional[str] = None
+    ) -> List[str]:
+        """Apply one action to many leads with set-based UPDATEs.
+        
+        Each chunk of ids is a single UPDATE scoped to the organization, so
+        ids from other organizations or that don't exist are skipped without
+        a lookup and no lead is loaded into Python. Returns the updated ids.
+        Raises ValueError for an unknown action or invalid data before
+        touching the database.
+        """
+        values = self._bulk_values(action, data)
+        updated_ids = await self._apply_bulk_update(
+            lead_ids, values, db, organization_id, updated_by_user_id
+        )
+        
+        logger.info(f"Bulk {action} updated {len(updated_ids)} of {len(lead_ids)} leads")
+        
+        return updated_ids
+    
     async def bulk_update_lead_tags(
         self,
         lead_ids: List[str],
         tags_to_add: List[str],
         tags_to_remove: List[str],
         db: AsyncSession,
-        updated_by_user_id: Optional[str] = None
+        updated_by_user_id: Optional[str] = None,
+        organization_id: Optional[str] = None
     ) -> int:
         """Bulk update tags for multiple leads"""
-        updated_count = 0
-        
         try:
-            for lead_id in lead_ids:
-                lead = await self.get_lead(lead_id, db)
-                if not lead:
-                    continue
-                
-                current_tags = set(lead.tags or [])
-                
-                # Add new tags
-                for tag in tags_to_add:
-                    current_tags.add(tag)
-                
-                # Remove tags
-                for tag in tags_to_remove:
-                    current_tags.discard(tag)
-                
-                lead.tags = list(current_tags)
-                lead.updated_at = datetime.utcnow()
-                if updated_by_user_id:
-                    lead.updated_by = updated_by_user_id
-                
-                updated_count += 1
-            
-            await db.commit()
+            updated_ids = await self._apply_bulk_update(
+                lead_ids,
+                {"tags": _tags_expression(tags_to_add, tags_to_remove)},
+                db,
+                organization_id,
+                updated_by_user_id
+            )
             
-            logger.info(f"Bulk updated tags for {updated_count} leads")
+            logger.info(f"Bulk updated tags for {len(updated_ids)} leads")
             
-            return updated_count
+            return len(updated_ids)
             
         except Exception as e:
             logger.error(f"Failed to bulk update lead tags: {e}")
-            return updated_count
\ No newline at end of file
+            await db.rollback()
+            return 0
\ No newline at end of file
@@ -25,9 +25,8 @@ import torch
 # Core services
 from app.core.config import settings
 from app.services.voice_intelligence_service import voice_intelligence_service
-from app.core.database import AsyncSessionLocal
+from app.services.session_state_buffer import session_state_buffer
 from app.models.voice_agent_intelligence import (
-    RealTimeConversationSession,
     EmotionDetectionLog, 
     ConversationIntent,
     VoiceQualityMetrics
@@ -260,6 +259,7 @@ class RealTimeVoiceProcessor:
         
         except Exception as e:
             logger.error(f"Voice processing error for session {session_id}: {e}")
+            session_state_buffer.record_error(session_id)
             yield {
                 "type": "error",
                 "message": "I'm experiencing some technical difficulties. Let me try again.",
@@ -670,22 +670,9 @@ class RealTimeVoiceProcessor:
             return {"url": "", "duration_seconds": 0, "quality_score": 0}
     
     async def _update_session_state(self, session_id: str, status: str):
-        """Update real-time session state"""
+        """Update real-time session state (in-memory, flushed write-behind)"""
         try:
-            async with AsyncSessionLocal() as db:
-                from sqlalchemy import select
-                
-                stmt = select(RealTimeConversationSession).where(
-                    RealTimeConversationSession.session_id == session_id
-                )
-                result = await db.execute(stmt)
-                session = result.scalar_one_or_none()
-                
-                if session:
-                    session.status = status
-                    session.last_activity = datetime.utcnow()
-                    await db.commit()
-                    
+            session_state_buffer.update_status(session_id, status)
         except Exception as e:
             logger.error(f"Failed to update session state: {e}")
     
@@ -696,37 +683,23 @@ class RealTimeVoiceProcessor:
         metrics: ProcessingMetrics,
         audio_quality: AudioQuality
     ):
-        """Log performance metrics for analysis"""
+        """Log performance metrics for analysis (in-memory, flushed write-behind)"""
         try:
-            async with AsyncSessionLocal() as db:
-                # Update session metrics
-                from sqlalchemy import select
-                
-                stmt = select(RealTimeConversationSession).where(
-                    RealTimeConversationSession.session_id == session_id
-                )
-                result = await db.execute(stmt)
-                session = result.scalar_one_or_none()
-                
-                if session:
-                    # Update performance metrics
-                    if not session.response_times:
-                        session.response_times = []
-                    
-                    session.response_times.append(metrics.total_processing_ms)
-                    # Keep only last 10 response times
-                    session.response_times = session.response_times[-10:]
-                    
-                    session.audio_quality_current = audio_quality.clarity_score
-                    session.total_turns += 1
-                    
-                    if metrics.total_processing_ms <= self.target_response_time_ms:
-                        session.successful_interactions += 1
-                    
-                    await db.commit()
-                    
+            session_state_buffer.record_turn(
+                session_id,
+                response_time_ms=metrics.total_processing_ms,
+                audio_quality=audio_quality.clarity_score,
+                successful=metrics.total_processing_ms <= self.target_response_time_ms
+            )
         except Exception as e:
             logger.error(f"Failed to log performance metrics: {e}")
+    
+    async def end_session(self, session_id: str, status: str = "ended"):
+        """End a real-time session and flush its state to the database"""
+        try:
+            await session_state_buffer.end_session(session_id, status)
+        except Exception as e:
+            logger.error(f"Failed to end session {session_id}: {e}")
 
 # Create singleton instance
 real_time_voice_processor = RealTimeVoiceProcessor()
\ No newline at end of file
@@ -0,0 +1,544 @@
+"""
+Session State Buffer
+Write-behind store for real-time voice session state.
+
+The voice hot loop only touches in-memory state and queues each event for
+a per-process Redis journal. Dirty sessions are flushed to Postgres in
+batches on an interval and when a session ends. A journal whose owning
+process stopped renewing its lease (e.g. after a crash) is replayed by
+another process; flush ids stored on the row make replay idempotent.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple
+
+from sqlalchemy import bindparam, or_
+
+from app.core import cache
+from app.core.database import AsyncSessionLocal
+from app.models.voice_agent_intelligence import RealTimeConversationSession
+
+logger = logging.getLogger("seiketsu.session_state_buffer")
+
+JOURNAL_KEY_PREFIX = "voice_session:journal:"
+JOURNAL_OWNERS_KEY = "voice_session:journal:owners"
+
+COUNTER_FIELDS = ("turns_delta", "successful_delta", "errors_delta")
+
+# Moves a session's pending journal aside under a flush id; returns 1 if moved
+SEAL_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('RENAME', KEYS[1], KEYS[2])
+redis.call('HSET', KEYS[2], 'flush_id', ARGV[1])
+return 1
+"""
+
+# Folds an unflushed sealed journal back into pending: counters add up,
+# pending keeps its newer field values
+RESTORE_SCRIPT = """
+local fields = redis.call('HGETALL', KEYS[2])
+for i = 1, #fields, 2 do
+    local name, value = fields[i], fields[i + 1]
+    if name == 'turns_delta' or name == 'successful_delta' or name == 'errors_delta' then
+        redis.call('HINCRBY', KEYS[1], name, value)
+    elseif name ~= 'flush_id' then
+        redis.call('HSETNX', KEYS[1], name, value)
+    end
+end
+redis.call('DEL', KEYS[2])
+return 1
+"""
+
+
+@dataclass
+class LiveSessionState:
+    """In-memory state for a single live voice session.
+
+    Counters are kept as deltas since the last flush so the batch
+    UPDATE can increment the stored totals without reading them first.
+    """
+    session_id: str
+    status: str = "active"
+    last_activity: datetime = field(default_factory=datetime.utcnow)
+    response_times: List[int] = field(default_factory=list)
+    audio_quality_current: Optional[float] = None
+    turns_delta: int = 0
+    successful_delta: int = 0
+    errors_delta: int = 0
+    ended_at: Optional[datetime] = None
+
+    def journal_fields(self) -> Dict[str, str]:
+        """Current non-counter fields as a flat Redis hash mapping"""
+        return {
+            "session_id": self.session_id,
+            "status": self.status,
+            "last_activity": self.last_activity.isoformat(),
+            "response_times": json.dumps(self.response_times),
+            "audio_quality_current": (
+                "" if self.audio_quality_current is None else str(self.audio_quality_current)
+            ),
+            "ended_at": self.ended_at.isoformat() if self.ended_at else "",
+        }
+
+    def to_journal(self) -> Dict[str, str]:
+        """Serialize to a flat Redis hash mapping"""
+        data = self.journal_fields()
+        for name in COUNTER_FIELDS:
+            data[name] = str(getattr(self, name))
+        return data
+
+    @classmethod
+    def from_journal(cls, data: Dict[Any, Any]) -> "LiveSessionState":
+        """Rebuild state from a Redis hash mapping"""
+        data = {
+            (k.decode("utf-8") if isinstance(k, bytes) else k):
+            (v.decode("utf-8") if isinstance(v, bytes) else v)
+            for k, v in data.items()
+        }
+        return cls(
+            session_id=data["session_id"],
+            status=data.get("status", "active"),
+            last_activity=datetime.fromisoformat(data["last_activity"]),
+            response_times=json.loads(data.get("response_times") or "[]"),
+            audio_quality_current=(
+                float(data["audio_quality_current"]) if data.get("audio_quality_current") else None
+            ),
+            turns_delta=int(data.get("turns_delta", 0)),
+            successful_delta=int(data.get("successful_delta", 0)),
+            errors_delta=int(data.get("errors_delta", 0)),
+            ended_at=datetime.fromisoformat(data["ended_at"]) if data.get("ended_at") else None,
+        )
+
+
+class SessionStateBuffer:
+    """Write-behind buffer between the voice pipeline and Postgres.
+
+    Every event is queued for this process's Redis journal as it happens;
+    a background writer pipelines the queue to Redis, so the hot path never
+    awaits. A flush first seals each session's pending journal under a
+    flush id, then writes the batch with that id, then drops the sealed
+    journal. Replaying a sealed journal after a crash is a no-op if the row
+    already carries its flush id.
+    """
+
+    def __init__(
+        self,
+        flush_interval_seconds: float = 5.0,
+        max_response_times: int = 10,
+        idle_eviction_seconds: int = 1800,
+        owner_id: Optional[str] = None
+    ):
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_response_times = max_response_times
+        self.idle_eviction_seconds = idle_eviction_seconds
+        self.owner_id = owner_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Journals of a process silent this long are recovered by others
+        self.lease_seconds = max(30.0, flush_interval_seconds * 6)
+
+        self._sessions: Dict[str, LiveSessionState] = {}
+        self._dirty: set[str] = set()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._journal_queue: Optional[asyncio.Queue] = None
+        self._journal_task: Optional[asyncio.Task] = None
+        self._seal_script = None
+        self._restore_script = None
+        self._last_recovery = 0.0
+
+    # ------------------------------------------------------------------
+    # Hot path - memory only, never awaits I/O
+    # ------------------------------------------------------------------
+
+    def _get_or_create(self, session_id: str) -> LiveSessionState:
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = LiveSessionState(session_id=session_id)
+            self._sessions[session_id] = state
+        return state
+
+    def _journal_event(self, state: LiveSessionState, **counters: int) -> None:
+        """Queue an event for the journal writer"""
+        if self._journal_queue is not None:
+            self._journal_queue.put_nowait(("event", state.session_id, state.journal_fields(), counters, None))
+
+    def update_status(self, session_id: str, status: str) -> None:
+        """Record a status change for a live session"""
+        state = self._get_or_create(session_id)
+        state.status = status
+        state.last_activity = datetime.utcnow()
+        self._dirty.add(session_id)
+        self._journal_event(state)
+
+    def record_turn(
+        self,
+        session_id: str,
+        response_time_ms: int,
+        audio_quality: Optional[float],
+        successful: bool
+    ) -> None:
+        """Record the outcome of a processed conversation turn"""
+        state = self._get_or_create(session_id)
+        state.response_times.append(response_time_ms)
+        state.response_times = state.response_times[-self.max_response_times:]
+        state.audio_quality_current = audio_quality
+        state.turns_delta += 1
+        if successful:
+            state.successful_delta += 1
+        state.last_activity = datetime.utcnow()
+        self._dirty.add(session_id)
+        self._journal_event(state, turns_delta=1, successful_delta=int(successful))
+
+    def record_error(self, session_id: str) -> None:
+        """Record a processing error for a live session"""
+        state = self._get_or_create(session_id)
+        state.errors_delta += 1
+        state.last_activity = datetime.utcnow()
+        self._dirty.add(session_id)
+        self._journal_event(state, errors_delta=1)
+
+    def get_state(self, session_id: str) -> Optional[LiveSessionState]:
+        """Get the live in-memory state for a session"""
+        return self._sessions.get(session_id)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        """Take a journal lease, recover orphaned journals and start the background tasks"""
+        client = cache.redis_client
+        if client and (self._journal_task is None or self._journal_task.done()):
+            self._seal_script = client.register_script(SEAL_SCRIPT)
+            self._restore_script = client.register_script(RESTORE_SCRIPT)
+            try:
+                await client.sadd(JOURNAL_OWNERS_KEY, self.owner_id)
+                await self._renew_lease()
+                self._journal_queue = asyncio.Queue()
+                self._journal_task = asyncio.create_task(self._journal_loop())
+            except Exception as e:
+                logger.warning(f"Session state journal unavailable: {e}")
+            await self.recover_journals()
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+            logger.info(f"Session state flusher started (interval={self.flush_interval_seconds}s)")
+
+    async def stop(self) -> None:
+        """Stop the periodic flusher, flush everything still pending and release the journal"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+        if self._journal_task:
+            # Drain queued journal writes before letting go of the lease
+            self._journal_queue.put_nowait(None)
+            await self._journal_task
+            self._journal_task = None
+            self._journal_queue = None
+            await self._release_lease()
+
+    async def end_session(self, session_id: str, status: str = "ended") -> None:
+        """Mark a session ended and flush it immediately"""
+        state = self._get_or_create(session_id)
+        state.status = status
+        state.ended_at = datetime.utcnow()
+        state.last_activity = state.ended_at
+        self._dirty.add(session_id)
+        self._journal_event(state)
+        await self.flush([session_id])
+        if session_id not in self._dirty:
+            self._sessions.pop(session_id, None)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            try:
+                if self._journal_task is not None:
+                    await self._renew_lease()
+                await self.flush()
+                self._evict_idle()
+                if self._journal_task is not None and time.monotonic() - self._last_recovery > self.lease_seconds:
+                    await self.recover_journals()
+            except Exception as e:
+                logger.error(f"Periodic session state flush failed: {e}")
+
+    def _evict_idle(self) -> None:
+        """Drop clean sessions that were never explicitly ended"""
+        now = datetime.utcnow()
+        for session_id, state in list(self._sessions.items()):
+            idle_seconds = (now - state.last_activity).total_seconds()
+            if session_id not in self._dirty and idle_seconds > self.idle_eviction_seconds:
+                del self._sessions[session_id]
+
+    # ------------------------------------------------------------------
+    # Flushing
+    # ------------------------------------------------------------------
+
+    def _take_snapshot(self, session_ids: Optional[List[str]] = None) -> List[LiveSessionState]:
+        """Copy dirty states and reset their deltas"""
+        if session_ids is None:
+            ids = list(self._dirty)
+        else:
+            ids = [sid for sid in session_ids if sid in self._dirty]
+
+        snapshot = []
+        for session_id in ids:
+            self._dirty.discard(session_id)
+            state = self._sessions.get(session_id)
+            if state is None:
+                continue
+            snapshot.append(LiveSessionState(**{
+                **asdict(state),
+                "response_times": list(state.response_times),
+            }))
+            state.turns_delta = 0
+            state.successful_delta = 0
+            state.errors_delta = 0
+        return snapshot
+
+    def _restore_deltas(self, snapshot: List[LiveSessionState]) -> None:
+        """Put deltas back after a failed flush so nothing is lost"""
+        for pending in snapshot:
+            state = self._get_or_create(pending.session_id)
+            state.turns_delta += pending.turns_delta
+            state.successful_delta += pending.successful_delta
+            state.errors_delta += pending.errors_delta
+            self._dirty.add(pending.session_id)
+
+    async def flush(self, session_ids: Optional[List[str]] = None) -> int:
+        """Flush dirty session state to Postgres in a single batch"""
+        async with self._flush_lock:
+            snapshot = self._take_snapshot(session_ids)
+            if not snapshot:
+                return 0
+
+            flush_id = uuid.uuid4().hex
+            flushed_ids = [state.session_id for state in snapshot]
+            # Queued right after the snapshot, so the sealed journal holds
+            # exactly the events in this batch
+            await self._write_journal(flushed_ids, flush_id)
+
+            try:
+                await self._write_database(snapshot, flush_id)
+            except Exception as e:
+                logger.error(f"Failed to flush {len(snapshot)} session states: {e}")
+                self._restore_deltas(snapshot)
+                await self._restore_journal(flushed_ids)
+                return 0
+
+            await self._clear_journal(flushed_ids)
+            return len(snapshot)
+
+    async def _write_database(self, snapshot: List[LiveSessionState], flush_id: str) -> None:
+        table = RealTimeConversationSession.__table__
+        stmt = (
+            table.update()
+            .where(
+                table.c.session_id == bindparam("b_session_id"),
+                # A replayed batch that already committed is skipped
+                or_(table.c.last_flush_id.is_(None), table.c.last_flush_id != bindparam("b_flush_id"))
+            )
+            .values(
+                status=bindparam("b_status"),
+                last_activity=bindparam("b_last_activity"),
+                response_times=bindparam("b_response_times"),
+                audio_quality_current=bindparam("b_audio_quality_current"),
+                total_turns=table.c.total_turns + bindparam("b_turns_delta"),
+                successful_interactions=(
+                    table.c.successful_interactions + bindparam("b_successful_delta")
+                ),
+                errors_encountered=table.c.errors_encountered + bindparam("b_errors_delta"),
+                ended_at=bindparam("b_ended_at"),
+                last_flush_id=bindparam("b_flush_id"),
+            )
+        )
+        params = [
+            {
+                "b_session_id": state.session_id,
+                "b_status": state.status,
+                "b_last_activity": state.last_activity,
+                "b_response_times": state.response_times,
+                "b_audio_quality_current": state.audio_quality_current,
+                "b_turns_delta": state.turns_delta,
+                "b_successful_delta": state.successful_delta,
+                "b_errors_delta": state.errors_delta,
+                "b_ended_at": state.ended_at,
+                "b_flush_id": flush_id,
+            }
+            for state in snapshot
+        ]
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(stmt, params)
+            await db.commit()
+
+    # ------------------------------------------------------------------
+    # Redis journal for crash-safe replay
+    # ------------------------------------------------------------------
+
+    def _key(self, kind: str, session_id: str = "", owner_id: Optional[str] = None) -> str:
+        owner = owner_id or self.owner_id
+        return f"{JOURNAL_KEY_PREFIX}{owner}:{kind}" + (f":{session_id}" if session_id else "")
+
+    async def _renew_lease(self) -> None:
+        await cache.redis_client.set(self._key("lease"), "1", px=int(self.lease_seconds * 1000))
+
+    async def _release_lease(self) -> None:
+        client = cache.redis_client
+        if not client:
+            return
+        try:
+            if not await client.scard(self._key("sessions")):
+                await client.srem(JOURNAL_OWNERS_KEY, self.owner_id)
+            # Anything left over is recovered by the next process to look
+            await client.delete(self._key("lease"))
+        except Exception as e:
+            logger.warning(f"Failed to release session state journal lease: {e}")
+
+    async def _barrier(self, kind: str, *args) -> None:
+        """Queue a journal operation behind pending events and wait for it"""
+        if self._journal_queue is None or self._journal_task is None or self._journal_task.done():
+            return
+        done = asyncio.get_running_loop().create_future()
+        self._journal_queue.put_nowait((kind, *args, done))
+        await done
+
+    async def _write_journal(self, session_ids: List[str], flush_id: str) -> None:
+        """Seal the journal of each session in a batch under its flush id"""
+        await self._barrier("seal", session_ids, flush_id, None)
+
+    async def _restore_journal(self, session_ids: List[str]) -> None:
+        """Fold sealed journals back into pending after a failed flush"""
+        await self._barrier("restore", session_ids, None, None)
+
+    async def _clear_journal(self, session_ids: List[str]) -> None:
+        """Drop sealed journals once their batch has committed"""
+        await self._barrier("clear", session_ids, None, None)
+
+    async def _journal_loop(self) -> None:
+        """Pipeline queued journal operations to Redis, in order"""
+        while True:
+            ops = [await self._journal_queue.get()]
+            while not self._journal_queue.empty():
+                ops.append(self._journal_queue.get_nowait())
+
+            stopping = ops[-1] is None
+            ops = [op for op in ops if op is not None]
+            try:
+                await self._apply_journal(ops)
+            except Exception as e:
+                logger.warning(f"Failed to journal {len(ops)} session state operations: {e}")
+            finally:
+                for op in ops:
+                    if op[-1] is not None and not op[-1].done():
+                        op[-1].set_result(None)
+            if stopping:
+                return
+
+    async def _apply_journal(self, ops: List[Tuple]) -> None:
+        client = cache.redis_client
+        if not client or not ops:
+            return
+
+        async with client.pipeline(transaction=False) as pipe:
+            for kind, target, fields, counters, _ in ops:
+                if kind == "event":
+                    key = self._key("pending", target)
+                    pipe.hset(key, mapping=fields)
+                    for name, value in counters.items():
+                        if value:
+                            pipe.hincrby(key, name, value)
+                    pipe.sadd(self._key("sessions"), target)
+                elif kind == "seal":
+                    for session_id in target:
+                        await self._seal_script(
+                            keys=[self._key("pending", session_id), self._key("inflight", session_id)],
+                            args=[fields],
+                            client=pipe
+                        )
+                elif kind == "restore":
+                    for session_id in target:
+                        await self._restore_script(
+                            keys=[self._key("pending", session_id), self._key("inflight", session_id)],
+                            args=[],
+                            client=pipe
+                        )
+                elif kind == "clear":
+                    pipe.delete(*[self._key("inflight", session_id) for session_id in target])
+                    for session_id in target:
+                        # Events after the seal keep the session indexed
+                        if session_id not in self._dirty:
+                            pipe.srem(self._key("sessions"), session_id)
+            await pipe.execute()
+
+    async def recover_journals(self) -> int:
+        """Replay journals of processes whose lease has expired"""
+        client = cache.redis_client
+        if not client:
+            return 0
+        self._last_recovery = time.monotonic()
+
+        recovered = 0
+        try:
+            owners = [
+                m.decode("utf-8") if isinstance(m, bytes) else m
+                for m in await client.smembers(JOURNAL_OWNERS_KEY)
+            ]
+            for owner_id in owners:
+                if owner_id == self.owner_id:
+                    continue
+                # Taking an expired lease claims the journal for this process
+                lease = self._key("lease", owner_id=owner_id)
+                if not await client.set(lease, self.owner_id, nx=True, px=int(self.lease_seconds * 1000)):
+                    continue
+                recovered += await self._replay_owner(owner_id)
+                await client.srem(JOURNAL_OWNERS_KEY, owner_id)
+                await client.delete(lease)
+        except Exception as e:
+            logger.error(f"Session state journal recovery failed: {e}")
+
+        if recovered:
+            logger.info(f"Replayed {recovered} journaled session states")
+        return recovered
+
+    async def _replay_owner(self, owner_id: str) -> int:
+        client = cache.redis_client
+        sessions_key = self._key("sessions", owner_id=owner_id)
+        replayed = 0
+        for member in await client.smembers(sessions_key):
+            session_id = member.decode("utf-8") if isinstance(member, bytes) else member
+            pending = self._key("pending", session_id, owner_id)
+            inflight = self._key("inflight", session_id, owner_id)
+            # A sealed batch first (skipped if it committed), then whatever
+            # was still pending, sealed under a fresh flush id
+            while True:
+                data = await client.hgetall(inflight)
+                if not data:
+                    if not await self._seal_script(keys=[pending, inflight], args=[uuid.uuid4().hex]):
+                        break
+                    continue
+                flush_id = data.get(b"flush_id", data.get("flush_id"))
+                flush_id = flush_id.decode("utf-8") if isinstance(flush_id, bytes) else flush_id
+                await self._write_database([LiveSessionState.from_journal(data)], flush_id)
+                await client.delete(inflight)
+                replayed += 1
+            await client.srem(sessions_key, session_id)
+        return replayed
+
+
+# Global session state buffer instance
+session_state_buffer = SessionStateBuffer()
@@ -124,6 +124,34 @@ class TwentyOneDevService:
             logger.error(f"Failed to predict lead conversion: {e}")
             return None
     
+    async def predict_lead_conversion_batch(
+        self,
+        leads: List[Dict[str, Any]],
+        organization_id: str
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Predict conversion for many leads in one request"""
+        if not self.client:
+            return None
+        
+        try:
+            payload = {
+                "organization_id": organization_id,
+                "leads": leads,
+                "model_type": "lead_conversion"
+            }
+            
+            response = await self.client.post("/predict/lead-conversion/batch", json=payload)
+            response.raise_for_status()
+            
+            predictions = response.json().get("predictions", [])
+            logger.debug(f"Generated {len(predictions)} lead conversion predictions for org {organization_id}")
+            
+            return predictions
+            
+        except Exception as e:
+            logger.error(f"Failed to predict lead conversion batch: {e}")
+            return None
+    
     async def get_conversation_insights(
         self,
         organization_id: str,
@@ -13,6 +13,7 @@ from elevenlabs import generate, set_api_key, Voice, VoiceSettings
 from app.services.elevenlabs_service import elevenlabs_service, Language, AudioFormat
 
 from app.core.config import settings
+from app.core.database import AsyncSessionLocal
 from app.models.conversation import Conversation, ConversationMessage, MessageType, MessageDirection
 from app.models.voice_agent import VoiceAgent
 from app.models.lead import Lead
@@ -403,27 +404,27 @@ class VoiceService:
         ai_response: str,
         timing: Dict[str, float]
     ):
-        """Save conversation messages to database"""
+        """Save a turn's user and agent messages in one batched insert"""
         try:
-            # Save user message
-            await self._save_conversation_message(
-                conversation_id,
+            writer = self.conversation_service.message_writer(conversation_id)
+            writer.add(
                 MessageType.USER_SPEECH,
                 MessageDirection.INBOUND,
                 user_input,
+                speaker_type="user",
                 processing_time_ms=timing.get("stt_ms", 0)
             )
-            
-            # Save AI response
-            await self._save_conversation_message(
-                conversation_id,
+            writer.add(
                 MessageType.AGENT_SPEECH,
                 MessageDirection.OUTBOUND,
                 ai_response,
-                audio_data=audio_response,
+                speaker_type="agent",
                 processing_time_ms=timing.get("total_ms", 0)
             )
             
+            async with AsyncSessionLocal() as db:
+                await writer.flush(db)
+            
         except Exception as e:
             logger.error(f"Failed to save conversation messages: {e}")
     
@@ -438,9 +439,21 @@ class VoiceService:
         processing_time_ms: Optional[float] = None
     ):
         """Save individual conversation message"""
-        # This would integrate with your database session
-        # Implementation depends on your database setup
-        pass
+        try:
+            writer = self.conversation_service.message_writer(conversation_id)
+            writer.add(
+                message_type,
+                direction,
+                content,
+                audio_url=audio_url,
+                processing_time_ms=processing_time_ms
+            )
+            
+            async with AsyncSessionLocal() as db:
+                await writer.flush(db)
+            
+        except Exception as e:
+            logger.error(f"Failed to save conversation message: {e}")
     
     async def _get_conversation_history(self, conversation_id: str) -> List[Dict[str, str]]:
         """Get recent conversation history for context"""
@@ -454,7 +467,7 @@ class VoiceService:
         lead_data: Dict[str, Any],
         organization_id: str
     ):
-        \"\"\"Process lead qualification from conversation\"\"\"
+        """Process lead qualification from conversation"""
         try:
             # Create lead record
             lead = await self.lead_service.create_lead_from_conversation(
@@ -579,14 +592,14 @@ class VoiceService:
     
     @property
     def average_response_time_ms(self) -> float:
-        \"\"\"Get average response time over recent requests\"\"\"
+        """Get average response time over recent requests"""
         if not self.response_times:
             return 0.0
         return sum(self.response_times) / len(self.response_times)
     
     @property
     def performance_stats(self) -> Dict[str, Any]:
-        \"\"\"Get performance statistics\"\"\"
+        """Get performance statistics"""
         if not self.response_times:
             return {"average_ms": 0, "requests_processed": 0, "target_met_percentage": 0}
         
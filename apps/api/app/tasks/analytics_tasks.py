@@ -11,6 +11,7 @@ import io
 from celery import Task
 
 from app.tasks.celery_app import celery_app
+from app.tasks.runtime import in_worker_loop
 from app.core.database import AsyncSessionLocal
 from app.services.analytics_service import AnalyticsService
 from app.services.twentyonedev_service import TwentyOneDevService
@@ -46,11 +47,15 @@ def generate_analytics_report(
         # Update task progress
         self.update_state(state="PROGRESS", meta={"progress": 10, "status": "Initializing"})
         
-        # Generate report data
+        # Generate report data; the task request is thread-local, so
+        # progress from the runtime loop names the task explicitly
+        task_id = self.request.id
+        
+        @in_worker_loop
         async def generate_report_data():
             async with AsyncSessionLocal() as db:
                 # Get dashboard metrics
-                self.update_state(state="PROGRESS", meta={"progress": 30, "status": "Collecting metrics"})
+                self.update_state(task_id=task_id, state="PROGRESS", meta={"progress": 30, "status": "Collecting metrics"})
                 
                 dashboard_metrics = await self.analytics_service.get_real_time_dashboard(
                     organization_id, db
@@ -68,7 +73,7 @@ def generate_analytics_report(
                     organization_id, db, days=date_range_days
                 )
                 
-                self.update_state(state="PROGRESS", meta={"progress": 60, "status": "Analyzing patterns"})
+                self.update_state(task_id=task_id, state="PROGRESS", meta={"progress": 60, "status": "Analyzing patterns"})
                 
                 # Get ML insights if requested
                 ml_insights = None
@@ -97,8 +102,7 @@ def generate_analytics_report(
                 }
         
         # Run async function
-        import asyncio
-        report_data = asyncio.run(generate_report_data())
+        report_data = generate_report_data()
         
         self.update_state(state="PROGRESS", meta={"progress": 80, "status": "Formatting report"})
         
@@ -151,6 +155,7 @@ def sync_data_to_twentyonedev(
     try:
         logger.info(f"Starting data sync to 21dev.ai: {organization_id}")
         
+        @in_worker_loop
         async def sync_data():
             async with AsyncSessionLocal() as db:
                 # Get recent conversations
@@ -212,7 +217,7 @@ def sync_data_to_twentyonedev(
                     logger.info("No new data to sync")
                     return {"synced_events": 0, "status": "no_data"}
         
-        return asyncio.run(sync_data())
+        return sync_data()
         
     except Exception as e:
         logger.error(f"Failed to sync data to 21dev.ai: {e}")
@@ -225,6 +230,7 @@ def sync_analytics_to_twentyonedev():
     try:
         logger.info("Starting periodic analytics sync to 21dev.ai")
         
+        @in_worker_loop
         async def sync_all_organizations():
             async with AsyncSessionLocal() as db:
                 # Get all active organizations
@@ -247,7 +253,7 @@ def sync_analytics_to_twentyonedev():
                 
                 return synced_count
         
-        synced_orgs = asyncio.run(sync_all_organizations())
+        synced_orgs = sync_all_organizations()
         logger.info(f"Periodic sync completed for {synced_orgs} organizations")
         
         return {"synced_organizations": synced_orgs}
@@ -263,6 +269,7 @@ def generate_daily_reports():
     try:
         logger.info("Starting daily report generation")
         
+        @in_worker_loop
         async def generate_reports():
             async with AsyncSessionLocal() as db:
                 from sqlalchemy import select
@@ -296,7 +303,7 @@ def generate_daily_reports():
                 
                 return generated_count
         
-        generated_reports = asyncio.run(generate_reports())
+        generated_reports = generate_reports()
         logger.info(f"Generated {generated_reports} daily reports")
         
         return {"generated_reports": generated_reports}
@@ -306,6 +313,25 @@ def generate_daily_reports():
         raise
 
 
+@celery_app.task(base=DatabaseTask)
+def refresh_analytics_rollups():
+    """Bring the hourly and daily analytics rollups up to date"""
+    try:
+        @in_worker_loop
+        async def refresh():
+            async with AsyncSessionLocal() as db:
+                return await refresh_analytics_rollups.analytics_service.rollups.refresh(db)
+        
+        result = refresh()
+        logger.info(f"Analytics rollups refreshed: {result}")
+        
+        return result
+        
+    except Exception as e:
+        logger.error(f"Analytics rollup refresh failed: {e}")
+        raise
+
+
 def convert_to_csv(report_data: Dict[str, Any]) -> str:
     """Convert report data to CSV format"""
     output = io.StringIO()
@@ -2,7 +2,10 @@
 Celery application configuration for background job processing
 """
 from celery import Celery
+from celery.signals import task_prerun, task_postrun, worker_process_init, worker_process_shutdown
 from app.core.config import settings
+from app.core.db_telemetry import set_query_source, db_telemetry
+from app.tasks.runtime import worker_runtime
 import logging
 
 logger = logging.getLogger("seiketsu.celery")
@@ -57,6 +60,10 @@ celery_app.conf.update(
             "task": "app.tasks.voice_tasks.cleanup_expired_conversations",
             "schedule": 1800.0,  # Every 30 minutes
         },
+        "refresh-analytics-rollups": {
+            "task": "app.tasks.analytics_tasks.refresh_analytics_rollups",
+            "schedule": 900.0,  # Every 15 minutes
+        },
         "update-lead-scores": {
             "task": "app.tasks.ml_tasks.update_lead_scores",
             "schedule": 7200.0,  # Every 2 hours
@@ -71,4 +78,48 @@ celery_app.conf.update(
     },
 )
 
+
+@task_prerun.connect
+def tag_task_queries(task=None, **kwargs):
+    """Attribute database statements to the running task"""
+    set_query_source(f"task {task.name}")
+
+
+@task_postrun.connect
+def untag_task_queries(**kwargs):
+    set_query_source(None)
+
+
+@worker_runtime.on_startup
+async def open_worker_connections():
+    """Connect the process-wide Redis client on the runtime loop"""
+    from app.core.cache import init_cache
+    await init_cache()
+
+
+@worker_runtime.on_shutdown
+async def close_worker_connections():
+    from app.core.cache import close_cache
+    from app.core.database import close_db
+    await close_cache()
+    await close_db()
+
+
+@worker_process_init.connect
+def start_worker_runtime(**kwargs):
+    """Give each worker process its own pools and a long-lived event loop"""
+    from app.core.database import replica_router
+    # Pooled connections inherited across fork belong to the parent
+    for pool_engine in (replica_router.writer, replica_router.reader):
+        if pool_engine is not None:
+            pool_engine.sync_engine.dispose(close=False)
+    worker_runtime.start()
+
+
+@worker_process_shutdown.connect
+def stop_worker_runtime(**kwargs):
+    logger.info(f"Worker database pools: {db_telemetry.pool_gauges()}")
+    worker_runtime.stop()
+
+
 logger.info("Celery application configured successfully")
\ No newline at end of file
@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 from celery import Task
 
 from app.tasks.celery_app import celery_app
+from app.tasks.runtime import in_worker_loop
 from app.core.database import AsyncSessionLocal
 from app.services.lead_service import LeadService
 from app.services.analytics_service import AnalyticsService
@@ -67,6 +68,7 @@ def send_follow_up_reminder(
     try:
         logger.info(f"Sending follow-up reminder for lead {lead_id}")
         
+        @in_worker_loop
         async def send_reminder():
             async with AsyncSessionLocal() as db:
                 # Get lead details
@@ -100,8 +102,7 @@ def send_follow_up_reminder(
                 logger.info(f"Follow-up reminder sent for lead {lead_id}")
                 return {"status": "sent", "lead_id": lead_id}
         
-        import asyncio
-        return asyncio.run(send_reminder())
+        return send_reminder()
         
     except Exception as e:
         logger.error(f"Failed to send follow-up reminder for lead {lead_id}: {e}")
@@ -114,6 +115,7 @@ def process_follow_up_reminders():
     try:
         logger.info("Processing follow-up reminders")
         
+        @in_worker_loop
         async def process_reminders():
             async with AsyncSessionLocal() as db:
                 from sqlalchemy import select, and_
@@ -155,8 +157,7 @@ def process_follow_up_reminders():
                 logger.info(f"Processed {reminder_count} follow-up reminders")
                 return {"processed_reminders": reminder_count}
         
-        import asyncio
-        return asyncio.run(process_reminders())
+        return process_reminders()
         
     except Exception as e:
         logger.error(f"Failed to process follow-up reminders: {e}")
@@ -173,6 +174,7 @@ def update_lead_score(
     try:
         logger.info(f"Updating lead score for lead {lead_id}")
         
+        @in_worker_loop
         async def update_score():
             async with AsyncSessionLocal() as db:
                 lead = await self.lead_service.get_lead(lead_id, db)
@@ -198,4 +200,296 @@ def update_lead_score(
                 
                 # Add additional data if provided
                 if additional_data:
-                    lead_data.update(additional_data)\n                \n                # Get ML prediction from 21dev.ai\n                prediction = await self.twentyonedev_service.predict_lead_conversion(\n                    lead_data, lead.organization_id\n                )\n                \n                if prediction and \"score\" in prediction:\n                    old_score = lead.lead_score\n                    new_score = int(prediction[\"score\"] * 100)  # Convert to 0-100 scale\n                    \n                    lead.lead_score = new_score\n                    lead.updated_at = datetime.utcnow()\n                    \n                    # Update qualification status if score changed significantly\n                    if new_score >= 70 and (not old_score or old_score < 70):\n                        lead.status = LeadStatus.QUALIFIED\n                    elif new_score < 50 and old_score and old_score >= 50:\n                        lead.status = LeadStatus.UNQUALIFIED\n                    \n                    await db.commit()\n                    \n                    # Track score update\n                    await self.analytics_service.track_event(\n                        \"leads\", \"score_updated\", lead.organization_id, db,\n                        properties={\n                            \"lead_id\": lead_id,\n                            \"old_score\": old_score,\n                            \"new_score\": new_score,\n                            \"ml_powered\": True\n                        }\n                    )\n                    \n                    logger.info(f\"Updated lead {lead_id} score from {old_score} to {new_score}\")\n                    return {\"status\": \"updated\", \"old_score\": old_score, \"new_score\": new_score}\n                else:\n                    # Fallback to rule-based scoring\n                    lead.update_lead_score()\n                    await db.commit()\n                    \n                    logger.info(f\"Updated lead {lead_id} score using rule-based method\")\n                    return {\"status\": \"updated_fallback\", \"score\": lead.lead_score}\n        \n        import asyncio\n        return asyncio.run(update_score())\n        \n    except Exception as e:\n        logger.error(f\"Failed to update lead score for {lead_id}: {e}\")\n        raise\n\n\n@celery_app.task(bind=True, base=LeadTask)\ndef bulk_update_lead_scores(\n    self,\n    organization_id: str,\n    lead_ids: Optional[List[str]] = None\n):\n    \"\"\"Bulk update lead scores for an organization\"\"\"\n    try:\n        logger.info(f\"Bulk updating lead scores for organization {organization_id}\")\n        \n        async def bulk_update():\n            async with AsyncSessionLocal() as db:\n                from sqlalchemy import select, and_\n                \n                # Get leads to update\n                if lead_ids:\n                    stmt = select(Lead).where(\n                        and_(\n                            Lead.organization_id == organization_id,\n                            Lead.id.in_(lead_ids)\n                        )\n                    )\n                else:\n                    # Update all active leads\n                    stmt = select(Lead).where(\n                        and_(\n                            Lead.organization_id == organization_id,\n                            Lead.status.in_([\n                                LeadStatus.NEW,\n                                LeadStatus.CONTACTED,\n                                LeadStatus.QUALIFIED,\n                                LeadStatus.INTERESTED\n                            ])\n                        )\n                    )\n                \n                result = await db.execute(stmt)\n                leads = result.scalars().all()\n                \n                updated_count = 0\n                for lead in leads:\n                    try:\n                        # Schedule individual score update\n                        update_lead_score.apply_async(args=[lead.id])\n                        updated_count += 1\n                    except Exception as e:\n                        logger.error(f\"Failed to schedule score update for lead {lead.id}: {e}\")\n                        continue\n                \n                logger.info(f\"Scheduled score updates for {updated_count} leads\")\n                return {\"scheduled_updates\": updated_count}\n        \n        import asyncio\n        return asyncio.run(bulk_update())\n        \n    except Exception as e:\n        logger.error(f\"Failed to bulk update lead scores: {e}\")\n        raise\n\n\n@celery_app.task(bind=True, base=LeadTask)\ndef auto_qualify_leads(\n    self,\n    organization_id: str\n):\n    \"\"\"Automatically qualify leads based on ML predictions\"\"\"\n    try:\n        logger.info(f\"Auto-qualifying leads for organization {organization_id}\")\n        \n        async def auto_qualify():\n            async with AsyncSessionLocal() as db:\n                from sqlalchemy import select, and_\n                \n                # Get new leads that haven't been scored recently\n                cutoff_time = datetime.utcnow() - timedelta(hours=1)\n                stmt = select(Lead).where(\n                    and_(\n                        Lead.organization_id == organization_id,\n                        Lead.status == LeadStatus.NEW,\n                        Lead.updated_at < cutoff_time\n                    )\n                )\n                \n                result = await db.execute(stmt)\n                new_leads = result.scalars().all()\n                \n                qualified_count = 0\n                for lead in new_leads:\n                    try:\n                        # Update lead score\n                        update_result = await self.update_lead_score(lead.id)\n                        \n                        if update_result.get(\"new_score\", 0) >= 70:\n                            # Auto-qualify high-scoring leads\n                            await self.lead_service.update_lead_status(\n                                lead.id,\n                                LeadStatus.QUALIFIED,\n                                db,\n                                \"Auto-qualified based on ML scoring\",\n                                \"system\"\n                            )\n                            qualified_count += 1\n                        \n                    except Exception as e:\n                        logger.error(f\"Failed to auto-qualify lead {lead.id}: {e}\")\n                        continue\n                \n                logger.info(f\"Auto-qualified {qualified_count} leads\")\n                return {\"qualified_leads\": qualified_count}\n        \n        import asyncio\n        return asyncio.run(auto_qualify())\n        \n    except Exception as e:\n        logger.error(f\"Failed to auto-qualify leads: {e}\")\n        raise\n\n\n@celery_app.task(bind=True, base=LeadTask)\ndef cleanup_stale_leads(\n    self,\n    organization_id: str,\n    days_threshold: int = 90\n):\n    \"\"\"Clean up stale leads that haven't been updated\"\"\"\n    try:\n        logger.info(f\"Cleaning up stale leads for organization {organization_id}\")\n        \n        async def cleanup_leads():\n            async with AsyncSessionLocal() as db:\n                from sqlalchemy import select, and_\n                \n                # Get stale leads\n                cutoff_date = datetime.utcnow() - timedelta(days=days_threshold)\n                stmt = select(Lead).where(\n                    and_(\n                        Lead.organization_id == organization_id,\n                        Lead.updated_at < cutoff_date,\n                        Lead.status.in_([\n                            LeadStatus.NEW,\n                            LeadStatus.CONTACTED,\n                            LeadStatus.UNQUALIFIED\n                        ])\n                    )\n                )\n                \n                result = await db.execute(stmt)\n                stale_leads = result.scalars().all()\n                \n                cleaned_count = 0\n                for lead in stale_leads:\n                    try:\n                        # Mark as stale/archived\n                        await self.lead_service.update_lead_status(\n                            lead.id,\n                            LeadStatus.ARCHIVED,\n                            db,\n                            f\"Auto-archived after {days_threshold} days of inactivity\",\n                            \"system\"\n                        )\n                        cleaned_count += 1\n                        \n                    except Exception as e:\n                        logger.error(f\"Failed to archive stale lead {lead.id}: {e}\")\n                        continue\n                \n                logger.info(f\"Archived {cleaned_count} stale leads\")\n                return {\"archived_leads\": cleaned_count}\n        \n        import asyncio\n        return asyncio.run(cleanup_leads())\n        \n    except Exception as e:\n        logger.error(f\"Failed to cleanup stale leads: {e}\")\n        raise\n\n\n@celery_app.task(bind=True, base=LeadTask)\ndef generate_lead_insights_report(\n    self,\n    organization_id: str,\n    days: int = 30\n):\n    \"\"\"Generate insights report about lead patterns and trends\"\"\"\n    try:\n        logger.info(f\"Generating lead insights report for organization {organization_id}\")\n        \n        async def generate_insights():\n            async with AsyncSessionLocal() as db:\n                # Get lead metrics\n                lead_metrics = await self.analytics_service.get_lead_metrics(\n                    organization_id, db, days=days\n                )\n                \n                # Get ML insights\n                ml_insights = await self.twentyonedev_service.get_conversation_insights(\n                    organization_id, [], \"lead_generation\"\n                )\n                \n                # Combine insights\n                insights_report = {\n                    \"organization_id\": organization_id,\n                    \"generated_at\": datetime.utcnow().isoformat(),\n                    \"date_range_days\": days,\n                    \"lead_metrics\": lead_metrics,\n                    \"ml_insights\": ml_insights,\n                    \"recommendations\": generate_lead_recommendations(lead_metrics, ml_insights)\n                }\n                \n                # Track report generation\n                await self.analytics_service.track_event(\n                    \"reports\", \"lead_insights_generated\", organization_id, db,\n                    properties={\"days\": days, \"automated\": True}\n                )\n                \n                return insights_report\n        \n        import asyncio\n        return asyncio.run(generate_insights())\n        \n    except Exception as e:\n        logger.error(f\"Failed to generate lead insights report: {e}\")\n        raise\n\n\ndef generate_lead_recommendations(lead_metrics: Dict[str, Any], ml_insights: Optional[Dict[str, Any]]) -> List[str]:\n    \"\"\"Generate actionable recommendations based on lead data\"\"\"\n    recommendations = []\n    \n    # Analyze conversion rates\n    if lead_metrics.get(\"high_quality_rate\", 0) < 25:\n        recommendations.append(\"Improve lead qualification criteria to increase high-quality lead rate\")\n    \n    # Analyze source performance\n    source_breakdown = lead_metrics.get(\"source_breakdown\", {})\n    if \"voice_call\" in source_breakdown and source_breakdown[\"voice_call\"] > 0:\n        recommendations.append(\"Voice calls are generating leads - consider increasing call capacity\")\n    \n    # Add ML-based recommendations\n    if ml_insights and ml_insights.get(\"recommendations\"):\n        recommendations.extend(ml_insights[\"recommendations\"][:3])\n    \n    return recommendations[:5]  # Return top 5 recommendations
\ No newline at end of file
+                    lead_data.update(additional_data)
+                
+                # Get ML prediction from 21dev.ai
+                prediction = await self.twentyonedev_service.predict_lead_conversion(
+                    lead_data, lead.organization_id
+                )
+                
+                if prediction and "score" in prediction:
+                    old_score = lead.lead_score
+                    new_score = int(prediction["score"] * 100)  # Convert to 0-100 scale
+                    
+                    lead.lead_score = new_score
+                    lead.updated_at = datetime.utcnow()
+                    
+                    # Update qualification status if score changed significantly
+                    if new_score >= 70 and (not old_score or old_score < 70):
+                        lead.status = LeadStatus.QUALIFIED
+                    elif new_score < 50 and old_score and old_score >= 50:
+                        lead.status = LeadStatus.UNQUALIFIED
+                    
+                    await db.commit()
+                    
+                    # Track score update
+                    await self.analytics_service.track_event(
+                        "leads", "score_updated", lead.organization_id, db,
+                        properties={
+                            "lead_id": lead_id,
+                            "old_score": old_score,
+                            "new_score": new_score,
+                            "ml_powered": True
+                        }
+                    )
+                    
+                    logger.info(f"Updated lead {lead_id} score from {old_score} to {new_score}")
+                    return {"status": "updated", "old_score": old_score, "new_score": new_score}
+                else:
+                    # Fallback to rule-based scoring
+                    lead.update_lead_score()
+                    await db.commit()
+                    
+                    logger.info(f"Updated lead {lead_id} score using rule-based method")
+                    return {"status": "updated_fallback", "score": lead.lead_score}
+        
+        return update_score()
+        
+    except Exception as e:
+        logger.error(f"Failed to update lead score for {lead_id}: {e}")
+        raise
+
+
+@celery_app.task(bind=True, base=LeadTask)
+def bulk_update_lead_scores(
+    self,
+    organization_id: str,
+    lead_ids: Optional[List[str]] = None
+):
+    """Bulk update lead scores for an organization"""
+    try:
+        logger.info(f"Bulk updating lead scores for organization {organization_id}")
+        
+        @in_worker_loop
+        async def bulk_update():
+            async with AsyncSessionLocal() as db:
+                from sqlalchemy import select, and_
+                
+                # Get leads to update
+                if lead_ids:
+                    stmt = select(Lead).where(
+                        and_(
+                            Lead.organization_id == organization_id,
+                            Lead.id.in_(lead_ids)
+                        )
+                    )
+                else:
+                    # Update all active leads
+                    stmt = select(Lead).where(
+                        and_(
+                            Lead.organization_id == organization_id,
+                            Lead.status.in_([
+                                LeadStatus.NEW,
+                                LeadStatus.CONTACTED,
+                                LeadStatus.QUALIFIED,
+                                LeadStatus.INTERESTED
+                            ])
+                        )
+                    )
+                
+                result = await db.execute(stmt)
+                leads = result.scalars().all()
+                
+                updated_count = 0
+                for lead in leads:
+                    try:
+                        # Schedule individual score update
+                        update_lead_score.apply_async(args=[lead.id])
+                        updated_count += 1
+                    except Exception as e:
+                        logger.error(f"Failed to schedule score update for lead {lead.id}: {e}")
+                        continue
+                
+                logger.info(f"Scheduled score updates for {updated_count} leads")
+                return {"scheduled_updates": updated_count}
+        
+        return bulk_update()
+        
+    except Exception as e:
+        logger.error(f"Failed to bulk update lead scores: {e}")
+        raise
+
+
+@celery_app.task(bind=True, base=LeadTask)
+def auto_qualify_leads(
+    self,
+    organization_id: str
+):
+    """Automatically qualify leads based on ML predictions"""
+    try:
+        logger.info(f"Auto-qualifying leads for organization {organization_id}")
+        
+        @in_worker_loop
+        async def auto_qualify():
+            async with AsyncSessionLocal() as db:
+                from sqlalchemy import select, and_
+                
+                # Get new leads that haven't been scored recently
+                cutoff_time = datetime.utcnow() - timedelta(hours=1)
+                stmt = select(Lead).where(
+                    and_(
+                        Lead.organization_id == organization_id,
+                        Lead.status == LeadStatus.NEW,
+                        Lead.updated_at < cutoff_time
+                    )
+                )
+                
+                result = await db.execute(stmt)
+                new_leads = result.scalars().all()
+                
+                qualified_count = 0
+                for lead in new_leads:
+                    try:
+                        # Update lead score
+                        update_result = await self.update_lead_score(lead.id)
+                        
+                        if update_result.get("new_score", 0) >= 70:
+                            # Auto-qualify high-scoring leads
+                            await self.lead_service.update_lead_status(
+                                lead.id,
+                                LeadStatus.QUALIFIED,
+                                db,
+                                "Auto-qualified based on ML scoring",
+                                "system"
+                            )
+                            qualified_count += 1
+                        
+                    except Exception as e:
+                        logger.error(f"Failed to auto-qualify lead {lead.id}: {e}")
+                        continue
+                
+                logger.info(f"Auto-qualified {qualified_count} leads")
+                return {"qualified_leads": qualified_count}
+        
+        return auto_qualify()
+        
+    except Exception as e:
+        logger.error(f"Failed to auto-qualify leads: {e}")
+        raise
+
+
+@celery_app.task(bind=True, base=LeadTask)
+def cleanup_stale_leads(
+    self,
+    organization_id: str,
+    days_threshold: int = 90
+):
+    """Clean up stale leads that haven't been updated"""
+    try:
+        logger.info(f"Cleaning up stale leads for organization {organization_id}")
+        
+        @in_worker_loop
+        async def cleanup_leads():
+            async with AsyncSessionLocal() as db:
+                from sqlalchemy import select, and_
+                
+                # Get stale leads
+                cutoff_date = datetime.utcnow() - timedelta(days=days_threshold)
+                stmt = select(Lead).where(
+                    and_(
+                        Lead.organization_id == organization_id,
+                        Lead.updated_at < cutoff_date,
+                        Lead.status.in_([
+                            LeadStatus.NEW,
+                            LeadStatus.CONTACTED,
+                            LeadStatus.UNQUALIFIED
+                        ])
+                    )
+                )
+                
+                result = await db.execute(stmt)
+                stale_leads = result.scalars().all()
+                
+                cleaned_count = 0
+                for lead in stale_leads:
+                    try:
+                        # Mark as stale/archived
+                        await self.lead_service.update_lead_status(
+                            lead.id,
+                            LeadStatus.ARCHIVED,
+                            db,
+                            f"Auto-archived after {days_threshold} days of inactivity",
+                            "system"
+                        )
+                        cleaned_count += 1
+                        
+                    except Exception as e:
+                        logger.error(f"Failed to archive stale lead {lead.id}: {e}")
+                        continue
+                
+                logger.info(f"Archived {cleaned_count} stale leads")
+                return {"archived_leads": cleaned_count}
+        
+        return cleanup_leads()
+        
+    except Exception as e:
+        logger.error(f"Failed to cleanup stale leads: {e}")
+        raise
+
+
+@celery_app.task(bind=True, base=LeadTask)
+def generate_lead_insights_report(
+    self,
+    organization_id: str,
+    days: int = 30
+):
+    """Generate insights report about lead patterns and trends"""
+    try:
+        logger.info(f"Generating lead insights report for organization {organization_id}")
+        
+        @in_worker_loop
+        async def generate_insights():
+            async with AsyncSessionLocal() as db:
+                # Get lead metrics
+                lead_metrics = await self.analytics_service.get_lead_metrics(
+                    organization_id, db, days=days
+                )
+                
+                # Get ML insights
+                ml_insights = await self.twentyonedev_service.get_conversation_insights(
+                    organization_id, [], "lead_generation"
+                )
+                
+                # Combine insights
+                insights_report = {
+                    "organization_id": organization_id,
+                    "generated_at": datetime.utcnow().isoformat(),
+                    "date_range_days": days,
+                    "lead_metrics": lead_metrics,
+                    "ml_insights": ml_insights,
+                    "recommendations": generate_lead_recommendations(lead_metrics, ml_insights)
+                }
+                
+                # Track report generation
+                await self.analytics_service.track_event(
+                    "reports", "lead_insights_generated", organization_id, db,
+                    properties={"days": days, "automated": True}
+                )
+                
+                return insights_report
+        
+        return generate_insights()
+        
+    except Exception as e:
+        logger.error(f"Failed to generate lead insights report: {e}")
+        raise
+
+
+def generate_lead_recommendations(lead_metrics: Dict[str, Any], ml_insights: Optional[Dict[str, Any]]) -> List[str]:
+    """Generate actionable recommendations based on lead data"""
+    recommendations = []
+    
+    # Analyze conversion rates
+    if lead_metrics.get("high_quality_rate", 0) < 25:
+        recommendations.append("Improve lead qualification criteria to increase high-quality lead rate")
+    
+    # Analyze source performance
+    source_breakdown = lead_metrics.get("source_breakdown", {})
+    if "voice_call" in source_breakdown and source_breakdown["voice_call"] > 0:
+        recommendations.append("Voice calls are generating leads - consider increasing call capacity")
+    
+    # Add ML-based recommendations
+    if ml_insights and ml_insights.get("recommendations"):
+        recommendations.extend(ml_insights["recommendations"][:3])
+    
+    return recommendations[:5]  # Return top 5 recommendations
\ No newline at end of file
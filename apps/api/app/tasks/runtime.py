@@ -0,0 +1,161 @@
+"""
+Worker async runtime
+One long-lived event loop per worker process for the async bodies of Celery tasks
+"""
+import asyncio
+import functools
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.db_telemetry import LatencyHistogram
+
+logger = logging.getLogger("seiketsu.celery")
+
+Hook = Callable[[], Awaitable[None]]
+
+
+class AsyncRuntime:
+    """Event loop on a dedicated thread, shared by every task in a process.
+
+    Engines, Redis and HTTP clients bind their connections to the loop that
+    opened them, so running each task under a fresh `asyncio.run` loop
+    threw their pools away on every call. Here the loop outlives the tasks:
+    startup hooks run once when the worker process starts, and task
+    coroutines are submitted to the loop and awaited from the pool thread.
+    """
+
+    def __init__(self, name: str = "worker-async-runtime"):
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self._startup_hooks: List[Hook] = []
+        self._shutdown_hooks: List[Hook] = []
+        self._lock = threading.Lock()
+        self.dispatch = LatencyHistogram()
+        self.duration = LatencyHistogram()
+        self.failures = 0
+        self.started_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def on_startup(self, hook: Hook) -> Hook:
+        """Register a coroutine function run on the loop when it starts"""
+        self._startup_hooks.append(hook)
+        return hook
+
+    def on_shutdown(self, hook: Hook) -> Hook:
+        """Register a coroutine function run on the loop before it stops"""
+        self._shutdown_hooks.append(hook)
+        return hook
+
+    def start(self):
+        """Start the loop thread and run startup hooks; idempotent"""
+        with self._lock:
+            if self.running:
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            thread = threading.Thread(target=self._run_loop, args=(loop, ready), name=self.name, daemon=True)
+            thread.start()
+            ready.wait()
+            self.loop, self.thread = loop, thread
+            self.started_at = time.monotonic()
+
+        for hook in self._startup_hooks:
+            try:
+                self._submit(hook()).result()
+            except Exception as e:
+                logger.error(f"Async runtime startup hook {hook.__name__} failed: {e}")
+        logger.info(f"Async runtime started ({len(self._startup_hooks)} startup hooks)")
+
+    def stop(self, timeout: float = 30.0):
+        """Run shutdown hooks, then stop and close the loop"""
+        with self._lock:
+            if not self.running:
+                return
+            loop, thread = self.loop, self.thread
+
+        for hook in reversed(self._shutdown_hooks):
+            try:
+                self._submit(hook()).result(timeout)
+            except Exception as e:
+                logger.error(f"Async runtime shutdown hook {hook.__name__} failed: {e}")
+
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        with self._lock:
+            self.loop = self.thread = None
+        logger.info(f"Async runtime stopped: {self.get_stats()}")
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop, ready: threading.Event):
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        try:
+            loop.run_forever()
+        finally:
+            try:
+                loop.run_until_complete(loop.shutdown_asyncgens())
+            finally:
+                loop.close()
+
+    def _submit(self, coro: Awaitable[Any]):
+        # The handle copies this thread's context, so context variables set
+        # by task signals (such as the query source) reach the coroutine
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and block until it finishes"""
+        if threading.current_thread() is self.thread:
+            coro.close()
+            raise RuntimeError("AsyncRuntime.run() called from the runtime loop; await the coroutine instead")
+        if not self.running:
+            # Beat, eager mode and scripts never see worker_process_init
+            self.start()
+
+        future = self._submit(self._timed(coro, time.perf_counter()))
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    async def _timed(self, coro: Awaitable[Any], submitted: float) -> Any:
+        started = time.perf_counter()
+        self.dispatch.observe(started - submitted)
+        try:
+            return await coro
+        except BaseException:
+            self.failures += 1
+            raise
+        finally:
+            self.duration.observe(time.perf_counter() - started)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "uptime_seconds": round(time.monotonic() - self.started_at, 1) if self.running else None,
+            "tasks": self.duration.count,
+            "failures": self.failures,
+            "dispatch": self.dispatch.snapshot(),
+            "duration": self.duration.snapshot()
+        }
+
+
+# Global runtime for this worker process
+worker_runtime = AsyncRuntime()
+
+
+def in_worker_loop(func: Callable[..., Awaitable[Any]]) -> Callable[..., Any]:
+    """Make a coroutine function callable from sync task code.
+
+    Calls submit the coroutine to the worker runtime and block for its result.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return worker_runtime.run(func(*args, **kwargs))
+    return wrapper
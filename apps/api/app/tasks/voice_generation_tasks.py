@@ -1,13 +1,13 @@
 """
 Celery tasks for background voice generation and processing
 """
-import asyncio
 import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 
 from celery import Task
 from app.tasks.celery_app import celery_app
+from app.tasks.runtime import worker_runtime
 from app.services.elevenlabs_service import elevenlabs_service, Language
 from app.models.voice_agent import VoiceAgent
 from app.core.database import get_db_session
@@ -19,13 +19,8 @@ class AsyncTask(Task):
     """Base task class for async operations"""
     
     def run_async(self, coro):
-        """Run async function in task"""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(coro)
-        finally:
-            loop.close()
+        """Run async function in task on the worker's event loop"""
+        return worker_runtime.run(coro)
 
 @celery_app.task(bind=True, base=AsyncTask)
 def pregenerate_agent_voices(self, agent_id: str, language: str = "en"):
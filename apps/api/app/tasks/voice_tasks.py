@@ -6,9 +6,9 @@ import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 from celery import Task
-import asyncio
 
 from app.tasks.celery_app import celery_app
+from app.tasks.runtime import in_worker_loop
 from app.core.database import AsyncSessionLocal
 from app.services.voice_service import VoiceService
 from app.services.analytics_service import AnalyticsService
@@ -32,6 +32,7 @@ def cleanup_expired_conversations():
     try:
         logger.info("Starting conversation cleanup")
         
+        @in_worker_loop
         async def cleanup():
             async with AsyncSessionLocal() as db:
                 from sqlalchemy import select, and_
@@ -46,4 +47,595 @@ def cleanup_expired_conversations():
                 archive_cutoff = now - timedelta(days=7)
                 
                 # Get stale active conversations
-                stale_stmt = select(Conversation).where(\n                    and_(\n                        Conversation.is_active == True,\n                        Conversation.started_at < stale_cutoff\n                    )\n                )\n                \n                stale_result = await db.execute(stale_stmt)\n                stale_conversations = stale_result.scalars().all()\n                \n                stale_count = 0\n                for conv in stale_conversations:\n                    try:\n                        # Mark as ended due to timeout\n                        conv.status = ConversationStatus.ENDED\n                        conv.is_active = False\n                        conv.ended_at = now\n                        conv.duration_seconds = int((now - conv.started_at).total_seconds())\n                        \n                        # Add timeout note\n                        if not conv.notes:\n                            conv.notes = \"\"\n                        conv.notes += f\"\\n[{now.isoformat()}] Conversation ended due to inactivity timeout\"\n                        \n                        stale_count += 1\n                        \n                    except Exception as e:\n                        logger.error(f\"Failed to cleanup conversation {conv.id}: {e}\")\n                        continue\n                \n                # Get old conversations for archival\n                archive_stmt = select(Conversation).where(\n                    and_(\n                        Conversation.started_at < archive_cutoff,\n                        Conversation.archived == False\n                    )\n                )\n                \n                archive_result = await db.execute(archive_stmt)\n                archive_conversations = archive_result.scalars().all()\n                \n                archive_count = 0\n                for conv in archive_conversations:\n                    try:\n                        conv.archived = True\n                        archive_count += 1\n                    except Exception as e:\n                        logger.error(f\"Failed to archive conversation {conv.id}: {e}\")\n                        continue\n                \n                await db.commit()\n                \n                logger.info(f\"Cleaned up {stale_count} stale conversations, archived {archive_count} old conversations\")\n                return {\"stale_cleaned\": stale_count, \"archived\": archive_count}\n        \n        return asyncio.run(cleanup())\n        \n    except Exception as e:\n        logger.error(f\"Conversation cleanup failed: {e}\")\n        raise\n\n\n@celery_app.task(bind=True, base=VoiceTask)\ndef process_conversation_analytics(\n    self,\n    conversation_id: str\n):\n    \"\"\"Process analytics for completed conversation\"\"\"\n    try:\n        async def process_analytics():\n            async with AsyncSessionLocal() as db:\n                from sqlalchemy import select\n                \n                # Get conversation\n                stmt = select(Conversation).where(Conversation.id == conversation_id)\n                result = await db.execute(stmt)\n                conversation = result.scalar_one_or_none()\n                \n                if not conversation:\n                    logger.warning(f\"Conversation {conversation_id} not found\")\n                    return {\"status\": \"conversation_not_found\"}\n                \n                # Calculate conversation metrics\n                metrics = {\n                    \"duration_seconds\": conversation.duration_seconds or 0,\n                    \"status\": conversation.status.value,\n                    \"lead_generated\": bool(conversation.lead_id),\n                    \"sentiment_score\": conversation.sentiment_score,\n                    \"transferred_to_human\": conversation.transferred_to_human,\n                    \"voice_agent_id\": conversation.voice_agent_id,\n                    \"organization_id\": conversation.organization_id\n                }\n                \n                # Track analytics event\n                await self.analytics_service.track_event(\n                    \"conversation\", \"completed\", conversation.organization_id, db,\n                    conversation_id=conversation_id,\n                    voice_agent_id=conversation.voice_agent_id,\n                    properties=metrics\n                )\n                \n                # Update voice agent statistics\n                await self._update_agent_statistics(conversation.voice_agent_id, metrics, db)\n                \n                logger.info(f\"Processed analytics for conversation {conversation_id}\")\n                return {\"status\": \"processed\", \"metrics\": metrics}\n        \n        return asyncio.run(process_analytics())\n        \n    except Exception as e:\n        logger.error(f\"Failed to process conversation analytics: {e}\")\n        raise\n\n\n@celery_app.task(bind=True, base=VoiceTask)\ndef optimize_voice_agent_performance(\n    self,\n    agent_id: str\n):\n    \"\"\"Optimize voice agent performance based on recent data\"\"\"\n    try:\n        async def optimize_performance():\n            async with AsyncSessionLocal() as db:\n                from sqlalchemy import select, and_\n                \n                # Get voice agent\n                agent_stmt = select(VoiceAgent).where(VoiceAgent.id == agent_id)\n                agent_result = await db.execute(agent_stmt)\n                agent = agent_result.scalar_one_or_none()\n                \n                if not agent:\n                    return {\"status\": \"agent_not_found\"}\n                \n                # Get recent conversations for analysis\n                recent_cutoff = datetime.utcnow() - timedelta(days=7)\n                conv_stmt = select(Conversation).where(\n                    and_(\n                        Conversation.voice_agent_id == agent_id,\n                        Conversation.started_at >= recent_cutoff\n                    )\n                )\n                \n                conv_result = await db.execute(conv_stmt)\n                conversations = conv_result.scalars().all()\n                \n                if len(conversations) < 5:\n                    return {\"status\": \"insufficient_data\"}\n                \n                # Analyze performance metrics\n                performance_analysis = self._analyze_agent_performance(conversations)\n                \n                # Generate optimization recommendations\n                optimizations = self._generate_optimizations(performance_analysis)\n                \n                # Apply automatic optimizations if safe\n                applied_optimizations = await self._apply_safe_optimizations(\n                    agent, optimizations, db\n                )\n                \n                logger.info(f\"Optimized agent {agent_id}: {applied_optimizations} changes applied\")\n                return {\n                    \"status\": \"optimized\",\n                    \"analysis\": performance_analysis,\n                    \"recommendations\": optimizations,\n                    \"applied\": applied_optimizations\n                }\n        \n        return asyncio.run(optimize_performance())\n        \n    except Exception as e:\n        logger.error(f\"Voice agent optimization failed: {e}\")\n        raise\n\n\n@celery_app.task(bind=True, base=VoiceTask)\ndef generate_voice_performance_report(\n    self,\n    organization_id: str,\n    days: int = 7\n):\n    \"\"\"Generate voice performance reports\"\"\"\n    try:\n        async def generate_report():\n            async with AsyncSessionLocal() as db:\n                # Get voice agent performance\n                agent_performance = await self.analytics_service.get_voice_agent_performance(\n                    organization_id, db, days=days\n                )\n                \n                # Get conversation metrics\n                conversation_metrics = await self.analytics_service.get_conversation_metrics(\n                    organization_id, db, days=days\n                )\n                \n                # Generate insights and recommendations\n                insights = self._generate_performance_insights(\n                    agent_performance, conversation_metrics\n                )\n                \n                # Store report\n                report = {\n                    \"organization_id\": organization_id,\n                    \"generated_at\": datetime.utcnow().isoformat(),\n                    \"period_days\": days,\n                    \"agent_performance\": agent_performance,\n                    \"conversation_metrics\": conversation_metrics,\n                    \"insights\": insights\n                }\n                \n                # Cache report for quick access\n                from app.core.cache import cache_analytics_data\n                await cache_analytics_data(\n                    organization_id, f\"voice_performance_report_{days}d\", report, ttl=3600\n                )\n                \n                logger.info(f\"Generated voice performance report for org {organization_id}\")\n                return report\n        \n        return asyncio.run(generate_report())\n        \n    except Exception as e:\n        logger.error(f\"Voice performance report generation failed: {e}\")\n        raise\n\n\n@celery_app.task(bind=True, base=VoiceTask)\ndef process_voice_quality_metrics(\n    self,\n    conversation_id: str,\n    audio_quality_data: Dict[str, Any]\n):\n    \"\"\"Process voice quality metrics for conversation\"\"\"\n    try:\n        async def process_quality():\n            async with AsyncSessionLocal() as db:\n                from sqlalchemy import select\n                \n                # Get conversation\n                stmt = select(Conversation).where(Conversation.id == conversation_id)\n                result = await db.execute(stmt)\n                conversation = result.scalar_one_or_none()\n                \n                if not conversation:\n                    return {\"status\": \"conversation_not_found\"}\n                \n                # Process quality metrics\n                quality_score = self._calculate_quality_score(audio_quality_data)\n                \n                # Update conversation with quality data\n                if not conversation.metadata:\n                    conversation.metadata = {}\n                \n                conversation.metadata[\"audio_quality\"] = {\n                    \"score\": quality_score,\n                    \"metrics\": audio_quality_data,\n                    \"processed_at\": datetime.utcnow().isoformat()\n                }\n                \n                await db.commit()\n                \n                # Track quality analytics\n                await self.analytics_service.track_event(\n                    \"voice\", \"quality_processed\", conversation.organization_id, db,\n                    conversation_id=conversation_id,\n                    properties={\n                        \"quality_score\": quality_score,\n                        \"audio_duration\": audio_quality_data.get(\"duration_seconds\", 0)\n                    }\n                )\n                \n                logger.info(f\"Processed voice quality for conversation {conversation_id}\")\n                return {\"status\": \"processed\", \"quality_score\": quality_score}\n        \n        return asyncio.run(process_quality())\n        \n    except Exception as e:\n        logger.error(f\"Voice quality processing failed: {e}\")\n        raise\n\n\n@celery_app.task(bind=True, base=VoiceTask)\ndef update_voice_agent_availability(\n    self,\n    agent_id: str\n):\n    \"\"\"Update voice agent availability based on performance and load\"\"\"\n    try:\n        async def update_availability():\n            async with AsyncSessionLocal() as db:\n                from sqlalchemy import select, and_\n                \n                # Get voice agent\n                agent_stmt = select(VoiceAgent).where(VoiceAgent.id == agent_id)\n                agent_result = await db.execute(agent_stmt)\n                agent = agent_result.scalar_one_or_none()\n                \n                if not agent:\n                    return {\"status\": \"agent_not_found\"}\n                \n                # Check current load (active conversations)\n                now = datetime.utcnow()\n                active_conv_stmt = select(Conversation).where(\n                    and_(\n                        Conversation.voice_agent_id == agent_id,\n                        Conversation.is_active == True\n                    )\n                )\n                \n                active_result = await db.execute(active_conv_stmt)\n                active_conversations = active_result.scalars().all()\n                \n                current_load = len(active_conversations)\n                max_concurrent = agent.max_concurrent_calls or 5\n                \n                # Update availability status\n                if current_load >= max_concurrent:\n                    agent.availability_status = \"busy\"\n                elif current_load >= max_concurrent * 0.8:\n                    agent.availability_status = \"limited\"\n                else:\n                    agent.availability_status = \"available\"\n                \n                # Update last_activity\n                agent.last_activity = now\n                \n                await db.commit()\n                \n                # Cache status for quick access\n                from app.core.cache import cache_voice_agent_status\n                await cache_voice_agent_status(\n                    agent_id,\n                    {\n                        \"availability_status\": agent.availability_status,\n                        \"current_load\": current_load,\n                        \"max_concurrent\": max_concurrent,\n                        \"last_updated\": now.isoformat()\n                    },\n                    ttl=30\n                )\n                \n                logger.debug(f\"Updated availability for agent {agent_id}: {agent.availability_status}\")\n                return {\n                    \"status\": \"updated\",\n                    \"availability\": agent.availability_status,\n                    \"load\": f\"{current_load}/{max_concurrent}\"\n                }\n        \n        return asyncio.run(update_availability())\n        \n    except Exception as e:\n        logger.error(f\"Voice agent availability update failed: {e}\")\n        raise\n\n\n# Helper methods\nasync def _update_agent_statistics(self, agent_id: str, metrics: Dict[str, Any], db):\n    \"\"\"Update voice agent statistics\"\"\"\n    try:\n        from sqlalchemy import select\n        \n        stmt = select(VoiceAgent).where(VoiceAgent.id == agent_id)\n        result = await db.execute(stmt)\n        agent = result.scalar_one_or_none()\n        \n        if agent:\n            # Update total conversations\n            agent.total_conversations = (agent.total_conversations or 0) + 1\n            \n            # Update success rate (if lead was generated)\n            if metrics.get(\"lead_generated\"):\n                agent.successful_calls = (agent.successful_calls or 0) + 1\n            \n            # Calculate success rate\n            if agent.total_conversations > 0:\n                agent.success_rate = (agent.successful_calls or 0) / agent.total_conversations * 100\n            \n            # Update average call duration\n            duration = metrics.get(\"duration_seconds\", 0)\n            if duration > 0:\n                current_avg = agent.average_call_duration or 0\n                total_calls = agent.total_conversations\n                agent.average_call_duration = (\n                    (current_avg * (total_calls - 1)) + duration\n                ) / total_calls\n            \n            agent.last_activity = datetime.utcnow()\n            await db.commit()\n    \n    except Exception as e:\n        logger.error(f\"Failed to update agent statistics: {e}\")\n\n\ndef _analyze_agent_performance(self, conversations: List[Conversation]) -> Dict[str, Any]:\n    \"\"\"Analyze agent performance from recent conversations\"\"\"\n    if not conversations:\n        return {}\n    \n    total_conversations = len(conversations)\n    completed_conversations = len([c for c in conversations if c.status == ConversationStatus.COMPLETED])\n    leads_generated = len([c for c in conversations if c.lead_id])\n    \n    # Duration analysis\n    durations = [c.duration_seconds for c in conversations if c.duration_seconds]\n    avg_duration = sum(durations) / len(durations) if durations else 0\n    \n    # Sentiment analysis\n    sentiments = [c.sentiment_score for c in conversations if c.sentiment_score is not None]\n    avg_sentiment = sum(sentiments) / len(sentiments) if sentiments else 0\n    \n    # Transfer rate\n    transfers = len([c for c in conversations if c.transferred_to_human])\n    \n    return {\n        \"total_conversations\": total_conversations,\n        \"completion_rate\": (completed_conversations / total_conversations) * 100,\n        \"lead_conversion_rate\": (leads_generated / total_conversations) * 100,\n        \"average_duration\": avg_duration,\n        \"average_sentiment\": avg_sentiment,\n        \"transfer_rate\": (transfers / total_conversations) * 100,\n        \"performance_score\": self._calculate_performance_score(\n            completed_conversations / total_conversations,\n            leads_generated / total_conversations,\n            avg_sentiment\n        )\n    }\n\n\ndef _calculate_performance_score(self, completion_rate: float, conversion_rate: float, sentiment: float) -> float:\n    \"\"\"Calculate overall performance score\"\"\"\n    # Weighted performance score\n    score = (\n        (completion_rate * 0.3) +\n        (conversion_rate * 0.4) +\n        ((sentiment + 1) * 50 * 0.3)  # Normalize sentiment to 0-100 scale\n    )\n    return max(0, min(100, score))\n\n\ndef _generate_optimizations(self, performance_analysis: Dict[str, Any]) -> List[Dict[str, Any]]:\n    \"\"\"Generate optimization recommendations\"\"\"\n    optimizations = []\n    \n    # Completion rate optimization\n    if performance_analysis.get(\"completion_rate\", 0) < 70:\n        optimizations.append({\n            \"type\": \"completion_rate\",\n            \"recommendation\": \"Improve conversation flow to reduce drop-offs\",\n            \"priority\": \"high\",\n            \"action\": \"review_conversation_scripts\"\n        })\n    \n    # Conversion rate optimization\n    if performance_analysis.get(\"lead_conversion_rate\", 0) < 20:\n        optimizations.append({\n            \"type\": \"conversion_rate\",\n            \"recommendation\": \"Enhance qualification questions and lead capture\",\n            \"priority\": \"high\",\n            \"action\": \"update_qualification_process\"\n        })\n    \n    # Sentiment optimization\n    if performance_analysis.get(\"average_sentiment\", 0) < -0.1:\n        optimizations.append({\n            \"type\": \"sentiment\",\n            \"recommendation\": \"Improve conversation tone and empathy\",\n            \"priority\": \"medium\",\n            \"action\": \"adjust_response_style\"\n        })\n    \n    # Duration optimization\n    avg_duration = performance_analysis.get(\"average_duration\", 0)\n    if avg_duration > 600:  # 10 minutes\n        optimizations.append({\n            \"type\": \"duration\",\n            \"recommendation\": \"Optimize conversation length for efficiency\",\n            \"priority\": \"medium\",\n            \"action\": \"streamline_conversation_flow\"\n        })\n    elif avg_duration < 60:  # 1 minute\n        optimizations.append({\n            \"type\": \"duration\",\n            \"recommendation\": \"Increase engagement time to improve qualification\",\n            \"priority\": \"medium\",\n            \"action\": \"extend_qualification_process\"\n        })\n    \n    return optimizations\n\n\nasync def _apply_safe_optimizations(\n    self, \n    agent: VoiceAgent, \n    optimizations: List[Dict[str, Any]], \n    db\n) -> int:\n    \"\"\"Apply safe, automatic optimizations\"\"\"\n    applied_count = 0\n    \n    for optimization in optimizations:\n        try:\n            if optimization[\"action\"] == \"adjust_response_style\" and optimization[\"priority\"] == \"medium\":\n                # Safely adjust response style parameters\n                if not agent.conversation_settings:\n                    agent.conversation_settings = {}\n                \n                # Make conversation slightly more empathetic\n                agent.conversation_settings[\"empathy_level\"] = min(\n                    agent.conversation_settings.get(\"empathy_level\", 0.5) + 0.1,\n                    1.0\n                )\n                applied_count += 1\n            \n            # Add more safe optimizations here\n            \n        except Exception as e:\n            logger.error(f\"Failed to apply optimization {optimization['type']}: {e}\")\n            continue\n    \n    if applied_count > 0:\n        await db.commit()\n    \n    return applied_count\n\n\ndef _generate_performance_insights(\n    self, \n    agent_performance: List[Dict[str, Any]], \n    conversation_metrics: Dict[str, Any]\n) -> Dict[str, Any]:\n    \"\"\"Generate performance insights from data\"\"\"\n    insights = {\n        \"top_performing_agents\": [],\n        \"areas_for_improvement\": [],\n        \"trending_metrics\": {},\n        \"recommendations\": []\n    }\n    \n    if agent_performance:\n        # Sort by performance score\n        sorted_agents = sorted(\n            agent_performance, \n            key=lambda x: x.get(\"lead_conversion_rate\", 0), \n            reverse=True\n        )\n        \n        insights[\"top_performing_agents\"] = sorted_agents[:3]\n        \n        # Identify improvement areas\n        avg_conversion = sum(a.get(\"lead_conversion_rate\", 0) for a in agent_performance) / len(agent_performance)\n        avg_sentiment = sum(a.get(\"average_sentiment_score\", 0) for a in agent_performance) / len(agent_performance)\n        \n        if avg_conversion < 25:\n            insights[\"areas_for_improvement\"].append(\"Overall lead conversion rate is below target\")\n        \n        if avg_sentiment < 0.1:\n            insights[\"areas_for_improvement\"].append(\"Customer sentiment scores need improvement\")\n    \n    # Add conversation-level insights\n    completion_rate = conversation_metrics.get(\"completion_rate\", 0)\n    if completion_rate < 80:\n        insights[\"recommendations\"].append(\"Focus on reducing conversation drop-off rates\")\n    \n    transfer_rate = conversation_metrics.get(\"transfer_rate\", 0)\n    if transfer_rate > 15:\n        insights[\"recommendations\"].append(\"High transfer rate indicates need for agent training\")\n    \n    return insights\n\n\ndef _calculate_quality_score(self, audio_data: Dict[str, Any]) -> float:\n    \"\"\"Calculate audio quality score from metrics\"\"\"\n    # This would analyze actual audio metrics\n    # For now, return a mock score based on available data\n    \n    score = 100.0\n    \n    # Penalize for poor audio quality indicators\n    if audio_data.get(\"noise_level\", 0) > 0.3:\n        score -= 20\n    \n    if audio_data.get(\"clarity_score\", 1.0) < 0.7:\n        score -= 15\n    \n    if audio_data.get(\"volume_consistency\", 1.0) < 0.8:\n        score -= 10\n    \n    return max(0, min(100, score))
\ No newline at end of file
+                stale_stmt = select(Conversation).where(
+                    and_(
+                        Conversation.is_active == True,
+                        Conversation.started_at < stale_cutoff
+                    )
+                )
+                
+                stale_result = await db.execute(stale_stmt)
+                stale_conversations = stale_result.scalars().all()
+                
+                stale_count = 0
+                for conv in stale_conversations:
+                    try:
+                        # Mark as ended due to timeout
+                        conv.status = ConversationStatus.ENDED
+                        conv.is_active = False
+                        conv.ended_at = now
+                        conv.duration_seconds = int((now - conv.started_at).total_seconds())
+                        
+                        # Add timeout note
+                        if not conv.notes:
+                            conv.notes = ""
+                        conv.notes += f"\n[{now.isoformat()}] Conversation ended due to inactivity timeout"
+                        
+                        stale_count += 1
+                        
+                    except Exception as e:
+                        logger.error(f"Failed to cleanup conversation {conv.id}: {e}")
+                        continue
+                
+                # Get old conversations for archival
+                archive_stmt = select(Conversation).where(
+                    and_(
+                        Conversation.started_at < archive_cutoff,
+                        Conversation.archived == False
+                    )
+                )
+                
+                archive_result = await db.execute(archive_stmt)
+                archive_conversations = archive_result.scalars().all()
+                
+                archive_count = 0
+                for conv in archive_conversations:
+                    try:
+                        conv.archived = True
+                        archive_count += 1
+                    except Exception as e:
+                        logger.error(f"Failed to archive conversation {conv.id}: {e}")
+                        continue
+                
+                await db.commit()
+                
+                logger.info(f"Cleaned up {stale_count} stale conversations, archived {archive_count} old conversations")
+                return {"stale_cleaned": stale_count, "archived": archive_count}
+        
+        return cleanup()
+        
+    except Exception as e:
+        logger.error(f"Conversation cleanup failed: {e}")
+        raise
+
+
+@celery_app.task(bind=True, base=VoiceTask)
+def process_conversation_analytics(
+    self,
+    conversation_id: str
+):
+    """Process analytics for completed conversation"""
+    try:
+        @in_worker_loop
+        async def process_analytics():
+            async with AsyncSessionLocal() as db:
+                from sqlalchemy import select
+                
+                # Get conversation
+                stmt = select(Conversation).where(Conversation.id == conversation_id)
+                result = await db.execute(stmt)
+                conversation = result.scalar_one_or_none()
+                
+                if not conversation:
+                    logger.warning(f"Conversation {conversation_id} not found")
+                    return {"status": "conversation_not_found"}
+                
+                # Calculate conversation metrics
+                metrics = {
+                    "duration_seconds": conversation.duration_seconds or 0,
+                    "status": conversation.status.value,
+                    "lead_generated": bool(conversation.lead_id),
+                    "sentiment_score": conversation.sentiment_score,
+                    "transferred_to_human": conversation.transferred_to_human,
+                    "voice_agent_id": conversation.voice_agent_id,
+                    "organization_id": conversation.organization_id
+                }
+                
+                # Track analytics event
+                await self.analytics_service.track_event(
+                    "conversation", "completed", conversation.organization_id, db,
+                    conversation_id=conversation_id,
+                    voice_agent_id=conversation.voice_agent_id,
+                    properties=metrics
+                )
+                
+                # Update voice agent statistics
+                await self._update_agent_statistics(conversation.voice_agent_id, metrics, db)
+                
+                logger.info(f"Processed analytics for conversation {conversation_id}")
+                return {"status": "processed", "metrics": metrics}
+        
+        return process_analytics()
+        
+    except Exception as e:
+        logger.error(f"Failed to process conversation analytics: {e}")
+        raise
+
+
+@celery_app.task(bind=True, base=VoiceTask)
+def optimize_voice_agent_performance(
+    self,
+    agent_id: str
+):
+    """Optimize voice agent performance based on recent data"""
+    try:
+        @in_worker_loop
+        async def optimize_performance():
+            async with AsyncSessionLocal() as db:
+                from sqlalchemy import select, and_
+                
+                # Get voice agent
+                agent_stmt = select(VoiceAgent).where(VoiceAgent.id == agent_id)
+                agent_result = await db.execute(agent_stmt)
+                agent = agent_result.scalar_one_or_none()
+                
+                if not agent:
+                    return {"status": "agent_not_found"}
+                
+                # Get recent conversations for analysis
+                recent_cutoff = datetime.utcnow() - timedelta(days=7)
+                conv_stmt = select(Conversation).where(
+                    and_(
+                        Conversation.voice_agent_id == agent_id,
+                        Conversation.started_at >= recent_cutoff
+                    )
+                )
+                
+                conv_result = await db.execute(conv_stmt)
+                conversations = conv_result.scalars().all()
+                
+                if len(conversations) < 5:
+                    return {"status": "insufficient_data"}
+                
+                # Analyze performance metrics
+                performance_analysis = self._analyze_agent_performance(conversations)
+                
+                # Generate optimization recommendations
+                optimizations = self._generate_optimizations(performance_analysis)
+                
+                # Apply automatic optimizations if safe
+                applied_optimizations = await self._apply_safe_optimizations(
+                    agent, optimizations, db
+                )
+                
+                logger.info(f"Optimized agent {agent_id}: {applied_optimizations} changes applied")
+                return {
+                    "status": "optimized",
+                    "analysis": performance_analysis,
+                    "recommendations": optimizations,
+                    "applied": applied_optimizations
+                }
+        
+        return optimize_performance()
+        
+    except Exception as e:
+        logger.error(f"Voice agent optimization failed: {e}")
+        raise
+
+
+@celery_app.task(bind=True, base=VoiceTask)
+def generate_voice_performance_report(
+    self,
+    organization_id: str,
+    days: int = 7
+):
+    """Generate voice performance reports"""
+    try:
+        @in_worker_loop
+        async def generate_report():
+            async with AsyncSessionLocal() as db:
+                # Get voice agent performance
+                agent_performance = await self.analytics_service.get_voice_agent_performance(
+                    organization_id, db, days=days
+                )
+                
+                # Get conversation metrics
+                conversation_metrics = await self.analytics_service.get_conversation_metrics(
+                    organization_id, db, days=days
+                )
+                
+                # Generate insights and recommendations
+                insights = self._generate_performance_insights(
+                    agent_performance, conversation_metrics
+                )
+                
+                # Store report
+                report = {
+                    "organization_id": organization_id,
+                    "generated_at": datetime.utcnow().isoformat(),
+                    "period_days": days,
+                    "agent_performance": agent_performance,
+                    "conversation_metrics": conversation_metrics,
+                    "insights": insights
+                }
+                
+                # Cache report for quick access
+                from app.core.cache import cache_analytics_data
+                await cache_analytics_data(
+                    organization_id, f"voice_performance_report_{days}d", report, ttl=3600
+                )
+                
+                logger.info(f"Generated voice performance report for org {organization_id}")
+                return report
+        
+        return generate_report()
+        
+    except Exception as e:
+        logger.error(f"Voice performance report generation failed: {e}")
+        raise
+
+
+@celery_app.task(bind=True, base=VoiceTask)
+def process_voice_quality_metrics(
+    self,
+    conversation_id: str,
+    audio_quality_data: Dict[str, Any]
+):
+    """Process voice quality metrics for conversation"""
+    try:
+        @in_worker_loop
+        async def process_quality():
+            async with AsyncSessionLocal() as db:
+                from sqlalchemy import select
+                
+                # Get conversation
+                stmt = select(Conversation).where(Conversation.id == conversation_id)
+                result = await db.execute(stmt)
+                conversation = result.scalar_one_or_none()
+                
+                if not conversation:
+                    return {"status": "conversation_not_found"}
+                
+                # Process quality metrics
+                quality_score = self._calculate_quality_score(audio_quality_data)
+                
+                # Update conversation with quality data
+                if not conversation.metadata:
+                    conversation.metadata = {}
+                
+                conversation.metadata["audio_quality"] = {
+                    "score": quality_score,
+                    "metrics": audio_quality_data,
+                    "processed_at": datetime.utcnow().isoformat()
+                }
+                
+                await db.commit()
+                
+                # Track quality analytics
+                await self.analytics_service.track_event(
+                    "voice", "quality_processed", conversation.organization_id, db,
+                    conversation_id=conversation_id,
+                    properties={
+                        "quality_score": quality_score,
+                        "audio_duration": audio_quality_data.get("duration_seconds", 0)
+                    }
+                )
+                
+                logger.info(f"Processed voice quality for conversation {conversation_id}")
+                return {"status": "processed", "quality_score": quality_score}
+        
+        return process_quality()
+        
+    except Exception as e:
+        logger.error(f"Voice quality processing failed: {e}")
+        raise
+
+
+@celery_app.task(bind=True, base=VoiceTask)
+def update_voice_agent_availability(
+    self,
+    agent_id: str
+):
+    """Update voice agent availability based on performance and load"""
+    try:
+        @in_worker_loop
+        async def update_availability():
+            async with AsyncSessionLocal() as db:
+                from sqlalchemy import select, and_
+                
+                # Get voice agent
+                agent_stmt = select(VoiceAgent).where(VoiceAgent.id == agent_id)
+                agent_result = await db.execute(agent_stmt)
+                agent = agent_result.scalar_one_or_none()
+                
+                if not agent:
+                    return {"status": "agent_not_found"}
+                
+                # Check current load (active conversations)
+                now = datetime.utcnow()
+                active_conv_stmt = select(Conversation).where(
+                    and_(
+                        Conversation.voice_agent_id == agent_id,
+                        Conversation.is_active == True
+                    )
+                )
+                
+                active_result = await db.execute(active_conv_stmt)
+                active_conversations = active_result.scalars().all()
+                
+                current_load = len(active_conversations)
+                max_concurrent = agent.max_concurrent_calls or 5
+                
+                # Update availability status
+                if current_load >= max_concurrent:
+                    agent.availability_status = "busy"
+                elif current_load >= max_concurrent * 0.8:
+                    agent.availability_status = "limited"
+                else:
+                    agent.availability_status = "available"
+                
+                # Update last_activity
+                agent.last_activity = now
+                
+                await db.commit()
+                
+                # Cache status for quick access
+                from app.core.cache import cache_voice_agent_status
+                await cache_voice_agent_status(
+                    agent_id,
+                    {
+                        "availability_status": agent.availability_status,
+                        "current_load": current_load,
+                        "max_concurrent": max_concurrent,
+                        "last_updated": now.isoformat()
+                    },
+                    ttl=30
+                )
+                
+                logger.debug(f"Updated availability for agent {agent_id}: {agent.availability_status}")
+                return {
+                    "status": "updated",
+                    "availability": agent.availability_status,
+                    "load": f"{current_load}/{max_concurrent}"
+                }
+        
+        return update_availability()
+        
+    except Exception as e:
+        logger.error(f"Voice agent availability update failed: {e}")
+        raise
+
+
+# Helper methods
+async def _update_agent_statistics(self, agent_id: str, metrics: Dict[str, Any], db):
+    """Update voice agent statistics"""
+    try:
+        from sqlalchemy import select
+        
+        stmt = select(VoiceAgent).where(VoiceAgent.id == agent_id)
+        result = await db.execute(stmt)
+        agent = result.scalar_one_or_none()
+        
+        if agent:
+            # Update total conversations
+            agent.total_conversations = (agent.total_conversations or 0) + 1
+            
+            # Update success rate (if lead was generated)
+            if metrics.get("lead_generated"):
+                agent.successful_calls = (agent.successful_calls or 0) + 1
+            
+            # Calculate success rate
+            if agent.total_conversations > 0:
+                agent.success_rate = (agent.successful_calls or 0) / agent.total_conversations * 100
+            
+            # Update average call duration
+            duration = metrics.get("duration_seconds", 0)
+            if duration > 0:
+                current_avg = agent.average_call_duration or 0
+                total_calls = agent.total_conversations
+                agent.average_call_duration = (
+                    (current_avg * (total_calls - 1)) + duration
+                ) / total_calls
+            
+            agent.last_activity = datetime.utcnow()
+            await db.commit()
+    
+    except Exception as e:
+        logger.error(f"Failed to update agent statistics: {e}")
+
+
+def _analyze_agent_performance(self, conversations: List[Conversation]) -> Dict[str, Any]:
+    """Analyze agent performance from recent conversations"""
+    if not conversations:
+        return {}
+    
+    total_conversations = len(conversations)
+    completed_conversations = len([c for c in conversations if c.status == ConversationStatus.COMPLETED])
+    leads_generated = len([c for c in conversations if c.lead_id])
+    
+    # Duration analysis
+    durations = [c.duration_seconds for c in conversations if c.duration_seconds]
+    avg_duration = sum(durations) / len(durations) if durations else 0
+    
+    # Sentiment analysis
+    sentiments = [c.sentiment_score for c in conversations if c.sentiment_score is not None]
+    avg_sentiment = sum(sentiments) / len(sentiments) if sentiments else 0
+    
+    # Transfer rate
+    transfers = len([c for c in conversations if c.transferred_to_human])
+    
+    return {
+        "total_conversations": total_conversations,
+        "completion_rate": (completed_conversations / total_conversations) * 100,
+        "lead_conversion_rate": (leads_generated / total_conversations) * 100,
+        "average_duration": avg_duration,
+        "average_sentiment": avg_sentiment,
+        "transfer_rate": (transfers / total_conversations) * 100,
+        "performance_score": self._calculate_performance_score(
+            completed_conversations / total_conversations,
+            leads_generated / total_conversations,
+            avg_sentiment
+        )
+    }
+
+
+def _calculate_performance_score(self, completion_rate: float, conversion_rate: float, sentiment: float) -> float:
+    """Calculate overall performance score"""
+    # Weighted performance score
+    score = (
+        (completion_rate * 0.3) +
+        (conversion_rate * 0.4) +
+        ((sentiment + 1) * 50 * 0.3)  # Normalize sentiment to 0-100 scale
+    )
+    return max(0, min(100, score))
+
+
+def _generate_optimizations(self, performance_analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Generate optimization recommendations"""
+    optimizations = []
+    
+    # Completion rate optimization
+    if performance_analysis.get("completion_rate", 0) < 70:
+        optimizations.append({
+            "type": "completion_rate",
+            "recommendation": "Improve conversation flow to reduce drop-offs",
+            "priority": "high",
+            "action": "review_conversation_scripts"
+        })
+    
+    # Conversion rate optimization
+    if performance_analysis.get("lead_conversion_rate", 0) < 20:
+        optimizations.append({
+            "type": "conversion_rate",
+            "recommendation": "Enhance qualification questions and lead capture",
+            "priority": "high",
+            "action": "update_qualification_process"
+        })
+    
+    # Sentiment optimization
+    if performance_analysis.get("average_sentiment", 0) < -0.1:
+        optimizations.append({
+            "type": "sentiment",
+            "recommendation": "Improve conversation tone and empathy",
+            "priority": "medium",
+            "action": "adjust_response_style"
+        })
+    
+    # Duration optimization
+    avg_duration = performance_analysis.get("average_duration", 0)
+    if avg_duration > 600:  # 10 minutes
+        optimizations.append({
+            "type": "duration",
+            "recommendation": "Optimize conversation length for efficiency",
+            "priority": "medium",
+            "action": "streamline_conversation_flow"
+        })
+    elif avg_duration < 60:  # 1 minute
+        optimizations.append({
+            "type": "duration",
+            "recommendation": "Increase engagement time to improve qualification",
+            "priority": "medium",
+            "action": "extend_qualification_process"
+        })
+    
+    return optimizations
+
+
+async def _apply_safe_optimizations(
+    self, 
+    agent: VoiceAgent, 
+    optimizations: List[Dict[str, Any]], 
+    db
+) -> int:
+    """Apply safe, automatic optimizations"""
+    applied_count = 0
+    
+    for optimization in optimizations:
+        try:
+            if optimization["action"] == "adjust_response_style" and optimization["priority"] == "medium":
+                # Safely adjust response style parameters
+                if not agent.conversation_settings:
+                    agent.conversation_settings = {}
+                
+                # Make conversation slightly more empathetic
+                agent.conversation_settings["empathy_level"] = min(
+                    agent.conversation_settings.get("empathy_level", 0.5) + 0.1,
+                    1.0
+                )
+                applied_count += 1
+            
+            # Add more safe optimizations here
+            
+        except Exception as e:
+            logger.error(f"Failed to apply optimization {optimization['type']}: {e}")
+            continue
+    
+    if applied_count > 0:
+        await db.commit()
+    
+    return applied_count
+
+
+def _generate_performance_insights(
+    self, 
+    agent_performance: List[Dict[str, Any]], 
+    conversation_metrics: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Generate performance insights from data"""
+    insights = {
+        "top_performing_agents": [],
+        "areas_for_improvement": [],
+        "trending_metrics": {},
+        "recommendations": []
+    }
+    
+    if agent_performance:
+        # Sort by performance score
+        sorted_agents = sorted(
+            agent_performance, 
+            key=lambda x: x.get("lead_conversion_rate", 0), 
+            reverse=True
+        )
+        
+        insights["top_performing_agents"] = sorted_agents[:3]
+        
+        # Identify improvement areas
+        avg_conversion = sum(a.get("lead_conversion_rate", 0) for a in agent_performance) / len(agent_performance)
+        avg_sentiment = sum(a.get("average_sentiment_score", 0) for a in agent_performance) / len(agent_performance)
+        
+        if avg_conversion < 25:
+            insights["areas_for_improvement"].append("Overall lead conversion rate is below target")
+        
+        if avg_sentiment < 0.1:
+            insights["areas_for_improvement"].append("Customer sentiment scores need improvement")
+    
+    # Add conversation-level insights
+    completion_rate = conversation_metrics.get("completion_rate", 0)
+    if completion_rate < 80:
+        insights["recommendations"].append("Focus on reducing conversation drop-off rates")
+    
+    transfer_rate = conversation_metrics.get("transfer_rate", 0)
+    if transfer_rate > 15:
+        insights["recommendations"].append("High transfer rate indicates need for agent training")
+    
+    return insights
+
+
+def _calculate_quality_score(self, audio_data: Dict[str, Any]) -> float:
+    """Calculate audio quality score from metrics"""
+    # This would analyze actual audio metrics
+    # For now, return a mock score based on available data
+    
+    score = 100.0
+    
+    # Penalize for poor audio quality indicators
+    if audio_data.get("noise_level", 0) > 0.3:
+        score -= 20
+    
+    if audio_data.get("clarity_score", 1.0) < 0.7:
+        score -= 15
+    
+    if audio_data.get("volume_consistency", 1.0) < 0.8:
+        score -= 10
+    
+    return max(0, min(100, score))
\ No newline at end of file
@@ -6,6 +6,8 @@ Common utilities and helpers for the application
 from .circuit_breaker import CircuitBreaker, CircuitBreakerException, MultiServiceCircuitBreaker
 from .rate_limiter import RateLimiter, RateLimitExceeded, MultiKeyRateLimiter, rate_limit
 from .retry_decorator import retry_async, retry_sync, RetryExhausted, RetryContext, retry_call
+from .streaming import encode_stream, gzip_stream
+from .pagination import encode_cursor, decode_cursor, keyset_after
 
 __all__ = [
     "CircuitBreaker",
@@ -19,5 +21,10 @@ __all__ = [
     "retry_sync",
     "RetryExhausted",
     "RetryContext",
-    "retry_call"
+    "retry_call",
+    "encode_stream",
+    "gzip_stream",
+    "encode_cursor",
+    "decode_cursor",
+    "keyset_after"
 ]
\ No newline at end of file
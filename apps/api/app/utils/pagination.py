@@ -0,0 +1,40 @@
+"""
+Keyset pagination helpers
+Opaque cursors over a (timestamp, id) sort key
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.sql import ColumnElement
+
+
+def encode_cursor(sort_value: datetime, row_id: str) -> str:
+    """Encode the sort key of the last row on a page as an opaque token"""
+    payload = json.dumps([sort_value.isoformat(), str(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a cursor token; raises ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(sort_value), str(row_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+
+def keyset_after(sort_column, id_column, cursor: Optional[str]) -> Optional[ColumnElement]:
+    """Condition selecting rows after the cursor in `sort DESC, id DESC` order.
+
+    Uses a row-value comparison, which PostgreSQL answers with a range scan
+    on a (..., sort, id) index, so every page costs the same as the first.
+    """
+    if not cursor:
+        return None
+    sort_value, row_id = decode_cursor(cursor)
+    return tuple_(sort_column, id_column) < tuple_(sort_value, row_id)
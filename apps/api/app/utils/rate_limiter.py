@@ -1,17 +1,21 @@
 """
 Rate Limiter Implementation
-Token bucket and sliding window rate limiting
+Token bucket and sliding window rate limiting on a generic cell-rate (GCRA) core
 """
 
 import asyncio
 import time
 import logging
+from collections import OrderedDict
 from typing import Optional, Dict, Any
 from dataclasses import dataclass
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+# Keys kept by an in-memory limiter; least recently used are evicted
+DEFAULT_MAX_KEYS = 10000
+
 class RateLimitExceeded(Exception):
     """Raised when rate limit is exceeded"""
     pass
@@ -22,10 +26,161 @@ class RateLimitConfig:
     burst_size: int
     window_size: int = 60  # seconds
 
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    remaining: int
+    retry_after: float  # seconds until the request would be allowed; 0 if allowed
+    reset_after: float  # seconds until the full burst is available again
+
 class RateLimiterType(Enum):
     TOKEN_BUCKET = "token_bucket"
     SLIDING_WINDOW = "sliding_window"
 
+def gcra(tat: Optional[float], now: float, interval: float, capacity: int, cost: int = 1):
+    """
+    One GCRA decision from a key's theoretical arrival time (TAT)
+    
+    The TAT is when the key would be fully drained at the sustained rate;
+    a request is allowed while it lies no more than `capacity` intervals
+    ahead of now. This is a token bucket stored as one timestamp.
+    
+    Returns:
+        (RateLimitResult, new TAT to store or None if unchanged)
+    """
+    tolerance = interval * capacity
+    tat = now if tat is None or tat < now else tat
+    new_tat = tat + interval * cost
+    allow_at = new_tat - tolerance
+    
+    if allow_at > now:
+        return RateLimitResult(
+            allowed=False,
+            remaining=max(0, int((now - (tat - tolerance)) / interval + 1e-9)),
+            retry_after=allow_at - now,
+            reset_after=tat - now
+        ), None
+    
+    return RateLimitResult(
+        allowed=True,
+        remaining=int((now - allow_at) / interval + 1e-9),
+        retry_after=0.0,
+        reset_after=new_tat - now
+    ), new_tat
+
+class MemoryGCRAStore:
+    """
+    Theoretical arrival times in a bounded LRU dict
+    
+    Updates never await, so each decision is atomic within the event loop
+    and needs no lock.
+    """
+    
+    def __init__(self, max_keys: int = DEFAULT_MAX_KEYS):
+        self.max_keys = max_keys
+        self.tats: "OrderedDict[str, float]" = OrderedDict()
+    
+    def update_now(self, key: str, now: float, interval: float, capacity: int, cost: int = 1) -> RateLimitResult:
+        result, new_tat = gcra(self.tats.get(key), now, interval, capacity, cost)
+        if new_tat is not None:
+            self.tats[key] = new_tat
+            self.tats.move_to_end(key)
+            if len(self.tats) > self.max_keys:
+                self.tats.popitem(last=False)
+        return result
+    
+    async def update(self, key: str, now: float, interval: float, capacity: int, cost: int = 1) -> RateLimitResult:
+        return self.update_now(key, now, interval, capacity, cost)
+    
+    def peek(self, key: str) -> Optional[float]:
+        return self.tats.get(key)
+
+# GCRA in Redis: one string per key holding its TAT in milliseconds, expiring
+# once the key is fully drained. Numbers travel as strings because Redis
+# truncates Lua numbers to integers in replies.
+GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local capacity = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local tolerance = interval * capacity
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+local new_tat = tat + interval * cost
+local allow_at = new_tat - tolerance
+if allow_at > now then
+    local remaining = math.max(0, math.floor((now - (tat - tolerance)) / interval + 1e-9))
+    return {0, remaining, tostring(allow_at - now), tostring(tat - now)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.max(1, math.ceil(new_tat - now)))
+return {1, math.floor((now - allow_at) / interval + 1e-9), '0', tostring(new_tat - now)}
+"""
+
+class RedisGCRAStore:
+    """Theoretical arrival times in Redis, shared by every process"""
+    
+    def __init__(self, redis_client, prefix: str = "gcra:"):
+        self.redis = redis_client
+        self.prefix = prefix
+        self.script = redis_client.register_script(GCRA_SCRIPT)
+    
+    async def update(self, key: str, now: float, interval: float, capacity: int, cost: int = 1) -> RateLimitResult:
+        allowed, remaining, retry_after, reset_after = await self.script(
+            keys=[f"{self.prefix}{key}"],
+            args=[repr(now * 1000), repr(interval * 1000), capacity, cost]
+        )
+        return RateLimitResult(
+            allowed=bool(allowed),
+            remaining=int(remaining),
+            retry_after=float(retry_after) / 1000,
+            reset_after=float(reset_after) / 1000
+        )
+
+class GCRARateLimiter:
+    """
+    Per-key rate limiter storing a single timestamp per key
+    
+    Allows `requests_per_second` sustained with bursts of up to `burst_size`.
+    Memory is constant per key and each decision is O(1). With a Redis store,
+    decisions fall back to a local in-memory store while Redis errors.
+    """
+    
+    def __init__(
+        self,
+        requests_per_second: float,
+        burst_size: Optional[int] = None,
+        store: Any = None,
+        max_keys: int = DEFAULT_MAX_KEYS
+    ):
+        self.rate = requests_per_second
+        self.interval = 1.0 / requests_per_second
+        self.capacity = burst_size or max(1, int(requests_per_second * 2))
+        self.memory = MemoryGCRAStore(max_keys)
+        self.store = store or self.memory
+    
+    def check_now(self, key: str, cost: int = 1) -> RateLimitResult:
+        """Decide against the in-memory store, synchronously"""
+        return self.memory.update_now(key, time.time(), self.interval, self.capacity, cost)
+    
+    async def check(self, key: str, cost: int = 1) -> RateLimitResult:
+        """Decide one request for key, recording it if allowed"""
+        if self.store is self.memory:
+            return self.check_now(key, cost)
+        try:
+            return await self.store.update(key, time.time(), self.interval, self.capacity, cost)
+        except Exception as e:
+            logger.error(f"Rate limit store failed, using in-memory limits: {e}")
+            return self.check_now(key, cost)
+    
+    def available(self, key: str) -> float:
+        """Requests available now for a key in the in-memory store"""
+        tat = self.memory.peek(key)
+        if tat is None:
+            return float(self.capacity)
+        return max(0.0, self.capacity - max(0.0, tat - time.time()) / self.interval)
+
 class TokenBucketRateLimiter:
     """
     Token bucket rate limiter implementation
@@ -36,11 +191,9 @@ class TokenBucketRateLimiter:
         requests_per_second: float,
         burst_size: Optional[int] = None
     ):
+        self.gcra = GCRARateLimiter(requests_per_second, burst_size, max_keys=1)
         self.rate = requests_per_second
-        self.capacity = burst_size or int(requests_per_second * 2)
-        self.tokens = float(self.capacity)
-        self.last_refill = time.time()
-        self._lock = asyncio.Lock()
+        self.capacity = self.gcra.capacity
         
         logger.debug(f"Token bucket rate limiter: {requests_per_second}/s, burst: {self.capacity}")
     
@@ -57,28 +210,13 @@ class TokenBucketRateLimiter:
         Raises:
             RateLimitExceeded: When rate limit is exceeded
         """
-        async with self._lock:
-            now = time.time()
-            
-            # Refill bucket based on elapsed time
-            time_passed = now - self.last_refill
-            new_tokens = time_passed * self.rate
-            self.tokens = min(self.capacity, self.tokens + new_tokens)
-            self.last_refill = now
-            
-            # Check if enough tokens available
-            if self.tokens >= tokens:
-                self.tokens -= tokens
-                return True
-            else:
-                # Calculate wait time for tokens
-                needed_tokens = tokens - self.tokens
-                wait_time = needed_tokens / self.rate
-                
-                raise RateLimitExceeded(
-                    f"Rate limit exceeded. Need {tokens} tokens, have {self.tokens:.2f}. "
-                    f"Wait {wait_time:.2f}s"
-                )
+        result = self.gcra.check_now("bucket", tokens)
+        if not result.allowed:
+            raise RateLimitExceeded(
+                f"Rate limit exceeded. Need {tokens} tokens, have {self.gcra.available('bucket'):.2f}. "
+                f"Wait {result.retry_after:.2f}s"
+            )
+        return True
     
     async def try_acquire(self, tokens: int = 1) -> bool:
         """
@@ -101,13 +239,15 @@ class TokenBucketRateLimiter:
             "type": "token_bucket",
             "rate": self.rate,
             "capacity": self.capacity,
-            "current_tokens": self.tokens,
-            "last_refill": self.last_refill
+            "current_tokens": self.gcra.available("bucket")
         }
 
 class SlidingWindowRateLimiter:
     """
     Sliding window rate limiter implementation
+    
+    Approximated by GCRA: up to `requests_per_window` at once, refilling
+    evenly over the window, instead of a log of every request time.
     """
     
     def __init__(
@@ -117,8 +257,7 @@ class SlidingWindowRateLimiter:
     ):
         self.limit = requests_per_window
         self.window_size = window_size
-        self.requests = []
-        self._lock = asyncio.Lock()
+        self.gcra = GCRARateLimiter(requests_per_window / window_size, requests_per_window, max_keys=1)
         
         logger.debug(f"Sliding window rate limiter: {requests_per_window}/{window_size}s")
     
@@ -135,31 +274,13 @@ class SlidingWindowRateLimiter:
         Raises:
             RateLimitExceeded: When rate limit is exceeded
         """
-        async with self._lock:
-            now = time.time()
-            cutoff_time = now - self.window_size
-            
-            # Remove old requests outside window
-            self.requests = [req_time for req_time in self.requests if req_time > cutoff_time]
-            
-            # Check if we can accommodate new requests
-            if len(self.requests) + requests <= self.limit:
-                # Add new request timestamps
-                for _ in range(requests):
-                    self.requests.append(now)
-                return True
-            else:
-                # Calculate when oldest request will expire
-                if self.requests:
-                    oldest_request = min(self.requests)
-                    wait_time = oldest_request + self.window_size - now
-                else:
-                    wait_time = self.window_size
-                
-                raise RateLimitExceeded(
-                    f"Rate limit exceeded. {len(self.requests)}/{self.limit} requests in window. "
-                    f"Wait {wait_time:.2f}s"
-                )
+        result = self.gcra.check_now("window", requests)
+        if not result.allowed:
+            raise RateLimitExceeded(
+                f"Rate limit exceeded. {self.limit - result.remaining}/{self.limit} requests in window. "
+                f"Wait {result.retry_after:.2f}s"
+            )
+        return True
     
     async def try_acquire(self, requests: int = 1) -> bool:
         """Try to acquire without raising exception"""
@@ -170,16 +291,14 @@ class SlidingWindowRateLimiter:
     
     def get_stats(self) -> Dict[str, Any]:
         """Get rate limiter statistics"""
-        now = time.time()
-        cutoff_time = now - self.window_size
-        active_requests = [req for req in self.requests if req > cutoff_time]
+        remaining = int(self.gcra.available("window"))
         
         return {
             "type": "sliding_window",
             "limit": self.limit,
             "window_size": self.window_size,
-            "current_requests": len(active_requests),
-            "requests_remaining": max(0, self.limit - len(active_requests))
+            "current_requests": self.limit - remaining,
+            "requests_remaining": remaining
         }
 
 class RateLimiter:
@@ -222,6 +341,9 @@ class RateLimiter:
 class MultiKeyRateLimiter:
     """
     Rate limiter with per-key limits
+    
+    Every key shares one GCRA limiter holding a single timestamp per key;
+    the least recently used keys are evicted beyond `max_keys`.
     """
     
     def __init__(
@@ -229,27 +351,20 @@ class MultiKeyRateLimiter:
         requests_per_second: float,
         burst_size: Optional[int] = None,
         limiter_type: RateLimiterType = RateLimiterType.TOKEN_BUCKET,
-        cleanup_interval: int = 300  # 5 minutes
+        max_keys: int = DEFAULT_MAX_KEYS,
+        store: Any = None
     ):
         self.config = RateLimitConfig(
             requests_per_second=requests_per_second,
             burst_size=burst_size or int(requests_per_second * 2)
         )
         self.limiter_type = limiter_type
-        self.limiters: Dict[str, RateLimiter] = {}
-        self.cleanup_interval = cleanup_interval
-        self.last_cleanup = time.time()
-        self._lock = asyncio.Lock()
-    
-    def _get_or_create_limiter(self, key: str) -> RateLimiter:
-        """Get or create rate limiter for key"""
-        if key not in self.limiters:
-            self.limiters[key] = RateLimiter(
-                requests_per_second=self.config.requests_per_second,
-                burst_size=self.config.burst_size,
-                limiter_type=self.limiter_type
-            )
-        return self.limiters[key]
+        if limiter_type == RateLimiterType.SLIDING_WINDOW:
+            # Same per-minute window as RateLimiter
+            capacity = int(requests_per_second * self.config.window_size)
+        else:
+            capacity = self.config.burst_size
+        self.limiter = GCRARateLimiter(requests_per_second, capacity, store=store, max_keys=max_keys)
     
     async def acquire(self, key: str, tokens: int = 1) -> bool:
         """
@@ -265,14 +380,12 @@ class MultiKeyRateLimiter:
         Raises:
             RateLimitExceeded: When rate limit exceeded for key
         """
-        async with self._lock:
-            # Periodic cleanup of old limiters
-            await self._cleanup_if_needed()
-            
-            limiter = self._get_or_create_limiter(key)
-            
-        # Acquire outside of global lock to avoid blocking other keys
-        return await limiter.acquire(tokens)
+        result = await self.limiter.check(key, tokens)
+        if not result.allowed:
+            raise RateLimitExceeded(
+                f"Rate limit exceeded for {key}. Wait {result.retry_after:.2f}s"
+            )
+        return True
     
     async def try_acquire(self, key: str, tokens: int = 1) -> bool:
         """Try to acquire for key without exception"""
@@ -281,49 +394,32 @@ class MultiKeyRateLimiter:
         except RateLimitExceeded:
             return False
     
-    async def _cleanup_if_needed(self):
-        """Clean up unused rate limiters periodically"""
-        now = time.time()
-        
-        if now - self.last_cleanup > self.cleanup_interval:
-            # Simple cleanup - remove limiters that haven't been used recently
-            # In production, you might want more sophisticated cleanup logic
-            keys_to_remove = []
-            
-            for key, limiter in self.limiters.items():
-                stats = limiter.get_stats()
-                
-                # Remove if token bucket is full (unused) or sliding window is empty
-                if (stats.get("current_tokens", 0) >= stats.get("capacity", 0) or
-                    stats.get("current_requests", 0) == 0):
-                    keys_to_remove.append(key)
-            
-            for key in keys_to_remove:
-                del self.limiters[key]
-            
-            self.last_cleanup = now
-            
-            if keys_to_remove:
-                logger.debug(f"Cleaned up {len(keys_to_remove)} unused rate limiters")
+    def _key_stats(self, key: str) -> Dict[str, Any]:
+        return {
+            "type": self.limiter_type.value,
+            "capacity": self.limiter.capacity,
+            "available": self.limiter.available(key)
+        }
     
     def get_stats(self, key: Optional[str] = None) -> Dict[str, Any]:
         """Get statistics for key or all keys"""
+        keys = self.limiter.memory.tats
         if key:
-            if key in self.limiters:
-                return {key: self.limiters[key].get_stats()}
+            if key in keys:
+                return {key: self._key_stats(key)}
             else:
                 return {key: "no_limiter"}
         else:
             return {
-                "total_keys": len(self.limiters),
+                "total_keys": len(keys),
                 "config": {
                     "requests_per_second": self.config.requests_per_second,
                     "burst_size": self.config.burst_size,
                     "limiter_type": self.limiter_type.value
                 },
                 "per_key_stats": {
-                    key: limiter.get_stats()
-                    for key, limiter in self.limiters.items()
+                    key: self._key_stats(key)
+                    for key in list(keys)
                 }
             }
 
@@ -0,0 +1,45 @@
+"""
+Streaming response helpers
+Incremental encoding for large exports without buffering them in memory
+"""
+
+import zlib
+from typing import AsyncIterator, Union
+
+
+async def encode_stream(
+    chunks: AsyncIterator[Union[str, bytes]],
+    encoding: str = "utf-8"
+) -> AsyncIterator[bytes]:
+    """Encode text chunks to bytes as they are produced"""
+    async for chunk in chunks:
+        yield chunk.encode(encoding) if isinstance(chunk, str) else chunk
+
+
+async def gzip_stream(
+    chunks: AsyncIterator[Union[str, bytes]],
+    level: int = 6,
+    flush_threshold: int = 64 * 1024
+) -> AsyncIterator[bytes]:
+    """Gzip-compress a chunk stream on the fly.
+
+    Compressed output is emitted whenever at least `flush_threshold` bytes of
+    input have been consumed, so memory stays bounded by the threshold plus
+    the compressor window.
+    """
+    # wbits=31 selects the gzip container format
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    pending_input = 0
+
+    async for chunk in encode_stream(chunks):
+        output = compressor.compress(chunk)
+        pending_input += len(chunk)
+
+        if pending_input >= flush_threshold:
+            output += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending_input = 0
+
+        if output:
+            yield output
+
+    yield compressor.flush(zlib.Z_FINISH)
@@ -18,6 +18,7 @@ import uuid
 from app.core.config import settings
 from app.core.database import init_db
 from app.core.logging import setup_logging
+from app.core.asgi import MiddlewarePipeline
 from app.core.middleware import (
     RequestLoggingMiddleware,
     ErrorHandlingMiddleware,
@@ -70,10 +71,16 @@ async def lifespan(app: FastAPI):
         logger.info("✅ Health service initialized")
         
         # Initialize caching
-        from app.core.cache import init_cache
+        from app.core.cache import init_cache, near_cache
         await init_cache()
+        await near_cache.start()
         logger.info("✅ Cache system initialized")
         
+        # Start write-behind flusher for real-time voice session state
+        from app.services.session_state_buffer import session_state_buffer
+        await session_state_buffer.start()
+        logger.info("✅ Voice session state flusher started")
+        
         # Initialize external services
         from app.services.elevenlabs_service import ElevenLabsService
         app.state.voice_service = ElevenLabsService()
@@ -92,6 +99,12 @@ async def lifespan(app: FastAPI):
     logger.info("🛑 Shutting down Seiketsu AI API Server...")
     
     # Cleanup resources
+    from app.services.session_state_buffer import session_state_buffer
+    await session_state_buffer.stop()
+    
+    from app.core.cache import near_cache
+    await near_cache.stop()
+    
     if hasattr(app.state, 'health_service'):
         await app.state.health_service.cleanup()
     
@@ -119,39 +132,29 @@ setup_logging()
 logger = logging.getLogger(__name__)
 
 
-# Add enhanced security middleware stack
-app.add_middleware(DataValidationMiddleware)
-app.add_middleware(ThreatDetectionMiddleware)
-app.add_middleware(SecurityHeadersMiddleware)
-
-# Add CORS middleware
+# Middleware pipeline, outermost first; every layer is pure ASGI and they
+# share per-request state through request.state
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
-    allow_headers=["*"],
-    expose_headers=["X-Request-ID", "X-Response-Time"],
+    MiddlewarePipeline,
+    middlewares=[
+        RequestLoggingMiddleware,
+        ErrorHandlingMiddleware,
+        TenantIsolationMiddleware,
+        AdvancedRateLimitMiddleware,
+        (TrustedHostMiddleware, {"allowed_hosts": settings.ALLOWED_HOSTS}),
+        (CORSMiddleware, {
+            "allow_origins": settings.CORS_ORIGINS,
+            "allow_credentials": True,
+            "allow_methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+            "allow_headers": ["*"],
+            "expose_headers": ["X-Request-ID", "X-Response-Time"]
+        }),
+        SecurityHeadersMiddleware,
+        ThreatDetectionMiddleware,
+        DataValidationMiddleware
+    ]
 )
 
-# Add trusted host middleware for security
-app.add_middleware(
-    TrustedHostMiddleware,
-    allowed_hosts=settings.ALLOWED_HOSTS
-)
-
-# Add advanced rate limiting middleware
-app.add_middleware(AdvancedRateLimitMiddleware)
-
-# Add tenant isolation middleware for multi-tenant support
-app.add_middleware(TenantIsolationMiddleware)
-
-# Add error handling middleware
-app.add_middleware(ErrorHandlingMiddleware)
-
-# Add request logging middleware
-app.add_middleware(RequestLoggingMiddleware)
-
 
 # Root endpoint
 @app.get("/", tags=["Root"])
@@ -0,0 +1,156 @@
+"""
+Middleware stack benchmark
+Drives a trivial endpoint through the production middleware stack in-process
+and reports requests per second and latency percentiles.
+
+    python scripts/benchmark_middleware.py --requests 20000 --concurrency 50
+
+--separate-layers registers the same pure ASGI middlewares one
+add_middleware call at a time instead of through MiddlewarePipeline; it
+does not measure BaseHTTPMiddleware. For the BaseHTTPMiddleware baseline,
+run this script against a checkout of the commit before the pure ASGI
+middleware change, e.g.
+
+    before=$(git log --diff-filter=A --format=%h -- app/core/asgi.py)^
+    git worktree add /tmp/before "$before"
+    cp scripts/benchmark_middleware.py /tmp/before/apps/api/scripts/
+    cd /tmp/before/apps/api && python scripts/benchmark_middleware.py --separate-layers
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.trustedhost import TrustedHostMiddleware
+
+from app.core.config import settings
+from app.core.middleware import ErrorHandlingMiddleware, RequestLoggingMiddleware, SecurityHeadersMiddleware
+from app.core.security_middleware import (
+    AdvancedRateLimitMiddleware,
+    DataValidationMiddleware,
+    TenantIsolationMiddleware,
+    ThreatDetectionMiddleware
+)
+
+# Same stack and order as main.py, outermost first
+MIDDLEWARE = [
+    RequestLoggingMiddleware,
+    ErrorHandlingMiddleware,
+    TenantIsolationMiddleware,
+    AdvancedRateLimitMiddleware,
+    (TrustedHostMiddleware, {"allowed_hosts": settings.ALLOWED_HOSTS}),
+    (CORSMiddleware, {"allow_origins": settings.CORS_ORIGINS, "allow_credentials": True}),
+    SecurityHeadersMiddleware,
+    ThreatDetectionMiddleware,
+    DataValidationMiddleware
+]
+
+
+def build_app(separate_layers: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/v1/ping")
+    async def ping():
+        return {"ok": True}
+
+    if separate_layers:
+        # One add_middleware call per middleware; on trees without
+        # MiddlewarePipeline this is the only option
+        for spec in reversed(MIDDLEWARE):
+            cls, kwargs = spec if isinstance(spec, tuple) else (spec, {})
+            app.add_middleware(cls, **kwargs)
+    else:
+        from app.core.asgi import MiddlewarePipeline
+        app.add_middleware(MiddlewarePipeline, middlewares=MIDDLEWARE)
+    return app
+
+
+async def request(app: FastAPI, client: int) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/v1/ping",
+        "raw_path": b"/api/v1/ping",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [
+            (b"host", b"localhost"),
+            (b"x-tenant-id", b"bench"),
+            (b"user-agent", b"benchmark"),
+            (b"x-forwarded-for", f"10.0.{client // 256}.{client % 256}".encode())
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 80)
+    }
+    status = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    elapsed = time.perf_counter() - started
+    assert status == [200], status
+    return elapsed
+
+
+async def run(app: FastAPI, total: int, concurrency: int) -> dict:
+    latencies = []
+
+    async def worker(client: int):
+        for _ in range(total // concurrency):
+            latencies.append(await request(app, client))
+
+    # Warm up routing, JSON encoding and limiter state
+    await asyncio.gather(*[request(app, client) for client in range(concurrency)])
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker(client) for client in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument(
+        "--separate-layers", action="store_true",
+        help="register each middleware with its own add_middleware call instead of the pipeline"
+    )
+    args = parser.parse_args()
+
+    # Measure the middleware, not log handlers or the rate limit itself
+    logging.disable(logging.INFO)
+    settings.RATE_LIMIT_PER_MINUTE = args.requests
+
+    result = asyncio.run(run(build_app(args.separate_layers), args.requests, args.concurrency))
+    print(
+        f"{result['requests']} requests, concurrency {args.concurrency}: "
+        f"{result['rps']:.0f} req/s, p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
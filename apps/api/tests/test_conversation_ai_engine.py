@@ -405,7 +405,8 @@ class TestConversationAI:
                 {"role": "assistant", "content": "Great! What's your budget?", "timestamp": 1001},
                 {"role": "user", "content": "Around $400k", "timestamp": 1002},
                 {"role": "assistant", "content": "Perfect! I can show you some options", "timestamp": 1003}
-            ]
+            ],
+            "metadata": {"turn_count": 2}
         }
         
         conversation_ai.context_manager.get_context.return_value = context_with_messages
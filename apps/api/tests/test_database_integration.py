@@ -614,6 +614,49 @@ class TestDatabasePerformance:
         print(f"Non-indexed query time: {non_indexed_query_time:.4f}s")
         print(f"Performance improvement: {non_indexed_query_time / indexed_query_time:.1f}x")
 
+    
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_lead_metrics_aggregate_benchmark(self, db_session, test_organization, test_user, performance_monitor):
+        """Benchmark SQL-side lead metrics over a seeded 1M-row dataset"""
+        from app.services.analytics_service import AnalyticsService
+        
+        row_count = 1_000_000
+        await db_session.execute(
+            text("""
+                INSERT INTO leads (
+                    id, first_name, last_name, organization_id, created_by_user_id,
+                    status, source, lead_score, created_at, updated_at, is_active
+                )
+                SELECT
+                    gen_random_uuid()::text, 'Bench', 'Lead ' || g, :org_id, :user_id,
+                    (ARRAY['NEW', 'CONTACTED', 'QUALIFIED', 'NURTURING'])[1 + g % 4]::leadstatus,
+                    (ARRAY['VOICE_CALL', 'WEBSITE', 'REFERRAL'])[1 + g % 3]::leadsource,
+                    g % 101,
+                    now() - (g % 30) * interval '1 day',
+                    now(),
+                    true
+                FROM generate_series(1, :row_count) AS g
+            """),
+            {"org_id": test_organization.id, "user_id": test_user.id, "row_count": row_count}
+        )
+        await db_session.commit()
+        await db_session.execute(text("ANALYZE leads"))
+        
+        analytics_service = AnalyticsService()
+        performance_monitor.start()
+        
+        metrics = await analytics_service.get_lead_metrics(test_organization.id, db_session, days=31)
+        
+        elapsed = performance_monitor.get_metrics()["elapsed_time"]
+        
+        assert metrics["total_leads"] >= row_count
+        assert sum(metrics["status_breakdown"].values()) == metrics["total_leads"]
+        assert len(metrics["daily_lead_counts"]) >= 30
+        assert elapsed < 5.0  # Aggregates only; no rows are materialized as objects
+        
+        print(f"\nLead metrics over {row_count} rows: {elapsed:.3f}s")
+
 
 @pytest.mark.database
 @pytest.mark.integration
@@ -6,9 +6,11 @@ import pytest
 import asyncio
 from datetime import datetime, timedelta
 from unittest.mock import Mock, AsyncMock, patch
+from sqlalchemy.dialects import postgresql, sqlite
 from typing import Dict, Any
 
 from app.services.lead_service import LeadService
+from app.utils.pagination import encode_cursor
 from app.models.lead import Lead, LeadStatus, LeadSource
 from app.models.conversation import Conversation
 
@@ -201,6 +203,63 @@ class TestLeadService:
         
         assert result == mock_leads
 
+    async def test_get_leads_with_cursor(self, lead_service, mock_db_session, test_organization):
+        """Test keyset pagination replaces OFFSET with a row-value comparison"""
+        mock_result = Mock()
+        mock_result.scalars.return_value.all.return_value = []
+        mock_db_session.execute.return_value = mock_result
+        cursor = encode_cursor(datetime(2025, 1, 20, 10, 0), "lead_50")
+        
+        await lead_service.get_leads_for_organization(
+            test_organization.id, mock_db_session, limit=50, offset=5000, cursor=cursor
+        )
+        
+        sql = str(mock_db_session.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "(leads.created_at, leads.id) < (" in sql
+        assert "ORDER BY leads.created_at DESC, leads.id DESC" in sql
+        assert "OFFSET" not in sql
+
+    async def test_get_leads_rejects_malformed_cursor(self, lead_service, mock_db_session, test_organization):
+        """Test malformed cursors raise instead of returning an empty page"""
+        with pytest.raises(ValueError):
+            await lead_service.get_leads_for_organization(
+                test_organization.id, mock_db_session, cursor="not-a-cursor"
+            )
+        mock_db_session.execute.assert_not_called()
+
+    async def test_search_leads_uses_trigram_operators_on_postgres(self, lead_service, mock_db_session, test_organization):
+        """Test search matches generated columns and ranks by word similarity"""
+        mock_result = Mock()
+        mock_result.scalars.return_value.all.return_value = []
+        mock_db_session.execute.return_value = mock_result
+        mock_db_session.bind.dialect.name = "postgresql"
+        
+        await lead_service.search_leads(test_organization.id, "Jon Smith 555-1234", mock_db_session)
+        
+        compiled = mock_db_session.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+        sql = str(compiled)
+        assert "leads.search_text LIKE" in sql
+        assert "<%% leads.search_text" in sql
+        assert "leads.phone_digits LIKE" in sql
+        assert "word_similarity" in sql
+        assert "ILIKE" not in sql
+        assert "jon smith 555-1234" in compiled.params.values()
+        assert "5551234" in compiled.params.values()
+
+    async def test_search_leads_falls_back_without_trigrams(self, lead_service, mock_db_session, test_organization):
+        """Test non-PostgreSQL sessions use plain substring matching"""
+        mock_result = Mock()
+        mock_result.scalars.return_value.all.return_value = []
+        mock_db_session.execute.return_value = mock_result
+        mock_db_session.bind.dialect.name = "sqlite"
+        
+        await lead_service.search_leads(test_organization.id, "jo", mock_db_session)
+        
+        sql = str(mock_db_session.execute.call_args.args[0].compile(dialect=sqlite.dialect()))
+        assert "leads.search_text LIKE" in sql
+        assert "word_similarity" not in sql
+        assert "leads.phone_digits LIKE" not in sql  # Too few digits to match phones
+
     async def test_update_lead_status_success(self, lead_service, mock_db_session):
         """Test successful lead status update"""
         lead_id = "test_lead_id"
@@ -350,35 +409,24 @@ class TestLeadService:
             assert result == mock_lead
 
     async def test_get_hot_leads_success(self, lead_service, mock_db_session, test_organization):
-        """Test hot leads retrieval"""
-        # Mock leads with different scores
-        mock_lead1 = Mock(spec=Lead)
-        mock_lead1.is_hot_lead = True
-        mock_lead1.lead_score = 85
-        
-        mock_lead2 = Mock(spec=Lead)
-        mock_lead2.is_hot_lead = False
-        mock_lead2.lead_score = 45
-        
-        mock_lead3 = Mock(spec=Lead)
-        mock_lead3.is_hot_lead = True
-        mock_lead3.lead_score = 90
-        
-        all_leads = [mock_lead1, mock_lead2, mock_lead3]
+        """Test hot leads are selected in SQL, so the page is never short"""
+        hot_leads = [Mock(spec=Lead) for _ in range(20)]
         
         mock_result = Mock()
-        mock_result.scalars.return_value.all.return_value = all_leads
+        mock_result.scalars.return_value.all.return_value = hot_leads
         mock_db_session.execute.return_value = mock_result
         
         result = await lead_service.get_hot_leads(
             test_organization.id, mock_db_session, limit=20
         )
         
-        # Should only return hot leads
-        assert len(result) == 2
-        assert mock_lead1 in result
-        assert mock_lead3 in result
-        assert mock_lead2 not in result
+        assert result == hot_leads
+        
+        sql = str(mock_db_session.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "leads.is_hot IS true" in sql
+        assert "leads.status IN" in sql
+        assert "ORDER BY leads.lead_score DESC, leads.created_at DESC" in sql
+        assert "LIMIT" in sql
 
     async def test_get_leads_needing_follow_up(self, lead_service, mock_db_session, test_organization):
         """Test retrieval of leads needing follow-up"""
@@ -393,74 +441,109 @@ class TestLeadService:
         
         assert result == mock_leads
         mock_db_session.execute.assert_called_once()
+        
+        sql = str(mock_db_session.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "leads.follow_up_due_at <=" in sql
+        assert " OR " not in sql
+        assert "ORDER BY leads.follow_up_due_at" in sql
+
+    def test_is_hot_lead_rule(self):
+        """Test the Python hot-lead rule mirrors the generated column"""
+        assert Lead(lead_score=80).is_hot_lead
+        assert Lead(lead_score=10, timeline="1_month").is_hot_lead
+        assert Lead(lead_score=10, pre_approved=True).is_hot_lead
+        assert not Lead(lead_score=None, timeline="1_year", pre_approved=False).is_hot_lead
+
+    def _returning(self, ids):
+        """Mock result of an UPDATE ... RETURNING id"""
+        result = Mock()
+        result.scalars.return_value.all.return_value = ids
+        return result
 
     async def test_bulk_update_lead_tags_success(self, lead_service, mock_db_session):
-        """Test bulk tag updates for multiple leads"""
+        """Test bulk tag updates run as one set-based UPDATE"""
         lead_ids = ["lead1", "lead2", "lead3"]
-        tags_to_add = ["high_priority", "qualified"]
-        tags_to_remove = ["unqualified"]
-        user_id = "manager_123"
-        
-        # Mock leads
-        mock_leads = []
-        for i, lead_id in enumerate(lead_ids):
-            mock_lead = Mock(spec=Lead)
-            mock_lead.id = lead_id
-            mock_lead.tags = ["existing_tag", "unqualified"] if i == 0 else ["other_tag"]
-            mock_leads.append(mock_lead)
-        
-        def get_lead_side_effect(lead_id, db_session):
-            for lead in mock_leads:
-                if lead.id == lead_id:
-                    return lead
-            return None
-        
-        with patch.object(lead_service, 'get_lead', side_effect=get_lead_side_effect):
+        mock_db_session.execute.return_value = self._returning(lead_ids)
+
+        with patch.object(lead_service, 'get_lead') as mock_get_lead:
             updated_count = await lead_service.bulk_update_lead_tags(
-                lead_ids, tags_to_add, tags_to_remove, mock_db_session, user_id
+                lead_ids, ["high_priority", "qualified"], ["unqualified"], mock_db_session, "manager_123"
             )
-            
-            assert updated_count == 3
-            
-            # Verify tag updates
-            for mock_lead in mock_leads:
-                assert "high_priority" in mock_lead.tags
-                assert "qualified" in mock_lead.tags
-                assert "unqualified" not in mock_lead.tags
-                assert mock_lead.updated_by == user_id
-            
-            # Verify database commit
-            mock_db_session.commit.assert_called_once()
+
+        assert updated_count == 3
+        mock_get_lead.assert_not_called()
+        mock_db_session.execute.assert_called_once()
+        mock_db_session.commit.assert_called_once()
+
+        sql = str(mock_db_session.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+        assert sql.startswith("UPDATE leads SET")
+        assert "jsonb_array_elements_text" in sql
+        assert "= ANY (" in sql
+        assert "RETURNING leads.id" in sql
 
     async def test_bulk_update_lead_tags_partial_success(self, lead_service, mock_db_session):
         """Test bulk tag updates with some leads not found"""
-        lead_ids = ["lead1", "nonexistent_lead", "lead3"]
-        tags_to_add = ["new_tag"]
-        tags_to_remove = []
-        
-        def get_lead_side_effect(lead_id, db_session):
-            if lead_id == "nonexistent_lead":
-                return None
-            mock_lead = Mock(spec=Lead)
-            mock_lead.id = lead_id
-            mock_lead.tags = []
-            return mock_lead
-        
-        with patch.object(lead_service, 'get_lead', side_effect=get_lead_side_effect):
-            updated_count = await lead_service.bulk_update_lead_tags(
-                lead_ids, tags_to_add, tags_to_remove, mock_db_session
-            )
-            
-            assert updated_count == 2  # Only 2 leads found and updated
+        mock_db_session.execute.return_value = self._returning(["lead1", "lead3"])
+
+        updated_count = await lead_service.bulk_update_lead_tags(
+            ["lead1", "nonexistent_lead", "lead3"], ["new_tag"], [], mock_db_session
+        )
+
+        assert updated_count == 2  # Only 2 leads found and updated
 
     async def test_bulk_update_lead_tags_error_handling(self, lead_service, mock_db_session):
         """Test error handling in bulk tag updates"""
-        with patch.object(lead_service, 'get_lead', side_effect=Exception("DB error")):
-            updated_count = await lead_service.bulk_update_lead_tags(
-                ["lead1"], ["tag"], [], mock_db_session
+        mock_db_session.execute.side_effect = Exception("DB error")
+
+        updated_count = await lead_service.bulk_update_lead_tags(
+            ["lead1"], ["tag"], [], mock_db_session
+        )
+
+        assert updated_count == 0  # No leads updated due to error
+        mock_db_session.rollback.assert_called_once()
+
+    async def test_bulk_update_leads_scopes_to_organization(self, lead_service, mock_db_session):
+        """Test bulk status updates are filtered by organization and return ids"""
+        mock_db_session.execute.return_value = self._returning(["lead1"])
+
+        updated_ids = await lead_service.bulk_update_leads(
+            "org_1", ["lead1", "lead1", "other_org_lead"], "update_status",
+            {"status": "qualified"}, mock_db_session, "manager_123"
+        )
+
+        assert updated_ids == ["lead1"]
+        stmt = mock_db_session.execute.call_args.args[0]
+        params = stmt.compile(dialect=postgresql.dialect()).params
+        assert params["lead_ids"] == ["lead1", "other_org_lead"]
+        assert "org_1" in params.values()
+        assert LeadStatus.QUALIFIED in params.values()
+
+    async def test_bulk_update_leads_chunks_large_requests(self, lead_service, mock_db_session):
+        """Test large id lists are split into a few chunked statements"""
+        lead_ids = [f"lead{i}" for i in range(12000)]
+        mock_db_session.execute.side_effect = lambda stmt: self._returning(
+            stmt.compile().params["lead_ids"]
+        )
+
+        with patch('app.services.lead_service.BULK_UPDATE_CHUNK_SIZE', 5000):
+            updated_ids = await lead_service.bulk_update_leads(
+                "org_1", lead_ids, "assign_agent", {"agent_id": "agent_1"}, mock_db_session
             )
-            
-            assert updated_count == 0  # No leads updated due to error
+
+        assert updated_ids == lead_ids
+        assert mock_db_session.execute.call_count == 3
+        mock_db_session.commit.assert_called_once()
+
+    async def test_bulk_update_leads_rejects_invalid_data(self, lead_service, mock_db_session):
+        """Test invalid actions and data fail before any query runs"""
+        with pytest.raises(ValueError):
+            await lead_service.bulk_update_leads("org_1", ["lead1"], "update_status", {"status": "bogus"}, mock_db_session)
+        with pytest.raises(ValueError):
+            await lead_service.bulk_update_leads("org_1", ["lead1"], "assign_agent", {}, mock_db_session)
+        with pytest.raises(ValueError):
+            await lead_service.bulk_update_leads("org_1", ["lead1"], "delete", {}, mock_db_session)
+
+        mock_db_session.execute.assert_not_called()
 
 
 @pytest.mark.asyncio
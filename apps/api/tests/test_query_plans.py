@@ -0,0 +1,214 @@
+"""
+Query-plan regression tests
+Seeds representative multi-tenant volumes, captures the SQL each service-layer
+query issues and fails if PostgreSQL would answer it with a sequential scan
+of a large table
+"""
+
+import json
+import pytest
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+from sqlalchemy import event, text
+
+from app.models.lead import LeadStatus
+from app.services.analytics_service import AnalyticsService
+from app.services.conversation_service import ConversationService
+from app.services.lead_service import LeadService
+
+# Tables big enough in production that a sequential scan is a regression
+LARGE_TABLES = {"leads", "conversations", "conversation_messages"}
+
+ORGANIZATIONS = 50
+LEADS = 200_000
+CONVERSATIONS = 200_000
+MESSAGES_PER_CONVERSATION = 5
+MESSAGE_CONVERSATIONS = 100_000
+
+SEED_SQL = [
+    """
+    INSERT INTO organizations (id, name, slug, created_at, updated_at, is_active)
+    SELECT 'plan-org-' || g, 'Plan Org ' || g, 'plan-org-' || g, now(), now(), true
+    FROM generate_series(1, :organizations) AS g
+    """,
+    """
+    INSERT INTO users (
+        id, email, first_name, last_name, hashed_password, role, organization_id,
+        created_at, updated_at, is_active
+    )
+    SELECT 'plan-user-' || g, 'plan' || g || '@example.com', 'Plan', 'User', 'x', 'AGENT',
+           'plan-org-' || g, now(), now(), true
+    FROM generate_series(1, :organizations) AS g
+    """,
+    """
+    INSERT INTO voice_agents (id, name, system_prompt, organization_id, created_at, updated_at, is_active)
+    SELECT 'plan-agent-' || g, 'Agent ' || g, 'prompt', 'plan-org-' || (1 + g % :organizations),
+           now(), now(), true
+    FROM generate_series(1, :organizations * 2) AS g
+    """,
+    """
+    INSERT INTO leads (
+        id, first_name, last_name, email, phone, organization_id, created_by_user_id,
+        status, source, lead_score, next_follow_up_date, created_at, updated_at, is_active
+    )
+    SELECT 'plan-lead-' || g, 'Lead', 'Number ' || g, 'lead' || g || '@example.com',
+           '+1555' || lpad(g::text, 7, '0'),
+           'plan-org-' || (1 + g % :organizations), 'plan-user-' || (1 + g % :organizations),
+           (ARRAY['NEW', 'CONTACTED', 'QUALIFIED', 'NURTURING', 'CLOSED_WON', 'CLOSED_LOST'])[1 + g % 6]::leadstatus,
+           (ARRAY['VOICE_CALL', 'WEBSITE', 'REFERRAL'])[1 + g % 3]::leadsource,
+           g % 101,
+           CASE WHEN g % 4 = 0 THEN now() + (g % 20 - 10) * interval '1 day' END,
+           now() - (g % 365) * interval '1 day',
+           now(), true
+    FROM generate_series(1, :leads) AS g
+    """,
+    """
+    INSERT INTO conversations (
+        id, call_id, caller_phone, voice_agent_id, organization_id, status,
+        duration_seconds, sentiment_score, last_message_sequence,
+        started_at, created_at, updated_at, is_active
+    )
+    SELECT 'plan-conv-' || g, 'plan-call-' || g, '+1555' || lpad(g::text, 7, '0'),
+           'plan-agent-' || (1 + g % (:organizations * 2)),
+           'plan-org-' || (1 + (1 + g % (:organizations * 2)) % :organizations),
+           (ARRAY['COMPLETED', 'COMPLETED', 'TRANSFERRED', 'FAILED', 'IN_PROGRESS'])[1 + g % 5]::conversationstatus,
+           g % 600, ((g % 200) - 100) / 100.0, :messages_per_conversation,
+           now() - (g % 365) * interval '1 day',
+           now() - (g % 365) * interval '1 day',
+           now(), true
+    FROM generate_series(1, :conversations) AS g
+    """,
+    """
+    INSERT INTO conversation_messages (
+        id, conversation_id, message_type, direction, content, timestamp, sequence_number,
+        created_at, updated_at, is_active
+    )
+    SELECT 'plan-msg-' || c || '-' || s, 'plan-conv-' || c,
+           (ARRAY['USER_SPEECH', 'AGENT_SPEECH'])[1 + s % 2]::messagetype,
+           (ARRAY['INBOUND', 'OUTBOUND'])[1 + s % 2]::messagedirection,
+           'Message ' || s, now(), s, now(), now(), true
+    FROM generate_series(1, :message_conversations) AS c,
+         generate_series(1, :messages_per_conversation) AS s
+    """,
+]
+
+
+def seq_scans(plan: Dict[str, Any], tables: Set[str]) -> Iterator[str]:
+    """Relations from `tables` read by a Seq Scan anywhere in the plan tree"""
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in tables:
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from seq_scans(child, tables)
+
+
+class StatementRecorder:
+    """Captures the SELECTs a block of service calls sends to the database"""
+
+    def __init__(self, engine):
+        self.engine = engine.sync_engine
+        self.statements: List[Tuple[str, Any]] = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+async def explain(db_session, statement: str, parameters: Any) -> Dict[str, Any]:
+    connection = await db_session.connection()
+    result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+    document = result.scalar()
+    return (json.loads(document) if isinstance(document, str) else document)[0]["Plan"]
+
+
+@pytest.fixture
+async def seeded_database(db_session):
+    """Multi-tenant dataset where one organization holds ~2% of each table"""
+    params = {
+        "organizations": ORGANIZATIONS,
+        "leads": LEADS,
+        "conversations": CONVERSATIONS,
+        "message_conversations": MESSAGE_CONVERSATIONS,
+        "messages_per_conversation": MESSAGES_PER_CONVERSATION,
+    }
+    for sql in SEED_SQL:
+        await db_session.execute(text(sql), {k: v for k, v in params.items() if f":{k}" in sql})
+    await db_session.commit()
+    for table in ("organizations", "voice_agents", "leads", "conversations", "conversation_messages"):
+        await db_session.execute(text(f"ANALYZE {table}"))
+    return db_session
+
+
+async def _service_queries(db) -> None:
+    """Every hot service-layer read, against the first seeded organization"""
+    organization_id = "plan-org-1"
+    lead_service = LeadService()
+    conversation_service = ConversationService()
+    analytics_service = AnalyticsService()
+
+    leads = await lead_service.get_leads_for_organization(organization_id, db, limit=50)
+    await lead_service.get_leads_for_organization(
+        organization_id, db, limit=50, status_filter=LeadStatus.QUALIFIED
+    )
+    await lead_service.count_leads_for_organization(organization_id, db, status_filter=LeadStatus.NEW)
+    await lead_service.search_leads(organization_id, "number 4242", db, limit=20)
+    await lead_service.get_hot_leads(organization_id, db)
+    await lead_service.get_leads_needing_follow_up(organization_id, db)
+    assert leads
+
+    conversations = await conversation_service.get_conversations_for_organization(organization_id, db, limit=50)
+    conversation_id = conversations[-1].id
+    await conversation_service.get_conversation_messages(conversation_id, db)
+    async for _ in conversation_service.stream_conversation_transcript(conversation_id, db):
+        pass
+
+    await analytics_service.get_conversation_metrics(organization_id, db, days=30)
+    await analytics_service.get_lead_metrics(organization_id, db, days=30)
+    await analytics_service.get_voice_agent_performance(organization_id, db, days=30)
+    await analytics_service.get_real_time_dashboard(organization_id, db)
+
+
+class TestPlanInspection:
+    """Unit tests for plan tree inspection"""
+
+    def test_seq_scan_detection(self):
+        plan = {
+            "Node Type": "Limit",
+            "Plans": [
+                {"Node Type": "Index Scan", "Relation Name": "leads"},
+                {"Node Type": "Seq Scan", "Relation Name": "conversations"},
+                {"Node Type": "Seq Scan", "Relation Name": "voice_agents"},
+            ]
+        }
+
+        assert list(seq_scans(plan, LARGE_TABLES)) == ["conversations"]
+
+
+@pytest.mark.database
+@pytest.mark.integration
+@pytest.mark.slow
+class TestQueryPlans:
+    """EXPLAIN every hot service query over seeded volumes"""
+
+    @pytest.mark.asyncio
+    async def test_service_queries_avoid_sequential_scans(self, seeded_database):
+        db = seeded_database
+        with StatementRecorder(db.bind) as recorder:
+            await _service_queries(db)
+
+        assert len(recorder.statements) >= 15
+
+        regressions = []
+        for statement, parameters in recorder.statements:
+            plan = await explain(db, statement, parameters)
+            scanned = sorted(set(seq_scans(plan, LARGE_TABLES)))
+            if scanned:
+                regressions.append(f"Seq Scan on {', '.join(scanned)}:\n{statement}")
+
+        assert not regressions, "\n\n".join(regressions)
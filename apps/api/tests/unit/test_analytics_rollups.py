@@ -0,0 +1,99 @@
+"""
+Unit tests for analytics rollup planning helpers
+"""
+
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy import Column, DateTime, MetaData, String, Table, event, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.services.analytics_rollup_service import (
+    AnalyticsRollupService,
+    add_sums,
+    ceil_day,
+    floor_day,
+    floor_hour,
+    live_condition
+)
+
+events = Table(
+    "events", MetaData(),
+    Column("id", String, primary_key=True),
+    Column("started_at", DateTime)
+)
+
+
+class TestAnalyticsRollups:
+    """Unit tests for bucket arithmetic and live/rollup read planning"""
+
+    def test_bucket_boundaries(self):
+        value = datetime(2025, 1, 20, 10, 30, 15)
+
+        assert floor_hour(value) == datetime(2025, 1, 20, 10)
+        assert floor_day(value) == datetime(2025, 1, 20)
+        assert ceil_day(value) == datetime(2025, 1, 21)
+        assert ceil_day(datetime(2025, 1, 20)) == datetime(2025, 1, 20)
+
+    def test_add_sums_treats_null_as_zero(self):
+        total = {"conversations": 3, "duration_sum": 10.0}
+        add_sums(total, {"conversations": 2, "duration_sum": None, "completed": 1})
+
+        assert total == {"conversations": 5, "duration_sum": 10.0, "completed": 1}
+
+    def test_live_condition_without_rollups_reads_whole_range(self):
+        condition = live_condition(events.c.started_at, datetime(2025, 1, 1), None)
+        sql = str(select(events).where(condition).compile(dialect=postgresql.dialect()))
+
+        assert "events.started_at >=" in sql
+        assert " OR " not in sql
+
+    def test_live_condition_excludes_rolled_up_days(self):
+        rollup_range = (datetime(2025, 1, 2), datetime(2025, 1, 20))
+        condition = live_condition(events.c.started_at, datetime(2025, 1, 1, 12), rollup_range)
+        compiled = select(events).where(condition).compile(dialect=postgresql.dialect())
+
+        assert " OR " in str(compiled)
+        assert set(compiled.params.values()) == {
+            datetime(2025, 1, 1, 12), datetime(2025, 1, 2), datetime(2025, 1, 20)
+        }
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("rolled_up_to, expected", [
+        (None, None),
+        (datetime(2025, 1, 2, 5), None),
+        (datetime(2025, 1, 20, 14), (datetime(2025, 1, 2), datetime(2025, 1, 20))),
+    ])
+    async def test_plan_covers_whole_days_before_watermark(self, rolled_up_to, expected):
+        service = AnalyticsRollupService()
+        watermark = SimpleNamespace(rolled_up_to=rolled_up_to) if rolled_up_to else None
+        service.get_watermark = AsyncMock(return_value=watermark)
+
+        assert await service.plan(MagicMock(), datetime(2025, 1, 1, 12)) == expected
+
+    @pytest.mark.asyncio
+    async def test_plan_falls_back_to_live_when_watermark_unavailable(self):
+        service = AnalyticsRollupService()
+        service.get_watermark = AsyncMock(side_effect=RuntimeError("no table"))
+
+        assert await service.plan(MagicMock(), datetime(2025, 1, 1)) is None
+
+    @pytest.mark.asyncio
+    async def test_failed_watermark_lookup_leaves_transaction_usable(self, tmp_path):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}")
+        statements = []
+        event.listen(
+            engine.sync_engine, "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement)
+        )
+
+        # No rollup_watermarks table, so the real lookup fails
+        async with AsyncSession(engine) as db:
+            await db.execute(text("SELECT 1"))
+            assert await AnalyticsRollupService().plan(db, datetime(2025, 1, 1)) is None
+            assert (await db.execute(text("SELECT 2"))).scalar() == 2
+        await engine.dispose()
+
+        assert any(statement.startswith("ROLLBACK TO SAVEPOINT") for statement in statements)
@@ -0,0 +1,220 @@
+"""
+Unit tests for the pure ASGI middleware pipeline
+"""
+
+import json
+import pytest
+
+from app.core.asgi import MiddlewarePipeline, client_ip, request_state
+from app.core.middleware import (
+    ErrorHandlingMiddleware,
+    RequestLoggingMiddleware,
+    SecurityHeadersMiddleware,
+    TenantContextMiddleware
+)
+from app.core.security_middleware import (
+    DataValidationMiddleware,
+    TenantIsolationMiddleware,
+    ThreatDetectionMiddleware
+)
+
+
+def http_scope(path="/api/v1/leads", method="GET", headers=None):
+    return {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+        "client": ("10.0.0.1", 50000),
+        "server": ("localhost", 80),
+        "scheme": "http",
+        "root_path": ""
+    }
+
+
+async def call(app, scope, body=b""):
+    messages = []
+    chunks = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        return chunks.pop() if chunks else {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
+
+def response_headers(messages):
+    return {name.decode(): value.decode() for name, value in messages[0]["headers"]}
+
+
+async def ok(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+class TestMiddlewarePipeline:
+    """Unit tests for pipeline ordering, shared state and pass-through"""
+
+    @pytest.mark.asyncio
+    async def test_layers_run_outermost_first(self):
+        order = []
+
+        def layer(name):
+            class Layer:
+                def __init__(self, app, tag=""):
+                    self.app = app
+                    self.tag = tag
+
+                async def __call__(self, scope, receive, send):
+                    order.append(name + self.tag)
+                    await self.app(scope, receive, send)
+            return Layer
+
+        pipeline = MiddlewarePipeline(ok, [layer("outer"), (layer("inner"), {"tag": "!"})])
+        await call(pipeline, http_scope())
+
+        assert order == ["outer", "inner!"]
+        assert len(pipeline.layers) == 2
+
+    @pytest.mark.asyncio
+    async def test_state_is_shared_with_the_endpoint(self):
+        seen = {}
+
+        async def endpoint(scope, receive, send):
+            seen.update(request_state(scope))
+            await ok(scope, receive, send)
+
+        pipeline = MiddlewarePipeline(endpoint, [
+            RequestLoggingMiddleware,
+            TenantIsolationMiddleware,
+            ThreatDetectionMiddleware
+        ])
+        messages = await call(pipeline, http_scope(headers={"X-Tenant-ID": "org-1", "X-Forwarded-For": "1.2.3.4, 10.0.0.1"}))
+
+        assert messages[0]["status"] == 200
+        assert seen["tenant_id"] == seen["organization_id"] == "org-1"
+        assert seen["client_ip"] == "1.2.3.4"
+        assert seen["threat_level"] == 0
+        assert seen["request_id"] == response_headers(messages)["x-request-id"]
+        assert response_headers(messages)["x-tenant-id"] == "org-1"
+
+    @pytest.mark.asyncio
+    async def test_streaming_responses_are_not_buffered(self):
+        sent = []
+
+        async def stream(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            for chunk in (b"a", b"b", b"c"):
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                # Each chunk reached the client before the next is produced
+                assert sent[-1] == chunk
+            await send({"type": "http.response.body", "body": b""})
+
+        pipeline = MiddlewarePipeline(stream, [RequestLoggingMiddleware, SecurityHeadersMiddleware])
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            if message["type"] == "http.response.body":
+                sent.append(message["body"])
+            else:
+                assert response_headers([message])["x-frame-options"] == "DENY"
+
+        await pipeline(http_scope(), receive, send)
+        assert sent == [b"a", b"b", b"c", b""]
+
+    @pytest.mark.asyncio
+    async def test_websockets_pass_through(self):
+        scopes = []
+
+        async def websocket_app(scope, receive, send):
+            scopes.append(scope["type"])
+
+        pipeline = MiddlewarePipeline(websocket_app, [TenantIsolationMiddleware, DataValidationMiddleware])
+        await pipeline({"type": "websocket", "path": "/ws", "headers": []}, None, None)
+
+        assert scopes == ["websocket"]
+
+
+class TestASGIMiddlewares:
+    """Unit tests for individual middlewares"""
+
+    @pytest.mark.asyncio
+    async def test_errors_become_500_with_request_id(self):
+        async def broken(scope, receive, send):
+            raise RuntimeError("boom")
+
+        pipeline = MiddlewarePipeline(broken, [RequestLoggingMiddleware, ErrorHandlingMiddleware])
+        messages = await call(pipeline, http_scope())
+
+        assert messages[0]["status"] == 500
+        assert json.loads(messages[1]["body"])["request_id"] == response_headers(messages)["x-request-id"]
+
+    @pytest.mark.asyncio
+    async def test_errors_after_response_start_propagate(self):
+        async def broken_stream(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            await call(ErrorHandlingMiddleware(broken_stream), http_scope())
+
+    @pytest.mark.asyncio
+    async def test_missing_tenant_is_rejected_except_for_auth(self):
+        middleware = TenantIsolationMiddleware(ok)
+
+        assert (await call(middleware, http_scope()))[0]["status"] == 403
+        assert (await call(middleware, http_scope("/api/v1/auth/login")))[0]["status"] == 200
+        assert (await call(middleware, http_scope("/api/health")))[0]["status"] == 200
+        assert (await call(middleware, http_scope(headers={"Host": "acme.seiketsu.ai"})))[0]["status"] == 200
+
+    @pytest.mark.asyncio
+    async def test_threat_detection_replays_the_body(self):
+        received = []
+
+        async def endpoint(scope, receive, send):
+            received.append((await receive())["body"])
+            await ok(scope, receive, send)
+
+        middleware = ThreatDetectionMiddleware(endpoint)
+        headers = {"Content-Type": "application/json"}
+
+        messages = await call(middleware, http_scope(method="POST", headers=headers), b'{"name": "Ada"}')
+        assert messages[0]["status"] == 200
+        assert received == [b'{"name": "Ada"}']
+
+        scope = http_scope(method="POST", headers={**headers, "User-Agent": "sqlmap"})
+        body = b'{"q": "<script>x</script> union select * from users; eval(1)"}'
+        assert (await call(middleware, scope, body))[0]["status"] == 403
+
+    @pytest.mark.asyncio
+    async def test_data_validation(self):
+        middleware = DataValidationMiddleware(ok)
+
+        too_large = http_scope(headers={"Content-Length": str(51 * 1024 * 1024)})
+        assert (await call(middleware, too_large))[0]["status"] == 413
+        assert (await call(middleware, http_scope(method="POST")))[0]["status"] == 400
+        unsupported = http_scope(method="POST", headers={"Content-Type": "text/xml"})
+        assert (await call(middleware, unsupported))[0]["status"] == 415
+        json_post = http_scope(method="POST", headers={"Content-Type": "application/json; charset=utf-8"})
+        assert (await call(middleware, json_post))[0]["status"] == 200
+
+    @pytest.mark.asyncio
+    async def test_tenant_context_from_subdomain(self):
+        seen = {}
+
+        async def endpoint(scope, receive, send):
+            seen.update(request_state(scope))
+            await ok(scope, receive, send)
+
+        await call(TenantContextMiddleware(endpoint), http_scope(headers={"Host": "acme.seiketsu.ai"}))
+        assert seen["tenant_id"] == "acme"
+
+    def test_client_ip_resolution(self):
+        assert client_ip(http_scope(headers={"X-Real-IP": " 5.6.7.8 "})) == "5.6.7.8"
+        assert client_ip(http_scope()) == "10.0.0.1"
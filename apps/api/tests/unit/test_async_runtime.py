@@ -0,0 +1,121 @@
+"""
+Unit tests for the worker async runtime
+"""
+
+import asyncio
+import contextvars
+import threading
+import pytest
+
+from app.tasks.runtime import AsyncRuntime
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+class LoopBoundPool:
+    """Stands in for a connection pool: connections only work on their loop"""
+
+    def __init__(self):
+        self.opened = 0
+        self.connection = None
+
+    async def query(self):
+        loop = asyncio.get_running_loop()
+        if self.connection is not loop:
+            self.connection = loop
+            self.opened += 1
+        await asyncio.sleep(0)
+        return self.opened
+
+
+@pytest.fixture
+def runtime():
+    runtime = AsyncRuntime(name="test-runtime")
+    yield runtime
+    runtime.stop()
+
+
+class TestAsyncRuntime:
+    """Unit tests for AsyncRuntime"""
+
+    def test_tasks_share_one_loop_and_its_connections(self, runtime):
+        pool = LoopBoundPool()
+
+        for _ in range(20):
+            runtime.run(pool.query())
+
+        assert pool.opened == 1
+        assert runtime.get_stats()["tasks"] == 20
+
+        # What a fresh loop per task costs
+        per_call_pool = LoopBoundPool()
+        for _ in range(20):
+            asyncio.run(per_call_pool.query())
+        assert per_call_pool.opened == 20
+
+    def test_hooks_run_on_the_runtime_loop(self, runtime):
+        events = []
+
+        @runtime.on_startup
+        async def open_resources():
+            events.append(("startup", threading.current_thread().name))
+
+        @runtime.on_shutdown
+        async def close_resources():
+            events.append(("shutdown", threading.current_thread().name))
+
+        runtime.start()
+        runtime.start()
+        runtime.stop()
+
+        assert events == [("startup", "test-runtime"), ("shutdown", "test-runtime")]
+        assert not runtime.running
+
+    def test_run_starts_lazily_and_returns_results(self, runtime):
+        async def add(a, b):
+            return a + b
+
+        assert not runtime.running
+        assert runtime.run(add(2, 3)) == 5
+        assert runtime.running
+
+    def test_exceptions_propagate_to_the_caller(self, runtime):
+        async def fail():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError, match="boom"):
+            runtime.run(fail())
+
+        assert runtime.get_stats()["failures"] == 1
+
+    def test_context_variables_reach_the_coroutine(self, runtime):
+        async def current_request():
+            return request_id.get()
+
+        token = request_id.set("task-42")
+        try:
+            assert runtime.run(current_request()) == "task-42"
+        finally:
+            request_id.reset(token)
+
+    def test_timeout_cancels_the_coroutine(self, runtime):
+        cancelled = threading.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with pytest.raises(TimeoutError):
+            runtime.run(slow(), timeout=0.05)
+
+        assert cancelled.wait(1)
+
+    def test_run_from_the_loop_thread_is_rejected(self, runtime):
+        async def nested():
+            return runtime.run(asyncio.sleep(0))
+
+        with pytest.raises(RuntimeError):
+            runtime.run(nested())
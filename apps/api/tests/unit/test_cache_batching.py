@@ -0,0 +1,96 @@
+"""
+Unit tests for batched cache reads and pipelined writes
+"""
+
+import asyncio
+import pytest
+import fakeredis.aioredis
+from unittest.mock import patch
+
+from app.core.cache import CacheService
+
+
+class TestCacheBatching:
+    """Unit tests for GetBatcher and CacheService.set_many"""
+
+    @pytest.fixture
+    def client(self):
+        return fakeredis.aioredis.FakeRedis()
+
+    @pytest.fixture
+    def service(self, client):
+        return CacheService(client)
+
+    async def test_concurrent_gets_share_one_mget(self, service, client):
+        await service.set_many({f"lead:{i}": {"id": i} for i in range(5)})
+
+        with patch.object(client, "mget", wraps=client.mget) as mget, \
+                patch.object(client, "get", wraps=client.get) as get:
+            results = await asyncio.gather(*(service.get(f"lead:{i}") for i in range(5)))
+
+        assert results == [{"id": i} for i in range(5)]
+        assert mget.call_count == 1
+        assert get.call_count == 0
+        assert service.batcher.get_stats()["avg_batch_size"] == 5
+
+    async def test_duplicate_keys_are_fetched_once(self, service, client):
+        await service.set("lead:1", {"id": 1})
+
+        with patch.object(client, "mget", wraps=client.mget) as mget, \
+                patch.object(client, "get", wraps=client.get) as get:
+            results = await asyncio.gather(
+                service.get("lead:1"), service.get("lead:1"), service.get("missing", "default")
+            )
+
+        assert results == [{"id": 1}, {"id": 1}, "default"]
+        assert mget.call_args.args[0] == ["lead:1", "missing"]
+        assert get.call_count == 0
+
+    async def test_max_batch_size_flushes_early(self, service, client):
+        service.batcher.max_batch_size = 2
+
+        with patch.object(client, "mget", wraps=client.mget) as mget:
+            await asyncio.gather(*(service.get(f"k{i}") for i in range(4)))
+
+        assert mget.call_count == 2
+
+    async def test_batch_errors_reach_every_caller(self, service, client):
+        with patch.object(client, "mget", side_effect=ConnectionError("down")):
+            results = await asyncio.gather(service.get("a", 1), service.get("b", 2))
+
+        # CacheService.get degrades to the default on Redis errors
+        assert results == [1, 2]
+
+    async def test_set_many_is_one_pipeline_with_ttl(self, service, client):
+        with patch.object(client, "mset") as mset, patch.object(client, "expire") as expire:
+            assert await service.set_many({"a": 1, "b": [2]}, ttl=120)
+
+        mset.assert_not_called()
+        expire.assert_not_called()
+        assert 0 < await client.ttl("a") <= 120
+        assert 0 < await client.ttl("b") <= 120
+        assert await service.get_many(["a", "b"]) == {"a": 1, "b": [2]}
+
+    async def test_set_many_without_ttl_persists(self, service, client):
+        await service.set_many({"a": 1})
+
+        assert await client.ttl("a") == -1
+
+    async def test_each_loop_batches_independently(self):
+        class Client:
+            async def get(self, key):
+                return key.encode()
+
+            async def mget(self, keys):
+                return [key.encode() for key in keys]
+
+        batcher = CacheService(Client(), batch_window=0.05).batcher
+        pending = asyncio.ensure_future(batcher.load("main"))
+        await asyncio.sleep(0)
+
+        # Another thread's loop queues its own batch while ours is pending
+        other = await asyncio.to_thread(asyncio.run, batcher.load("worker"))
+
+        assert other == b"worker"
+        assert await asyncio.wait_for(pending, timeout=1) == b"main"
+        assert batcher.get_stats()["batches"] == 2
@@ -0,0 +1,136 @@
+"""
+Unit tests and microbenchmark for the cache value codec
+"""
+
+import json
+import pickle
+import time
+import pytest
+from datetime import datetime, timedelta, date
+from decimal import Decimal
+from uuid import uuid4
+
+from app.core.cache_codec import CacheCodec, CodecError, FORMAT_JSON, FORMAT_TAGGED_JSON, FORMAT_MASK
+
+
+def analytics_payload():
+    """Dashboard-style analytics payload with real datetimes"""
+    start = datetime(2024, 1, 1)
+    return {
+        "organization_id": "org_123",
+        "generated_at": start,
+        "totals": {"leads": 1250, "qualified": 310, "conversion_rate": 24.8},
+        "daily": [
+            {"date": start + timedelta(days=i), "leads": 40 + i % 7, "conversations": 95 + i % 11, "avg_score": 61.5}
+            for i in range(90)
+        ],
+        "sources": {"website": 520, "google_ads": 410, "referral": 320},
+    }
+
+
+def context_payload():
+    """Conversation context as stored by the context manager"""
+    return {
+        "conversation_id": "conv_123",
+        "user_id": "user_456",
+        "tenant_id": "tenant_789",
+        "messages": [
+            {"role": "user" if i % 2 == 0 else "assistant",
+             "content": f"Message {i} about a 3-bedroom house near downtown with a yard",
+             "timestamp": 1704067200.0 + i}
+            for i in range(20)
+        ],
+        "metadata": {"turn_count": 10, "last_intent": "property_search"},
+    }
+
+
+def legacy_encode(value):
+    try:
+        return json.dumps(value).encode("utf-8")
+    except (TypeError, ValueError):
+        return pickle.dumps(value)
+
+
+def legacy_decode(data):
+    try:
+        return json.loads(data.decode("utf-8"))
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return pickle.loads(data)
+
+
+class TestCacheCodec:
+    """Unit tests for CacheCodec"""
+
+    @pytest.fixture
+    def codec(self):
+        return CacheCodec()
+
+    def test_plain_json_round_trip(self, codec):
+        value = context_payload()
+        encoded = codec.encode(value)
+
+        assert encoded[0] & FORMAT_MASK == FORMAT_JSON
+        assert codec.decode(encoded) == value
+
+    def test_rich_types_round_trip(self, codec):
+        value = {
+            "at": datetime(2024, 5, 1, 12, 30),
+            "day": date(2024, 5, 1),
+            "price": Decimal("350000.50"),
+            "tags": {"hot", "qualified"},
+            "raw": b"\x00\x01",
+        }
+        encoded = codec.encode(value)
+
+        assert encoded[0] & FORMAT_MASK == FORMAT_TAGGED_JSON
+        assert codec.decode(encoded) == value
+
+    def test_uuids_are_stored_as_strings(self, codec):
+        lead_id = uuid4()
+
+        assert codec.decode(codec.encode({"id": lead_id})) == {"id": str(lead_id)}
+
+    def test_large_payloads_are_compressed(self, codec):
+        value = analytics_payload()
+        encoded = codec.encode(value)
+
+        assert len(encoded) < len(legacy_encode(value))
+        assert codec.decode(encoded) == value
+
+    def test_arbitrary_objects_are_rejected(self, codec):
+        with pytest.raises(CodecError):
+            codec.encode({"obj": object()})
+
+    def test_legacy_values(self, codec):
+        assert codec.decode(json.dumps({"a": 1}).encode()) == {"a": 1}
+        with pytest.raises(CodecError):
+            codec.decode(pickle.dumps({"a": 1}))
+
+    @pytest.mark.performance
+    def test_codec_microbenchmark(self, codec):
+        """Compare the codec with the previous JSON-then-pickle path"""
+        iterations = 2000
+        report = []
+
+        for name, value in (("analytics", analytics_payload()), ("context", context_payload())):
+            for label, encode, decode in (
+                ("legacy", legacy_encode, legacy_decode),
+                ("codec", codec.encode, codec.decode),
+            ):
+                encoded = encode(value)
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    encode(value)
+                encode_us = (time.perf_counter() - started) / iterations * 1e6
+
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    decode(encoded)
+                decode_us = (time.perf_counter() - started) / iterations * 1e6
+
+                report.append((name, label, len(encoded), encode_us, decode_us))
+                assert decode(encoded) == value
+
+        print("\npayload    path    bytes  encode_us  decode_us")
+        for row in report:
+            print("%-10s %-6s %6d %10.1f %10.1f" % row)
@@ -0,0 +1,84 @@
+"""
+Unit tests for SCAN-, tag- and generation-based cache invalidation
+"""
+
+import pytest
+import fakeredis.aioredis
+from unittest.mock import patch
+
+from app.core import cache
+from app.core.cache import CacheService, CacheManager
+
+
+class TestCacheInvalidation:
+    """Unit tests for cache invalidation without KEYS"""
+
+    @pytest.fixture
+    def client(self):
+        client = fakeredis.aioredis.FakeRedis()
+        with patch.object(cache, "redis_client", client):
+            yield client
+
+    @pytest.fixture
+    def service(self, client):
+        return CacheService(client)
+
+    @pytest.mark.asyncio
+    async def test_clear_pattern_never_uses_keys(self, service, client):
+        for i in range(1200):
+            await client.set(f"leads:{i}", i)
+        await client.set("voice_session:1", "live")
+
+        with patch.object(client, "keys", side_effect=AssertionError("KEYS called")):
+            removed = await service.clear_pattern("leads:*")
+
+        assert removed == 1200
+        assert await client.exists("voice_session:1")
+
+    @pytest.mark.asyncio
+    async def test_invalidate_tags_removes_tagged_keys_only(self, service, client):
+        await service.set("lead:1", {"id": 1}, ttl=60, tags=["org:a"])
+        await service.set("lead:2", {"id": 2}, ttl=60, tags=["org:a", "agent:x"])
+        await service.set("lead:3", {"id": 3}, ttl=60, tags=["org:b"])
+
+        removed = await service.invalidate_tags("org:a")
+
+        assert removed == 2
+        assert await service.get("lead:3") == {"id": 3}
+        assert not await client.exists("cache:tag:org:a")
+
+    @pytest.mark.asyncio
+    async def test_tag_index_outlives_its_members(self, service, client):
+        await service.set("short", 1, ttl=10, tags=["t"])
+        await service.set("long", 2, ttl=600, tags=["t"])
+        assert 590 < await client.ttl("cache:tag:t") <= 600
+
+        await service.set("forever", 3, tags=["t"])
+        assert await client.ttl("cache:tag:t") == -1
+
+        await service.set("later", 4, ttl=10, tags=["t"])
+        assert await client.ttl("cache:tag:t") == -1
+
+    @pytest.mark.asyncio
+    async def test_clear_namespace_is_a_generation_bump(self, client):
+        manager = CacheManager("leads")
+        await manager.set("a", 1)
+        await manager.set("b", 2)
+        assert sorted(await manager.get_keys()) == ["a", "b"]
+
+        await manager.clear_namespace()
+
+        assert await manager.get("a") is None
+        assert await manager.get_keys() == []
+        # Previous generation is orphaned, not deleted, and ages out by TTL
+        assert await client.ttl("leads:v0:a") > 0
+
+    @pytest.mark.asyncio
+    async def test_organization_invalidation_is_scoped(self, client):
+        await cache.cache_analytics_data("org_1", "dashboard", {"leads": 5})
+        await cache.cache_analytics_data("org_2", "dashboard", {"leads": 7})
+
+        await cache.invalidate_organization_cache("org_1")
+
+        assert await cache.get_cached_analytics_data("org_1", "dashboard") is None
+        assert await cache.get_cached_analytics_data("org_2", "dashboard") == {"leads": 7}
@@ -0,0 +1,103 @@
+"""
+Unit tests for the cache_result decorator
+"""
+
+import asyncio
+import time
+import pytest
+import fakeredis.aioredis
+from unittest.mock import patch
+
+from app.core import cache
+from app.core.cache import cache_result, get_cache_metrics, make_cache_key
+
+
+class TestCacheResult:
+    """Unit tests for deterministic, stampede-safe result caching"""
+
+    @pytest.fixture(autouse=True)
+    def client(self):
+        client = fakeredis.aioredis.FakeRedis()
+        with patch.object(cache, "redis_client", client):
+            yield client
+
+    def test_keys_are_deterministic_and_ignore_sessions(self):
+        async def report(self, organization_id, days=7, db=None):
+            pass
+
+        first = make_cache_key(report, (object(), "org_1"), {"db": object()}, "analytics", {"self", "db"})
+        second = make_cache_key(report, (object(),), {"organization_id": "org_1", "days": 7}, "analytics", {"self", "db"})
+
+        assert first == second
+        assert first.startswith("analytics:")
+        assert make_cache_key(report, (None, "org_2"), {}, "", {"self", "db"}) != first
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_call(self):
+        calls = 0
+
+        @cache_result(ttl=60)
+        async def slow_lookup(lead_id):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"lead_id": lead_id}
+
+        results = await asyncio.gather(*(slow_lookup("lead_1") for _ in range(10)))
+
+        assert calls == 1
+        assert all(result == {"lead_id": "lead_1"} for result in results)
+        assert await slow_lookup("lead_1") == {"lead_id": "lead_1"}
+        assert calls == 1
+
+    @pytest.mark.asyncio
+    async def test_none_results_are_negatively_cached(self):
+        calls = 0
+
+        @cache_result(ttl=60)
+        async def missing_lead(lead_id):
+            nonlocal calls
+            calls += 1
+            return None
+
+        assert await missing_lead("nope") is None
+        assert await missing_lead("nope") is None
+        assert calls == 1
+
+        metrics = get_cache_metrics()[f"{__name__}.{missing_lead.__qualname__}"]
+        assert metrics["negative_hits"] == 1
+        assert metrics["hit_rate"] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_stale_value_served_while_refreshing(self):
+        calls = 0
+
+        @cache_result(ttl=60, stale_ttl=300, early_refresh_beta=0)
+        async def score(lead_id):
+            nonlocal calls
+            calls += 1
+            return calls
+
+        assert await score("lead_1") == 1
+
+        with patch("app.core.cache.time.time", return_value=time.time() + 120):
+            assert await score("lead_1") == 1  # stale, refresh scheduled
+            await asyncio.gather(*cache._refresh_tasks)
+
+        assert calls == 2
+        assert await score("lead_1") == 2
+
+    @pytest.mark.asyncio
+    async def test_uncacheable_arguments_bypass_cache(self):
+        calls = 0
+
+        @cache_result(ttl=60)
+        async def lookup(payload):
+            nonlocal calls
+            calls += 1
+            return "ok"
+
+        await lookup(object())
+        await lookup(object())
+
+        assert calls == 2
@@ -0,0 +1,75 @@
+"""
+Unit tests for conversation message sequencing and batched writes
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.models.conversation import MessageType, MessageDirection
+from app.services.conversation_service import ConversationService, PendingMessage
+
+
+class TestConversationMessages:
+    """Unit tests for sequence allocation and the buffered message writer"""
+
+    @pytest.fixture
+    def service(self):
+        with patch("app.services.conversation_service.AnalyticsService"):
+            return ConversationService()
+
+    @pytest.fixture
+    def db(self):
+        db = AsyncMock()
+        result = MagicMock()
+        result.scalar_one_or_none.return_value = 7
+        db.execute.return_value = result
+        return db
+
+    @pytest.mark.asyncio
+    async def test_allocate_sequence_numbers_returns_first_of_block(self, service, db):
+        first = await service.allocate_sequence_numbers("conv_1", 2, db)
+
+        assert first == 6
+        db.execute.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_allocate_sequence_numbers_missing_conversation(self, service, db):
+        db.execute.return_value.scalar_one_or_none.return_value = None
+
+        with pytest.raises(ValueError):
+            await service.allocate_sequence_numbers("missing", 1, db)
+
+    @pytest.mark.asyncio
+    async def test_add_messages_uses_one_insert_and_one_commit(self, service, db):
+        messages = [
+            PendingMessage(MessageType.USER_SPEECH, MessageDirection.INBOUND, "Hi"),
+            PendingMessage(MessageType.AGENT_SPEECH, MessageDirection.OUTBOUND, "Hello!"),
+        ]
+
+        message_ids = await service.add_messages("conv_1", messages, db)
+
+        assert len(message_ids) == 2
+        # One UPDATE ... RETURNING for the sequence block, one multi-row INSERT
+        assert db.execute.await_count == 2
+        db.commit.assert_awaited_once()
+
+        insert_params = db.execute.await_args_list[1].args[0].compile().params
+        sequence_numbers = sorted(
+            value for key, value in insert_params.items() if key.startswith("sequence_number")
+        )
+        assert sequence_numbers == [6, 7]
+
+    @pytest.mark.asyncio
+    async def test_writer_buffers_until_flush(self, service, db):
+        writer = service.message_writer("conv_1")
+        writer.add(MessageType.USER_SPEECH, MessageDirection.INBOUND, "Hi")
+        writer.add(MessageType.AGENT_SPEECH, MessageDirection.OUTBOUND, "Hello!")
+
+        db.execute.assert_not_called()
+
+        with patch.object(service, "add_messages", new_callable=AsyncMock, return_value=["a", "b"]) as mock_add:
+            assert await writer.flush(db) == ["a", "b"]
+
+        mock_add.assert_awaited_once()
+        assert len(mock_add.await_args.args[1]) == 2
+        assert writer.pending == []
@@ -0,0 +1,92 @@
+"""
+Unit tests for the incremental conversation summarizer
+"""
+
+import json
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+from app.ai.conversation.summarizer import ConversationSummarizer
+
+
+def _turns(count, offset=0):
+    messages = []
+    for i in range(offset, offset + count):
+        messages.append({"role": "user", "content": f"question {i} about budget", "timestamp": 1000 + i * 10})
+        messages.append({"role": "assistant", "content": f"answer {i}", "timestamp": 1001 + i * 10})
+    return messages
+
+
+class FakeRedis:
+    """Minimal async Redis stand-in for get/setex"""
+
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.store[key] = value
+
+
+class TestConversationSummarizer:
+    """Unit tests for ConversationSummarizer"""
+
+    @pytest.fixture
+    def client(self):
+        client = Mock()
+        client.chat.completions.create = AsyncMock(
+            return_value=Mock(choices=[Mock(message=Mock(content="rolling summary"))])
+        )
+        return client
+
+    @pytest.fixture
+    def summarizer(self, client):
+        summarizer = ConversationSummarizer(client)
+        summarizer.redis_client = FakeRedis()
+        return summarizer
+
+    @pytest.mark.asyncio
+    async def test_update_only_sends_new_messages(self, summarizer, client):
+        await summarizer.update("conv_1", {"messages": _turns(2), "metadata": {"turn_count": 2}})
+
+        context = {"messages": _turns(3), "metadata": {"turn_count": 3}}
+        summary = await summarizer.update("conv_1", context)
+
+        assert summary["turn_count"] == 3
+        prompt = client.chat.completions.create.await_args.kwargs["messages"][0]["content"]
+        assert "question 2" in prompt
+        assert "question 0" not in prompt
+        assert "rolling summary" in prompt  # previous summary is carried forward
+
+    @pytest.mark.asyncio
+    async def test_current_summary_is_a_cache_read(self, summarizer, client):
+        context = {"messages": _turns(2), "metadata": {"turn_count": 2}}
+        await summarizer.update("conv_1", context)
+        client.chat.completions.create.reset_mock()
+
+        summary = await summarizer.update("conv_1", context)
+
+        client.chat.completions.create.assert_not_awaited()
+        assert summary["summary"] == "rolling summary"
+
+    @pytest.mark.asyncio
+    async def test_summary_is_versioned_and_stored(self, summarizer):
+        await summarizer.update("conv_1", {"messages": _turns(2), "metadata": {"turn_count": 2}}, "tenant_1")
+
+        stored = json.loads(summarizer.redis_client.store["conversation:tenant_1:conv_1:summary"])
+        assert stored["turn_count"] == 2
+        assert stored["first_timestamp"] == 1000
+        assert stored["insight_flags"] == ["price_discussion"]
+
+    def test_insights_accumulate_across_deltas(self):
+        summary = ConversationSummarizer.empty_summary()
+        ConversationSummarizer.update_insights(summary, [{"role": "user", "content": "What is the price?"}])
+        ConversationSummarizer.update_insights(summary, [{"role": "user", "content": "Can we schedule a tour?"}])
+
+        insights = ConversationSummarizer.insights(summary)
+
+        assert "Price/budget discussion - potential qualified lead" in insights
+        assert "Scheduling request - follow up needed" in insights
+        assert summary["user_message_count"] == 2
@@ -0,0 +1,122 @@
+"""
+Unit tests for read-replica session routing
+Two SQLite files stand in for the primary and the replica
+"""
+
+import pytest
+from sqlalchemy import Column, Integer, String, select, update, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import declarative_base
+
+from app.core.db_routing import ReplicaRouter, READ_ONLY_KEY
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = "items"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+
+
+@pytest.fixture
+async def router(tmp_path):
+    writer = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    reader = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    for engine, name in ((writer, "primary"), (reader, "replica")):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(Item.__table__.insert().values(id=1, name=name))
+
+    router = ReplicaRouter(writer, reader, max_lag_seconds=5.0, check_interval=60.0)
+    yield router
+    await router.dispose()
+
+
+async def item_name(session) -> str:
+    return (await session.execute(select(Item.name).where(Item.id == 1))).scalar_one()
+
+
+class TestReplicaRouting:
+    """Unit tests for ReplicaRouter and RoutingSession"""
+
+    @pytest.mark.asyncio
+    async def test_default_sessions_use_primary(self, router):
+        await router.check_replica()
+        async with router.sessionmaker()() as session:
+            assert await item_name(session) == "primary"
+
+    @pytest.mark.asyncio
+    async def test_read_only_sessions_use_healthy_replica(self, router):
+        await router.check_replica()
+        async with router.sessionmaker()(info={READ_ONLY_KEY: True}) as session:
+            assert await item_name(session) == "replica"
+            assert (await session.get(Item, 1)).name == "replica"
+
+    @pytest.mark.asyncio
+    async def test_replica_unused_until_checked(self, router):
+        async with router.sessionmaker()(info={READ_ONLY_KEY: True}) as session:
+            assert await item_name(session) == "primary"
+
+    @pytest.mark.asyncio
+    async def test_lagging_replica_falls_back_to_primary(self, router):
+        router.monitor.measure_lag = lambda: _returning(30.0)
+        await router.check_replica()
+
+        assert not router.replica_available
+        async with router.sessionmaker()(info={READ_ONLY_KEY: True}) as session:
+            assert await item_name(session) == "primary"
+
+    @pytest.mark.asyncio
+    async def test_unreachable_replica_falls_back_to_primary(self, router):
+        async def fail():
+            raise ConnectionError("replica down")
+        router.monitor.measure_lag = fail
+        await router.check_replica()
+
+        assert router.get_stats()["last_error"] == "replica down"
+        async with router.sessionmaker()(info={READ_ONLY_KEY: True}) as session:
+            assert await item_name(session) == "primary"
+
+    @pytest.mark.asyncio
+    async def test_reads_stick_to_primary_after_write(self, router):
+        await router.check_replica()
+        async with router.sessionmaker()(info={READ_ONLY_KEY: True}) as session:
+            assert await item_name(session) == "replica"
+
+            await session.execute(update(Item).where(Item.id == 1).values(name="written"))
+            await session.commit()
+
+            assert await item_name(session) == "written"
+
+    @pytest.mark.asyncio
+    async def test_flush_makes_session_sticky(self, router):
+        await router.check_replica()
+        async with router.sessionmaker()(info={READ_ONLY_KEY: True}) as session:
+            session.add(Item(id=2, name="new"))
+            await session.flush()
+
+            assert (await session.execute(select(Item.name).where(Item.id == 2))).scalar_one() == "new"
+
+    @pytest.mark.asyncio
+    async def test_locking_reads_and_raw_sql_use_primary(self, router):
+        await router.check_replica()
+        async with router.sessionmaker()(info={READ_ONLY_KEY: True}) as session:
+            assert (await session.execute(text("SELECT name FROM items WHERE id = 1"))).scalar_one() == "primary"
+
+        async with router.sessionmaker()(info={READ_ONLY_KEY: True}) as session:
+            stmt = select(Item.name).where(Item.id == 1).with_for_update()
+            assert (await session.execute(stmt)).scalar_one() == "primary"
+
+    @pytest.mark.asyncio
+    async def test_without_replica_everything_uses_primary(self, router):
+        single = ReplicaRouter(router.writer)
+        await single.check_replica()
+        async with single.sessionmaker()(info={READ_ONLY_KEY: True}) as session:
+            assert await item_name(session) == "primary"
+        assert single.get_stats() == {"replica_configured": False}
+
+
+async def _returning(value):
+    return value
@@ -0,0 +1,150 @@
+"""
+Unit tests for database telemetry
+"""
+
+import logging
+import pytest
+from types import SimpleNamespace
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.db_telemetry import (
+    DatabaseTelemetry,
+    InstrumentedQueuePool,
+    LatencyHistogram,
+    current_query_source,
+    db_telemetry,
+    fingerprint,
+    reset_query_source,
+    set_query_source
+)
+
+
+class TestFingerprint:
+    """Unit tests for SQL normalization"""
+
+    def test_literals_and_placeholders_are_replaced(self):
+        assert fingerprint(
+            "SELECT * FROM leads WHERE email = 'a@b.com' AND lead_score > 75 AND id = $1"
+        ) == "SELECT * FROM leads WHERE email = ? AND lead_score > ? AND id = ?"
+
+    def test_statements_differing_in_literals_share_a_fingerprint(self):
+        assert fingerprint("SELECT 1 FROM t WHERE id IN (1, 2, 3)") == fingerprint("SELECT 1 FROM t WHERE id IN (%s)")
+        assert fingerprint("SELECT 1 FROM t WHERE id IN (1, 2, 3)") == "SELECT ? FROM t WHERE id IN (...)"
+
+    def test_casts_identifiers_and_comments_survive(self):
+        sql = "SELECT t1.data::jsonb -- note\n FROM t1 WHERE t1.name = :name_1 /* x */"
+
+        assert fingerprint(sql) == "SELECT t1.data::jsonb FROM t1 WHERE t1.name = ?"
+
+    def test_multi_row_values_collapse(self):
+        assert fingerprint("INSERT INTO t (a, b) VALUES (?, ?), (?, ?), (?, ?)") == "INSERT INTO t (a, b) VALUES (?, ?), ..."
+
+
+class TestLatencyHistogram:
+    """Unit tests for the fixed-bucket histogram"""
+
+    def test_observations_land_in_cumulative_buckets(self):
+        histogram = LatencyHistogram(buckets_ms=(1, 10, 100))
+        for seconds in (0.0005, 0.005, 0.005, 0.05, 2.0):
+            histogram.observe(seconds)
+
+        snapshot = histogram.snapshot()
+        assert snapshot["count"] == 5
+        assert snapshot["buckets"] == {"1": 1, "10": 3, "100": 4, "+Inf": 5}
+        assert snapshot["p50_ms"] == 10.0
+        assert snapshot["p99_ms"] == 2000.0
+
+    def test_empty_histogram_has_no_quantiles(self):
+        assert LatencyHistogram().snapshot()["p95_ms"] is None
+
+
+class TestQuerySource:
+    """Unit tests for query attribution"""
+
+    def test_request_scope_resolves_to_route_template(self):
+        scope = {"type": "http", "method": "GET"}
+        token = set_query_source(scope)
+        try:
+            assert current_query_source() == "GET unmatched"
+            scope["route"] = SimpleNamespace(path="/api/v1/leads/{lead_id}")
+            assert current_query_source() == "GET /api/v1/leads/{lead_id}"
+        finally:
+            reset_query_source(token)
+
+        assert current_query_source() == "unattributed"
+
+
+class TestDatabaseTelemetry:
+    """Unit tests for event-driven statement and pool metrics"""
+
+    @pytest.mark.asyncio
+    async def test_statements_are_timed_per_source(self, tmp_path):
+        telemetry = DatabaseTelemetry(slow_query_ms=10_000)
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}")
+        telemetry.instrument(engine, "primary")
+
+        token = set_query_source("task app.tasks.lead_tasks.score")
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                await conn.execute(text("SELECT 2"))
+        finally:
+            reset_query_source(token)
+            await engine.dispose()
+
+        stats = telemetry.get_stats()
+        assert stats["statements"]["task app.tasks.lead_tasks.score"]["count"] == 2
+        assert stats["slow_queries"] == []
+
+    @pytest.mark.asyncio
+    async def test_failed_statements_do_not_leak_timers(self, tmp_path):
+        telemetry = DatabaseTelemetry()
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}")
+        telemetry.instrument(engine, "primary")
+
+        async with engine.connect() as conn:
+            with pytest.raises(Exception):
+                await conn.execute(text("SELECT * FROM missing"))
+            await conn.execute(text("SELECT 1"))
+            assert conn.sync_connection.info["query_start_time"] == []
+        await engine.dispose()
+
+    def test_slow_queries_are_grouped_and_logged_without_parameters(self, caplog):
+        telemetry = DatabaseTelemetry(slow_query_ms=100)
+
+        with caplog.at_level(logging.WARNING, logger="seiketsu.database"):
+            telemetry.record_statement("GET /api/v1/leads", "SELECT * FROM leads WHERE email = 'x@y.z'", 0.25)
+            telemetry.record_statement("GET /api/v1/leads/search", "SELECT * FROM leads WHERE email = 'q@r.s'", 0.15)
+            telemetry.record_statement("GET /api/v1/leads", "SELECT 1", 0.01)
+
+        slow = telemetry.top_slow_queries()
+        assert len(slow) == 1
+        assert slow[0]["fingerprint"] == "SELECT * FROM leads WHERE email = ?"
+        assert slow[0]["count"] == 2
+        assert slow[0]["sources"] == {"GET /api/v1/leads": 1, "GET /api/v1/leads/search": 1}
+        assert "x@y.z" not in caplog.text
+
+    @pytest.mark.asyncio
+    async def test_pool_reports_checkout_wait_and_gauges(self, tmp_path):
+        db_telemetry.reset()
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}",
+            poolclass=InstrumentedQueuePool,
+            pool_size=2,
+            pool_logging_name="telemetry_test"
+        )
+        db_telemetry.instrument(engine, "telemetry_test")
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                gauges = db_telemetry.pool_gauges()["telemetry_test"]
+                assert gauges["in_use"] == 1
+                assert gauges["checkout_wait"]["count"] == 1
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+            # The second checkout reuses the pooled connection
+            assert db_telemetry.pool_gauges()["telemetry_test"]["connections_opened"] == 1
+        finally:
+            await engine.dispose()
+            db_telemetry.engines.pop("telemetry_test", None)
@@ -0,0 +1,143 @@
+"""
+Unit tests for the GCRA rate limiters
+"""
+
+import asyncio
+import pytest
+import fakeredis.aioredis
+
+from app.utils import rate_limiter
+from app.utils.rate_limiter import (
+    GCRARateLimiter,
+    MemoryGCRAStore,
+    MultiKeyRateLimiter,
+    RateLimitExceeded,
+    RedisGCRAStore,
+    SlidingWindowRateLimiter,
+    TokenBucketRateLimiter,
+    gcra
+)
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "time", clock.time)
+    return clock
+
+
+class TestGCRA:
+    """Unit tests for the GCRA decision and stores"""
+
+    def test_burst_then_sustained_rate(self):
+        store = MemoryGCRAStore()
+
+        results = [store.update_now("k", 100.0, 1.0, 3) for _ in range(4)]
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert [r.remaining for r in results[:3]] == [2, 1, 0]
+        assert results[3].retry_after == pytest.approx(1.0)
+        assert results[2].reset_after == pytest.approx(3.0)
+
+        # One interval later exactly one more request fits
+        assert store.update_now("k", 101.0, 1.0, 3).allowed
+        assert not store.update_now("k", 101.0, 1.0, 3).allowed
+        # Idle keys recover the full burst
+        assert store.update_now("k", 200.0, 1.0, 3).remaining == 2
+
+    def test_rejections_do_not_consume(self):
+        result, tat = gcra(105.0, 100.0, 1.0, 3)
+
+        assert not result.allowed and tat is None
+        assert result.retry_after == pytest.approx(3.0)
+
+    def test_memory_store_evicts_least_recently_used(self):
+        store = MemoryGCRAStore(max_keys=2)
+
+        for key in ("a", "b", "a", "c"):
+            store.update_now(key, 100.0, 1.0, 3)
+
+        assert list(store.tats) == ["a", "c"]
+
+    @pytest.mark.asyncio
+    async def test_redis_store_matches_memory_store(self):
+        redis_store = RedisGCRAStore(fakeredis.aioredis.FakeRedis(), prefix="test:")
+        memory_store = MemoryGCRAStore()
+
+        for now in (100.0, 100.0, 100.0, 100.0, 100.5, 101.25, 110.0):
+            expected = memory_store.update_now("k", now, 0.5, 3)
+            result = await redis_store.update("k", now, 0.5, 3)
+            assert result.allowed == expected.allowed
+            assert result.remaining == expected.remaining
+            assert result.retry_after == pytest.approx(expected.retry_after)
+            assert result.reset_after == pytest.approx(expected.reset_after)
+
+        assert 0 < await redis_store.redis.pttl("test:k") <= 1500
+
+    @pytest.mark.asyncio
+    async def test_redis_concurrent_requests_never_exceed_burst(self, clock):
+        limiter = GCRARateLimiter(1 / 60, 10, store=RedisGCRAStore(fakeredis.aioredis.FakeRedis(max_connections=1000)))
+
+        results = await asyncio.gather(*[limiter.check("ip:1.2.3.4") for _ in range(1000)])
+
+        assert sum(result.allowed for result in results) == 10
+
+    @pytest.mark.asyncio
+    async def test_store_errors_fall_back_to_memory(self, clock):
+        class BrokenStore:
+            async def update(self, *args):
+                raise ConnectionError("redis down")
+
+        limiter = GCRARateLimiter(1, 2, store=BrokenStore())
+
+        assert [(await limiter.check("k")).allowed for _ in range(3)] == [True, True, False]
+
+
+class TestRateLimiters:
+    """Unit tests for the limiter classes built on GCRA"""
+
+    @pytest.mark.asyncio
+    async def test_token_bucket(self, clock):
+        limiter = TokenBucketRateLimiter(requests_per_second=2, burst_size=3)
+
+        for _ in range(3):
+            assert await limiter.acquire()
+        with pytest.raises(RateLimitExceeded, match="Wait 0.50s"):
+            await limiter.acquire()
+        assert limiter.get_stats()["current_tokens"] == pytest.approx(0)
+
+        clock.now += 1
+        assert limiter.get_stats()["current_tokens"] == pytest.approx(2)
+        assert await limiter.try_acquire(2)
+        assert not await limiter.try_acquire()
+
+    @pytest.mark.asyncio
+    async def test_sliding_window(self, clock):
+        limiter = SlidingWindowRateLimiter(requests_per_window=4, window_size=60)
+
+        assert await limiter.try_acquire(4)
+        assert not await limiter.try_acquire()
+        assert limiter.get_stats()["current_requests"] == 4
+
+        clock.now += 15
+        assert await limiter.try_acquire()
+        assert not await limiter.try_acquire()
+
+    @pytest.mark.asyncio
+    async def test_multi_key_limits_are_independent_and_bounded(self, clock):
+        limiter = MultiKeyRateLimiter(requests_per_second=1, burst_size=1, max_keys=100)
+
+        assert await limiter.try_acquire("a")
+        assert not await limiter.try_acquire("a")
+        assert await limiter.try_acquire("b")
+
+        for i in range(500):
+            await limiter.try_acquire(f"client-{i}")
+        assert limiter.get_stats()["total_keys"] == 100
@@ -0,0 +1,204 @@
+"""
+Unit tests for the streaming lead import pipeline
+"""
+
+import json
+import os
+import pytest
+from unittest.mock import AsyncMock
+
+from app.services.lead_import_service import (
+    BatchResult,
+    ImportJobBusy,
+    LeadImportService,
+    normalize_email,
+    normalize_phone,
+    read_rows
+)
+
+
+async def chunks_of(data: bytes, size: int = 7):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def batch_importer(fail_on_batch=None):
+    """import_batch stand-in: every row imports except those marked bad"""
+    calls = []
+
+    async def import_batch(batch, organization_id, user_id, row_model, db):
+        calls.append([row_number for row_number, _, _ in batch])
+        if fail_on_batch is not None and len(calls) == fail_on_batch:
+            raise RuntimeError("database went away")
+        result = BatchResult()
+        for row_number, record, _ in batch:
+            if record.get("bad"):
+                result.invalid += 1
+                result.errors.append({"row": row_number, "error": "bad row", "data": record})
+            else:
+                result.imported += 1
+        return result
+
+    return import_batch, calls
+
+
+class TestLeadImportParsing:
+    """Unit tests for row readers and dedupe keys"""
+
+    def test_csv_rows(self, tmp_path):
+        path = tmp_path / "leads.csv"
+        path.write_text(
+            "\ufefffirst_name,last_name,email,tags\n"
+            "Ada,Lovelace,ADA@example.com, investor ; cash buyer \n"
+            "Alan,Turing,,\n",
+            encoding="utf-8"
+        )
+
+        rows = list(read_rows(str(path), "csv"))
+
+        assert rows == [
+            (1, {"first_name": "Ada", "last_name": "Lovelace", "email": "ADA@example.com",
+                 "tags": ["investor", "cash buyer"]}, None),
+            (2, {"first_name": "Alan", "last_name": "Turing"}, None)
+        ]
+        assert [number for number, _, _ in read_rows(str(path), "csv", skip=1)] == [2]
+
+    def test_ndjson_rows_report_parse_errors(self, tmp_path):
+        path = tmp_path / "leads.ndjson"
+        path.write_text('{"first_name": "Ada"}\n\nnot json\n[1, 2]\n{"first_name": "Alan"}\n')
+
+        rows = list(read_rows(str(path), "ndjson"))
+
+        assert [(number, error is None) for number, _, error in rows] == [
+            (1, True), (2, False), (3, False), (4, True)
+        ]
+        assert rows[1][1] == "not json"
+        assert rows[3][1] == {"first_name": "Alan"}
+
+    def test_unsupported_format(self, tmp_path):
+        path = tmp_path / "leads.xlsx"
+        path.write_text("")
+
+        with pytest.raises(ValueError):
+            list(read_rows(str(path), "xlsx"))
+
+    def test_normalized_keys(self):
+        assert normalize_email("  Ada@Example.COM ") == "ada@example.com"
+        assert normalize_email("  ") is None
+        assert normalize_phone("+1 (555) 010-2030") == "15550102030"
+        assert normalize_phone(None) is None
+
+
+class TestLeadImportJobs:
+    """Unit tests for job spooling, checkpoints and resume"""
+
+    @pytest.fixture
+    def service(self, tmp_path):
+        return LeadImportService(base_dir=str(tmp_path), batch_size=2)
+
+    async def create_job(self, service, lines):
+        data = "".join(json.dumps(line) + "\n" for line in lines).encode()
+        return await service.create_job("org-1", "user-1", "ndjson", chunks_of(data))
+
+    @pytest.mark.asyncio
+    async def test_run_records_progress_and_errors(self, service, monkeypatch):
+        job = await self.create_job(service, [{"n": 1}, {"n": 2, "bad": True}, {"n": 3}])
+        import_batch, calls = batch_importer()
+        monkeypatch.setattr(service, "import_batch", import_batch)
+        progress = []
+
+        checkpoint = await service.run(job.job_id, AsyncMock(), dict, progress=lambda c: progress.append(c.rows_read))
+
+        assert calls == [[1, 2], [3]]
+        assert progress == [2, 3]
+        assert checkpoint.status == "completed"
+        assert (checkpoint.imported, checkpoint.invalid, checkpoint.rows_read) == (2, 1, 3)
+        with open(service.errors_path(job.job_id)) as f:
+            assert [json.loads(line)["row"] for line in f] == [2]
+        assert service.load_checkpoint(job.job_id).status == "completed"
+
+    @pytest.mark.asyncio
+    async def test_resume_after_failure_skips_committed_batches(self, service, monkeypatch):
+        job = await self.create_job(service, [{"n": 1, "bad": True}, {"n": 2}, {"n": 3}, {"n": 4}, {"n": 5}])
+        db = AsyncMock()
+
+        import_batch, calls = batch_importer(fail_on_batch=2)
+        monkeypatch.setattr(service, "import_batch", import_batch)
+        with pytest.raises(RuntimeError):
+            await service.run(job.job_id, db, dict)
+
+        failed = service.load_checkpoint(job.job_id)
+        assert failed.status == "failed"
+        assert failed.rows_read == 2
+        assert failed.error == "database went away"
+        db.rollback.assert_awaited()
+
+        # Simulate error lines left behind by the batch that never committed
+        with open(service.errors_path(job.job_id), "a") as f:
+            f.write('{"row": 3, "error": "uncommitted"}\n')
+
+        import_batch, calls = batch_importer()
+        monkeypatch.setattr(service, "import_batch", import_batch)
+        checkpoint = await service.run(job.job_id, db, dict)
+
+        assert calls == [[3, 4], [5]]
+        assert checkpoint.status == "completed"
+        assert (checkpoint.imported, checkpoint.invalid) == (4, 1)
+        with open(service.errors_path(job.job_id)) as f:
+            assert [json.loads(line)["row"] for line in f] == [1]
+
+    @pytest.mark.asyncio
+    async def test_upload_size_limit(self, service, tmp_path):
+        with pytest.raises(ValueError):
+            await service.create_job("org-1", "user-1", "csv", chunks_of(b"x" * 20), max_bytes=10)
+
+        assert list(tmp_path.iterdir()) == []
+
+    def test_job_ids_cannot_escape_import_dir(self, service):
+        with pytest.raises(ValueError):
+            service.load_checkpoint("../etc")
+
+    @pytest.mark.asyncio
+    async def test_abandoned_running_job_becomes_resumable(self, service, monkeypatch):
+        job = await self.create_job(service, [{"n": 1}, {"n": 2}, {"n": 3}])
+        service.stale_after = 60
+
+        # A runner that died mid-import leaves its lock and a running checkpoint
+        assert service.claim(job.job_id)
+        checkpoint = service.load_checkpoint(job.job_id)
+        checkpoint.status, checkpoint.rows_read = "running", 2
+        service.save_checkpoint(checkpoint)
+        service._claimed.clear()
+
+        assert not service.is_resumable(service.load_checkpoint(job.job_id))
+        assert not service.claim(job.job_id)
+
+        checkpoint.updated_at = "2000-01-01T00:00:00"
+        with open(service._job_path(job.job_id, "checkpoint.json"), "w") as f:
+            json.dump(checkpoint.to_dict(), f)
+        os.utime(service.lock_path(job.job_id), (0, 0))
+
+        assert service.is_resumable(service.load_checkpoint(job.job_id))
+        import_batch, calls = batch_importer()
+        monkeypatch.setattr(service, "import_batch", import_batch)
+        resumed = await service.run(job.job_id, AsyncMock(), dict)
+
+        assert calls == [[3]]
+        assert resumed.status == "completed"
+        assert not os.path.exists(service.lock_path(job.job_id))
+
+    @pytest.mark.asyncio
+    async def test_only_one_runner_owns_a_job(self, service, monkeypatch):
+        job = await self.create_job(service, [{"n": 1}])
+        import_batch, calls = batch_importer()
+        monkeypatch.setattr(service, "import_batch", import_batch)
+
+        other = LeadImportService(base_dir=service.base_dir, batch_size=2)
+        assert other.claim(job.job_id)
+        assert not service.claim(job.job_id)
+        with pytest.raises(ImportJobBusy):
+            await service.run(job.job_id, AsyncMock(), dict)
+        assert calls == []
+
+        other.release(job.job_id)
+        assert (await service.run(job.job_id, AsyncMock(), dict)).status == "completed"
@@ -0,0 +1,56 @@
+"""
+Unit tests for the leads table DDL outside PostgreSQL
+"""
+
+from datetime import datetime
+
+from sqlalchemy import Column, MetaData, String, Table, create_engine, insert, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from app.models.lead import Lead
+
+
+def leads_metadata() -> MetaData:
+    """The leads table plus bare stand-ins for the tables it references"""
+    metadata = MetaData()
+    for table_name in {fk.target_fullname.split(".")[0] for fk in Lead.__table__.foreign_keys}:
+        Table(table_name, metadata, Column("id", String, primary_key=True))
+    Lead.__table__.to_metadata(metadata)
+    return metadata
+
+
+class TestLeadSchema:
+    """Unit tests for generated lead columns across dialects"""
+
+    def test_create_all_on_sqlite(self):
+        metadata = leads_metadata()
+        engine = create_engine("sqlite://")
+        metadata.create_all(engine)
+        leads = metadata.tables["leads"]
+        now = datetime(2025, 1, 1, 12, 0)
+
+        def lead(lead_id, **values):
+            row = {"id": lead_id, "organization_id": "org-1", "created_by_user_id": "user-1",
+                   "first_name": "Ada", "last_name": "Lovelace",
+                   "created_at": now, "updated_at": now}
+            row.update(values)
+            return row
+
+        with engine.begin() as conn:
+            conn.execute(insert(leads).values(lead("new", phone="+1 (555) 010-2030", lead_score=80)))
+            conn.execute(insert(leads).values(lead("scheduled", next_follow_up_date=datetime(2025, 2, 1))))
+            conn.execute(insert(leads).values(lead("contacted", last_contact_date=now)))
+            rows = {row.id: row for row in conn.execute(select(leads))}
+
+        assert rows["new"].follow_up_due_at == datetime(2025, 1, 2, 12, 0)
+        assert rows["scheduled"].follow_up_due_at == datetime(2025, 2, 1)
+        assert rows["contacted"].follow_up_due_at is None
+        assert rows["new"].is_hot and not rows["contacted"].is_hot
+        assert rows["new"].phone_digits == "15550102030"
+
+    def test_postgresql_ddl_uses_interval(self):
+        leads = leads_metadata().tables["leads"]
+        ddl = str(CreateTable(leads).compile(dialect=postgresql.dialect()))
+
+        assert "created_at + interval '1 day'" in ddl
@@ -0,0 +1,128 @@
+"""
+Unit tests for vectorized batch lead scoring
+"""
+
+import numpy as np
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from app.services.lead_scoring_service import (
+    LEAD_FEATURES,
+    LeadScoringService,
+    feature_matrix,
+    rule_scores
+)
+
+NOW = datetime(2025, 1, 31)
+
+
+def lead_row(**values):
+    row = {
+        "id": "lead-1",
+        "lead_score": 0,
+        "email": None,
+        "phone": None,
+        "budget_min": None,
+        "budget_max": None,
+        "timeline": None,
+        "pre_approved": None,
+        "preferred_bedrooms": None,
+        "preferred_bathrooms": None,
+        "created_at": datetime(2025, 1, 1),
+        "sentiment_score": None
+    }
+    row.update(values)
+    return SimpleNamespace(**row)
+
+
+class FakeModel:
+    def predict_proba(self, matrix):
+        assert not np.isnan(matrix).any()
+        positive = np.linspace(0.1, 0.9, len(matrix))
+        return np.column_stack([1 - positive, positive])
+
+
+class TestLeadScoring:
+    """Unit tests for feature extraction and chunk scoring"""
+
+    def test_feature_matrix(self):
+        matrix = feature_matrix([
+            lead_row(email="a@example.com", phone="555", budget_max=400000, timeline="1_month", preferred_bedrooms=3),
+            lead_row(pre_approved=True, sentiment_score=0.2)
+        ], now=NOW)
+
+        assert matrix.shape == (2, len(LEAD_FEATURES))
+        first = dict(zip(LEAD_FEATURES, matrix[0]))
+        assert first["has_email"] == first["has_phone"] == first["has_budget"] == 1
+        assert np.isnan(first["budget_min"])
+        assert first["budget_max"] == 400000
+        assert first["timeline_points"] == 25
+        assert first["bedrooms"] == 3
+        assert first["days_since_creation"] == 30
+        assert np.isnan(first["sentiment"])
+        assert dict(zip(LEAD_FEATURES, matrix[1]))["pre_approved"] == 1
+
+    def test_rule_scores_match_lead_score_rule(self):
+        matrix = feature_matrix([
+            lead_row(),
+            lead_row(email="a@example.com", phone="555"),
+            lead_row(email="a@example.com", phone="555", budget_min=1, timeline="immediate"),
+            lead_row(budget_min=1, timeline="immediate", pre_approved=True, sentiment_score=0.9),
+            lead_row(sentiment_score=0.3),
+            lead_row(sentiment_score=-0.5, timeline="someday")
+        ], now=NOW)
+
+        assert rule_scores(matrix).tolist() == [0, 20, 70, 90, 5, 0]
+
+    def test_rule_scores_are_capped(self):
+        matrix = feature_matrix([lead_row(
+            email="a@example.com", phone="555", budget_min=1, timeline="immediate",
+            pre_approved=True, sentiment_score=0.9
+        )], now=NOW)
+
+        assert rule_scores(matrix).tolist() == [100]
+
+    @pytest.mark.asyncio
+    async def test_local_model_scores_whole_chunk(self):
+        service = LeadScoringService(backend="local", model_path="/nonexistent", batch_size=10)
+        service._model, service._model_loaded = FakeModel(), True
+        matrix = feature_matrix([lead_row(), lead_row(), lead_row()], now=NOW)
+
+        scores = await service.score_matrix(["a", "b", "c"], matrix, "org-1")
+
+        assert scores.tolist() == [10, 50, 90]
+
+    @pytest.mark.asyncio
+    async def test_missing_model_falls_back_to_rules(self):
+        service = LeadScoringService(backend="local", model_path="/nonexistent", batch_size=10)
+        matrix = feature_matrix([lead_row(email="a@example.com")], now=NOW)
+
+        assert (await service.score_matrix(["a"], matrix, "org-1")).tolist() == [10]
+
+    @pytest.mark.asyncio
+    async def test_remote_backend_makes_one_batched_call(self):
+        remote = AsyncMock()
+        remote.predict_lead_conversion_batch.return_value = [{"lead_id": "b", "score": 0.42}]
+        service = LeadScoringService(backend="remote", model_path="/nonexistent", batch_size=10, remote=remote)
+        matrix = feature_matrix([lead_row(email="a@example.com"), lead_row()], now=NOW)
+
+        scores = await service.score_matrix(["a", "b"], matrix, "org-1")
+
+        remote.predict_lead_conversion_batch.assert_awaited_once()
+        leads, organization_id = remote.predict_lead_conversion_batch.await_args.args
+        assert organization_id == "org-1"
+        assert [lead["lead_id"] for lead in leads] == ["a", "b"]
+        assert leads[0]["has_email"] == 1.0 and leads[0]["budget_min"] is None
+        # Leads missing from the response keep their rule score
+        assert scores.tolist() == [10, 42]
+
+    @pytest.mark.asyncio
+    async def test_remote_outage_falls_back_to_rules(self):
+        remote = AsyncMock()
+        remote.predict_lead_conversion_batch.return_value = None
+        service = LeadScoringService(backend="remote", model_path="/nonexistent", batch_size=10, remote=remote)
+        matrix = feature_matrix([lead_row(phone="555")], now=NOW)
+
+        assert (await service.score_matrix(["a"], matrix, "org-1")).tolist() == [10]
@@ -0,0 +1,95 @@
+"""
+Unit tests for the in-process near-cache
+"""
+
+import asyncio
+import pytest
+import fakeredis.aioredis
+from unittest.mock import patch
+
+from app.core import cache
+from app.core.cache import CacheService, NearCache
+
+
+async def _wait_until(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not reached")
+        await asyncio.sleep(0.01)
+
+
+class TestNearCache:
+    """Unit tests for NearCache"""
+
+    @pytest.fixture
+    async def client(self):
+        server = fakeredis.FakeServer()
+        client = fakeredis.aioredis.FakeRedis(server=server)
+        client.server = server
+        with patch.object(cache, "redis_client", client):
+            yield client
+
+    @pytest.fixture
+    async def workers(self, client):
+        # Two workers sharing one Redis, each with its own L1
+        first = NearCache(CacheService(client))
+        second = NearCache(CacheService(fakeredis.aioredis.FakeRedis(server=client.server)))
+        for worker in (first, second):
+            worker.configure("permissions", max_entries=2, ttl=60)
+            await worker.start()
+        await _wait_until(lambda: first._subscribed and second._subscribed)
+        yield first, second
+        for worker in (first, second):
+            await worker.stop()
+
+    @pytest.mark.asyncio
+    async def test_second_read_is_served_from_l1(self, workers, client):
+        first, _ = workers
+        await first.set("permissions", "user_permissions:u1:c1", ["lead:read"], 300)
+
+        with patch.object(client, "get", side_effect=AssertionError("went to Redis")):
+            assert await first.get("permissions", "user_permissions:u1:c1") == ["lead:read"]
+
+        stats = first.get_stats()["permissions"]
+        assert stats["l1_hits"] == 1
+        assert stats["l1_hit_ratio"] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_hits_return_private_copies(self, workers):
+        first, _ = workers
+        await first.set("permissions", "key", ["a"], 300)
+
+        (await first.get("permissions", "key")).append("mutated")
+
+        assert await first.get("permissions", "key") == ["a"]
+
+    @pytest.mark.asyncio
+    async def test_writes_invalidate_other_workers(self, workers):
+        first, second = workers
+        await first.set("permissions", "key", ["old"], 300)
+        await _wait_until(lambda: second.get_stats().get("permissions", {}).get("invalidations") == 1)
+        assert await second.get("permissions", "key") == ["old"]
+        assert "key" in second._entries["permissions"]
+
+        await first.set("permissions", "key", ["new"], 300)
+        await _wait_until(lambda: "key" not in second._entries["permissions"])
+
+        assert await second.get("permissions", "key") == ["new"]
+
+    @pytest.mark.asyncio
+    async def test_namespace_size_limit_evicts_lru(self, workers):
+        first, _ = workers
+        for i in range(3):
+            await first.set("permissions", f"key{i}", i, 300)
+
+        assert list(first._entries["permissions"]) == ["key1", "key2"]
+        assert first.get_stats()["permissions"]["evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_no_l1_without_subscription(self, client):
+        near = NearCache(CacheService(client))
+        await near.set("permissions", "key", 1, 300)
+
+        assert await near.get("permissions", "key") == 1
+        assert not near._entries["permissions"]
@@ -0,0 +1,44 @@
+"""
+Unit tests for keyset pagination helpers
+"""
+
+import pytest
+from datetime import datetime
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select
+from sqlalchemy.dialects import postgresql
+
+from app.utils.pagination import encode_cursor, decode_cursor, keyset_after
+
+items = Table(
+    "items", MetaData(),
+    Column("id", String, primary_key=True),
+    Column("created_at", DateTime)
+)
+
+
+class TestPagination:
+    """Unit tests for cursor encoding and keyset conditions"""
+
+    def test_cursor_round_trip(self):
+        created_at = datetime(2025, 1, 20, 10, 30, 15, 123456)
+        cursor = encode_cursor(created_at, "lead-1")
+
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == (created_at, "lead-1")
+
+    @pytest.mark.parametrize("cursor", ["", "garbage", "W10", encode_cursor(datetime(2025, 1, 1), "x")[:-3]])
+    def test_malformed_cursor_raises(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+    def test_no_cursor_means_no_condition(self):
+        assert keyset_after(items.c.created_at, items.c.id, None) is None
+
+    def test_keyset_condition_is_row_comparison(self):
+        cursor = encode_cursor(datetime(2025, 1, 20), "lead-1")
+        stmt = select(items).where(keyset_after(items.c.created_at, items.c.id, cursor))
+
+        compiled = stmt.compile(dialect=postgresql.dialect())
+        assert "(items.created_at, items.id) < (" in str(compiled)
+        assert datetime(2025, 1, 20) in compiled.params.values()
+        assert "lead-1" in compiled.params.values()
@@ -0,0 +1,84 @@
+"""
+Unit tests for compiled prompt bundles
+"""
+
+import pytest
+from unittest.mock import AsyncMock
+
+from app.ai.conversation.function_calling import FunctionCallHandler
+from app.ai.conversation.prompt_bundles import PromptBundleCache, invalidate_prompt_bundles
+
+
+class TestPromptBundleCache:
+    """Unit tests for PromptBundleCache"""
+
+    @pytest.fixture
+    def cache(self):
+        return PromptBundleCache(FunctionCallHandler().get_available_functions)
+
+    def test_bundle_is_reused_across_turns(self, cache):
+        context = {"agent_id": "agent_1", "user_type": "agent"}
+
+        first = cache.get_bundle("tenant_1", context)
+        second = cache.get_bundle("tenant_1", context)
+
+        assert first is second
+        assert first.system_message is second.system_message
+        assert "agent-specific" in first.system_prompt
+        assert cache.get_stats()["builds"] == 1
+        assert cache.get_stats()["hits"] == 1
+
+    def test_bundles_are_per_tenant_and_agent(self, cache):
+        cache.get_bundle("tenant_1", {"agent_id": "agent_1"})
+        cache.get_bundle("tenant_2", {"agent_id": "agent_1"})
+        custom = cache.get_bundle("tenant_1", {"agent_id": "agent_2", "agent_system_prompt": "Custom prompt"})
+
+        assert custom.system_prompt == "Custom prompt"
+        assert cache.get_stats()["cached_bundles"] == 3
+
+    def test_invalidation_rebuilds_bundle(self, cache):
+        context = {"agent_id": "agent_invalidate"}
+        first = cache.get_bundle("tenant_1", context)
+
+        invalidate_prompt_bundles(agent_id="agent_invalidate")
+
+        assert cache.get_bundle("tenant_1", context) is not first
+        assert cache.get_stats()["builds"] == 2
+
+    def test_config_version_change_rebuilds_bundle(self, cache):
+        first = cache.get_bundle("tenant_1", {"agent_id": "agent_1", "agent_config_version": 1})
+        second = cache.get_bundle("tenant_1", {"agent_id": "agent_1", "agent_config_version": 2})
+
+        assert first is not second
+
+    def test_prompt_change_rebuilds_bundle(self, cache):
+        context = {"agent_id": "agent_1", "agent_config_version": 1, "agent_system_prompt": "Old prompt"}
+        first = cache.get_bundle("tenant_1", context)
+        second = cache.get_bundle("tenant_1", {**context, "agent_system_prompt": "New prompt"})
+
+        assert second is not first
+        assert second.system_prompt == "New prompt"
+
+    def test_least_recently_used_bundles_are_evicted(self):
+        cache = PromptBundleCache(FunctionCallHandler().get_available_functions, max_bundles=2)
+        first = cache.get_bundle("tenant_1", {"agent_id": "agent_1"})
+        cache.get_bundle("tenant_2", {"agent_id": "agent_1"})
+        cache.get_bundle("tenant_1", {"agent_id": "agent_1"})
+        cache.get_bundle("tenant_3", {"agent_id": "agent_1"})
+
+        assert cache.get_stats()["cached_bundles"] == 2
+        assert cache.get_bundle("tenant_1", {"agent_id": "agent_1"}) is first
+        assert cache.get_stats()["builds"] == 3
+
+    @pytest.mark.asyncio
+    async def test_functions_filtered_by_intent_and_loaded_once(self):
+        loader = AsyncMock(side_effect=FunctionCallHandler().get_available_functions)
+        cache = PromptBundleCache(loader)
+        bundle = cache.get_bundle("tenant_1")
+
+        functions = await cache.get_functions(bundle, "user_1", "tenant_1", "market_analysis")
+        again = await cache.get_functions(bundle, "user_1", "tenant_1", "market_analysis")
+
+        assert [f["name"] for f in functions] == ["get_market_data", "analyze_trends"]
+        assert again is functions
+        loader.assert_awaited_once()
@@ -0,0 +1,91 @@
+"""
+Unit tests for the atomic sliding-window rate limiter
+"""
+
+import asyncio
+import pytest
+import fakeredis.aioredis
+
+from app.core.security_middleware import AdvancedRateLimitMiddleware, MemorySlidingWindow
+
+RATE_LIMIT = {"requests": 10, "window": 60}
+
+
+class BrokenRedis:
+    def register_script(self, script):
+        async def run(keys, args):
+            raise ConnectionError("redis down")
+        return run
+
+
+@pytest.fixture
+def limiter():
+    async def app(scope, receive, send):
+        pass
+    return AdvancedRateLimitMiddleware(app)
+
+
+class TestAdvancedRateLimit:
+    """Unit tests for AdvancedRateLimitMiddleware._check_rate_limit"""
+
+    @pytest.mark.asyncio
+    async def test_redis_concurrent_requests_never_exceed_limit(self, limiter):
+        limiter.redis_client = fakeredis.aioredis.FakeRedis(max_connections=1000)
+
+        results = await asyncio.gather(*[
+            limiter._check_rate_limit("ip:1.2.3.4", "/api/v1/leads", RATE_LIMIT) for _ in range(1000)
+        ])
+
+        assert sum(allowed for allowed, _, _ in results) == RATE_LIMIT["requests"]
+        assert sorted(remaining for allowed, remaining, _ in results if allowed) == list(range(10))
+        assert all(remaining == 0 for allowed, remaining, _ in results if not allowed)
+        assert await limiter.redis_client.zcard("rate_limit:ip:1.2.3.4:/api/v1/leads") == 10
+        assert 0 < await limiter.redis_client.pttl("rate_limit:ip:1.2.3.4:/api/v1/leads") <= 60000
+
+    @pytest.mark.asyncio
+    async def test_redis_limits_are_per_client_and_path(self, limiter):
+        limiter.redis_client = fakeredis.aioredis.FakeRedis(max_connections=1000)
+
+        for _ in range(10):
+            await limiter._check_rate_limit("ip:1.2.3.4", "/api/v1/leads", RATE_LIMIT)
+
+        assert (await limiter._check_rate_limit("ip:1.2.3.4", "/api/v1/leads", RATE_LIMIT))[0] is False
+        assert (await limiter._check_rate_limit("ip:5.6.7.8", "/api/v1/leads", RATE_LIMIT))[0] is True
+        assert (await limiter._check_rate_limit("ip:1.2.3.4", "/api/v1/analytics", RATE_LIMIT))[0] is True
+
+    @pytest.mark.asyncio
+    async def test_memory_fallback_concurrent_requests_never_exceed_limit(self, limiter):
+        limiter.redis_client = BrokenRedis()
+
+        results = await asyncio.gather(*[
+            limiter._check_rate_limit("ip:1.2.3.4", "/api/v1/leads", RATE_LIMIT) for _ in range(1000)
+        ])
+
+        assert sum(allowed for allowed, _, _ in results) == RATE_LIMIT["requests"]
+        _, remaining, reset = results[-1]
+        assert remaining == 0
+        assert 1 <= reset <= 60
+
+
+class TestMemorySlidingWindow:
+    """Unit tests for the bounded in-memory fallback"""
+
+    def test_window_slides(self):
+        windows = MemorySlidingWindow()
+
+        assert windows.hit("k", 0, 1000, 2) == (True, 1, 1000)
+        assert windows.hit("k", 400, 1000, 2) == (True, 0, 600)
+        assert windows.hit("k", 900, 1000, 2) == (False, 0, 100)
+        # The first request has left the window
+        assert windows.hit("k", 1000, 1000, 2) == (True, 0, 400)
+
+    def test_least_recently_used_keys_are_evicted(self):
+        windows = MemorySlidingWindow(max_keys=2)
+
+        windows.hit("a", 0, 1000, 1)
+        windows.hit("b", 0, 1000, 1)
+        windows.hit("a", 1, 1000, 1)
+        windows.hit("c", 2, 1000, 1)
+
+        assert list(windows.windows) == ["a", "c"]
+        assert windows.windows["a"].maxlen == 1
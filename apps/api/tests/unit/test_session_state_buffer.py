@@ -0,0 +1,234 @@
+"""
+Unit tests for the write-behind session state buffer
+"""
+
+import pytest
+import fakeredis.aioredis
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy.dialects import postgresql
+
+from app.core import cache
+from app.services.session_state_buffer import SessionStateBuffer, LiveSessionState
+
+
+class TestSessionStateBuffer:
+    """Unit tests for SessionStateBuffer"""
+
+    @pytest.fixture
+    def buffer(self):
+        return SessionStateBuffer(flush_interval_seconds=60)
+
+    def test_hot_path_is_memory_only(self, buffer):
+        """Recording turns should only touch in-memory state"""
+        with patch.object(buffer, "_write_database", new_callable=AsyncMock) as mock_write:
+            buffer.update_status("s1", "processing")
+            buffer.record_turn("s1", response_time_ms=800, audio_quality=0.9, successful=True)
+            buffer.record_turn("s1", response_time_ms=2500, audio_quality=0.7, successful=False)
+
+        mock_write.assert_not_called()
+        state = buffer.get_state("s1")
+        assert state.status == "processing"
+        assert state.turns_delta == 2
+        assert state.successful_delta == 1
+        assert state.response_times == [800, 2500]
+        assert state.audio_quality_current == 0.7
+
+    def test_response_times_are_bounded(self, buffer):
+        for i in range(25):
+            buffer.record_turn("s1", response_time_ms=i, audio_quality=None, successful=True)
+
+        assert buffer.get_state("s1").response_times == list(range(15, 25))
+
+    @pytest.mark.asyncio
+    async def test_flush_batches_dirty_sessions(self, buffer):
+        buffer.record_turn("s1", response_time_ms=100, audio_quality=1.0, successful=True)
+        buffer.record_turn("s2", response_time_ms=200, audio_quality=1.0, successful=True)
+
+        with patch.object(buffer, "_write_database", new_callable=AsyncMock) as mock_write, \
+             patch.object(buffer, "_write_journal", new_callable=AsyncMock), \
+             patch.object(buffer, "_clear_journal", new_callable=AsyncMock):
+            flushed = await buffer.flush()
+
+        assert flushed == 2
+        mock_write.assert_awaited_once()
+        snapshot = mock_write.await_args.args[0]
+        assert {state.session_id for state in snapshot} == {"s1", "s2"}
+        assert buffer.get_state("s1").turns_delta == 0
+
+        # Nothing dirty left to flush
+        with patch.object(buffer, "_write_database", new_callable=AsyncMock) as mock_write:
+            assert await buffer.flush() == 0
+            mock_write.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_deltas(self, buffer):
+        buffer.record_turn("s1", response_time_ms=100, audio_quality=1.0, successful=True)
+
+        with patch.object(buffer, "_write_database", new_callable=AsyncMock, side_effect=Exception("db down")), \
+             patch.object(buffer, "_write_journal", new_callable=AsyncMock), \
+             patch.object(buffer, "_clear_journal", new_callable=AsyncMock) as mock_clear:
+            assert await buffer.flush() == 0
+
+        mock_clear.assert_not_called()
+        buffer.record_turn("s1", response_time_ms=100, audio_quality=1.0, successful=False)
+        state = buffer.get_state("s1")
+        assert state.turns_delta == 2
+        assert state.successful_delta == 1
+
+    @pytest.mark.asyncio
+    async def test_end_session_flushes_and_releases(self, buffer):
+        buffer.record_turn("s1", response_time_ms=100, audio_quality=1.0, successful=True)
+
+        with patch.object(buffer, "_write_database", new_callable=AsyncMock) as mock_write, \
+             patch.object(buffer, "_write_journal", new_callable=AsyncMock), \
+             patch.object(buffer, "_clear_journal", new_callable=AsyncMock):
+            await buffer.end_session("s1")
+
+        snapshot = mock_write.await_args.args[0]
+        assert snapshot[0].status == "ended"
+        assert snapshot[0].ended_at is not None
+        assert buffer.get_state("s1") is None
+
+    def test_journal_round_trip(self):
+        state = LiveSessionState(
+            session_id="s1",
+            status="processing",
+            last_activity=datetime(2024, 1, 1, 12, 0, 0),
+            response_times=[100, 200],
+            audio_quality_current=0.8,
+            turns_delta=3,
+            successful_delta=2,
+        )
+        journal = {k.encode(): v.encode() for k, v in state.to_journal().items()}
+
+        assert LiveSessionState.from_journal(journal) == state
+
+
+class TestSessionStateJournal:
+    """Unit tests for the per-process Redis journal"""
+
+    @pytest.fixture
+    def client(self):
+        client = fakeredis.aioredis.FakeRedis()
+        with patch.object(cache, "redis_client", client):
+            yield client
+
+    @pytest.fixture
+    def writes(self):
+        """Batches handed to the database, as (flush_id, states) pairs"""
+        return []
+
+    def make_buffer(self, owner_id, writes):
+        buffer = SessionStateBuffer(flush_interval_seconds=60, owner_id=owner_id)
+
+        async def write_database(snapshot, flush_id):
+            writes.append((flush_id, snapshot))
+
+        buffer._write_database = write_database
+        return buffer
+
+    async def crash(self, buffer, client):
+        """Stop background tasks without flushing, and let the lease lapse"""
+        buffer._flush_task.cancel()
+        buffer._journal_queue.put_nowait(None)
+        await buffer._journal_task
+        await client.delete(buffer._key("lease"))
+
+    @pytest.mark.asyncio
+    async def test_events_are_journaled_as_recorded(self, client, writes):
+        buffer = self.make_buffer("worker-a", writes)
+        await buffer.start()
+        buffer.record_turn("s1", response_time_ms=100, audio_quality=0.9, successful=True)
+        buffer.record_turn("s1", response_time_ms=200, audio_quality=0.8, successful=False)
+        buffer.record_error("s1")
+
+        await buffer._barrier("sync", [], None, None)
+        journal = LiveSessionState.from_journal(await client.hgetall(buffer._key("pending", "s1")))
+        assert (journal.turns_delta, journal.successful_delta, journal.errors_delta) == (2, 1, 1)
+        assert journal.response_times == [100, 200]
+        assert await client.sismember(buffer._key("sessions"), "s1")
+
+        assert await buffer.flush() == 1
+        await buffer._barrier("sync", [], None, None)
+        assert not await client.exists(buffer._key("pending", "s1"), buffer._key("inflight", "s1"))
+        await buffer.stop()
+        assert not await client.sismember("voice_session:journal:owners", "worker-a")
+
+    @pytest.mark.asyncio
+    async def test_crashed_worker_is_recovered_once(self, client, writes):
+        crashed = self.make_buffer("worker-a", writes)
+        await crashed.start()
+        crashed.record_turn("s1", response_time_ms=100, audio_quality=None, successful=True)
+        crashed.record_turn("s1", response_time_ms=100, audio_quality=None, successful=True)
+        await self.crash(crashed, client)
+
+        survivor = self.make_buffer("worker-b", writes)
+        await survivor.start()
+        assert len(writes) == 1
+        assert writes[0][1][0].turns_delta == 2
+
+        # Nothing is left to replay a second time
+        assert await survivor.recover_journals() == 0
+        assert not await client.sismember("voice_session:journal:owners", "worker-a")
+        await survivor.stop()
+
+    @pytest.mark.asyncio
+    async def test_replay_reuses_the_sealed_flush_id(self, client, writes):
+        crashed = self.make_buffer("worker-a", writes)
+        await crashed.start()
+        crashed.record_turn("s1", response_time_ms=100, audio_quality=None, successful=True)
+
+        # Crash after the batch committed but before its journal was dropped
+        with patch.object(crashed, "_clear_journal", new_callable=AsyncMock):
+            await crashed.flush()
+        crashed.record_error("s1")
+        await self.crash(crashed, client)
+
+        survivor = self.make_buffer("worker-b", writes)
+        await survivor.start()
+
+        committed_id = writes[0][0]
+        assert writes[1][0] == committed_id
+        assert writes[2][0] != committed_id
+        assert writes[2][1][0].errors_delta == 1
+        await survivor.stop()
+
+    @pytest.mark.asyncio
+    async def test_live_workers_are_not_replayed(self, client, writes):
+        live = self.make_buffer("worker-a", writes)
+        await live.start()
+        live.record_turn("s1", response_time_ms=100, audio_quality=None, successful=True)
+        await live._barrier("sync", [], None, None)
+
+        other = self.make_buffer("worker-b", writes)
+        await other.start()
+        assert writes == []
+        assert await client.exists(live._key("pending", "s1"))
+        await other.stop()
+        await live.stop()
+
+    @pytest.mark.asyncio
+    async def test_update_skips_already_applied_flush(self):
+        buffer = SessionStateBuffer()
+        captured = {}
+
+        class Session:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def execute(self, stmt, params):
+                captured["sql"] = str(stmt.compile(dialect=postgresql.dialect()))
+
+            async def commit(self):
+                pass
+
+        with patch("app.services.session_state_buffer.AsyncSessionLocal", Session):
+            await buffer._write_database([LiveSessionState(session_id="s1")], "f1")
+
+        assert "last_flush_id IS NULL OR" in captured["sql"]
+        assert "last_flush_id != %(b_flush_id)s" in captured["sql"]
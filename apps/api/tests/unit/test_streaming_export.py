@@ -0,0 +1,90 @@
+"""
+Unit tests for streaming transcript and export helpers
+"""
+
+import gzip
+import json
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.models.conversation import MessageType
+from app.services.conversation_service import ConversationService
+from app.utils.streaming import encode_stream, gzip_stream
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+
+class TestStreamingHelpers:
+    """Unit tests for app.utils.streaming"""
+
+    @pytest.mark.asyncio
+    async def test_gzip_stream_round_trip(self):
+        lines = [json.dumps({"n": i}) + "\n" for i in range(5000)]
+
+        chunks = await _collect(gzip_stream(_aiter(lines), flush_threshold=4096))
+
+        assert len(chunks) > 1
+        assert gzip.decompress(b"".join(chunks)).decode() == "".join(lines)
+
+    @pytest.mark.asyncio
+    async def test_encode_stream(self):
+        chunks = await _collect(encode_stream(_aiter(["a", b"b", "ü"])))
+
+        assert chunks == [b"a", b"b", "ü".encode()]
+
+
+class TestTranscriptStreaming:
+    """Unit tests for ConversationService transcript streaming"""
+
+    @pytest.fixture
+    def service(self):
+        with patch("app.services.conversation_service.AnalyticsService"):
+            return ConversationService()
+
+    def _message(self, n):
+        message = MagicMock()
+        message.to_transcript_format.return_value = f"[12:00:0{n}] Agent: line {n}"
+        return message
+
+    @pytest.mark.asyncio
+    async def test_transcript_is_not_capped(self, service):
+        db = AsyncMock()
+        db.stream_scalars.return_value = _aiter([self._message(i % 10) for i in range(250)])
+
+        transcript = await service.get_conversation_transcript("conv_1", db)
+
+        assert len(transcript.split("\n")) == 250
+        db.stream_scalars.assert_awaited_once()
+        db.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_organization_export_emits_conversation_then_messages(self, service):
+        conversation = MagicMock(
+            id="conv_1", call_id="call_1", voice_agent_id="agent_1", caller_phone="5551234567",
+            status=None, outcome=None, started_at=datetime(2024, 1, 1), ended_at=None,
+            duration_seconds=0, lead_id=None
+        )
+        messages = []
+        for n in range(2):
+            message = MagicMock(
+                sequence_number=n + 1, speaker_name="Agent", message_type=MessageType.AGENT_SPEECH,
+                timestamp=datetime(2024, 1, 1), content=f"hello {n}"
+            )
+            messages.append((conversation, message))
+
+        db = AsyncMock()
+        db.stream.return_value = _aiter(messages)
+
+        lines = await _collect(service.stream_organization_export("org_1", db))
+        records = [json.loads(line) for line in lines]
+
+        assert [r["type"] for r in records] == ["conversation", "message", "message"]
+        assert [r.get("sequence_number") for r in records[1:]] == [1, 2]